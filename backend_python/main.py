@@ -2,6 +2,7 @@ from dotenv import load_dotenv
 
 load_dotenv(".env")  # Load .env into os.environ before any other imports (required by google-adk, google-genai)
 
+import asyncio
 import uuid
 from contextlib import asynccontextmanager
 from typing import Any, cast
@@ -39,6 +40,10 @@ async def lifespan(_app: FastAPI):
     from src.core.tracing import init_tracing, shutdown_tracing
     init_tracing()
 
+    # ── Shared outbound HTTP pool (media fetches) ──────────────────────────────
+    from src.utils.http_client import close_http_clients, startup_http_clients
+    startup_http_clients()
+
     # ── Non-blocking ADK warm-up ──────────────────────────────────────────────
     # Starts ADKOrchestrator initialization (Vertex AI + protobuf loading) in a
     # background thread so /health, /ready and non-chat endpoints are available
@@ -62,6 +67,30 @@ async def lifespan(_app: FastAPI):
     warmup_task = asyncio.create_task(_background_warmup())
     _app.state.warmup_task = warmup_task
 
+    # ── Shared google-genai clients (vision, imagen, insight) ──────────────────
+    from src.utils.genai_client import close_genai_clients, warm_up_genai_clients
+    try:
+        warm_up_genai_clients()
+    except ValueError as _e:
+        logger.warning(f"GenAI client warm-up skipped (will retry lazily): {_e}")
+
+    # ── In-process prezzario code index (retrieve_price_by_code) ───────────────
+    from src.services.prezzario_index import get_prezzario_index
+    await run_in_threadpool(get_prezzario_index)
+
+    # ── Live price book (admin edits in Firestore app_config/price_book) ───────
+    from src.services.price_book_refresher import start_price_book_refresher, stop_price_book_refresher
+    try:
+        start_price_book_refresher()
+    except Exception as _e:  # noqa: BLE001 — logged; the bundled price book keeps serving without live reload
+        logger.warning(f"Price book live reload disabled (serving the bundled JSON): {_e}")
+
+    # ── Offline BM25 indexes (Pinecone fallback / hybrid retrieval) ────────────
+    from src.services.lexical_index import get_lexical_index
+    from src.services.rag_service import NAMESPACE_NORMATIVE, NAMESPACE_PREZZARIO
+    for _ns in (NAMESPACE_PREZZARIO, NAMESPACE_NORMATIVE):
+        await run_in_threadpool(get_lexical_index, _ns)
+
     yield
     # ── Graceful Shutdown ──────────────────────────────────────────────────────
     # Cloud Run sends SIGTERM and waits up to 40s (--timeout-graceful-shutdown).
@@ -70,6 +99,24 @@ async def lifespan(_app: FastAPI):
     if not warmup_task.done():
         warmup_task.cancel()
         logger.info("Cancelled in-progress ADKOrchestrator warm-up.")
+    await stop_price_book_refresher()
+    # Drain the ADK session write-behind queue before the Firestore channel closes.
+    try:
+        from src.adk.session import shutdown_session_service
+        await asyncio.wait_for(shutdown_session_service(), timeout=10.0)
+        logger.info("ADK session event log flushed.")
+    except Exception as _e:  # noqa: BLE001 — logged; shutdown must go on to close the remaining clients
+        logger.warning(f"ADK session flush on shutdown failed: {_e}")
+    try:
+        await close_http_clients()
+        logger.info("Shared HTTP pool closed.")
+    except Exception as _e:  # noqa: BLE001 — logged; shutdown must go on to close the remaining clients
+        logger.warning(f"HTTP pool close on shutdown failed: {_e}")
+    try:
+        await close_genai_clients()
+        logger.info("Shared GenAI clients closed.")
+    except Exception as _e:  # noqa: BLE001 — logged; shutdown must go on to close the remaining clients
+        logger.warning(f"GenAI client close on shutdown failed: {_e}")
     shutdown_tracing()
     try:
         import src.db.firebase_client as _fb
@@ -170,6 +217,9 @@ async def app_exception_handler(request: Request, exc: AppException):
             headers["Retry-After"] = str(max(1, int(delta)))
         except (ValueError, TypeError):
             headers["Retry-After"] = "60"
+    # RFC 9110 §15.6.4: tell overloaded clients when to come back
+    if exc.status_code == 503 and exc.detail and exc.detail.get("retry_after"):
+        headers["Retry-After"] = str(exc.detail["retry_after"])
     return JSONResponse(
         status_code=exc.status_code,
         content=APIErrorResponse(
@@ -574,9 +624,20 @@ async def readiness_check():
         checks["firestore"] = "error"
 
     all_ok = all(v == "ok" for v in checks.values())
+    # Informational only: a saturated instance is still ready (it queues/sheds load itself).
+    from src.auth.token_cache import get_token_cache
+    from src.core.admission import get_admission_controller
+    from src.utils.genai_client import genai_client_stats
+    token_cache = get_token_cache()
     return JSONResponse(
         status_code=200 if all_ok else 503,
-        content={"status": "ready" if all_ok else "not_ready", "checks": checks},
+        content={
+            "status": "ready" if all_ok else "not_ready",
+            "checks": checks,
+            "admission": get_admission_controller().stats(),
+            "genai": genai_client_stats(),
+            "token_cache": token_cache.stats() if token_cache is not None else None,
+        },
     )
 
 
@@ -634,9 +695,19 @@ async def chat_stream(
             logger.warning(f"Failed to apply multimodal rate limit penalty: {e}")
             # Non-blocking: we continue even if penalty fails to avoid crashing the whole stream
 
+    # 🚦 Admission control: global stream cap + per-user fair queue (503 + Retry-After when saturated).
+    # Acquired before any Firestore work so a rejected request costs nothing downstream.
+    from src.core.admission import get_admission_controller, guard_stream
+    slot = await get_admission_controller().acquire(
+        user_session.uid, cost=settings.CHAT_ADMISSION_MEDIA_COST if has_media else 1,
+    )
+
     logger.info(
         "Chat stream request received. Starting StreamingResponse.",
-        extra={"message_count": len(body.messages), "session_id": body.session_id, "has_media": has_media},
+        extra={
+            "message_count": len(body.messages), "session_id": body.session_id,
+            "has_media": has_media, "admission_wait_ms": round(slot.waited_ms, 1),
+        },
     )
 
     # --- CHRONOLOGICAL ANCHOR: SAVE USER MESSAGE BEFORE GENERATOR ---
@@ -677,6 +748,9 @@ async def chat_stream(
     repo = get_conversation_repository()
     try:
         await repo.ensure_session(body.session_id, user_session.uid)
+    except asyncio.CancelledError:
+        slot.release()
+        raise
     except Exception as e:  # noqa: BLE001
         logger.error(f"Failed to ensure session before stream: {e}")
 
@@ -702,7 +776,7 @@ async def chat_stream(
     # The orchestrator emits the AI SDK v6 UI Message Stream protocol (SSE),
     # which @ai-sdk/react parses via x-vercel-ai-ui-message-stream: v1.
     return StreamingResponse(
-        orchestrator.stream_chat(body, user_session, background_tasks),
+        guard_stream(orchestrator.stream_chat(body, user_session, background_tasks), slot),
         media_type="text/event-stream; charset=utf-8",
         headers={
             "Connection": "close",
@@ -0,0 +1,91 @@
+"""
+Benchmark chat-turn persistence (ConversationRepository) against a local Firestore fake.
+
+A turn persists its tool results and the assistant reply. Compared paths:
+  legacy         — previous save_message: add/set + session get + session set (3 round-trips/message)
+  write-through  — save_message as one WriteBatch per message (1 round-trip/message)
+  write-behind   — TurnWriter(write_behind=True): the whole turn in one commit after the stream
+
+The fake (tests/unit/firestore_fake.py) sleeps --rtt-ms per server call, so wall
+time is dominated by round-trips, as it is against real Firestore from Cloud Run.
+
+Run:
+    cd backend_python
+    uv run python scripts/bench_conversation_persistence.py
+    uv run python scripts/bench_conversation_persistence.py --tools 6 --rtt-ms 12
+
+Options:
+    --tools 3      # tool results per turn (plus one assistant message)
+    --rtt-ms 8     # simulated Firestore round-trip time
+    --turns 20     # turns per path (mean reported)
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from datetime import UTC, datetime, timedelta
+from unittest.mock import patch
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from google.cloud import firestore
+from src.repositories import conversation_repository as repo_mod
+from src.repositories.conversation_repository import ConversationRepository
+from tests.unit.firestore_fake import FakeFirestore
+
+
+async def legacy_save(db: FakeFirestore, session_id: str, role: str, content: str, user_id: str) -> None:
+    """The pre-batch save_message call pattern, kept for comparison."""
+    expire_at = datetime.now(UTC) + timedelta(days=30)
+    messages_ref = db.collection("sessions").document(session_id).collection("messages")
+    await messages_ref.add({"role": role, "content": content, "timestamp": datetime.now(UTC), "expireAt": expire_at})
+    session_ref = db.collection("sessions").document(session_id)
+    session_doc = await session_ref.get()
+    update = {
+        "updatedAt": firestore.SERVER_TIMESTAMP, "sessionId": session_id,
+        "messageCount": firestore.Increment(1), "expireAt": expire_at,
+    }
+    if not session_doc.exists:
+        update["createdAt"] = firestore.SERVER_TIMESTAMP
+    if not (session_doc.to_dict() or {}).get("userId"):
+        update["userId"] = user_id
+    await session_ref.set(update, merge=True)
+
+
+async def run_turn(path: str, db: FakeFirestore, repo: ConversationRepository, session_id: str, tools: int) -> None:
+    messages = [("tool", f"result {i}") for i in range(tools)] + [("assistant", "Ecco il preventivo.")]
+    if path == "legacy":
+        for role, content in messages:
+            await legacy_save(db, session_id, role, content, "u1")
+        return
+    turn = repo.begin_turn(session_id, "u1", write_behind=path == "write-behind")
+    for role, content in messages:
+        await turn.save(role=role, content=content, timestamp=datetime.now(UTC))
+    await turn.flush()
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tools", type=int, default=3)
+    parser.add_argument("--rtt-ms", type=float, default=8.0)
+    parser.add_argument("--turns", type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"{args.tools} tool results + 1 reply per turn, {args.rtt_ms} ms simulated RTT, {args.turns} turns\n")
+    print(f"{'path':<14} {'RPCs/turn':>10} {'ms/turn':>9} {'speedup':>8}")
+    baseline = None
+    for path in ("legacy", "write-through", "write-behind"):
+        db = FakeFirestore(rtt=args.rtt_ms / 1000)
+        with patch.object(repo_mod, "get_async_firestore_client", return_value=db):
+            repo = ConversationRepository()
+            started = time.perf_counter()
+            for t in range(args.turns):
+                await run_turn(path, db, repo, f"s{t % 4}", args.tools)
+            per_turn = (time.perf_counter() - started) * 1000 / args.turns
+        baseline = baseline or per_turn
+        print(f"{path:<14} {db.round_trips / args.turns:>10.1f} {per_turn:>9.1f} {baseline / per_turn:>7.1f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,75 @@
+"""
+Benchmark the pre-model image normalization stage (src/vision/preprocess.py).
+
+Reports, per use case, the bytes sent to Gemini before/after normalization and
+the decode+resize+encode time.
+
+Run:
+    cd backend_python
+    uv run python scripts/bench_image_preprocess.py                 # synthetic 12 MP photo
+    uv run python scripts/bench_image_preprocess.py photo1.jpg ...  # your own photos
+
+Options:
+    --format jpeg|webp   # re-encode format (default: settings.VISION_ENCODE_FORMAT)
+    --quality 85         # encode quality (default: settings.VISION_ENCODE_QUALITY)
+    --repeat 5           # timed runs per image/profile (median reported)
+"""
+import argparse
+import io
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image, ImageFilter
+from src.core.config import settings
+from src.vision.preprocess import normalize_image
+
+
+def synthetic_photo(size: tuple[int, int] = (4032, 3024)) -> bytes:
+    """Phone-like JPEG: smooth gradients plus fine sensor-like noise, quality 95."""
+    base = Image.radial_gradient("L").resize(size).convert("RGB")
+    noise = Image.effect_noise(size, 24).convert("RGB").filter(ImageFilter.GaussianBlur(0.6))
+    img = Image.blend(base, noise, 0.35)
+    out = io.BytesIO()
+    img.save(out, format="JPEG", quality=95)
+    return out.getvalue()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("images", nargs="*", type=Path)
+    parser.add_argument("--format", default=settings.VISION_ENCODE_FORMAT)
+    parser.add_argument("--quality", type=int, default=settings.VISION_ENCODE_QUALITY)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    sources = [(p.name, p.read_bytes()) for p in args.images] or [("synthetic-12MP.jpg", synthetic_photo())]
+
+    print(f"{'image':<24} {'use':<12} {'long_edge':>9} {'in_KB':>9} {'out_KB':>9} {'saved':>7} {'ms':>8}")
+    total_in = total_out = 0
+    for name, data in sources:
+        for use, long_edge in settings.VISION_LONG_EDGE.items():
+            timings = []
+            result = None
+            for _ in range(args.repeat):
+                started = time.perf_counter()
+                result = normalize_image(data, long_edge=long_edge, encode_format=args.format, quality=args.quality)
+                timings.append((time.perf_counter() - started) * 1000)
+            assert result is not None
+            saved = 1 - len(result.data) / len(data)
+            total_in += len(data)
+            total_out += len(result.data)
+            print(
+                f"{name[:24]:<24} {use:<12} {long_edge:>9} {len(data) / 1024:>9.0f} "
+                f"{len(result.data) / 1024:>9.0f} {saved:>6.0%} {statistics.median(timings):>8.1f}"
+            )
+    print(f"\nTotal: {total_in / 1024 / 1024:.1f} MB -> {total_out / 1024 / 1024:.1f} MB "
+          f"({1 - total_out / total_in:.0%} fewer bytes sent to the model)")
+
+
+if __name__ == "__main__":
+    main()
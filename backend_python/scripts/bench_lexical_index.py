@@ -0,0 +1,169 @@
+"""
+Benchmark the offline BM25 indexes (src/services/lexical_index.py).
+
+Queries are the user turns of the tests/evals/*.test.json scenarios. There are
+no relevance labels for them, so recall is measured two ways:
+
+  - known-item: a sample of indexed chunks is queried by its own description
+    (code and boilerplate stripped); recall@k = chunk found in the top k;
+  - vs dense (--dense, needs PINECONE_API_KEY): share of the Pinecone top-k
+    that BM25 and the hybrid fusion also return for each eval query.
+
+Latency is reported per retriever as p50/p95 over all queries.
+
+Run:
+    cd backend_python
+    uv run python scripts/build_lexical_index.py      # once, after ingestion
+    uv run python scripts/bench_lexical_index.py
+    uv run python scripts/bench_lexical_index.py --dense
+
+Options:
+    --namespace prezzario   # repeatable; default: every built namespace
+    --top-k 10              # depth for recall@k (default: 10)
+    --sample 500            # known-item queries per namespace (default: 500)
+    --repeat 5              # timed runs per eval query (default: 5)
+    --dense                 # also query Pinecone and compare
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.services.lexical_index import LexicalIndex, index_path
+from src.services.rag_service import (
+    NAMESPACE_NORMATIVE,
+    NAMESPACE_PREZZARIO,
+    RAGService,
+    fuse_dense_lexical,
+)
+
+EVALS_DIR = Path(__file__).resolve().parents[1] / "tests" / "evals"
+_BOILERPLATE = re.compile(r"(Codice articolo|Categoria|Unità di misura|Prezzo unitario|Documento|Sezione):[^.]*\.")
+
+
+def eval_queries() -> list[str]:
+    queries = []
+    for path in sorted(EVALS_DIR.glob("*.test.json")):
+        for case in json.loads(path.read_text(encoding="utf-8")).get("evalCases", []):
+            for turn in case.get("conversation", []):
+                for part in turn.get("userContent", {}).get("parts", []):
+                    if part.get("text"):
+                        queries.append(part["text"])
+    return queries
+
+
+def known_item_query(metadata: dict) -> str:
+    text = metadata.get("descrizione") or _BOILERPLATE.sub(" ", metadata.get("chunk_text", ""))
+    return " ".join(text.split()[:12])
+
+
+def _record_key(hit: dict) -> str:
+    metadata = hit.get("metadata") or {}
+    return metadata.get("codice") or metadata.get("chunk_text") or str(hit.get("id"))
+
+
+def _pct(samples: list[float]) -> str:
+    if len(samples) < 2:
+        return f"{samples[0] * 1000:7.2f} ms" if samples else "      n/a"
+    q = statistics.quantiles(samples, n=20)
+    return f"p50 {statistics.median(samples) * 1000:7.2f} ms  p95 {q[-1] * 1000:7.2f} ms"
+
+
+def bench_known_item(index: LexicalIndex, top_k: int, sample: int) -> None:
+    docs = index._docs
+    picked = random.Random(0).sample(range(len(docs)), min(sample, len(docs)))
+    hits_at_1 = hits_at_k = 0
+    rr_total = 0.0
+    timings = []
+    for doc_no in picked:
+        query = known_item_query(docs[doc_no]["metadata"])
+        started = time.perf_counter()
+        results = index.search(query, top_k)
+        timings.append(time.perf_counter() - started)
+        ids = [r["id"] for r in results]
+        target = docs[doc_no]["id"]
+        if target in ids:
+            rank = ids.index(target) + 1
+            hits_at_k += 1
+            hits_at_1 += rank == 1
+            rr_total += 1.0 / rank
+    n = len(picked) or 1
+    print(
+        f"  known-item  n={len(picked):<5} recall@1 {hits_at_1 / n:.3f}  recall@{top_k} {hits_at_k / n:.3f}"
+        f"  MRR {rr_total / n:.3f}  {_pct(timings)}"
+    )
+
+
+async def bench_eval_queries(
+    namespace: str, index: LexicalIndex, rag: RAGService | None, top_k: int, repeat: int,
+) -> None:
+    queries = eval_queries()
+    bm25_t, dense_t = [], []
+    bm25_recall, hybrid_recall = [], []
+    for query in queries:
+        for _ in range(repeat):
+            started = time.perf_counter()
+            lexical = index.search(query, top_k)
+            bm25_t.append(time.perf_counter() - started)
+        if rag is None:
+            continue
+        started = time.perf_counter()
+        dense = await rag._query_index(rag.index, query, top_k, None, namespace, False, 0.0)
+        dense_t.append(time.perf_counter() - started)
+        if not dense:
+            continue
+        reference = {_record_key(h) for h in dense}
+        hybrid = fuse_dense_lexical(dense, lexical)[:top_k]
+        bm25_recall.append(len(reference & {_record_key(h) for h in lexical}) / len(reference))
+        hybrid_recall.append(len(reference & {_record_key(h) for h in hybrid}) / len(reference))
+
+    print(f"  eval        n={len(queries):<5} bm25   {_pct(bm25_t)}")
+    if rag is not None:
+        print(f"                        dense  {_pct(dense_t)}")
+        if bm25_recall:
+            print(
+                f"                        overlap with dense@{top_k}: "
+                f"bm25 {statistics.mean(bm25_recall):.3f}  hybrid {statistics.mean(hybrid_recall):.3f}"
+            )
+
+
+async def main_async(args) -> None:
+    rag = None
+    if args.dense:
+        rag = RAGService()
+        if not rag.index:
+            print("Pinecone not available — dense comparison skipped.")
+            rag = None
+
+    for namespace in args.namespace or [NAMESPACE_PREZZARIO, NAMESPACE_NORMATIVE]:
+        path = index_path(namespace)
+        if not path.exists():
+            print(f"[{namespace}] {path} not built — run scripts/build_lexical_index.py")
+            continue
+        index = LexicalIndex(path)
+        print(f"[{namespace}] {len(index)} chunks, {path.stat().st_size / 1024:.0f} KB")
+        bench_known_item(index, args.top_k, args.sample)
+        await bench_eval_queries(namespace, index, rag, args.top_k, args.repeat)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--namespace", action="append")
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--sample", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--dense", action="store_true")
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
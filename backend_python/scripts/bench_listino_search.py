@@ -0,0 +1,111 @@
+"""
+Benchmark search_listino's inverted index against the old full-catalog scan.
+
+Builds a synthetic catalog N× the master price book (default 100×): every
+item is cloned with extra material/finish/size words and a fresh SKU, so the
+vocabulary and posting lists grow the way a larger listino would. Times, per
+query, the previous algorithm (normalize every item, count token overlap)
+and `_ListinoIndex.search`, plus the one-off index build.
+
+Run:
+    cd backend_python
+    uv run python scripts/bench_listino_search.py
+    uv run python scripts/bench_listino_search.py --scale 1000 --repeat 50
+
+Options:
+    --scale 100      # catalog size as a multiple of the master price book (default: 100)
+    --repeat 20      # timed runs per query (default: 20)
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.services.pricing_service import PriceBookSnapshot
+from src.tools.listino_tools import _ListinoIndex, _normalize, _searchable
+
+_QUERIES = [
+    "quanto costa una finestra in pvc",
+    "rifacimento bagno completo",
+    "piastrelle pavimento gres",
+    "tinteggiatura pareti",
+    "porte interne scorrevoli",
+    "caldaia a condensazione",
+    "demolizone tramezzi",  # typo
+    "piscina interrata",  # no match
+]
+_VARIANTS = [
+    "bianco", "grigio", "rovere", "noce", "antracite", "satinato", "lucido", "opaco", "rinforzato", "economico",
+    "premium", "compatto", "maxi", "slim", "ecologico", "certificato", "antiscivolo", "ignifugo", "isolante",
+]
+
+
+def synthetic_catalog(scale: int) -> list[dict]:
+    rng = random.Random(scale)
+    base = list(PriceBookSnapshot.load().items)
+    catalog = []
+    for copy in range(scale):
+        for item in base:
+            extra = " ".join(rng.sample(_VARIANTS, 2))
+            catalog.append({
+                **item,
+                "sku": f"{item['sku']}-{copy:04d}",
+                "description": f"{item['description']} {extra} ({rng.randint(40, 200)}x{rng.randint(40, 250)} cm)",
+                "tags": list(item.get("tags") or []) + [rng.choice(_VARIANTS)],
+            })
+    return catalog
+
+
+def linear_search(items: list[dict], query: str) -> list[tuple[int, dict]]:
+    """search_listino's matching before the inverted index."""
+    q_tokens = _normalize(query)
+    scored = []
+    for item in items:
+        item_tokens = set(_normalize(_searchable(item)))
+        score = sum(1 for t in q_tokens if t in item_tokens)
+        if score > 0:
+            scored.append((score, item))
+    scored.sort(key=lambda s: s[0], reverse=True)
+    return scored
+
+
+def _ms(samples: list[float], q: int) -> float:
+    return statistics.quantiles(samples, n=100)[q - 1] * 1000 if len(samples) > 1 else samples[0] * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    catalog = synthetic_catalog(args.scale)
+    started = time.perf_counter()
+    index = _ListinoIndex(catalog)
+    build = time.perf_counter() - started
+    print(f"catalog: {len(catalog)} items, {len(index.postings)} terms, index build {build * 1000:.0f} ms\n")
+    print(f"{'query':<36} {'hits':>6} {'scan p50':>9} {'index p50':>10} {'index p95':>10} {'speedup':>8}")
+
+    for query in _QUERIES:
+        scan, indexed = [], []
+        for _ in range(args.repeat):
+            t0 = time.perf_counter()
+            linear_search(catalog, query)
+            t1 = time.perf_counter()
+            hits = index.search(_normalize(query))
+            t2 = time.perf_counter()
+            scan.append(t1 - t0)
+            indexed.append(t2 - t1)
+        speedup = statistics.median(scan) / max(statistics.median(indexed), 1e-9)
+        print(
+            f"{query:<36} {len(hits):>6} {_ms(scan, 50):>8.2f}ms {_ms(indexed, 50):>9.3f}ms "
+            f"{_ms(indexed, 95):>9.3f}ms {speedup:>7.0f}×"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Micro-benchmark for the /chat/stream SSE serializer (src/utils/stream_protocol.py).
+
+Compares, on a synthetic token-level reply:
+  legacy     — the previous path: json.dumps(ensure_ascii=False) for every frame
+  fast       — pre-encoded frame prefixes + orjson (if installed), no coalescing
+  coalesced  — fast + text-delta coalescing (settings.SSE_COALESCE_*)
+
+Each frame is one write through the raw ASGI middlewares, so fewer frames for
+the same text means less per-write overhead downstream; tokens/s is the rate at
+which the serializer drains the model stream.
+
+Run:
+    cd backend_python
+    uv run python scripts/bench_sse_stream.py                   # 5000 tokens, burst
+    uv run python scripts/bench_sse_stream.py --pace-ms 2       # model-like pacing
+
+Options:
+    --tokens 5000     # text-delta chunks in the reply
+    --pace-ms 0       # delay between tokens (0 = as fast as possible)
+    --repeat 5        # runs per path (median reported)
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+from collections.abc import AsyncIterator
+from typing import Any
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core.config import settings
+from src.utils import stream_protocol
+from src.utils.stream_protocol import TEXT_PART_ID, to_ui_message_stream
+
+_WORDS = "Il bagno misura circa sei metri quadrati, con piastrelle già posate e un lucernario però da sostituire.".split()
+
+
+def _legacy_sse(chunk: dict[str, Any]) -> str:
+    return f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n"
+
+
+async def legacy_stream(source: AsyncIterator[dict[str, Any]]) -> AsyncIterator[str]:
+    """The pre-coalescing to_ui_message_stream loop, kept verbatim for comparison."""
+    text_open = False
+    yield _legacy_sse({"type": "start"})
+    async for chunk in source:
+        if chunk.get("type") == "text-delta":
+            if not text_open:
+                yield _legacy_sse({"type": "text-start", "id": TEXT_PART_ID})
+                text_open = True
+            yield _legacy_sse(chunk)
+        else:
+            if text_open:
+                yield _legacy_sse({"type": "text-end", "id": TEXT_PART_ID})
+                text_open = False
+            yield _legacy_sse(chunk)
+    if text_open:
+        yield _legacy_sse({"type": "text-end", "id": TEXT_PART_ID})
+    yield _legacy_sse({"type": "finish"})
+    yield "data: [DONE]\n\n"
+
+
+async def token_source(n: int, pace_s: float) -> AsyncIterator[dict[str, Any]]:
+    yield {"type": "data-status", "data": {"type": "status", "message": "Syd sta analizzando..."}, "transient": True}
+    for i in range(n):
+        if pace_s:
+            await asyncio.sleep(pace_s)
+        yield {"type": "text-delta", "id": TEXT_PART_ID, "delta": _WORDS[i % len(_WORDS)] + " "}
+
+
+async def run_once(path: str, n: int, pace_s: float) -> tuple[int, int, float]:
+    source = token_source(n, pace_s)
+    if path == "legacy":
+        stream = legacy_stream(source)
+    elif path == "fast":
+        stream = to_ui_message_stream(source)
+    else:
+        stream = to_ui_message_stream(
+            source,
+            coalesce_window_ms=settings.SSE_COALESCE_WINDOW_MS,
+            coalesce_max_chars=settings.SSE_COALESCE_MAX_CHARS,
+        )
+    frames = size = 0
+    started = time.perf_counter()
+    async for frame in stream:
+        frames += 1
+        size += len(frame.encode())
+    return frames, size, time.perf_counter() - started
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tokens", type=int, default=5000)
+    parser.add_argument("--pace-ms", type=float, default=0.0)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"orjson: {'yes' if stream_protocol.orjson is not None else 'no (json fallback)'}; "
+          f"coalesce window {settings.SSE_COALESCE_WINDOW_MS} ms / {settings.SSE_COALESCE_MAX_CHARS} chars; "
+          f"{args.tokens} tokens, pace {args.pace_ms} ms\n")
+    print(f"{'path':<10} {'frames':>8} {'KB':>9} {'ms':>9} {'tokens/s':>11} {'frames/s':>11} {'MB/s':>8}")
+    for path in ("legacy", "fast", "coalesced"):
+        runs = [await run_once(path, args.tokens, args.pace_ms / 1000) for _ in range(args.repeat)]
+        frames, size, _ = runs[-1]
+        elapsed = statistics.median(r[2] for r in runs)
+        print(f"{path:<10} {frames:>8} {size / 1024:>9.1f} {elapsed * 1000:>9.1f} "
+              f"{args.tokens / elapsed:>11.0f} {frames / elapsed:>11.0f} {size / elapsed / 1e6:>8.2f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,120 @@
+"""
+Benchmark the local vector backend (src/services/vector_backend.py) against corpus size.
+
+Builds synthetic namespaces of random unit vectors (no embedding cost), stores
+them exactly as LocalVectorBackend does (memory-mapped .npy, float32 or int8),
+and times brute-force top-k for single queries, query batches and filtered
+queries. The point is to find the corpus size where a scan stops fitting the
+latency budget and an ANN index (or Pinecone) is needed.
+
+Run:
+    cd backend_python
+    uv run python scripts/bench_vector_backend.py
+    uv run python scripts/bench_vector_backend.py --sizes 10000 100000 1000000 --dim 768
+
+Options:
+    --sizes 1000 10000 100000 500000   # corpus sizes (default)
+    --dim 768                          # vector dimension (default: 768)
+    --queries 50                       # timed queries per configuration (default: 50)
+    --batch 32                         # queries per batched matmul (default: 32)
+    --top-k 10
+    --budget-ms 50                     # per-query p95 budget used for the verdict
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from src.services.vector_backend import LocalVectorBackend, _normalize
+
+
+class _NoEmbedder:
+    def __init__(self, dim: int):
+        self.dim = dim
+
+    def embed(self, texts, *, query=False):  # vectors are written directly
+        raise NotImplementedError
+
+
+def synthetic_vectors(size: int, dim: int) -> np.ndarray:
+    rng = np.random.default_rng(size)
+    vectors = np.empty((size, dim), dtype=np.float32)
+    for start in range(0, size, 100_000):  # keep the generator's temporaries small
+        stop = min(start + 100_000, size)
+        vectors[start:stop] = _normalize(rng.standard_normal((stop - start, dim), dtype=np.float32))
+    return vectors
+
+
+def _p(samples: list[float], q: int) -> float:
+    return statistics.quantiles(samples, n=100)[q - 1] * 1000 if len(samples) > 1 else samples[0] * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000, 500_000])
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--batch", type=int, default=32)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--budget-ms", type=float, default=50.0)
+    args = parser.parse_args()
+
+    queries = _normalize(np.random.default_rng(0).standard_normal((args.queries, args.dim), dtype=np.float32))
+    print(
+        f"{'size':>9} {'dtype':>7} {'MB':>8} {'p50 ms':>8} {'p95 ms':>8} "
+        f"{'batch/q ms':>10} {'filt p50':>9} {'recall@k':>8}  verdict"
+    )
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in args.sizes:
+            vectors = synthetic_vectors(size, args.dim)
+            records = [{"_id": str(i), "categoria": f"cat-{i % 20}"} for i in range(size)]
+            exact_rows = None
+            for quantize in (False, True):
+                backend = LocalVectorBackend(Path(tmp) / f"{size}-{quantize}", _NoEmbedder(args.dim), quantize)
+                backend._write("bench", vectors, records)
+                ns_dir = backend._live_version("bench")
+                assert ns_dir is not None
+                mb = sum(p.stat().st_size for p in ns_dir.glob("*.npy")) / 2**20
+
+                single = []
+                rows_all = []
+                for q in queries:
+                    started = time.perf_counter()
+                    rows, _ = backend.query_vectors("bench", q[None, :], args.top_k)
+                    single.append(time.perf_counter() - started)
+                    rows_all.append(rows[0])
+
+                started = time.perf_counter()
+                for start in range(0, len(queries), args.batch):
+                    backend.query_vectors("bench", queries[start:start + args.batch], args.top_k)
+                batched = (time.perf_counter() - started) / len(queries) * 1000
+
+                filtered = []
+                for q in queries[:10]:
+                    started = time.perf_counter()
+                    backend.query_vectors("bench", q[None, :], args.top_k, {"categoria": {"$in": ["cat-1", "cat-2"]}})
+                    filtered.append(time.perf_counter() - started)
+
+                if exact_rows is None:
+                    exact_rows = rows_all
+                    recall = 1.0
+                else:
+                    recall = statistics.mean(
+                        len(set(a) & set(b)) / args.top_k for a, b in zip(exact_rows, rows_all, strict=True)
+                    )
+                p95 = _p(single, 95)
+                verdict = "ok" if p95 <= args.budget_ms else "over budget → ANN/Pinecone"
+                print(
+                    f"{size:>9} {'int8' if quantize else 'float32':>7} {mb:>8.1f} {_p(single, 50):>8.2f} {p95:>8.2f} "
+                    f"{batched:>10.2f} {_p(filtered, 50):>9.2f} {recall:>8.3f}  {verdict}"
+                )
+
+
+if __name__ == "__main__":
+    main()
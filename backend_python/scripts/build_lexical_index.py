@@ -0,0 +1,75 @@
+"""
+Build the offline BM25 indexes (src/services/lexical_index.py).
+
+Uses the exact chunks the Pinecone ingestion produces — `build_chunks` from
+ingest_prezzario.py and `chunk_markdown` from ingest_normative.py — so the
+lexical fallback and the dense index cover the same records. Re-run it after
+every re-ingestion.
+
+Run:
+    cd backend_python
+    uv run python scripts/build_lexical_index.py
+
+Options:
+    --prezzario data/prezzario_lazio_2023_structured.json   # extract_prezzario.py output
+    --normative-dir data/knowledge/normative                # markdown sources
+    --out-dir data/lexical                                  # default: settings.RAG_LEXICAL_INDEX_DIR
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ingest_normative import chunk_markdown
+from ingest_prezzario import build_chunks
+from src.services.lexical_index import index_path, write_lexical_index
+from src.services.rag_service import NAMESPACE_NORMATIVE, NAMESPACE_PREZZARIO
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s | %(levelname)-8s | [%(name)s] %(message)s",
+)
+logger = logging.getLogger("BuildLexicalIndex")
+
+
+def _write(namespace: str, chunks: list[dict], out_dir: str | None) -> None:
+    path = Path(out_dir) / f"{namespace}.bm25" if out_dir else index_path(namespace)
+    started = time.perf_counter()
+    count = write_lexical_index(path, chunks)
+    size_kb = path.stat().st_size / 1024
+    logger.info(
+        f"'{namespace}': {count} chunks → {path} ({size_kb:.0f} KB, {time.perf_counter() - started:.2f}s)"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--prezzario", default="data/prezzario_lazio_2023_structured.json")
+    parser.add_argument("--normative-dir", default="data/knowledge/normative")
+    parser.add_argument("--out-dir", default=None)
+    args = parser.parse_args()
+
+    prezzario = Path(args.prezzario)
+    if prezzario.exists():
+        articles = json.loads(prezzario.read_text(encoding="utf-8"))
+        _write(NAMESPACE_PREZZARIO, build_chunks(articles), args.out_dir)
+    else:
+        logger.warning(f"{prezzario} not found — skipping '{NAMESPACE_PREZZARIO}' (run extract_prezzario.py)")
+
+    md_files = sorted(Path(args.normative_dir).rglob("*.md"))
+    if md_files:
+        chunks = []
+        for md_file in md_files:
+            chunks.extend(chunk_markdown(md_file.read_text(encoding="utf-8"), source_name=md_file.name))
+        _write(NAMESPACE_NORMATIVE, chunks, args.out_dir)
+    else:
+        logger.warning(f"No markdown files in {args.normative_dir} — skipping '{NAMESPACE_NORMATIVE}'")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,25 +4,50 @@ Extract structured data from the Tariffa Regionale Lazio 2023 PDF using Gemini 2
 Processes each page with Structured Output to produce a JSON file where each record
 represents a single price-list article with code, description, unit, price, and category.
 
+Pipeline:
+    1. split:   single-page PDFs are cut in a process pool (pypdf is pure Python
+                and CPU-bound), overlapping with the extraction of earlier pages;
+    2. extract: up to --concurrency Gemini calls in flight, paced by a request
+                bucket (--rpm) that halves on 429/RESOURCE_EXHAUSTED and grows
+                back on success; failed calls retry with exponential backoff;
+    3. record:  every finished page is appended to a JSONL checkpoint, so a rerun
+                on the same PDF only extracts the pages still missing;
+    4. merge:   pages are merged in order and deduplicated by normalized codice
+                (as PrezzarioIndex keys it; first occurrence wins) into the
+                output JSON.
+
+Throughput (pages/min) and an ETA are logged as pages complete.
+
 Output: data/prezzario_lazio_2023_structured.json
 
 Usage:
     uv run python scripts/extract_prezzario.py
     uv run python scripts/extract_prezzario.py --pages 1-10   # extract subset
+    uv run python scripts/extract_prezzario.py --concurrency 4 --rpm 15   # free tier
+    uv run python scripts/extract_prezzario.py --merge-only   # rebuild the JSON from the checkpoint
+    uv run python scripts/extract_prezzario.py --fresh        # ignore pages extracted by earlier runs
 """
 import os
+import io
 import sys
 import json
 import time
+import random
+import asyncio
+import hashlib
 import logging
 import argparse
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Optional
+from typing import Any
 
 from pydantic import BaseModel, Field
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from src.core.config import settings
+from src.services.bulk_upsert import TokenBucket, is_rate_limited
+from src.services.prezzario_index import normalize_code
 
 logging.basicConfig(
     level=logging.INFO,
@@ -30,6 +55,10 @@ logging.basicConfig(
 )
 logger = logging.getLogger("ExtractPrezzario")
 
+MODEL = "gemini-2.5-flash"
+_BACKOFF_BASE_SECONDS = 2.0
+_BACKOFF_MAX_SECONDS = 60.0
+
 
 # ── Pydantic schemas for Gemini Structured Output ─────────────────────────────
 
@@ -88,76 +117,246 @@ REGOLE IMPORTANTI:
 """
 
 
-def extract_pages(pdf_path: str, start_page: int = 0, end_page: Optional[int] = None) -> list[ArticoloPrezzario]:
-    """Extract structured articles from PDF pages using Gemini 2.5 Flash."""
-    from google import genai
-    from google.genai import types
-    from pypdf import PdfReader, PdfWriter
-    import io
+# ── Stage 1: page splitting (process pool) ────────────────────────────────────
+
+_reader = None  # per worker process: the PDF is parsed once, not once per page
+
+
+def _init_splitter(pdf_path: str) -> None:
+    global _reader
+    from pypdf import PdfReader
+
+    _reader = PdfReader(pdf_path)
+
+
+def _page_pdf(page_idx: int) -> bytes:
+    """One page of the worker's PDF as a standalone single-page PDF."""
+    from pypdf import PdfWriter
 
-    client = genai.Client(api_key=settings.api_key)
-    reader = PdfReader(pdf_path)
-    total_pages = len(reader.pages)
+    writer = PdfWriter()
+    writer.add_page(_reader.pages[page_idx])
+    buf = io.BytesIO()
+    writer.write(buf)
+    return buf.getvalue()
 
-    if end_page is None or end_page > total_pages:
-        end_page = total_pages
 
-    logger.info(f"PDF has {total_pages} pages. Processing pages {start_page + 1} to {end_page}.")
+def count_pages(pdf_path: str) -> int:
+    from pypdf import PdfReader
 
-    all_articles: list[ArticoloPrezzario] = []
-    errors = 0
+    return len(PdfReader(pdf_path).pages)
 
-    for page_idx in range(start_page, end_page):
-        page_num = page_idx + 1
-        logger.info(f"Processing page {page_num}/{end_page}...")
 
+# ── Stage 3: per-page checkpoint ──────────────────────────────────────────────
+
+class PageCheckpoint:
+    """Articles extracted per page of one PDF, appended as JSONL (one line per finished page).
+
+    Lines carry the PDF's sha256, so a checkpoint left by another edition of
+    the price list is discarded instead of merged. A truncated last line (a
+    crash mid-write) is skipped and that page is extracted again.
+    """
+
+    def __init__(self, path: str | Path, pdf_digest: str):
+        self.path = Path(path)
+        self.pdf_digest = pdf_digest
+        self.pages: dict[int, list[dict[str, Any]]] = {}
+        self._rewrite = False
+        try:
+            lines = self.path.read_text(encoding="utf-8").splitlines()
+        except FileNotFoundError:
+            return
+        for line in lines:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            if entry.get("pdf") != pdf_digest:
+                self._rewrite = True
+                continue
+            self.pages[entry["page"]] = entry["articoli"]
+        if self._rewrite:
+            logger.info(f"Checkpoint {self.path} has pages of another PDF — they will be dropped")
+
+    def add(self, page_idx: int, articles: list[dict[str, Any]]) -> None:
+        self.pages[page_idx] = articles
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        if self._rewrite:
+            self._rewrite = False
+            lines = [self._line(p, a) for p, a in sorted(self.pages.items())]
+            self.path.write_text("".join(lines), encoding="utf-8")
+            return
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(self._line(page_idx, articles))
+
+    def clear(self) -> None:
+        self.pages = {}
+        self._rewrite = False
+        self.path.unlink(missing_ok=True)
+
+    def _line(self, page_idx: int, articles: list[dict[str, Any]]) -> str:
+        entry = {"pdf": self.pdf_digest, "page": page_idx, "articoli": articles}
+        return json.dumps(entry, ensure_ascii=False) + "\n"
+
+
+def file_digest(path: str | Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+# ── Stage 2: extraction (bounded concurrency, adaptive rate) ──────────────────
+
+@dataclass
+class ExtractionReport:
+    pages: int = 0
+    skipped: int = 0
+    errors: int = 0
+    retries: int = 0
+    articles: int = 0
+    seconds: float = 0.0
+
+    @property
+    def pages_per_minute(self) -> float:
+        return self.pages / self.seconds * 60 if self.seconds else 0.0
+
+
+async def _extract_page(client, page_bytes: bytes) -> list[dict[str, Any]]:
+    from google.genai import types
+    from src.utils.genai_client import track_genai_call
+
+    with track_genai_call(MODEL):
+        response = await client.aio.models.generate_content(
+            model=MODEL,
+            contents=[
+                types.Part.from_bytes(data=page_bytes, mime_type="application/pdf"),
+                "Estrai tutti gli articoli del prezzario da questa pagina.",
+            ],
+            config=types.GenerateContentConfig(
+                system_instruction=SYSTEM_PROMPT,
+                response_mime_type="application/json",
+                response_schema=PaginaPrezzario,
+                temperature=0.0,
+            ),
+        )
+    parsed: PaginaPrezzario = response.parsed
+    return [a.model_dump() for a in parsed.articoli] if parsed else []
+
+
+async def _extract_with_retry(
+    client,
+    page_bytes: bytes,
+    page_num: int,
+    bucket: TokenBucket | None,
+    max_retries: int,
+    report: ExtractionReport,
+) -> list[dict[str, Any]]:
+    for attempt in range(max_retries + 1):
+        if bucket is not None:
+            await bucket.acquire(1)  # one token per request
         try:
-            # Extract single page as a mini-PDF in memory
-            writer = PdfWriter()
-            writer.add_page(reader.pages[page_idx])
-            buf = io.BytesIO()
-            writer.write(buf)
-            page_bytes = buf.getvalue()
-
-            response = client.models.generate_content(
-                model="gemini-2.5-flash",
-                contents=[
-                    types.Part.from_bytes(data=page_bytes, mime_type="application/pdf"),
-                    "Estrai tutti gli articoli del prezzario da questa pagina.",
-                ],
-                config=types.GenerateContentConfig(
-                    system_instruction=SYSTEM_PROMPT,
-                    response_mime_type="application/json",
-                    response_schema=PaginaPrezzario,
-                    temperature=0.0,
-                ),
+            articles = await _extract_page(client, page_bytes)
+        except Exception as e:
+            if attempt == max_retries:
+                raise
+            if is_rate_limited(e) and bucket is not None:
+                bucket.slow_down()
+            delay = min(_BACKOFF_MAX_SECONDS, _BACKOFF_BASE_SECONDS * 2 ** attempt) * random.uniform(0.5, 1.0)
+            report.retries += 1
+            logger.warning(f"  Page {page_num}: {e} (attempt {attempt + 1}), retrying in {delay:.1f}s")
+            await asyncio.sleep(delay)
+        else:
+            if bucket is not None:
+                bucket.speed_up()
+            return articles
+    return []  # unreachable: the last attempt returns or raises
+
+
+async def extract_pages(
+    pdf_path: str,
+    page_indices: list[int],
+    checkpoint: PageCheckpoint,
+    concurrency: int = 8,
+    rpm: float | None = 60,
+    workers: int = 4,
+    max_retries: int = 5,
+) -> ExtractionReport:
+    """Extract every page not yet in the checkpoint. Pages that keep failing are logged and left out."""
+    from src.utils.genai_client import get_genai_client
+
+    report = ExtractionReport()
+    pending = [p for p in page_indices if p not in checkpoint.pages]
+    report.skipped = len(page_indices) - len(pending)
+    if report.skipped:
+        logger.info(f"Resuming: {report.skipped} page(s) already extracted")
+    if not pending:
+        return report
+
+    client = get_genai_client()
+    bucket = TokenBucket(rpm) if rpm else None
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    loop = asyncio.get_running_loop()
+    started = time.monotonic()
+
+    with ProcessPoolExecutor(max_workers=max(1, workers), initializer=_init_splitter, initargs=(pdf_path,)) as pool:
+
+        async def one(page_idx: int) -> None:
+            page_num = page_idx + 1
+            page_bytes = await loop.run_in_executor(pool, _page_pdf, page_idx)
+            try:
+                async with semaphore:
+                    articles = await _extract_with_retry(client, page_bytes, page_num, bucket, max_retries, report)
+            except Exception as e:
+                report.errors += 1
+                logger.error(f"  ✗ Error on page {page_num}: {e}")
+                return
+            checkpoint.add(page_idx, articles)
+            report.pages += 1
+            report.articles += len(articles)
+            elapsed = time.monotonic() - started
+            per_minute = report.pages / elapsed * 60 if elapsed else 0.0
+            remaining = len(pending) - report.pages - report.errors
+            eta = remaining / per_minute * 60 if per_minute else 0.0
+            logger.info(
+                f"  → Page {page_num}: {len(articles)} articles "
+                f"[{report.pages + report.errors}/{len(pending)}, {per_minute:.1f} pages/min, ETA {eta:.0f}s]"
             )
 
-            parsed: PaginaPrezzario = response.parsed
-            page_articles = parsed.articoli if parsed else []
+        await asyncio.gather(*(one(p) for p in pending))
 
-            if page_articles:
-                all_articles.extend(page_articles)
-                logger.info(f"  → Extracted {len(page_articles)} articles from page {page_num}")
-            else:
-                logger.info(f"  → No articles on page {page_num} (cover/index/blank)")
+    report.seconds = time.monotonic() - started
+    return report
 
-        except Exception as e:
-            errors += 1
-            logger.error(f"  ✗ Error on page {page_num}: {e}")
 
-        # Rate limiting: ~15 RPM for free tier, be conservative
-        if page_idx < end_page - 1:
-            time.sleep(4.5)
+# ── Stage 4: merge ────────────────────────────────────────────────────────────
+
+def merge_pages(pages: dict[int, list[dict[str, Any]]]) -> list[ArticoloPrezzario]:
+    """Articles in page order, deduplicated by normalize_code(codice) (first occurrence wins).
 
-    logger.info(f"\n{'='*60}")
-    logger.info(f"EXTRACTION COMPLETE")
-    logger.info(f"  Total articles: {len(all_articles)}")
-    logger.info(f"  Pages processed: {end_page - start_page}")
-    logger.info(f"  Errors: {errors}")
-    logger.info(f"{'='*60}")
+    Normalizing like PrezzarioIndex means "A 3.02.14.a." and "A 3.2.14.a" —
+    the same article as read off two pages — collapse to one record here
+    instead of shadowing each other in the index.
+    """
+    seen_codes: set[str] = set()
+    merged: list[ArticoloPrezzario] = []
+    duplicates = 0
+    for page_idx in sorted(pages):
+        for art in pages[page_idx]:
+            code_key = normalize_code(art.get("codice") or "")
+            if not code_key:
+                continue
+            if code_key in seen_codes:
+                duplicates += 1
+                continue
+            seen_codes.add(code_key)
+            merged.append(ArticoloPrezzario.model_validate(art))
 
-    return all_articles
+    logger.info(f"Merge result: {len(merged)} unique articles from {len(pages)} page(s), {duplicates} duplicate(s)")
+    category_counts = Counter(a.categoria for a in merged)
+    for cat, count in sorted(category_counts.items(), key=lambda x: -x[1]):
+        logger.info(f"  {count:4d}  {cat}")
+    return merged
 
 
 def save_json(articles: list[ArticoloPrezzario], output_path: str):
@@ -224,24 +423,65 @@ def main():
         default=None,
         help="Page range to process (e.g. '1-10'). Omit for all pages.",
     )
+    parser.add_argument("--concurrency", type=int, default=8, help="Gemini calls in flight")
+    parser.add_argument("--rpm", type=float, default=60, help="Request budget per minute (0 = unpaced)")
+    parser.add_argument("--workers", type=int, default=min(4, os.cpu_count() or 1), help="Page-splitting processes")
+    parser.add_argument("--max-retries", type=int, default=5, help="Retries per page before giving up")
+    parser.add_argument(
+        "--checkpoint",
+        type=str,
+        default="data/.extract_prezzario.pages.jsonl",
+        help="Per-page results; pages found here are not extracted again",
+    )
+    parser.add_argument("--fresh", action="store_true", help="Discard the checkpoint and extract every page")
+    parser.add_argument(
+        "--merge-only",
+        action="store_true",
+        help="Skip extraction: merge the pages already in the checkpoint into the output",
+    )
     args = parser.parse_args()
 
-    # Parse page range
-    start_page, end_page = 0, None
-    if args.pages:
-        parts = args.pages.split("-")
-        start_page = int(parts[0]) - 1  # 0-indexed
-        if len(parts) > 1:
-            end_page = int(parts[1])
-
     pdf_path = Path(args.file)
     if not pdf_path.exists():
         logger.error(f"PDF file not found: {pdf_path}")
         sys.exit(1)
 
-    logger.info(f"Starting extraction from: {pdf_path}")
-
-    articles = extract_pages(str(pdf_path), start_page, end_page)
+    # Parse page range
+    total_pages = count_pages(str(pdf_path))
+    start_page, end_page = 0, total_pages
+    if args.pages:
+        parts = args.pages.split("-")
+        start_page = int(parts[0]) - 1  # 0-indexed
+        if len(parts) > 1:
+            end_page = min(int(parts[1]), total_pages)
+    page_indices = list(range(start_page, end_page))
+
+    checkpoint = PageCheckpoint(args.checkpoint, file_digest(pdf_path))
+    if args.fresh:
+        checkpoint.clear()
+
+    if not args.merge_only:
+        logger.info(f"Starting extraction from: {pdf_path} ({total_pages} pages, processing {start_page + 1}-{end_page})")
+        report = asyncio.run(extract_pages(
+            str(pdf_path),
+            page_indices,
+            checkpoint,
+            concurrency=args.concurrency,
+            rpm=args.rpm or None,
+            workers=args.workers,
+            max_retries=args.max_retries,
+        ))
+        logger.info(f"\n{'='*60}")
+        logger.info(f"EXTRACTION COMPLETE")
+        logger.info(f"  Pages extracted: {report.pages} ({report.skipped} from checkpoint)")
+        logger.info(f"  Articles: {report.articles}")
+        logger.info(f"  Errors: {report.errors} (re-run to retry them)")
+        logger.info(f"  Retries: {report.retries}")
+        logger.info(f"  Throughput: {report.pages_per_minute:.1f} pages/min over {report.seconds:.0f}s")
+        logger.info(f"{'='*60}")
+
+    wanted = set(page_indices)
+    articles = merge_pages({p: a for p, a in checkpoint.pages.items() if p in wanted})
 
     if articles:
         output_path = Path(args.output)
@@ -8,6 +8,7 @@ from pathlib import Path
 # Add the project root to the python path to import src modules
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+from src.services.index_manifest import IndexManifest
 from src.services.rag_service import RAGService
 
 # Configure logging
@@ -45,20 +46,26 @@ def chunk_text(text: str, max_chars: int = 1000, overlap: int = 100) -> list[str
         
     return chunks
 
-async def ingest_directory(directory_path: str, namespace: str = "normative"):
-    """Reads all markdown files in a directory and upserts them to RAG."""
+async def ingest_directory(directory_path: str, namespace: str = "normative", incremental: bool = False):
+    """Reads all markdown files in a directory and upserts them to RAG.
+
+    With `incremental`, the directory is treated as the namespace's complete
+    content: only new or changed chunks are upserted, and chunks no longer
+    produced are deleted (diffed against data/manifests/<namespace>.json).
+    """
     target_dir = Path(directory_path)
     if not target_dir.exists() or not target_dir.is_dir():
         logger.error(f"Directory {directory_path} not found.")
         return
 
     rag_service = RAGService()
-    if not rag_service.pc:
+    if not rag_service.index:
         logger.error("Pinecone Service could not initialize (missing API keys). Aborting.")
         return
 
     docs_to_upsert = []
     file_count = 0
+    failed = 0
 
     for file_path in target_dir.rglob("*.md"):
         try:
@@ -79,11 +86,28 @@ async def ingest_directory(directory_path: str, namespace: str = "normative"):
             file_count += 1
         except Exception as e:
             logger.error(f"Failed to read {file_path.name}: {e}")
+            failed += 1
 
     logger.info(f"Generated {len(docs_to_upsert)} chunks from {file_count} files.")
-    
+
+    manifest = IndexManifest.for_namespace(namespace)
+    if incremental:
+        if failed:
+            # A sync deletes whatever is missing: never sync from a partial read.
+            logger.error(f"{failed} file(s) could not be read. Aborting incremental sync.")
+            return
+        diff = await rag_service.sync_documents(docs_to_upsert, namespace, manifest)
+        if diff is not None:
+            logger.info(f"Synced namespace '{namespace}': {diff}.")
+        else:
+            logger.error("Sync operation failed.")
+        return
+
     if docs_to_upsert:
-        res = await rag_service.upsert_documents(docs_to_upsert, namespace=namespace)
+        # Keep an existing manifest current; a missing one is rebuilt from the index by the next sync.
+        res = await rag_service.upsert_documents(
+            docs_to_upsert, namespace=namespace, manifest=manifest if manifest.exists else None
+        )
         if res:
             logger.info(f"Successfully ingrained {file_count} documents into namespace '{namespace}'.")
         else:
@@ -95,7 +119,9 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Ingest Markdown files into SYD Pinecone Knowledge Base")
     parser.add_argument("--dir", type=str, required=True, help="Directory containing .md files to ingest")
     parser.add_argument("--namespace", type=str, default="normative", help="Pinecone namespace to use")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Upsert only changed chunks and delete removed ones (the directory is the whole namespace)")
     
     args = parser.parse_args()
     
-    asyncio.run(ingest_directory(args.dir, args.namespace))
+    asyncio.run(ingest_directory(args.dir, args.namespace, args.incremental))
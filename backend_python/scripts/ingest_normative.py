@@ -7,6 +7,12 @@ chunking before upserting to Pinecone with Integrated Inference.
 Usage:
     uv run python scripts/ingest_normative.py
     uv run python scripts/ingest_normative.py --wipe   # wipe namespace first
+    uv run python scripts/ingest_normative.py --fresh  # ignore the checkpoint of an interrupted run
+    uv run python scripts/ingest_normative.py --incremental  # upsert changed, delete removed chunks only
+
+Ingests record id → content hash in data/manifests/normative.json;
+--incremental diffs the chunked documents against it, and rebuilds the
+manifest from the index's content_hash metadata when it is missing.
 """
 import os
 import sys
@@ -18,6 +24,7 @@ from pathlib import Path
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+from src.services.index_manifest import IndexManifest
 from src.services.rag_service import RAGService, NAMESPACE_NORMATIVE
 
 logging.basicConfig(
@@ -154,8 +161,14 @@ async def main_async(args):
     if args.wipe:
         logger.warning(f"Wiping namespace '{NAMESPACE_NORMATIVE}'...")
         await rag.delete_namespace(NAMESPACE_NORMATIVE)
-        import time
-        time.sleep(3)
+        await rag.wait_for_namespace(NAMESPACE_NORMATIVE, lambda count: count == 0)
+
+    checkpoint = Path(args.checkpoint)
+    manifest = IndexManifest.load(args.manifest)
+    if args.wipe or args.fresh:
+        checkpoint.unlink(missing_ok=True)
+    if args.wipe:
+        manifest.clear()
 
     # Process each file
     all_chunks: list[dict] = []
@@ -169,11 +182,25 @@ async def main_async(args):
     logger.info(f"Total chunks: {len(all_chunks)}")
 
     # Upsert
-    success = await rag.upsert_documents(all_chunks, namespace=NAMESPACE_NORMATIVE)
+    if args.incremental:
+        diff = await rag.sync_documents(all_chunks, NAMESPACE_NORMATIVE, manifest, checkpoint_path=checkpoint)
+        success = diff is not None
+    else:
+        success = await rag.upsert_documents(
+            all_chunks,
+            namespace=NAMESPACE_NORMATIVE,
+            checkpoint_path=checkpoint,
+            # Without a wipe the namespace may hold records this run does not produce: leave a
+            # missing manifest missing, so --incremental rebuilds it from the index.
+            manifest=manifest if args.wipe or manifest.exists else None,
+        )
 
     if success:
-        import time
-        time.sleep(5)
+        if args.incremental:
+            # Pinecone is eventually consistent: wait until deletions are visible too.
+            await rag.wait_for_namespace(NAMESPACE_NORMATIVE, lambda count: count == len(manifest.entries))
+        else:
+            await rag.wait_for_namespace(NAMESPACE_NORMATIVE, lambda count: count >= len({c["text"] for c in all_chunks}))
         stats = rag.get_stats()
         logger.info(f"✅ Normative ingestion complete!")
         if stats:
@@ -195,7 +222,31 @@ def main():
         action="store_true",
         help="Wipe normative namespace before ingestion",
     )
+    parser.add_argument(
+        "--checkpoint",
+        type=str,
+        default="data/.ingest_normative.checkpoint.json",
+        help="Resume file recording the batches already upserted",
+    )
+    parser.add_argument(
+        "--fresh",
+        action="store_true",
+        help="Discard the checkpoint and upsert every chunk",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Upsert only new or changed chunks and delete the ones no longer produced",
+    )
+    parser.add_argument(
+        "--manifest",
+        type=str,
+        default="data/manifests/normative.json",
+        help="id → content hash of what the namespace holds (rebuilt from the index if missing)",
+    )
     args = parser.parse_args()
+    if args.incremental and args.wipe:
+        parser.error("--incremental cannot be combined with --wipe")
     asyncio.run(main_async(args))
 
 
@@ -8,6 +8,13 @@ Usage:
     uv run python scripts/ingest_prezzario.py
     uv run python scripts/ingest_prezzario.py --file data/prezzario_lazio_2023_structured.json
     uv run python scripts/ingest_prezzario.py --wipe   # wipe namespace first, then ingest
+    uv run python scripts/ingest_prezzario.py --fresh  # ignore the checkpoint of an interrupted run
+    uv run python scripts/ingest_prezzario.py --incremental  # upsert changed, delete removed articles only
+
+An interrupted ingest resumes from data/.ingest_prezzario.checkpoint.json on
+the next run with the same file. Ingests record id → content hash in
+data/manifests/prezzario.json; --incremental diffs the file against it, and
+rebuilds the manifest from the index's content_hash metadata when it is missing.
 """
 import os
 import sys
@@ -19,6 +26,7 @@ from pathlib import Path
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+from src.services.index_manifest import IndexManifest
 from src.services.rag_service import RAGService, NAMESPACE_PREZZARIO, NAMESPACE_NORMATIVE
 
 logging.basicConfig(
@@ -98,28 +106,47 @@ async def main_async(args):
             logger.error(f"Failed to wipe namespace. Aborting.")
             return
 
-        # Brief pause after wipe (Pinecone consistency)
-        import time
-        time.sleep(3)
+        # Pinecone is eventually consistent: wait until the wipe is visible.
+        await rag.wait_for_namespace(NAMESPACE_PREZZARIO, lambda count: count == 0)
 
     # Also wipe old normative namespace if requested
     if args.wipe_normative:
         logger.warning(f"Wiping namespace '{NAMESPACE_NORMATIVE}'...")
         await rag.delete_namespace(NAMESPACE_NORMATIVE)
-        import time
-        time.sleep(3)
+        IndexManifest.for_namespace(NAMESPACE_NORMATIVE).clear()
+        await rag.wait_for_namespace(NAMESPACE_NORMATIVE, lambda count: count == 0)
+
+    checkpoint = Path(args.checkpoint)
+    manifest = IndexManifest.load(args.manifest)
+    if args.wipe or args.fresh:
+        checkpoint.unlink(missing_ok=True)  # nothing from an earlier run survives a wipe
+    if args.wipe:
+        manifest.clear()
 
     # Build and ingest
     chunks = build_chunks(articles)
-    logger.info(f"Built {len(chunks)} chunks. Starting upsert to namespace '{NAMESPACE_PREZZARIO}'...")
-
-    success = await rag.upsert_documents(chunks, namespace=NAMESPACE_PREZZARIO)
+    if args.incremental:
+        logger.info(f"Built {len(chunks)} chunks. Syncing namespace '{NAMESPACE_PREZZARIO}' against {manifest.path}...")
+        diff = await rag.sync_documents(chunks, NAMESPACE_PREZZARIO, manifest, checkpoint_path=checkpoint)
+        success = diff is not None
+    else:
+        logger.info(f"Built {len(chunks)} chunks. Starting upsert to namespace '{NAMESPACE_PREZZARIO}'...")
+        success = await rag.upsert_documents(
+            chunks,
+            namespace=NAMESPACE_PREZZARIO,
+            checkpoint_path=checkpoint,
+            # Without a wipe the namespace may hold records this run does not produce: leave a
+            # missing manifest missing, so --incremental rebuilds it from the index.
+            manifest=manifest if args.wipe or manifest.exists else None,
+        )
 
     if success:
         logger.info("✅ Ingestion complete!")
-        # Brief pause for Pinecone to index
-        import time
-        time.sleep(5)
+        if args.incremental:
+            # Pinecone is eventually consistent: wait until deletions are visible too.
+            await rag.wait_for_namespace(NAMESPACE_PREZZARIO, lambda count: count == len(manifest.entries))
+        else:
+            await rag.wait_for_namespace(NAMESPACE_PREZZARIO, lambda count: count >= len({c["codice"] for c in chunks}))
         stats = rag.get_stats()
         if stats:
             logger.info(f"Index stats AFTER: {json.dumps(stats, indent=2)}")
@@ -145,7 +172,31 @@ def main():
         action="store_true",
         help="Also wipe normative namespace (for full reset)",
     )
+    parser.add_argument(
+        "--checkpoint",
+        type=str,
+        default="data/.ingest_prezzario.checkpoint.json",
+        help="Resume file recording the batches already upserted",
+    )
+    parser.add_argument(
+        "--fresh",
+        action="store_true",
+        help="Discard the checkpoint and upsert every article",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Upsert only new or changed articles and delete the ones no longer in the file",
+    )
+    parser.add_argument(
+        "--manifest",
+        type=str,
+        default="data/manifests/prezzario.json",
+        help="id → content hash of what the namespace holds (rebuilt from the index if missing)",
+    )
     args = parser.parse_args()
+    if args.incremental and (args.wipe or args.wipe_normative):
+        parser.error("--incremental cannot be combined with --wipe/--wipe-normative")
 
     asyncio.run(main_async(args))
 
@@ -10,23 +10,25 @@ import json
 import logging
 import time
 import uuid
-from collections.abc import AsyncIterator
+from collections.abc import AsyncIterator, Awaitable
+from dataclasses import dataclass, field
 from datetime import UTC, datetime
 from typing import Any
 from urllib.parse import urlparse
 
-import httpx
 from google.adk.events import Event, EventActions
 from google.adk.runners import Runner
 from google.genai import types
 
 from src.adk.agents import syd_orchestrator
 from src.adk.filters import filter_agent_output, sanitize_before_agent
-from src.adk.session import get_artifact_service, get_session_service
+from src.adk.session import ADK_APP_NAME, get_artifact_service, get_session_service
+from src.core.tracing import get_tracer
 from src.db.firebase_client import get_async_firestore_client
 from src.repositories.conversation_repository import get_conversation_repository
 from src.services.base_orchestrator import BaseOrchestrator
 from src.utils.circuit_breaker import vertex_ai_breaker
+from src.utils.media_cache import fetch_media_cached
 from src.utils.stream_protocol import (
     stream_artifact_event,
     stream_data,
@@ -38,8 +40,22 @@ from src.utils.stream_protocol import (
     stream_ui_widget,
     to_ui_message_stream,
 )
+from src.vision.preprocess import prepare_image
 
 logger = logging.getLogger(__name__)
+_tracer = get_tracer(__name__)
+
+
+@dataclass
+class _PreRun:
+    """Inputs gathered before run_async (see ADKOrchestrator._prerun)."""
+    sanitized_input: str
+    phone_on_file: bool
+    media_parts: list[types.Part]
+    session_service: Any
+    session: Any
+    timings_ms: dict[str, float] = field(default_factory=dict)
+    dropped: list[str] = field(default_factory=list)  # optional steps cut by the deadline
 
 
 class ADKOrchestrator(BaseOrchestrator):
@@ -64,7 +80,7 @@ class ADKOrchestrator(BaseOrchestrator):
         )
 
         self.runner = Runner(
-            app_name="syd_orchestrator",
+            app_name=ADK_APP_NAME,
             agent=syd_orchestrator,
             session_service=get_session_service(),
             artifact_service=get_artifact_service(),
@@ -88,13 +104,26 @@ class ADKOrchestrator(BaseOrchestrator):
         document id when the assistant message is persisted. Aligning the two
         identities removes the post-turn id swap that re-mounts the bubble and
         causes flicker.
+
+        The whole turn is recorded as one `adk/turn` span; the pre-run stage
+        adds per-step `prerun.*_ms` attributes to it.
         """
+        from src.core.config import settings
+
         assistant_msg_id = uuid.uuid4().hex
-        async for sse in to_ui_message_stream(
-            self._stream_events(request, user_session, background_tasks, assistant_msg_id),
-            message_id=assistant_msg_id,
-        ):
-            yield sse
+        # Not made current: the span outlives many yields, and OTel context
+        # tokens cannot be detached across the generator's suspension points.
+        turn_span = _tracer.start_span("adk/turn", attributes={"session.id": str(request.session_id)})
+        try:
+            async for sse in to_ui_message_stream(
+                self._stream_events(request, user_session, background_tasks, assistant_msg_id, turn_span),
+                message_id=assistant_msg_id,
+                coalesce_window_ms=settings.SSE_COALESCE_WINDOW_MS,
+                coalesce_max_chars=settings.SSE_COALESCE_MAX_CHARS,
+            ):
+                yield sse
+        finally:
+            turn_span.end()
 
     async def _stream_events(
         self,
@@ -102,6 +131,7 @@ class ADKOrchestrator(BaseOrchestrator):
         user_session: Any,  # UserSession
         background_tasks: Any = None,  # FastAPI BackgroundTasks (unused here, required by BaseOrchestrator)
         assistant_msg_id: str | None = None,  # stable id shared with start.messageId + Firestore doc id
+        turn_span: Any = None,  # OTel span of the turn (set by stream_chat)
     ) -> AsyncIterator[dict]:
         """
         Main streaming chat method for Vertex AI Agent Builder.
@@ -112,6 +142,7 @@ class ADKOrchestrator(BaseOrchestrator):
         Responsibilities:
         - Use the already verified user_session (H1 fix)
         - Session + conversation history loading via ADK Session Service
+          (concurrently with the profile lookup and media fetch, see _prerun)
         - Multimodal handling (GCS images/video integration)
         - Native ADK Runner execution (Agent Engine)
         """
@@ -130,173 +161,70 @@ class ADKOrchestrator(BaseOrchestrator):
             last_msg_content = request.messages[-1].content
             user_message_text = last_msg_content if isinstance(last_msg_content, str) else str(last_msg_content)
 
-        sanitized_input = await sanitize_before_agent(user_message_text or "")
         # FIX: Use the client's session_id to ensure chats don't mix up across projects
         session_id = getattr(request, "session_id", "default-session")
-
-        # ────────── SYSTEM CONTEXT INJECTION (Auth State) ──────────
-        # Since ADK agents have static instructions, we must inject dynamic state
-        # (like authentication status) into the user's message payload.
         is_guest = user_session.is_anonymous or not user_session.is_authenticated
-        auth_status_msg = (
-            "STATO AUTENTICAZIONE: L'utente è un OSPITE ANONIMO. "
-            "REGOLA ASSOLUTA: Prima di chiamare generate_render, suggest_quote_items, pricing_engine, "
-            "search_listino, search_prezzario, retrieve_price_by_code o qualsiasi tool premium, "
-            "DEVI OBBLIGATORIAMENTE chiamare request_login_adk. "
-            "NON chiamare MAI generate_render per un utente OSPITE. "
-            "Questo vale per rendering 3D, preventivi, salvataggi e qualsiasi azione premium. "
-            "Sequenza corretta: 1) chiama request_login_adk, 2) rispondi all'utente che deve autenticarsi."
-            if is_guest else
-            "STATO AUTENTICAZIONE: L'utente è GIA' LOGGATO con un account verificato. NON DEVI MAI USARE il tool request_login_adk per nessun motivo."
-        )
-        # Check if phone is already on file (avoids asking again in quote flow)
-        phone_on_file = False
-        if not is_guest:
-            try:
-                _db = get_async_firestore_client()
-                _user_doc = await _db.collection("users").document(user_id).get()
-                phone_on_file = bool((_user_doc.to_dict() or {}).get("phone")) if _user_doc.exists else False
-            except Exception:  # noqa: BLE001
-                pass  # Non-fatal: agent will ask for phone if lookup fails
-
-        logger.info(f"[ADK] Auth injection: is_guest={is_guest}, uid={user_id}, phone_on_file={phone_on_file}")
-        system_context = (
-            f"[SYSTEM_MESSAGE]\n"
-            f"{auth_status_msg}\n"
-            f"USER_UID: {user_id}\n"
-            f"SESSION_ID: {session_id}\n"
-            f"PHONE_ON_FILE: {'true' if phone_on_file else 'false'}\n"
-            f"[END_SYSTEM_MESSAGE]\n\n"
-        )
-
-        # Apply the Sandwich Defense boundary delimiters to the clean input
-        delimited_input = f"{system_context}###\n{sanitized_input}\n###"
-
-        # Multimodal Injection & Triage Trigger
-        content_parts = [types.Part(text=delimited_input)]
-
-        media_urls = getattr(request, "media_urls", []) or []
-        video_uris = getattr(request, "video_file_uris", []) or []
-        media_types = getattr(request, "media_types", []) or []
-
-        # Optimized Media Fetching: Parallelize using asyncio.gather
-        async def fetch_media(i, url, mime=None):
-            try:
-                parsed_url = urlparse(url)
-                bucket = settings.FIREBASE_STORAGE_BUCKET or ""
-                # Firebase Storage URLs can be either:
-                # - https://storage.googleapis.com/{bucket}/{path}  (bucket in path)
-                # - https://{bucket}.firebasestorage.app/{path}     (bucket in hostname)
-                # Both must reference our configured bucket for security.
-                hostname_ok = parsed_url.hostname == bucket
-                path_ok = bucket and parsed_url.hostname == "storage.googleapis.com" and parsed_url.path.startswith(f"/{bucket}/")
-                if not (hostname_ok or path_ok):
-                    logger.warning(f"Rejected invalid media URL source: {url}")
-                    return None
-
-                async with httpx.AsyncClient(timeout=15.0) as client:
-                    response = await client.get(url)
-                    response.raise_for_status()
-                    image_bytes = response.content
-                    final_mime = mime or (media_types[i] if i < len(media_types) else "image/jpeg")
-                    logger.info(f"[ADK] Fetched media {i}: {len(image_bytes)} bytes ({final_mime})")
-                    # Return both the image data and a text hint so the agent knows the source URL
-                    img_part = types.Part(inline_data=types.Blob(mime_type=final_mime, data=image_bytes))
-                    hint_part = types.Part(text=f"\n[URL Immagine Caricata per riferimento o tool: {url}]\n")
-                    return [img_part, hint_part]
-            except Exception as e:  # noqa: BLE001
-                logger.error(f"Failed to fetch media {url}: {e}")
-                return None
-
-        # Handle Video File API URIs (local check, no download)
-        for uri in video_uris:
-            try:
-                parsed_uri = urlparse(uri)
-                if parsed_uri.scheme == "gs" and parsed_uri.netloc == settings.FIREBASE_STORAGE_BUCKET:
-                    content_parts.append(types.Part(file_data=types.FileData(file_uri=uri, mime_type="video/mp4")))
-            except Exception:  # noqa: BLE001
-                pass
-
-        # Execute parallel fetch using TaskGroup (Python 3.12+): auto-cancels on exception
-        if media_urls:
-            logger.info(f"[ADK] Parallel fetching {len(media_urls)} media items...")
-            async with asyncio.TaskGroup() as tg:
-                task_objs = [tg.create_task(fetch_media(i, url)) for i, url in enumerate(media_urls)]
-            for t in task_objs:
-                p_list = t.result()
-                if p_list is not None:
-                    if isinstance(p_list, list):
-                        content_parts.extend(p_list)
-                    else:
-                        content_parts.append(p_list)
 
         try:
-            # Ensure session exists — ADK raises SessionNotFoundError otherwise
-            session_service = get_session_service()
-            try:
-                session = await session_service.get_session(
-                    app_name="syd_orchestrator",
-                    user_id=user_id,
-                    session_id=session_id,
-                )
-            except Exception as e:
-                if type(e).__name__ == "SessionNotFoundError" or "Session not found" in str(e):
-                    session = None
-                else:
-                    raise e
-
-            if session is None:
-                session = await session_service.create_session(
-                    app_name="syd_orchestrator",
-                    user_id=user_id,
-                    session_id=session_id,
-                )
-                logger.info("Created new ADK session", extra={"session_id": session_id, "user_id": user_id})
-
-                # ── HISTORY INJECTION (Restart Recovery) ──
-                # On server restart, InMemorySessionService loses all context.
-                # Re-inject the last 30 Firestore messages as ADK Events so the
-                # agent can continue mid-conversation (e.g., knows the room analysis
-                # for generate_render) without asking the user to repeat themselves.
+            prerun = await self._prerun(request, user_id, session_id, user_message_text, is_guest, settings)
+            session_service, session = prerun.session_service, prerun.session
+            if turn_span is not None:
+                for step, ms in prerun.timings_ms.items():
+                    turn_span.set_attribute(f"prerun.{step}_ms", ms)
+                turn_span.set_attribute("prerun.media_count", len(prerun.media_parts) // 2)
+                turn_span.set_attribute("prerun.dropped", ",".join(prerun.dropped))
+
+            # ────────── SYSTEM CONTEXT INJECTION (Auth State) ──────────
+            # Since ADK agents have static instructions, we must inject dynamic state
+            # (like authentication status) into the user's message payload.
+            auth_status_msg = (
+                "STATO AUTENTICAZIONE: L'utente è un OSPITE ANONIMO. "
+                "REGOLA ASSOLUTA: Prima di chiamare generate_render, suggest_quote_items, pricing_engine, "
+                "search_listino, search_prezzario, retrieve_price_by_code o qualsiasi tool premium, "
+                "DEVI OBBLIGATORIAMENTE chiamare request_login_adk. "
+                "NON chiamare MAI generate_render per un utente OSPITE. "
+                "Questo vale per rendering 3D, preventivi, salvataggi e qualsiasi azione premium. "
+                "Sequenza corretta: 1) chiama request_login_adk, 2) rispondi all'utente che deve autenticarsi."
+                if is_guest else
+                "STATO AUTENTICAZIONE: L'utente è GIA' LOGGATO con un account verificato. NON DEVI MAI USARE il tool request_login_adk per nessun motivo."
+            )
+            phone_on_file = prerun.phone_on_file
+            logger.info(f"[ADK] Auth injection: is_guest={is_guest}, uid={user_id}, phone_on_file={phone_on_file}")
+            system_context = (
+                f"[SYSTEM_MESSAGE]\n"
+                f"{auth_status_msg}\n"
+                f"USER_UID: {user_id}\n"
+                f"SESSION_ID: {session_id}\n"
+                f"PHONE_ON_FILE: {'true' if phone_on_file else 'false'}\n"
+                f"[END_SYSTEM_MESSAGE]\n\n"
+            )
+
+            # Apply the Sandwich Defense boundary delimiters to the clean input
+            delimited_input = f"{system_context}###\n{prerun.sanitized_input}\n###"
+
+            # Multimodal Injection & Triage Trigger
+            content_parts = [types.Part(text=delimited_input)]
+
+            # Handle Video File API URIs (local check, no download)
+            for uri in getattr(request, "video_file_uris", []) or []:
                 try:
-                    repo = get_conversation_repository()
-                    history = await repo.get_context(session_id, limit=30)
-                    if history:
-                        events_to_inject = []
-                        for idx, msg in enumerate(history):
-                            role = msg.get("role", "user")
-                            text = msg.get("content", "").strip()
-                            if not text:
-                                continue
-                            hist_event = Event(
-                                invocation_id=f"history_restore_{int(time.time() * 1000)}_{idx}",
-                                author=role,
-                                content=types.Content(
-                                    role=role,
-                                    parts=[types.Part(text=text)],
-                                ),
-                                actions=EventActions(),
-                            )
-                            events_to_inject.append(hist_event)
-                        # Parallel injection: ~10x faster than sequential await loop
-                        if events_to_inject:
-                            await asyncio.gather(*(
-                                session_service.append_event(session, evt)
-                                for evt in events_to_inject
-                            ))
-                        logger.info(
-                            f"[ADK] Injected {len(events_to_inject)} history events into restored session",
-                            extra={"session_id": session_id},
-                        )
-                except Exception as hist_err:  # noqa: BLE001
-                    # Non-fatal: agent starts fresh if history injection fails
-                    logger.warning(f"[ADK] History injection failed (session starts fresh): {hist_err}")
+                    parsed_uri = urlparse(uri)
+                    if parsed_uri.scheme == "gs" and parsed_uri.netloc == settings.FIREBASE_STORAGE_BUCKET:
+                        content_parts.append(types.Part(file_data=types.FileData(file_uri=uri, mime_type="video/mp4")))
+                except Exception:  # noqa: BLE001
+                    pass
+
+            content_parts.extend(prerun.media_parts)
 
             full_response = ""
             accumulated_tool_calls = []
             # Map tool_name → call_id so we can correlate function_response
             # with the correct call_id (ADK may not preserve call_id on responses)
             pending_tool_calls: dict[str, str] = {}
+            # Tool results + assistant reply of this turn (one commit at the end when write-behind is on)
+            turn_writer = get_conversation_repository().begin_turn(
+                session_id, user_id, write_behind=settings.CHAT_PERSIST_WRITE_BEHIND,
+            )
             try:
                 # Pass user message directly via new_message parameter (ADK 1.x API)
                 if not content_parts:
@@ -337,37 +265,13 @@ class ADKOrchestrator(BaseOrchestrator):
                                 )
                                 try:
                                     session = await session_service.create_session(
-                                        app_name="syd_orchestrator",
+                                        app_name=ADK_APP_NAME,
                                         user_id=user_id,
                                         session_id=session_id,
                                     )
-                                    _repo = get_conversation_repository()
-                                    _history = await _repo.get_context(session_id, limit=30)
-                                    if _history:
-                                        _events = []
-                                        for _idx, _msg in enumerate(_history):
-                                            _role = _msg.get("role", "user")
-                                            _text = _msg.get("content", "").strip()
-                                            if not _text:
-                                                continue
-                                            _events.append(Event(
-                                                invocation_id=f"recovery_restore_{int(time.time()*1000)}_{_idx}",
-                                                author=_role,
-                                                content=types.Content(
-                                                    role=_role,
-                                                    parts=[types.Part(text=_text)],
-                                                ),
-                                                actions=EventActions(),
-                                            ))
-                                        if _events:
-                                            await asyncio.gather(*(
-                                                session_service.append_event(session, e)
-                                                for e in _events
-                                            ))
-                                        logger.info(
-                                            f"[ADK] Recovery: injected {len(_events)} history events",
-                                            extra={"session_id": session_id},
-                                        )
+                                    await self._inject_history(
+                                        session_service, session, session_id, "recovery_restore"
+                                    )
                                 except Exception as recovery_err:  # noqa: BLE001
                                     logger.error(f"[ADK] Session recovery failed: {recovery_err}")
                                     raise run_err from None  # surface original error, not the recovery failure
@@ -497,15 +401,12 @@ class ADKOrchestrator(BaseOrchestrator):
 
                                             # ── Persist Tool Result to Firestore ──
                                             try:
-                                                repo = get_conversation_repository()
                                                 content_str = json.dumps(raw_response) if isinstance(raw_response, dict) else str(raw_response)
-                                                await repo.save_message(
-                                                    session_id=session_id,
+                                                await turn_writer.save(
                                                     role="tool",
                                                     content=content_str,
                                                     tool_call_id=call_id,
                                                     timestamp=datetime.now(UTC),
-                                                    user_id=user_id,
                                                 )
                                                 logger.info(f"[Repo] Saved tool result for call_id {call_id}")
                                             except Exception as e:  # noqa: BLE001
@@ -589,16 +490,13 @@ class ADKOrchestrator(BaseOrchestrator):
                 # --- LOCAL PERSISTENCE BRIDGE (Save Assistant) ---
                 if full_response or accumulated_tool_calls:
                     try:
-                        repo = get_conversation_repository()
                         assistant_timestamp = datetime.now(UTC)
-                        await repo.save_message(
-                            session_id=session_id,
+                        await turn_writer.save(
                             role="assistant",
                             content=full_response,
                             tool_calls=accumulated_tool_calls if accumulated_tool_calls else None,
                             timestamp=assistant_timestamp,
                             message_id=assistant_msg_id,
-                            user_id=user_id,
                         )
                         logger.info(f"[Repo] Saved assistant message for session {session_id}")
                     except Exception as e:  # noqa: BLE001
@@ -608,6 +506,10 @@ class ADKOrchestrator(BaseOrchestrator):
                 logger.exception("Inner ADK run_async error captured")
                 async for chunk in stream_error("Errore durante la generazione della risposta AI."):
                     yield chunk
+            finally:
+                # Write-behind: the turn's buffered messages go out in one commit,
+                # also when the run failed or the client disconnected mid-stream.
+                await turn_writer.flush()
         except Exception:
             logger.exception("Outer ADKOrchestrator execution error.")
             async for chunk in stream_error("Impossibile connettersi all'assistente Sydney."):
@@ -615,12 +517,239 @@ class ADKOrchestrator(BaseOrchestrator):
 
 
 
+    async def _prerun(
+        self,
+        request: Any,
+        user_id: str,
+        session_id: str,
+        user_message_text: str,
+        is_guest: bool,
+        settings: Any,
+    ) -> _PreRun:
+        """Gather everything run_async needs, concurrently, under one deadline.
+
+        Dependency graph (arrows = "needs"):
+            sanitize ─┐
+            profile  ─┤
+            media[i] ─┼─► prompt assembly
+            session  ─┘
+                └─► history  (read and injected only if the session had to be created)
+
+        The Firestore history read runs only on a cold turn (session created),
+        after the session lookup: warm turns — nearly all of them — never pay
+        for it. Profile and media are optional: whatever is still pending at the deadline is
+        cancelled and the turn proceeds without it. The session is required —
+        missing the deadline on it raises TimeoutError.
+        """
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        deadline = started + float(settings.ADK_PRERUN_DEADLINE_SECONDS)
+        timings: dict[str, float] = {}
+
+        def timed[T](name: str, aw: Awaitable[T]) -> asyncio.Task[T]:
+            async def run() -> T:
+                t0 = loop.time()
+                try:
+                    return await aw
+                finally:
+                    timings[name] = round((loop.time() - t0) * 1000, 1)
+            return asyncio.create_task(run())
+
+        media_urls = getattr(request, "media_urls", []) or []
+        media_types = getattr(request, "media_types", []) or []
+        session_service = get_session_service()
+        repo = get_conversation_repository()
+
+        sanitize_t = timed("sanitize", sanitize_before_agent(user_message_text or ""))
+        profile_t = timed("profile", self._load_phone_on_file(user_id)) if not is_guest else None
+        media_ts = [
+            timed(f"media_{i}", self._fetch_media_part(i, url, media_types, settings))
+            for i, url in enumerate(media_urls)
+        ]
+        if media_urls:
+            logger.info(f"[ADK] Parallel fetching {len(media_urls)} media items...")
+        session_t = timed("session", self._get_or_create_session(session_service, user_id, session_id))
+        history_t: asyncio.Task | None = None
+
+        optional = [t for t in (profile_t, *media_ts) if t is not None]
+        try:
+            async with asyncio.timeout_at(deadline):
+                session, created = await session_t
+                if created:
+                    # ── HISTORY INJECTION (fallback) ──
+                    # DurableSessionService restores sessions from its event log, so
+                    # reaching this branch means the session has no durable record
+                    # (brand-new chat, pre-migration session, or the volatile memory
+                    # backend). Re-inject the last Firestore messages so the agent can
+                    # continue mid-conversation without asking the user to repeat.
+                    history_t = timed("history", repo.get_context(session_id, limit=30))
+                    try:
+                        history = await history_t
+                    except Exception as hist_err:  # noqa: BLE001 — logged; history is a best-effort restore
+                        logger.warning(f"[ADK] History load failed (session starts fresh): {hist_err}")
+                        history = []
+                    t0 = loop.time()
+                    await self._inject_history(session_service, session, session_id, "history_restore", history)
+                    timings["inject"] = round((loop.time() - t0) * 1000, 1)
+                sanitized_input = await sanitize_t
+            if optional:
+                # Optional steps get whatever is left of the same deadline.
+                await asyncio.wait(optional, timeout=max(0.0, deadline - loop.time()))
+        except BaseException:
+            for t in (sanitize_t, session_t, history_t, *optional):
+                if t is not None:
+                    t.cancel()
+            raise
+
+        dropped = []
+        for name, t in (("profile", profile_t), *((f"media_{i}", t) for i, t in enumerate(media_ts))):
+            if t is not None and not t.done():
+                t.cancel()
+                dropped.append(name)
+        if dropped:
+            logger.warning(f"[ADK] Pre-run deadline hit — continuing without: {', '.join(dropped)}")
+
+        def result_or_none(t: asyncio.Task | None) -> Any:
+            # Tasks cancelled above stay not-done until their next loop turn.
+            return t.result() if t is not None and t.done() and not t.cancelled() else None
+
+        phone_on_file = bool(result_or_none(profile_t))
+        media_parts: list[types.Part] = []
+        for t in media_ts:
+            media_parts.extend(result_or_none(t) or [])
+
+        media_timings = [v for k, v in timings.items() if k.startswith("media_")]
+        timings = {k: v for k, v in timings.items() if not k.startswith("media_")}
+        if media_timings:
+            timings["media"] = max(media_timings)
+        timings["total"] = round((loop.time() - started) * 1000, 1)
+        logger.info("[ADK] Pre-run complete", extra={"prerun_ms": timings, "dropped": dropped})
+
+        return _PreRun(
+            sanitized_input=sanitized_input,
+            phone_on_file=phone_on_file,
+            media_parts=media_parts,
+            session_service=session_service,
+            session=session,
+            timings_ms=timings,
+            dropped=dropped,
+        )
+
+    @staticmethod
+    async def _load_phone_on_file(user_id: str) -> bool:
+        """Check if phone is already on file (avoids asking again in quote flow)."""
+        try:
+            _db = get_async_firestore_client()
+            _user_doc = await _db.collection("users").document(user_id).get()
+            return bool((_user_doc.to_dict() or {}).get("phone")) if _user_doc.exists else False
+        except Exception:  # noqa: BLE001
+            return False  # Non-fatal: agent will ask for phone if lookup fails
+
+    @staticmethod
+    async def _fetch_media_part(i: int, url: str, media_types: list[str], settings: Any) -> list[types.Part] | None:
+        """Fetch one uploaded media item as [inline image part, URL hint part], or None."""
+        try:
+            parsed_url = urlparse(url)
+            bucket = settings.FIREBASE_STORAGE_BUCKET or ""
+            # Firebase Storage URLs can be either:
+            # - https://storage.googleapis.com/{bucket}/{path}  (bucket in path)
+            # - https://{bucket}.firebasestorage.app/{path}     (bucket in hostname)
+            # Both must reference our configured bucket for security.
+            hostname_ok = parsed_url.hostname == bucket
+            path_ok = bucket and parsed_url.hostname == "storage.googleapis.com" and parsed_url.path.startswith(f"/{bucket}/")
+            if not (hostname_ok or path_ok):
+                logger.warning(f"Rejected invalid media URL source: {url}")
+                return None
+
+            fetched = await fetch_media_cached(url, timeout=15.0)
+            final_mime = media_types[i] if i < len(media_types) else "image/jpeg"
+            prepared = await prepare_image(fetched.data, final_mime, use="chat")
+            image_bytes, final_mime = prepared.data, prepared.mime_type
+            logger.info(f"[ADK] Fetched media {i}: {len(image_bytes)} bytes ({final_mime})")
+            # Return both the image data and a text hint so the agent knows the source URL
+            img_part = types.Part(inline_data=types.Blob(mime_type=final_mime, data=image_bytes))
+            hint_part = types.Part(text=f"\n[URL Immagine Caricata per riferimento o tool: {url}]\n")
+            return [img_part, hint_part]
+        except Exception as e:  # noqa: BLE001
+            logger.error(f"Failed to fetch media {url}: {e}")
+            return None
+
+    @staticmethod
+    async def _get_or_create_session(session_service: Any, user_id: str, session_id: str) -> tuple[Any, bool]:
+        """Ensure the ADK session exists (ADK raises SessionNotFoundError otherwise).
+
+        Returns (session, created).
+        """
+        try:
+            session = await session_service.get_session(
+                app_name=ADK_APP_NAME,
+                user_id=user_id,
+                session_id=session_id,
+            )
+        except Exception as e:
+            if type(e).__name__ == "SessionNotFoundError" or "Session not found" in str(e):
+                session = None
+            else:
+                raise e
+        if session is not None:
+            return session, False
+        session = await session_service.create_session(
+            app_name=ADK_APP_NAME,
+            user_id=user_id,
+            session_id=session_id,
+        )
+        logger.info("Created new ADK session", extra={"session_id": session_id, "user_id": user_id})
+        return session, True
+
+    @staticmethod
+    async def _inject_history(
+        session_service: Any,
+        session: Any,
+        session_id: str,
+        tag: str,
+        history: list[dict] | None = None,
+    ) -> None:
+        """Replay the last 30 Firestore messages into a freshly created ADK session.
+
+        `history` may be passed pre-loaded (see _prerun); otherwise it is read here.
+        Non-fatal: the agent starts fresh if history cannot be loaded.
+        """
+        try:
+            if history is None:
+                repo = get_conversation_repository()
+                history = await repo.get_context(session_id, limit=30)
+            if not history:
+                return
+            now_ms = int(time.time() * 1000)
+            events = [
+                Event(
+                    invocation_id=f"{tag}_{now_ms}_{idx}",
+                    author=msg.get("role", "user"),
+                    content=types.Content(
+                        role=msg.get("role", "user"),
+                        parts=[types.Part(text=msg.get("content", "").strip())],
+                    ),
+                    actions=EventActions(),
+                )
+                for idx, msg in enumerate(history)
+                if msg.get("content", "").strip()
+            ]
+            # Parallel injection: ~10x faster than sequential await loop
+            if events:
+                await asyncio.gather(*(session_service.append_event(session, evt) for evt in events))
+            logger.info(
+                f"[ADK] Injected {len(events)} history events into restored session ({tag})",
+                extra={"session_id": session_id},
+            )
+        except Exception as hist_err:  # noqa: BLE001
+            logger.warning(f"[ADK] History injection failed (session starts fresh): {hist_err}")
+
     async def health_check(self) -> bool:
         """Verifies if the Vertex AI ADK backend is accessible by listing sessions."""
         try:
             session_service = get_session_service()
             # Attempt a lightweight Firestore read to verify connectivity
-            await session_service.list_sessions(user_id="__healthcheck__", app_name="syd_orchestrator")
+            await session_service.list_sessions(user_id="__healthcheck__", app_name=ADK_APP_NAME)
             return True
         except Exception as e:  # noqa: BLE001
             logger.warning(f"[ADKOrchestrator] Health check failed: {e}")
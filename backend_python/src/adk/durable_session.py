@@ -0,0 +1,556 @@
+"""
+Durable ADK session service — append-only event log behind a hot in-memory LRU.
+
+Why: with InMemorySessionService every restart / scale-out lost all ADK sessions,
+so the first turn after a deploy re-read 30 Firestore messages and replayed them
+through append_event before the model could even start (the "cold turn").
+
+Design:
+  - Hot tier: the InMemorySessionService maps (subclassed), bounded to
+    ADK_SESSION_HOT_MAX active sessions (LRU) and ADK_SESSION_HOT_TTL_SECONDS of
+    idleness. Before a hot entry is served, the log's `last_update_time` for the
+    session (one small read) is compared with the value this instance last
+    loaded or wrote; a mismatch means another instance appended meanwhile, and
+    the session is reloaded.
+  - Durable tier: an append-only log per session — one header record (initial
+    state) plus one record per non-partial event. SQLiteEventLog locally,
+    FirestoreEventLog in production (adk_sessions/{app}:{user}:{sid}/events).
+  - Write-behind: append_event applies the event in memory and returns; the
+    serialized record is queued and written in batches by a background task,
+    off the request path. `flush()` drains the queue (called on shutdown and
+    before any cold load, so a reload never misses this instance's own writes).
+  - Lazy load: a hot hit reads only the session header's timestamp; events are
+    read on a hot-tier miss or a stale entry.
+  - Erasure: `purge()` deletes a user's (or a chat's) sessions from the log and
+    from memory, including records still queued — the GDPR deletion paths
+    (src/db/users.py, src/db/projects/deletion.py) call it through
+    src.adk.session.purge_sessions.
+
+Records are compacted before persisting: inline media bytes (user photos sent as
+inline_data) are replaced by a short text marker — the public URL hint part that
+the orchestrator sends alongside every image is kept, so the agent can still
+reference the upload by URL after a reload.
+
+Scope: only session-scoped state is persisted (the header's initial state plus
+the events' state deltas, replayed on load). The agents do not use `app:`/`user:`
+scoped state; it is rebuilt from the session's own events on load.
+"""
+import asyncio
+import json
+import logging
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from typing import Any
+
+from google.adk.events import Event
+from google.adk.sessions import InMemorySessionService, Session
+from google.adk.sessions.base_session_service import GetSessionConfig, ListSessionsResponse
+
+from src.utils.async_utils import run_blocking
+
+logger = logging.getLogger(__name__)
+
+_SessionKey = tuple[str, str, str]  # (app_name, user_id, session_id)
+
+_WRITE_BATCH_SIZE = 200
+_WRITE_RETRIES = 3
+
+
+@dataclass
+class StoredSession:
+    """A session as read back from the durable log."""
+    app_name: str
+    user_id: str
+    session_id: str
+    state: dict[str, Any] = field(default_factory=dict)
+    last_update_time: float = 0.0
+    events: list[dict[str, Any]] = field(default_factory=list)
+
+
+@dataclass
+class LogOp:
+    """One queued write. kind: 'create' | 'event' | 'delete'."""
+    kind: str
+    key: _SessionKey
+    payload: dict[str, Any] | None = None
+    ts: float = 0.0
+
+
+def compact_event(event: Event) -> dict[str, Any]:
+    """Serialize an event for the log, dropping inline media bytes."""
+    data = event.model_dump(mode="json", exclude_none=True, by_alias=True)
+    content = data.get("content") or {}
+    for part in content.get("parts") or []:
+        blob = part.pop("inlineData", None)
+        if blob is not None:
+            part["text"] = f"[allegato {blob.get('mimeType', 'media')} non persistito]"
+    return data
+
+
+# ── Durable tier backends ─────────────────────────────────────────────────────
+
+class SessionEventLog(ABC):
+    """Append-only storage for ADK sessions."""
+
+    @abstractmethod
+    async def write(self, ops: list[LogOp]) -> None: ...
+
+    @abstractmethod
+    async def load(self, key: _SessionKey) -> StoredSession | None: ...
+
+    @abstractmethod
+    async def list_sessions(self, app_name: str, user_id: str | None) -> list[StoredSession]: ...
+
+    @abstractmethod
+    async def last_update_time(self, key: _SessionKey) -> float | None:
+        """The stored session's last_update_time (None if the session is not in the log)."""
+
+    @abstractmethod
+    async def purge(self, app_name: str, user_id: str | None, session_id: str | None) -> int:
+        """Delete every stored session of `user_id` and/or with id `session_id`, events included.
+
+        Returns the number of sessions deleted.
+        """
+
+
+class SQLiteEventLog(SessionEventLog):
+    """Local/dev backend: one SQLite file, WAL mode, events keyed by rowid order."""
+
+    def __init__(self, path: str = "adk_sessions.sqlite3"):
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            " app_name TEXT, user_id TEXT, session_id TEXT, state TEXT NOT NULL,"
+            " last_update_time REAL NOT NULL, PRIMARY KEY (app_name, user_id, session_id))"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS events ("
+            " seq INTEGER PRIMARY KEY AUTOINCREMENT, app_name TEXT, user_id TEXT,"
+            " session_id TEXT, event TEXT NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_events_session ON events(app_name, user_id, session_id)")
+        self._lock = threading.Lock()
+
+    def _write_sync(self, ops: list[LogOp]) -> None:
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                for op in ops:
+                    if op.kind == "create":
+                        self._conn.execute("DELETE FROM events WHERE app_name=? AND user_id=? AND session_id=?", op.key)
+                        self._conn.execute(
+                            "INSERT OR REPLACE INTO sessions VALUES (?, ?, ?, ?, ?)",
+                            (*op.key, json.dumps((op.payload or {}).get("state", {})), op.ts),
+                        )
+                    elif op.kind == "event":
+                        self._conn.execute(
+                            "INSERT INTO events (app_name, user_id, session_id, event) VALUES (?, ?, ?, ?)",
+                            (*op.key, json.dumps(op.payload)),
+                        )
+                        self._conn.execute(
+                            "UPDATE sessions SET last_update_time=? WHERE app_name=? AND user_id=? AND session_id=?",
+                            (op.ts, *op.key),
+                        )
+                    elif op.kind == "delete":
+                        self._conn.execute("DELETE FROM events WHERE app_name=? AND user_id=? AND session_id=?", op.key)
+                        self._conn.execute(
+                            "DELETE FROM sessions WHERE app_name=? AND user_id=? AND session_id=?", op.key
+                        )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def _load_sync(self, key: _SessionKey) -> StoredSession | None:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT state, last_update_time FROM sessions WHERE app_name=? AND user_id=? AND session_id=?", key
+            ).fetchone()
+            if row is None:
+                return None
+            events = self._conn.execute(
+                "SELECT event FROM events WHERE app_name=? AND user_id=? AND session_id=? ORDER BY seq", key
+            ).fetchall()
+        return StoredSession(*key, state=json.loads(row[0]), last_update_time=row[1],
+                             events=[json.loads(e[0]) for e in events])
+
+    def _last_update_time_sync(self, key: _SessionKey) -> float | None:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT last_update_time FROM sessions WHERE app_name=? AND user_id=? AND session_id=?", key
+            ).fetchone()
+        return row[0] if row is not None else None
+
+    def _list_sync(self, app_name: str, user_id: str | None) -> list[StoredSession]:
+        query = "SELECT user_id, session_id, state, last_update_time FROM sessions WHERE app_name=?"
+        params: tuple = (app_name,)
+        if user_id is not None:
+            query += " AND user_id=?"
+            params += (user_id,)
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        return [StoredSession(app_name, r[0], r[1], state=json.loads(r[2]), last_update_time=r[3]) for r in rows]
+
+    def _purge_sync(self, app_name: str, user_id: str | None, session_id: str | None) -> int:
+        query = "SELECT user_id, session_id FROM sessions WHERE app_name=?"
+        params: tuple = (app_name,)
+        if user_id is not None:
+            query += " AND user_id=?"
+            params += (user_id,)
+        if session_id is not None:
+            query += " AND session_id=?"
+            params += (session_id,)
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        self._write_sync([LogOp("delete", (app_name, r[0], r[1])) for r in rows])
+        return len(rows)
+
+    async def write(self, ops: list[LogOp]) -> None:
+        await run_blocking(self._write_sync, ops)
+
+    async def load(self, key: _SessionKey) -> StoredSession | None:
+        return await run_blocking(self._load_sync, key)
+
+    async def list_sessions(self, app_name: str, user_id: str | None) -> list[StoredSession]:
+        return await run_blocking(self._list_sync, app_name, user_id)
+
+    async def last_update_time(self, key: _SessionKey) -> float | None:
+        return await run_blocking(self._last_update_time_sync, key)
+
+    async def purge(self, app_name: str, user_id: str | None, session_id: str | None) -> int:
+        return await run_blocking(self._purge_sync, app_name, user_id, session_id)
+
+
+class FirestoreEventLog(SessionEventLog):
+    """Production backend.
+
+    Layout: {collection}/{app}:{user}:{sid} holds the header (state, timestamps);
+    its `events` subcollection holds one document per event, ordered by `ts`.
+    A flush is committed in WriteBatches of at most _MAX_BATCH_OPS writes
+    (Firestore rejects batches over 500); a long session's delete spans several.
+    """
+
+    _MAX_BATCH_OPS = 450
+
+    def __init__(self, collection: str = "adk_sessions"):
+        self.collection = collection
+
+    def _doc(self, key: _SessionKey) -> Any:
+        from src.db.firebase_client import get_async_firestore_client
+        return get_async_firestore_client().collection(self.collection).document(":".join(key))
+
+    async def write(self, ops: list[LogOp]) -> None:
+        from src.db.firebase_client import get_async_firestore_client
+
+        db = get_async_firestore_client()
+        batch, n = db.batch(), 0
+
+        async def room_for(writes: int) -> Any:
+            """The batch to add `writes` writes to, committing the current one first if they would not fit."""
+            nonlocal batch, n
+            if n + writes > self._MAX_BATCH_OPS:
+                await batch.commit()
+                batch, n = db.batch(), 0
+            n += writes
+            return batch
+
+        for op in ops:
+            doc = self._doc(op.key)
+            if op.kind == "delete":
+                # Subcollection docs are not removed by deleting the parent.
+                async for ev in doc.collection("events").stream():
+                    (await room_for(1)).delete(ev.reference)
+                (await room_for(1)).delete(doc)
+            elif op.kind == "create":
+                app_name, user_id, session_id = op.key
+                (await room_for(1)).set(doc, {
+                    "app_name": app_name, "user_id": user_id, "session_id": session_id,
+                    "state": (op.payload or {}).get("state", {}), "last_update_time": op.ts,
+                })
+            else:
+                payload = op.payload or {}
+                event_batch = await room_for(2)
+                event_batch.set(doc.collection("events").document(payload.get("id") or None), {
+                    "ts": op.ts, "event": json.dumps(payload),
+                })
+                event_batch.set(doc, {"last_update_time": op.ts}, merge=True)
+        if n:
+            await batch.commit()
+
+    async def load(self, key: _SessionKey) -> StoredSession | None:
+        doc = self._doc(key)
+        snap = await doc.get()
+        if not snap.exists:
+            return None
+        header = snap.to_dict() or {}
+        events = [json.loads((ev.to_dict() or {})["event"])
+                  async for ev in doc.collection("events").order_by("ts").stream()]
+        return StoredSession(*key, state=header.get("state") or {},
+                             last_update_time=header.get("last_update_time", 0.0), events=events)
+
+    async def last_update_time(self, key: _SessionKey) -> float | None:
+        snap = await self._doc(key).get(field_paths=["last_update_time"])
+        if not snap.exists:
+            return None
+        return (snap.to_dict() or {}).get("last_update_time", 0.0)
+
+    async def list_sessions(self, app_name: str, user_id: str | None) -> list[StoredSession]:
+        from src.db.firebase_client import get_async_firestore_client
+
+        query = get_async_firestore_client().collection(self.collection).where("app_name", "==", app_name)
+        if user_id is not None:
+            query = query.where("user_id", "==", user_id)
+        out = []
+        async for snap in query.stream():
+            d = snap.to_dict() or {}
+            out.append(StoredSession(app_name, d.get("user_id", ""), d.get("session_id", ""),
+                                     state=d.get("state") or {}, last_update_time=d.get("last_update_time", 0.0)))
+        return out
+
+    async def purge(self, app_name: str, user_id: str | None, session_id: str | None) -> int:
+        from src.db.firebase_client import get_async_firestore_client
+
+        query = get_async_firestore_client().collection(self.collection).where("app_name", "==", app_name)
+        if user_id is not None:
+            query = query.where("user_id", "==", user_id)
+        if session_id is not None:
+            query = query.where("session_id", "==", session_id)
+        keys = []
+        async for snap in query.stream():
+            d = snap.to_dict() or {}
+            keys.append((app_name, d.get("user_id", ""), d.get("session_id", "")))
+        # The delete ops remove each events subcollection in batches of at most _MAX_BATCH_OPS.
+        await self.write([LogOp("delete", key) for key in keys])
+        return len(keys)
+
+
+# ── Session service ───────────────────────────────────────────────────────────
+
+class DurableSessionService(InMemorySessionService):
+    """ADK session service: in-memory hot LRU over a durable append-only log."""
+
+    def __init__(self, log: SessionEventLog, hot_max: int = 500, hot_ttl_seconds: float = 900.0):
+        super().__init__()
+        self.log = log
+        self.hot_max = hot_max
+        self.hot_ttl_seconds = hot_ttl_seconds
+        self._hot: OrderedDict[_SessionKey, float] = OrderedDict()  # key → last access (monotonic)
+        # key → the log's last_update_time as of this instance's last load or completed write.
+        self._synced: dict[_SessionKey, float] = {}
+        self._queue: asyncio.Queue[LogOp] | None = None
+        self._writer: asyncio.Task | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self.cold_loads = 0
+
+    # ── Hot tier bookkeeping ──────────────────────────────────────────────────
+
+    def _touch(self, key: _SessionKey) -> None:
+        self._hot[key] = time.monotonic()
+        self._hot.move_to_end(key)
+        while len(self._hot) > self.hot_max:
+            evicted, _ = self._hot.popitem(last=False)
+            self._drop_from_memory(evicted)
+
+    def _drop_from_memory(self, key: _SessionKey) -> None:
+        app_name, user_id, session_id = key
+        self.sessions.get(app_name, {}).get(user_id, {}).pop(session_id, None)
+        self._hot.pop(key, None)
+        self._synced.pop(key, None)
+
+    def _is_hot(self, key: _SessionKey) -> bool:
+        last = self._hot.get(key)
+        if last is None:
+            return False
+        if time.monotonic() - last > self.hot_ttl_seconds:
+            self._drop_from_memory(key)
+            return False
+        return True
+
+    async def _is_current(self, key: _SessionKey) -> bool:
+        """False when the log was written by someone else since this instance last loaded/wrote the session.
+
+        Compares timestamps for equality, not order, so clock skew between
+        instances cannot hide a foreign append. Own records still queued leave
+        the log at the synced value; own records landing mid-check at worst
+        cause a redundant reload.
+        """
+        return await self.log.last_update_time(key) == self._synced.get(key)
+
+    # ── Write-behind queue ────────────────────────────────────────────────────
+
+    def _enqueue(self, op: LogOp) -> None:
+        loop = asyncio.get_running_loop()
+        if self._queue is None or self._loop is not loop or self._writer is None or self._writer.done():
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._writer = loop.create_task(self._drain_forever(self._queue))
+        self._queue.put_nowait(op)
+
+    async def _drain_forever(self, queue: "asyncio.Queue[LogOp]") -> None:
+        while True:
+            ops = [await queue.get()]
+            while not queue.empty() and len(ops) < _WRITE_BATCH_SIZE:
+                ops.append(queue.get_nowait())
+            try:
+                await self._write_with_retry(ops)
+            finally:
+                for _ in ops:
+                    queue.task_done()
+
+    async def _write_with_retry(self, ops: list[LogOp]) -> None:
+        for attempt in range(_WRITE_RETRIES):
+            try:
+                await self.log.write(ops)
+                for op in ops:
+                    if op.kind == "delete":
+                        self._synced.pop(op.key, None)
+                    else:
+                        self._synced[op.key] = op.ts
+                return
+            except Exception as exc:  # noqa: BLE001 — background writer must never die
+                if attempt == _WRITE_RETRIES - 1:
+                    logger.error("[DurableSession] Dropped %d log records after %d attempts: %s",
+                                 len(ops), _WRITE_RETRIES, exc)
+                    return
+                await asyncio.sleep(0.2 * 2 ** attempt)
+
+    def _discard_queued(self, matches: Callable[[_SessionKey], bool]) -> None:
+        """Drop queued records whose session key `matches` (the writer has not picked them up yet)."""
+        queue = self._queue
+        if queue is None or self._loop is not asyncio.get_running_loop():
+            return
+        keep = []
+        while not queue.empty():
+            op = queue.get_nowait()
+            queue.task_done()
+            if not matches(op.key):
+                keep.append(op)
+        for op in keep:
+            queue.put_nowait(op)
+
+    async def flush(self) -> None:
+        """Wait until every queued record is written to the durable log."""
+        if self._queue is not None and self._loop is asyncio.get_running_loop():
+            await self._queue.join()
+
+    async def close(self) -> None:
+        await self.flush()
+        if self._writer is not None and not self._writer.done():
+            self._writer.cancel()
+
+    # ── Cold load ─────────────────────────────────────────────────────────────
+
+    async def _load_into_memory(self, key: _SessionKey) -> bool:
+        await self.flush()
+        stored = await self.log.load(key)
+        if stored is None:
+            self._drop_from_memory(key)
+            return False
+        session = Session(app_name=key[0], user_id=key[1], id=key[2],
+                          state=dict(stored.state), last_update_time=stored.last_update_time)
+        for raw in stored.events:
+            event = Event.model_validate(raw)
+            self._commit_event_to_session(session, event)
+        self.sessions.setdefault(key[0], {}).setdefault(key[1], {})[key[2]] = session
+        self._synced[key] = stored.last_update_time
+        self.cold_loads += 1
+        logger.info("[DurableSession] Loaded session %s from log (%d events)", key[2], len(stored.events))
+        return True
+
+    # ── BaseSessionService API ────────────────────────────────────────────────
+
+    async def create_session(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        state: dict[str, Any] | None = None,
+        session_id: str | None = None,
+    ) -> Session:
+        session = await super().create_session(
+            app_name=app_name, user_id=user_id, state=state, session_id=session_id
+        )
+        key = (app_name, user_id, session.id)
+        self._touch(key)
+        stored_state = self.sessions[app_name][user_id][session.id].state
+        self._enqueue(LogOp("create", key, {"state": dict(stored_state)}, session.last_update_time))
+        return session
+
+    async def get_session(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        session_id: str,
+        config: GetSessionConfig | None = None,
+    ) -> Session | None:
+        key = (app_name, user_id, session_id)
+        fresh = self._is_hot(key) and await self._is_current(key)
+        if not fresh and not await self._load_into_memory(key):
+            return None
+        self._touch(key)
+        return await super().get_session(app_name=app_name, user_id=user_id, session_id=session_id, config=config)
+
+    async def list_sessions(self, *, app_name: str, user_id: str | None = None) -> ListSessionsResponse:
+        await self.flush()
+        stored = await self.log.list_sessions(app_name, user_id)
+        sessions = [
+            Session(app_name=s.app_name, user_id=s.user_id, id=s.session_id,
+                    state=s.state, last_update_time=s.last_update_time)
+            for s in stored
+        ]
+        sessions.sort(key=lambda s: (s.last_update_time, s.user_id, s.id))
+        return ListSessionsResponse(sessions=sessions)
+
+    async def delete_session(self, *, app_name: str, user_id: str, session_id: str) -> None:
+        await super().delete_session(app_name=app_name, user_id=user_id, session_id=session_id)
+        key = (app_name, user_id, session_id)
+        self._hot.pop(key, None)
+        self._enqueue(LogOp("delete", key))
+
+    async def purge(self, *, app_name: str, user_id: str | None = None, session_id: str | None = None) -> int:
+        """Erase every session of `user_id` and/or with id `session_id` (GDPR erasure).
+
+        Queued write-behind records for those sessions are discarded, a batch the
+        writer already holds is waited for, the hot entries are dropped, and then
+        the log records are deleted. Raises if the log delete fails, so callers
+        can fail closed. Returns the number of sessions deleted from the log.
+        """
+        if user_id is None and session_id is None:
+            raise ValueError("purge needs a user_id or a session_id")
+
+        def matches(key: _SessionKey) -> bool:
+            return (key[0] == app_name and (user_id is None or key[1] == user_id)
+                    and (session_id is None or key[2] == session_id))
+
+        self._discard_queued(matches)
+        await self.flush()
+        in_memory = [(app_name, uid, sid) for uid, by_id in self.sessions.get(app_name, {}).items() for sid in by_id]
+        for key in {*in_memory, *self._hot, *self._synced}:
+            if matches(key):
+                self._drop_from_memory(key)
+        purged = await self.log.purge(app_name, user_id, session_id)
+        logger.info("[DurableSession] Purged %d sessions from the log", purged)
+        return purged
+
+    async def append_event(self, session: Session, event: Event) -> Event:
+        key = (session.app_name, session.user_id, session.id)
+        if not event.partial and not self._is_hot(key):
+            # Evicted (LRU/idle) while a run still holds the Session object: reload
+            # the stored copy so the append lands on it instead of raising
+            # SessionNotFoundError mid-stream.
+            await self._load_into_memory(key)
+        storage = self.sessions.get(key[0], {}).get(key[1], {}).get(key[2])
+        before = len(storage.events) if storage is not None else -1
+        event = await super().append_event(session, event)
+        # Persist only events that were actually committed (skips partials and re-deliveries).
+        if storage is not None and len(storage.events) > before:
+            self._touch(key)
+            self._enqueue(LogOp("event", key, compact_event(event), event.timestamp))
+        return event
@@ -2,7 +2,10 @@
 Session & Artifact Services for ADK runner.
 
 ADK 1.27 ships VertexAiSessionService (managed by Vertex AI Agent Engine)
-and InMemorySessionService (dev/test only).
+and InMemorySessionService (dev/test only). We run DurableSessionService
+(src/adk/durable_session.py): an in-memory hot LRU over an append-only event
+log (Firestore in production, SQLite locally), so sessions survive restarts
+and scale-out without re-injecting Firestore history.
 
 Artifact Service (ADK 1.27+): InMemoryArtifactService stores tool-generated
 artifacts (renders, PDFs) keyed by filename. Tools save via
@@ -18,25 +21,80 @@ from google.adk.sessions import InMemorySessionService
 
 logger = logging.getLogger(__name__)
 
-_session_service_instance = None
+ADK_APP_NAME = "syd_orchestrator"
+
+_session_service_instance: InMemorySessionService | None = None
 _artifact_service_instance = None
 
 
-def get_session_service():
+def get_session_service() -> InMemorySessionService:
     """
-    Returns the appropriate ADK session service based on environment.
+    Returns the ADK session service selected by ADK_SESSION_BACKEND.
 
-    Returns a singleton so the Runner and stream_chat share the same in-memory store.
+    Returns a singleton so the Runner and stream_chat share the same hot tier
+    (and the same write-behind queue). DurableSessionService subclasses
+    InMemorySessionService, so both backends share that type.
     """
     global _session_service_instance
     if _session_service_instance is not None:
         return _session_service_instance
 
-    logger.info("Initializing InMemorySessionService for ADK Orchestrator (singleton)")
-    _session_service_instance = InMemorySessionService()
+    from src.adk.durable_session import DurableSessionService, FirestoreEventLog, SQLiteEventLog
+    from src.core.config import settings
+
+    backend = settings.ADK_SESSION_BACKEND.lower()
+    if backend == "auto":
+        backend = "firestore" if settings.ENV == "production" else "sqlite"
+
+    if backend == "memory":
+        logger.info("Initializing InMemorySessionService for ADK Orchestrator (singleton)")
+        _session_service_instance = InMemorySessionService()
+        return _session_service_instance
+
+    log = FirestoreEventLog() if backend == "firestore" else SQLiteEventLog(settings.ADK_SESSION_SQLITE_PATH)
+    logger.info(f"Initializing DurableSessionService ({backend} event log) for ADK Orchestrator (singleton)")
+    _session_service_instance = DurableSessionService(
+        log,
+        hot_max=settings.ADK_SESSION_HOT_MAX,
+        hot_ttl_seconds=settings.ADK_SESSION_HOT_TTL_SECONDS,
+    )
     return _session_service_instance
 
 
+async def shutdown_session_service() -> None:
+    """Flush pending write-behind records (no-op if the service was never built)."""
+    from src.adk.durable_session import DurableSessionService
+
+    service = _session_service_instance
+    if isinstance(service, DurableSessionService):
+        await service.close()
+
+
+async def purge_sessions(*, user_id: str | None = None, session_id: str | None = None) -> int:
+    """
+    GDPR erasure: delete the ADK sessions of `user_id` and/or with id `session_id`.
+
+    Covers the durable event log (full chat text) and the in-memory tier. Raises
+    on failure so the deletion paths can fail closed. Returns the number of
+    sessions deleted.
+    """
+    from src.adk.durable_session import DurableSessionService
+
+    service = get_session_service()
+    if isinstance(service, DurableSessionService):
+        return await service.purge(app_name=ADK_APP_NAME, user_id=user_id, session_id=session_id)
+    if user_id is None and session_id is None:
+        raise ValueError("purge_sessions needs a user_id or a session_id")
+    purged = 0
+    for uid, by_id in service.sessions.get(ADK_APP_NAME, {}).items():
+        if user_id is not None and uid != user_id:
+            continue
+        for sid in [s for s in by_id if session_id is None or s == session_id]:
+            del by_id[sid]
+            purged += 1
+    return purged
+
+
 def get_artifact_service():
     """
     Returns the ADK artifact service singleton.
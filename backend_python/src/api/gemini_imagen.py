@@ -3,29 +3,21 @@ import base64
 import logging
 from typing import Any, cast
 
-from google import genai
 from google.api_core import exceptions as google_exceptions
 from google.genai import types
-from src.core.config import settings
+from src.utils.genai_client import get_genai_client, track_genai_call
 
 logger = logging.getLogger(__name__)
 
 # Configure Gemini API via Settings (Robust)
 # GEMINI_API_KEY is now accessed via settings.api_key which handles fallback and validation
 
-# Create client with API key (Lazy)
-_client = None
-
 def _get_client():
-    """Lazy-load GenAI client."""
-    global _client
-    if _client is None:
-        try:
-            api_key = settings.api_key
-            _client = genai.Client(api_key=api_key)
-        except ValueError as e:
-            raise Exception(f"Configuration Error: {e}") from e
-    return _client
+    """Shared GenAI client from the process-wide registry (src/utils/genai_client.py)."""
+    try:
+        return get_genai_client()
+    except ValueError as e:
+        raise Exception(f"Configuration Error: {e}") from e
 
 # Models for image generation
 T2I_MODEL = "gemini-3.1-flash-image-preview"  # High Efficiency T2I
@@ -67,15 +59,16 @@ async def generate_image_t2i(
         logger.info(f"Generating T2I image with prompt length: {len(full_prompt)} chars")
 
         # Generate content with new SDK (Async)
-        response = await client.aio.models.generate_content(
-            model=model,
-            contents=full_prompt,
-            config=types.GenerateContentConfig(
-                response_modalities=["IMAGE", "TEXT"],
-                temperature=0.4,
-                image_config=types.ImageConfig(aspect_ratio=aspect_ratio),
+        with track_genai_call(model):
+            response = await client.aio.models.generate_content(
+                model=model,
+                contents=full_prompt,
+                config=types.GenerateContentConfig(
+                    response_modalities=["IMAGE", "TEXT"],
+                    temperature=0.4,
+                    image_config=types.ImageConfig(aspect_ratio=aspect_ratio),
+                )
             )
-        )
 
         # Extract image from response
         content = response.candidates[0].content if response.candidates else None
@@ -182,20 +175,21 @@ async def generate_image_i2i(
 
         # Call API Async with explicit configuration and timeout
         try:
-            response = await asyncio.wait_for(
-                client.aio.models.generate_content(
-                    model=model,
-                    # genai's contents union is invariant in the stub; our
-                    # list[Content] is valid at runtime.
-                    contents=cast("types.ContentListUnion", contents),
-                    config=types.GenerateContentConfig(
-                        response_modalities=["IMAGE", "TEXT"],
-                        temperature=0.4,
-                        image_config=types.ImageConfig(aspect_ratio=aspect_ratio),
-                    )
-                ),
-                timeout=90.0  # Generative tasks can be slow, 90s is safe
-            )
+            with track_genai_call(model):
+                response = await asyncio.wait_for(
+                    client.aio.models.generate_content(
+                        model=model,
+                        # genai's contents union is invariant in the stub; our
+                        # list[Content] is valid at runtime.
+                        contents=cast("types.ContentListUnion", contents),
+                        config=types.GenerateContentConfig(
+                            response_modalities=["IMAGE", "TEXT"],
+                            temperature=0.4,
+                            image_config=types.ImageConfig(aspect_ratio=aspect_ratio),
+                        )
+                    ),
+                    timeout=90.0  # Generative tasks can be slow, 90s is safe
+                )
         except TimeoutError as e:
             logger.error("[Gemini] ❌ I2I Request timed out after 90s")
             raise Exception("La generazione dell'immagine ha impiegato troppo tempo. Riprova.") from e
@@ -68,7 +68,7 @@ async def erase_my_account(
     GDPR Art. 17 "Right to Erasure".
 
     Permanently and irreversibly deletes all personal data for the authenticated user:
-    - Firestore: chat sessions + messages, projects + files, leads, user profile
+    - Firestore: chat sessions + messages, ADK session logs, projects + files, leads, user profile
     - Firebase Auth: authentication account (JWT becomes invalid after this call)
 
     The client MUST sign the user out immediately upon receiving 204.
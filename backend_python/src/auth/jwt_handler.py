@@ -3,6 +3,7 @@ import logging
 from fastapi import Request, Security
 from fastapi.security import HTTPBearer
 from firebase_admin import auth
+from src.auth.token_cache import get_token_cache
 from src.core.exceptions import AuthError
 from src.db.firebase_client import init_firebase
 from src.schemas.internal import UserSession
@@ -20,7 +21,9 @@ async def verify_token(req: Request) -> UserSession:
     Firebase Admin SDK network calls that fail when credentials are not
     available (e.g. local dev with anonymous Firebase users).
 
-    In production, always verifies the token via Firebase Admin SDK.
+    In production, verifies the token via Firebase Admin SDK on first sight,
+    then serves repeat requests from the verified-token cache (revocation is
+    rechecked in the background — see src/auth/token_cache.py).
     """
     from src.core.config import settings
     if req is None:
@@ -89,30 +92,44 @@ async def verify_token(req: Request) -> UserSession:
     # ─────────────────────────────────────────────────────────────────
     # req.client is Optional (None for some ASGI/test transports); resolve once.
     client_host = req.client.host if req.client else "unknown"
+    token_cache = get_token_cache()
     try:
-        # Ensure Firebase is initialized
-        init_firebase()
-
-        # Verify the ID token using the Firebase Admin SDK.
-        # This performs asymmetric RSA signature verification using public keys
-        # cached automatically by the SDK (rotated ~every 6 hours).
-        # We enforce check_revoked=True for strict security (checks against blacklisted tokens).
-        decoded_token = auth.verify_id_token(
-            token,
-            check_revoked=True,
-            clock_skew_seconds=60
-        )
-
-        # Extra Architecture Guard: Explicitly verify that the audience matches our Project ID.
-        # Although verify_id_token does this, explicit verification prevents cross-project
-        # token injection if multiple projects share an environment accidentally.
-        expected_aud = settings.GOOGLE_CLOUD_PROJECT or settings.FIREBASE_PROJECT_ID
-        if expected_aud and decoded_token.get("aud") != expected_aud:
-            logger.error(f"JWT Audience mismatch. Expected: {expected_aud}, Got: {decoded_token.get('aud')}")
-            raise AuthError("Invalid audience", detail={"reason": "project_mismatch"})
+        # Fast path: token already fully verified on this instance. Revocation is
+        # rechecked in the background by the cache (see src/auth/token_cache.py).
+        decoded_token = token_cache.get(token) if token_cache is not None else None
+        if decoded_token is None:
+            # Ensure Firebase is initialized
+            init_firebase()
+
+            # Verify the ID token using the Firebase Admin SDK.
+            # This performs asymmetric RSA signature verification using public keys
+            # cached automatically by the SDK (rotated ~every 6 hours).
+            # We enforce check_revoked=True for strict security (checks against blacklisted tokens).
+            decoded_token = auth.verify_id_token(
+                token,
+                check_revoked=True,
+                clock_skew_seconds=60
+            )
+
+            # Extra Architecture Guard: Explicitly verify that the audience matches our Project ID.
+            # Although verify_id_token does this, explicit verification prevents cross-project
+            # token injection if multiple projects share an environment accidentally.
+            expected_aud = settings.GOOGLE_CLOUD_PROJECT or settings.FIREBASE_PROJECT_ID
+            if expected_aud and decoded_token.get("aud") != expected_aud:
+                logger.error(f"JWT Audience mismatch. Expected: {expected_aud}, Got: {decoded_token.get('aud')}")
+                raise AuthError("Invalid audience", detail={"reason": "project_mismatch"})
+
+            # Only tokens that passed signature, revocation AND audience checks are cached.
+            if token_cache is not None:
+                token_cache.put(token, decoded_token)
+
+        uid = decoded_token.get("uid")
+        if not isinstance(uid, str) or not uid:
+            # verify_id_token always sets uid; a token without one is never accepted.
+            raise AuthError("Invalid token", detail={"reason": "missing_uid"})
 
         session = UserSession(
-            uid=decoded_token.get("uid"),
+            uid=uid,
             email=decoded_token.get("email"),
             is_authenticated=True,
             is_anonymous=(decoded_token.get("firebase", {}).get("sign_in_provider") == "anonymous"),
@@ -0,0 +1,169 @@
+"""
+Verified-token cache — takes the Firebase revocation round-trip off the hot path.
+
+`auth.verify_id_token(..., check_revoked=True)` performs a remote user lookup on
+every call. Signature verification is local (public keys are cached by the SDK),
+so the network hop only exists to answer "was this user's session revoked?".
+
+This cache remembers tokens that already passed full verification, keyed by the
+SHA-256 of the raw token (the token itself is never stored). A hit is served
+without any network call:
+
+  - Entries expire at the token's own `exp` claim — never later.
+  - Revocation is rechecked in the BACKGROUND once an entry is older than
+    AUTH_REVOCATION_RECHECK_SECONDS, by comparing the token's `iat` to the user's
+    `tokens_valid_after_timestamp` (same rule the Admin SDK applies). A revoked
+    or disabled user has all cached tokens evicted, so the next request falls
+    back to full verification and gets the proper `RevokedIdTokenError`.
+  - If the recheck itself fails (Firebase unreachable), the entry is evicted:
+    the worst case is the pre-cache behaviour, never a longer trust window.
+
+Bounded LRU (OrderedDict), per-instance. Revocation latency is therefore at most
+one recheck interval plus one Firebase lookup.
+"""
+import asyncio
+import hashlib
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any
+
+from src.utils.async_utils import run_blocking
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(slots=True)
+class _Entry:
+    claims: dict[str, Any]
+    expires_at: float  # token `exp`, epoch seconds (wall clock)
+    checked_at: float  # last revocation check, time.monotonic()
+
+
+def _fetch_user(uid: str) -> Any:
+    """Sync: Firebase Auth user lookup (runs in the threadpool)."""
+    from firebase_admin import auth
+    return auth.get_user(uid)
+
+
+class VerifiedTokenCache:
+    """Bounded LRU of verified ID-token claims with background revocation checks."""
+
+    def __init__(self, max_entries: int = 10_000, recheck_seconds: float = 300.0):
+        self.max_entries = max_entries
+        self.recheck_seconds = recheck_seconds
+        self._entries: OrderedDict[str, _Entry] = OrderedDict()
+        # uid → in-flight recheck task (dedup + keeps a reference, no fire-and-forget)
+        self._rechecks: dict[str, asyncio.Task] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.revocations = 0
+
+    @staticmethod
+    def _key(token: str) -> str:
+        return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+    def get(self, token: str) -> dict[str, Any] | None:
+        """Return cached claims for a verified token, or None on miss/expiry."""
+        key = self._key(token)
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        if time.time() >= entry.expires_at:
+            del self._entries[key]
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        if time.monotonic() - entry.checked_at >= self.recheck_seconds:
+            self._schedule_recheck(key, entry)
+        return entry.claims
+
+    def put(self, token: str, claims: dict[str, Any]) -> None:
+        """Cache claims of a token that just passed full verification (incl. revocation)."""
+        exp = claims.get("exp")
+        if not isinstance(exp, int | float) or exp <= time.time():
+            return
+        key = self._key(token)
+        self._entries[key] = _Entry(claims=claims, expires_at=float(exp), checked_at=time.monotonic())
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate_uid(self, uid: str) -> int:
+        """Drop every cached token of `uid`. Returns the number of entries removed."""
+        stale = [k for k, e in self._entries.items() if e.claims.get("uid") == uid]
+        for k in stale:
+            del self._entries[k]
+        return len(stale)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> dict[str, Any]:
+        """Hit/miss counters for observability (logged, or exposed by a debug route)."""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "revocations": self.revocations,
+            "rechecks_in_flight": len(self._rechecks),
+        }
+
+    # ── Background revocation check ──────────────────────────────────────────
+
+    def _schedule_recheck(self, key: str, entry: _Entry) -> None:
+        uid = entry.claims.get("uid")
+        if not uid or uid in self._rechecks:
+            return
+        try:
+            task = asyncio.get_running_loop().create_task(self._recheck(key, entry, uid))
+        except RuntimeError:
+            return  # No running loop (sync test context) — next hit will retry
+        self._rechecks[uid] = task
+        task.add_done_callback(lambda _t: self._rechecks.pop(uid, None))
+
+    async def _recheck(self, key: str, entry: _Entry, uid: str) -> None:
+        try:
+            user = await run_blocking(_fetch_user, uid)
+        except Exception as exc:  # noqa: BLE001 — fail closed: evict, next request re-verifies fully
+            self._entries.pop(key, None)
+            logger.warning("[TokenCache] Revocation recheck failed for uid=%s, entry evicted: %s", uid, exc)
+            return
+
+        valid_after_ms = getattr(user, "tokens_valid_after_timestamp", None) or 0
+        iat = entry.claims.get("iat") or 0
+        if getattr(user, "disabled", False) or iat * 1000 < valid_after_ms:
+            removed = self.invalidate_uid(uid)
+            self.revocations += 1
+            logger.warning("[TokenCache] Tokens revoked for uid=%s — evicted %d cached entries", uid, removed)
+            return
+        entry.checked_at = time.monotonic()
+
+
+# ── Singleton factory ─────────────────────────────────────────────────────────
+
+_token_cache: VerifiedTokenCache | None = None
+
+
+def get_token_cache() -> VerifiedTokenCache | None:
+    """Returns the process-wide token cache, or None when AUTH_TOKEN_CACHE_ENABLED is off."""
+    global _token_cache
+    from src.core.config import settings
+    if not settings.AUTH_TOKEN_CACHE_ENABLED:
+        return None
+    if _token_cache is None:
+        _token_cache = VerifiedTokenCache(
+            max_entries=settings.AUTH_TOKEN_CACHE_MAX_ENTRIES,
+            recheck_seconds=settings.AUTH_REVOCATION_RECHECK_SECONDS,
+        )
+    return _token_cache
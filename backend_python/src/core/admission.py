@@ -0,0 +1,295 @@
+"""
+Admission control for /chat/stream.
+
+Every admitted stream holds a Vertex AI call open for up to the run timeout
+(180 s), so an instance can only serve a bounded number of turns well at once.
+Without a cap, a burst slows every stream down together and the circuit
+breaker only notices after calls start failing. The controller:
+
+  - admits at most CHAT_MAX_CONCURRENT_STREAMS streams per instance;
+  - parks the excess in a bounded wait queue (CHAT_ADMISSION_QUEUE_SIZE), each
+    waiter with a deadline (CHAT_ADMISSION_QUEUE_TIMEOUT_SECONDS);
+  - hands freed slots out across users by deficit round-robin (DRR), so one
+    uid firing many requests cannot starve the others. Requests carry a cost
+    (multimodal turns cost more, as in the rate limiter's penalty);
+  - rejects with ServiceOverloaded (503 + Retry-After) when the queue is full
+    or the wait deadline passes.
+
+Queue depth, in-flight streams, wait time and rejections are exported as
+OpenTelemetry metrics (no-op until a MeterProvider is configured) and via
+`stats()`, which /ready reports.
+
+Usage:
+    slot = await get_admission_controller().acquire(uid, cost=1)
+    return StreamingResponse(guard_stream(stream, slot), ...)
+"""
+import asyncio
+import logging
+import math
+import time
+import weakref
+from collections import deque
+from collections.abc import AsyncIterator
+from dataclasses import dataclass, field
+from typing import Any, NoReturn
+
+from opentelemetry import metrics
+
+from src.core.exceptions import ServiceOverloaded
+
+logger = logging.getLogger(__name__)
+_meter = metrics.get_meter(__name__)
+
+_DEFAULT_HOLD_SECONDS = 10.0  # prior for the Retry-After estimate before any stream finished
+_HOLD_EWMA_ALPHA = 0.2
+_MAX_RETRY_AFTER = 60
+
+
+@dataclass(eq=False)
+class _Waiter:
+    uid: str
+    cost: int
+    future: asyncio.Future
+    enqueued_at: float = field(default_factory=time.monotonic)
+
+
+class AdmissionSlot:
+    """One admitted stream. `release()` is idempotent."""
+
+    __slots__ = ("__weakref__", "_controller", "_released", "admitted_at", "uid", "waited_ms")
+
+    def __init__(self, controller: "AdmissionController", uid: str, waited_ms: float):
+        self._controller = controller
+        self._released = False
+        self.uid = uid
+        self.waited_ms = waited_ms
+        self.admitted_at = time.monotonic()
+
+    @property
+    def released(self) -> bool:
+        return self._released
+
+    def release(self) -> None:
+        if self._released:
+            return
+        self._released = True
+        self._controller._on_release(self)
+
+
+class AdmissionController:
+    """Global concurrency cap + bounded, per-uid fair (DRR) wait queue.
+
+    Single-event-loop, like the rest of the app: state is only touched from the
+    loop thread, so no lock is needed.
+    """
+
+    def __init__(
+        self,
+        max_concurrent: int,
+        max_queue: int,
+        queue_timeout: float,
+        quantum: int = 1,
+    ):
+        self.max_concurrent = max(1, max_concurrent)
+        self.max_queue = max(0, max_queue)
+        self.queue_timeout = queue_timeout
+        self.quantum = max(1, quantum)
+
+        self._in_flight = 0
+        self._queues: dict[str, deque[_Waiter]] = {}
+        self._active: deque[str] = deque()  # uids with waiters, in round-robin order
+        self._deficit: dict[str, int] = {}
+        self._waiting = 0
+        self._hold_ewma = _DEFAULT_HOLD_SECONDS
+
+        self._admitted = 0
+        self._rejected_full = 0
+        self._rejected_timeout = 0
+        self._wait_ms_total = 0.0
+        self._wait_ms_max = 0.0
+
+        self._wait_hist = _meter.create_histogram(
+            "chat.admission.wait", unit="ms", description="Time /chat/stream requests spent queued before admission",
+        )
+        self._rejections = _meter.create_counter(
+            "chat.admission.rejected", description="/chat/stream requests rejected with 503 (attr: reason)",
+        )
+        _meter.create_observable_gauge(
+            "chat.admission.queue_depth", callbacks=[self._observe_queue],
+            description="Requests waiting for a /chat/stream slot",
+        )
+        _meter.create_observable_gauge(
+            "chat.admission.in_flight", callbacks=[self._observe_in_flight],
+            description="Admitted /chat/stream streams currently running",
+        )
+
+    # ── Public API ────────────────────────────────────────────────────────────
+
+    async def acquire(self, uid: str, cost: int = 1) -> AdmissionSlot:
+        """Wait for a stream slot. Raises ServiceOverloaded when it cannot be had in time."""
+        cost = max(1, cost)
+        if self._in_flight < self.max_concurrent and not self._waiting:
+            return self._grant(uid, 0.0)
+        if self._waiting >= self.max_queue:
+            self._reject("queue_full")
+
+        waiter = _Waiter(uid=uid, cost=cost, future=asyncio.get_running_loop().create_future())
+        self._enqueue(waiter)
+        try:
+            return await asyncio.wait_for(asyncio.shield(waiter.future), timeout=self.queue_timeout)
+        except TimeoutError:
+            if waiter.future.done() and not waiter.future.cancelled():
+                return waiter.future.result()  # granted in the same loop turn as the timeout
+            self._discard(waiter)
+            self._reject("queue_timeout")
+        except asyncio.CancelledError:
+            # Client went away while queued: give back a slot granted meanwhile.
+            if waiter.future.done() and not waiter.future.cancelled():
+                waiter.future.result().release()
+            else:
+                self._discard(waiter)
+            raise
+
+    def stats(self) -> dict[str, Any]:
+        admitted = self._admitted or 1
+        return {
+            "in_flight": self._in_flight,
+            "max_concurrent": self.max_concurrent,
+            "queue_depth": self._waiting,
+            "queued_users": len(self._active),
+            "max_queue": self.max_queue,
+            "admitted": self._admitted,
+            "rejected_queue_full": self._rejected_full,
+            "rejected_queue_timeout": self._rejected_timeout,
+            "wait_ms_avg": round(self._wait_ms_total / admitted, 1),
+            "wait_ms_max": round(self._wait_ms_max, 1),
+            "hold_seconds_ewma": round(self._hold_ewma, 2),
+        }
+
+    def retry_after_seconds(self) -> int:
+        """Rough time until a newly queued request would be admitted."""
+        drains = (self._waiting + 1) / self.max_concurrent
+        return max(1, min(_MAX_RETRY_AFTER, math.ceil(drains * self._hold_ewma)))
+
+    # ── Internals ─────────────────────────────────────────────────────────────
+
+    def _grant(self, uid: str, waited_ms: float) -> AdmissionSlot:
+        self._in_flight += 1
+        self._admitted += 1
+        self._wait_ms_total += waited_ms
+        self._wait_ms_max = max(self._wait_ms_max, waited_ms)
+        self._wait_hist.record(waited_ms)
+        return AdmissionSlot(self, uid, waited_ms)
+
+    def _reject(self, reason: str) -> NoReturn:
+        if reason == "queue_full":
+            self._rejected_full += 1
+        else:
+            self._rejected_timeout += 1
+        self._rejections.add(1, {"reason": reason})
+        retry_after = self.retry_after_seconds()
+        logger.warning(
+            "[Admission] Rejecting /chat/stream request",
+            extra={"reason": reason, "retry_after": retry_after, **self.stats()},
+        )
+        raise ServiceOverloaded(reason=reason, retry_after=retry_after)
+
+    def _enqueue(self, waiter: _Waiter) -> None:
+        queue = self._queues.get(waiter.uid)
+        if queue is None:
+            queue = self._queues[waiter.uid] = deque()
+            self._deficit[waiter.uid] = 0
+            self._active.append(waiter.uid)
+        queue.append(waiter)
+        self._waiting += 1
+
+    def _discard(self, waiter: _Waiter) -> None:
+        queue = self._queues.get(waiter.uid)
+        if queue is None or waiter not in queue:
+            return
+        queue.remove(waiter)
+        self._waiting -= 1
+        if not queue:
+            self._drop_user(waiter.uid)
+        # The departing waiter may have been the DRR head blocking cheaper ones.
+        self._dispatch()
+
+    def _drop_user(self, uid: str) -> None:
+        del self._queues[uid]
+        del self._deficit[uid]  # DRR: an idle flow does not bank credit
+        self._active.remove(uid)
+
+    def _on_release(self, slot: AdmissionSlot) -> None:
+        self._in_flight -= 1
+        held = time.monotonic() - slot.admitted_at
+        self._hold_ewma += _HOLD_EWMA_ALPHA * (held - self._hold_ewma)
+        self._dispatch()
+
+    def _dispatch(self) -> None:
+        """Hand free slots to waiters, deficit round-robin across uids."""
+        while self._in_flight < self.max_concurrent and self._active:
+            uid = self._active[0]
+            queue = self._queues[uid]
+            waiter = queue[0]
+            if self._deficit[uid] < waiter.cost:
+                # Start of this uid's turn: top up once, then serve or move on.
+                self._deficit[uid] += self.quantum
+                if self._deficit[uid] < waiter.cost:
+                    self._active.rotate(-1)
+                    continue
+            queue.popleft()
+            self._waiting -= 1
+            self._deficit[uid] -= waiter.cost
+            if not queue:
+                self._drop_user(uid)
+            elif self._deficit[uid] < queue[0].cost:
+                self._active.rotate(-1)  # turn over
+            if waiter.future.done():
+                continue  # cancelled between timeout and discard
+            waited_ms = (time.monotonic() - waiter.enqueued_at) * 1000
+            waiter.future.set_result(self._grant(uid, waited_ms))
+
+    def _observe_queue(self, _options: Any) -> list[metrics.Observation]:
+        return [metrics.Observation(self._waiting)]
+
+    def _observe_in_flight(self, _options: Any) -> list[metrics.Observation]:
+        return [metrics.Observation(self._in_flight)]
+
+
+async def release_when_done(stream: AsyncIterator[str], slot: AdmissionSlot) -> AsyncIterator[str]:
+    """Yield from `stream`, releasing `slot` when it ends, fails or is closed."""
+    try:
+        async for chunk in stream:
+            yield chunk
+    finally:
+        slot.release()
+
+
+def guard_stream(stream: AsyncIterator[str], slot: AdmissionSlot) -> AsyncIterator[str]:
+    """Wrap a response stream so the slot is released however the response ends.
+
+    If the client disconnects before StreamingResponse pulls the first chunk,
+    the wrapper generator never starts and its `finally` never runs; the
+    finalizer covers that case when the generator is collected.
+    """
+    wrapped = release_when_done(stream, slot)
+    weakref.finalize(wrapped, slot.release)
+    return wrapped
+
+
+_controller: AdmissionController | None = None
+
+
+def get_admission_controller() -> AdmissionController:
+    """Process-wide controller built from settings on first use."""
+    global _controller
+    if _controller is None:
+        from src.core.config import settings
+
+        _controller = AdmissionController(
+            max_concurrent=settings.CHAT_MAX_CONCURRENT_STREAMS,
+            max_queue=settings.CHAT_ADMISSION_QUEUE_SIZE,
+            queue_timeout=settings.CHAT_ADMISSION_QUEUE_TIMEOUT_SECONDS,
+            quantum=settings.CHAT_ADMISSION_DRR_QUANTUM,
+        )
+    return _controller
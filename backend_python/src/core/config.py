@@ -53,13 +53,96 @@ class Settings(BaseSettings):
         default=4,
         description="Candidate multiplier for reranking: fetch top_k×this, rerank down to top_k.",
     )
+    RAG_CACHE_MAX_ENTRIES: int = Field(
+        default=2048,
+        description="Search results kept in RAGService's query cache (LRU). 0 disables the cache.",
+    )
+    RAG_CACHE_TTL_SECONDS: float = Field(
+        default=900.0,
+        description="Lifetime of a cached search result. Bounds staleness after re-indexing from another process.",
+    )
     RAG_MIN_SCORE: float = Field(
         default=0.0,
         description="Drop results whose relevance score is below this threshold. "
                     "0.0 disables filtering. Tune against eval_rag.py (rerank scores run higher).",
     )
+    PREZZARIO_INDEX_PATH: str | None = Field(
+        default=None,
+        description="Structured prezzario JSON (scripts/extract_prezzario.py) loaded into the in-process code index. "
+                    "Defaults to data/prezzario_lazio_2023_structured.json.",
+    )
+    PRICE_BOOK_REFRESH_SECONDS: float = Field(
+        default=60.0,
+        description="How often the backend polls Firestore app_config/price_book (admin edits) for a newer "
+                    "updated_at and swaps in the new price book. 0 disables live reload (bundled JSON only).",
+    )
+    RAG_NAMESPACE_TIMEOUT_SECONDS: float = Field(
+        default=3.0,
+        description="Per-namespace deadline in search_multi_namespace; slower namespaces are left out (partial results).",
+    )
+    RAG_HEDGE_ENABLED: bool = Field(
+        default=False,
+        description="Send one duplicate Pinecone request when a namespace search outlives its observed p95 latency.",
+    )
+    RAG_RRF_K: int = Field(
+        default=60,
+        description="Reciprocal-rank fusion constant for merging namespaces (higher = flatter rank weighting).",
+    )
+    RAG_LEXICAL_MODE: str = Field(
+        default="fallback",
+        description="Offline BM25 index (scripts/build_lexical_index.py): 'fallback' serves it alone when Pinecone "
+                    "is down or fails, 'hybrid' also fuses it with dense results by RRF, 'off' never uses it.",
+    )
+    RAG_LEXICAL_INDEX_DIR: str | None = Field(
+        default=None,
+        description="Directory holding one <namespace>.bm25 file per namespace. Defaults to data/lexical.",
+    )
+    RAG_UPSERT_TOKENS_PER_MINUTE: int = Field(
+        default=250_000,
+        description="Embedding token budget for bulk upserts (multilingual-e5-large: 250k TPM). "
+                    "Batches are paced by a token bucket at this rate, halved on every 429.",
+    )
+    RAG_UPSERT_BATCH_SIZE: int = Field(
+        default=96,
+        description="Records per upsert_records call (Pinecone's limit for integrated-inference upserts is 96).",
+    )
+    RAG_UPSERT_CONCURRENCY: int = Field(
+        default=4,
+        description="Upsert batches in flight at once during bulk ingestion.",
+    )
+    RAG_UPSERT_MAX_RETRIES: int = Field(
+        default=6,
+        description="Retries per batch after a 429 before the ingest gives up (exponential backoff, Retry-After aware).",
+    )
+    RAG_VECTOR_BACKEND: str = Field(
+        default="pinecone",
+        description="Vector index behind RAGService: 'pinecone' (Integrated Inference) or 'local' "
+                    "(memory-mapped .npy brute force, for dev/CI/disaster recovery).",
+    )
+    RAG_LOCAL_VECTOR_DIR: str | None = Field(
+        default=None,
+        description="Local backend storage, one sub-directory per namespace. Defaults to data/vectors.",
+    )
+    RAG_LOCAL_EMBEDDER: str = Field(
+        default="genai",
+        description="Local backend embedder: 'genai' (Gemini embeddings) or 'hashing' (deterministic, offline).",
+    )
+    RAG_LOCAL_QUANTIZE: bool = Field(
+        default=False,
+        description="Store local vectors as int8 with per-row scales (4× smaller, slightly lower precision).",
+    )
 
     CHAT_MODEL_VERSION: str = Field(default="gemini-3.1-flash-lite-preview", description="Default model for chat and analysis")
+    INSIGHT_CONTEXT_CACHE_ENABLED: bool = Field(
+        default=False,
+        description="Store InsightEngine's static system prompt (rules + assemblies + price book) as a Gemini "
+                    "cached content, so each analysis sends only the conversation and media.",
+    )
+    INSIGHT_CONTEXT_CACHE_TTL_SECONDS: int = Field(
+        default=3600,
+        description="Lifetime of the Gemini cached system prompt; it is recreated shortly before expiry "
+                    "and whenever the price book or assemblies change.",
+    )
 
     # Feature Flags (App Check enabled by default for production safety)
     ENABLE_APP_CHECK: bool = Field(default=True, description="Enable Firebase App Check (set to false for local dev)")
@@ -82,6 +165,70 @@ class Settings(BaseSettings):
         default=None,
         description="Cloud KMS Key Name for CMEK encryption of ADK Sessions"
     )
+    # Durable ADK sessions (src/adk/durable_session.py)
+    ADK_SESSION_BACKEND: str = Field(
+        default="auto",
+        description="ADK session store: 'firestore', 'sqlite', 'memory' (volatile, tests only) or "
+                    "'auto' (firestore in production, sqlite otherwise).",
+    )
+    ADK_SESSION_SQLITE_PATH: str = Field(
+        default="adk_sessions.sqlite3",
+        description="Event log file for ADK_SESSION_BACKEND=sqlite.",
+    )
+    ADK_SESSION_HOT_MAX: int = Field(
+        default=500,
+        description="Active sessions kept in memory (LRU); colder ones are reloaded from the log.",
+    )
+    ADK_SESSION_HOT_TTL_SECONDS: float = Field(
+        default=900.0,
+        description="Idle time after which a hot session is re-read from the log on next access "
+                    "(picks up turns served by another instance).",
+    )
+    ADK_PRERUN_DEADLINE_SECONDS: float = Field(
+        default=20.0,
+        description="Overall budget for the concurrent pre-run stage of a chat turn (profile, media, "
+                    "session, history). Optional steps still pending at the deadline are dropped.",
+    )
+    # Admission control for /chat/stream (src/core/admission.py)
+    CHAT_MAX_CONCURRENT_STREAMS: int = Field(
+        default=40,
+        description="Chat streams served at once per instance; further requests wait in the admission queue.",
+    )
+    CHAT_ADMISSION_QUEUE_SIZE: int = Field(
+        default=80,
+        description="Requests allowed to wait for a chat stream slot; beyond this they get 503 + Retry-After.",
+    )
+    CHAT_ADMISSION_QUEUE_TIMEOUT_SECONDS: float = Field(
+        default=15.0,
+        description="Longest a request waits for a chat stream slot before it is rejected with 503.",
+    )
+    CHAT_ADMISSION_DRR_QUANTUM: int = Field(
+        default=1,
+        description="Deficit round-robin credit each queued user earns per turn (a text turn costs 1).",
+    )
+    CHAT_ADMISSION_MEDIA_COST: int = Field(
+        default=4,
+        description="Admission cost of a turn with images or video (mirrors the rate-limit multimodal penalty).",
+    )
+    # SSE framing for /chat/stream (src/utils/stream_protocol.py)
+    SSE_COALESCE_WINDOW_MS: float = Field(
+        default=20.0,
+        description="Merge text-deltas arriving within this window into one SSE frame (0 = one frame per token).",
+    )
+    SSE_COALESCE_MAX_CHARS: int = Field(
+        default=1024,
+        description="Flush a coalesced text-delta frame once it holds this many characters.",
+    )
+    SESSION_ENSURE_CACHE_TTL_SECONDS: float = Field(
+        default=60.0,
+        description="How long a session verified by ensure_session is trusted without re-reading Firestore "
+                    "(per instance; 0 disables).",
+    )
+    CHAT_PERSIST_WRITE_BEHIND: bool = Field(
+        default=False,
+        description="Buffer a chat turn's tool/assistant messages and persist them in one Firestore commit "
+                    "after the stream ends (default: one commit per message as it happens).",
+    )
     USE_CHECKPOINTER: bool = Field(
         default=False,
         description="Enable FirestoreSaver checkpointing on the main conversation graph. "
@@ -91,6 +238,21 @@ class Settings(BaseSettings):
     # Auth & Infrastructure
     RP_ID: str | None = Field(default=None, description="WebAuthn Relying Party ID")
     FIREBASE_CREDENTIALS: str | None = Field(default=None, description="Path to firebase credentials json")
+    # Verified-token cache (src/auth/token_cache.py): serves repeat requests bearing an
+    # already-verified ID token without the check_revoked network round-trip.
+    AUTH_TOKEN_CACHE_ENABLED: bool = Field(
+        default=True,
+        description="Cache verified Firebase ID tokens (keyed by SHA-256, expiring at the token's exp).",
+    )
+    AUTH_TOKEN_CACHE_MAX_ENTRIES: int = Field(
+        default=10_000,
+        description="LRU bound of the verified-token cache (per instance).",
+    )
+    AUTH_REVOCATION_RECHECK_SECONDS: float = Field(
+        default=300.0,
+        description="Age after which a cache hit triggers a background revocation recheck "
+                    "(tokens_valid_after). Upper bound on revocation latency for cached tokens.",
+    )
 
     # Firebase Environment Variables (Alternative to JSON file)
     FIREBASE_PROJECT_ID: str | None = None
@@ -100,6 +262,81 @@ class Settings(BaseSettings):
     FIREBASE_CLIENT_ID: str | None = None
     FIREBASE_STORAGE_BUCKET: str | None = None
 
+    # Shared outbound HTTP pool for media fetches (src/utils/http_client.py)
+    HTTP_CLIENT_HTTP2: bool = Field(
+        default=True,
+        description="Negotiate HTTP/2 with storage hosts (falls back to HTTP/1.1 if 'h2' is not installed).",
+    )
+    HTTP_CLIENT_MAX_CONNECTIONS: int = Field(
+        default=100,
+        description="Upper bound on open connections across all hosts in the shared pool.",
+    )
+    HTTP_CLIENT_MAX_PER_HOST: int = Field(
+        default=16,
+        description="Concurrent in-flight fetches allowed per upstream host.",
+    )
+    HTTP_CLIENT_KEEPALIVE_SECONDS: float = Field(
+        default=60.0,
+        description="Idle time before a pooled keep-alive connection is closed.",
+    )
+    # Process-wide media byte cache (src/utils/media_cache.py)
+    MEDIA_CACHE_MAX_BYTES: int = Field(
+        default=128 * 1024 * 1024,
+        description="In-memory byte budget of the media cache (LRU). 0 disables caching.",
+    )
+    MEDIA_CACHE_TTL_SECONDS: float = Field(
+        default=3600.0,
+        description="Lifetime of a cached media object before it is fetched again.",
+    )
+    MEDIA_CACHE_SPILL_DIR: str | None = Field(
+        default=None,
+        description="Optional local directory that receives objects evicted from memory.",
+    )
+    MEDIA_CACHE_SPILL_MAX_BYTES: int = Field(
+        default=1024 * 1024 * 1024,
+        description="Byte budget of MEDIA_CACHE_SPILL_DIR (LRU).",
+    )
+    # Pre-model image normalization (src/vision/preprocess.py)
+    VISION_PREPROCESS_ENABLED: bool = Field(
+        default=True,
+        description="Downscale and re-encode photos before they are sent to Gemini as inline_data.",
+    )
+    VISION_LONG_EDGE: dict[str, int] = Field(
+        default={"chat": 1536, "triage": 1024, "measurement": 1536, "i2i": 1536, "cad": 2048, "insight": 1024},
+        description="Target long edge (px) per use case. JSON object in the environment.",
+    )
+    VISION_ENCODE_FORMAT: str = Field(
+        default="jpeg",
+        description="Re-encode format for normalized images: 'jpeg' or 'webp'.",
+    )
+    VISION_ENCODE_QUALITY: int = Field(default=85, description="JPEG/WebP quality for normalized images.")
+    VISION_PREPROCESS_CACHE_BYTES: int = Field(
+        default=64 * 1024 * 1024,
+        description="Byte budget of the normalized-image cache, keyed by source hash and use case.",
+    )
+    # Vision result cache (src/vision/result_cache.py)
+    VISION_CACHE_ENABLED: bool = Field(
+        default=True,
+        description="Reuse triage/measurement/architect/room-structure results for the same image, prompt and model.",
+    )
+    VISION_CACHE_MAX_ENTRIES: int = Field(default=512, description="Entries kept in the in-memory LRU tier.")
+    VISION_CACHE_TTL_SECONDS: float = Field(
+        default=7 * 24 * 3600.0,
+        description="Lifetime of a cached vision result in every tier.",
+    )
+    VISION_CACHE_BACKEND: str = Field(
+        default="none",
+        description="Persistent tier behind the memory LRU: 'none', 'sqlite' or 'firestore'.",
+    )
+    VISION_CACHE_SQLITE_PATH: str = Field(
+        default="/tmp/syd_vision_cache.sqlite3",
+        description="Database file used when VISION_CACHE_BACKEND='sqlite'.",
+    )
+    VISION_CACHE_FIRESTORE_COLLECTION: str = Field(
+        default="vision_cache",
+        description="Collection used when VISION_CACHE_BACKEND='firestore' (configure a TTL policy on expireAt).",
+    )
+
     # n8n MCP Integration (Webhook URLs)
     N8N_WEBHOOK_NOTIFY_ADMIN: str | None = Field(default=None, description="n8n webhook URL to notify admin of new quote draft")
     N8N_WEBHOOK_DELIVER_QUOTE: str | None = Field(default=None, description="n8n webhook URL to deliver approved quote to client")
@@ -112,6 +349,17 @@ class Settings(BaseSettings):
     N8N_ALLOWED_WEBHOOK_HOSTS: str | None = Field(default=None, description="Comma-separated allowlist of n8n webhook hostnames (SSRF guard)")
     ADMIN_DASHBOARD_URL: str = Field(default="http://localhost:8501", description="Base URL of the Streamlit admin console")
 
+    # Idempotency-Key replay store (src/middleware/idempotency_store.py)
+    IDEMPOTENCY_BACKEND: str = Field(
+        default="memory",
+        description="'memory' (per-instance LRU+TTL), 'sqlite' (shared by workers on one host) "
+                    "or 'firestore' (shared across Cloud Run instances — required past one instance).",
+    )
+    IDEMPOTENCY_SQLITE_PATH: str = Field(
+        default="/tmp/syd_idempotency.sqlite3",
+        description="Database file for IDEMPOTENCY_BACKEND=sqlite.",
+    )
+
     # Account Lifecycle (GDPR B2C Inactivity Policy)
     LIFECYCLE_SECRET: str | None = Field(
         default=None,
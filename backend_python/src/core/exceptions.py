@@ -52,6 +52,17 @@ class QuotaExceeded(AppException):
     status_code = 429
     error_code = "QUOTA_EXCEEDED"
 
+class ServiceOverloaded(AppException):
+    """Instance at capacity: the request could not be admitted in time (503 + Retry-After)."""
+    status_code = 503
+    error_code = "SERVICE_OVERLOADED"
+
+    def __init__(self, reason: str, retry_after: int) -> None:
+        super().__init__(
+            message="The assistant is busy right now. Please retry shortly.",
+            detail={"reason": reason, "retry_after": retry_after},
+        )
+
 
 # ─── Quote / HITL Domain (skill: error-handling-patterns) ─────────────────────
 
@@ -83,8 +83,8 @@ async def soft_delete_project(session_id: str, user_id: str) -> bool:
 
 async def delete_project(session_id: str, user_id: str) -> bool:
     """
-    Hard-delete a project and all its associated data (messages, files, storage blobs).
-    Reserved for admin purge after the GDPR retention window.
+    Hard-delete a project and all its associated data (messages, files, storage blobs,
+    ADK session event log). Reserved for admin purge after the GDPR retention window.
     """
     try:
         db = get_async_firestore_client()
@@ -140,8 +140,16 @@ async def delete_project(session_id: str, user_id: str) -> bool:
             )
             return False
 
-        # 3. Delete Project Document (Backend)
+        # 3. ADK session event log (full chat text). Raises on failure → the outer
+        # handler returns False with the project document still in place.
+        from src.adk.session import purge_sessions
+        await purge_sessions(session_id=session_id)
+
+        # 4. Delete Project Document (Backend)
         await doc_ref.delete()
+        # Local import: conversation_repository imports src.db.projects.
+        from src.repositories.conversation_repository import forget_known_session
+        forget_known_session(session_id)
 
         logger.info(f"[Projects] DEEP DELETE completed for {session_id}")
         return True
@@ -4,6 +4,7 @@ Firestore operations for Users.
 import asyncio
 import logging
 
+from src.adk.session import purge_sessions
 from src.db.firebase_client import get_async_firestore_client
 from src.models.user import UserPreferences, UserPreferencesUpdate
 
@@ -51,6 +52,7 @@ async def delete_user_data(uid: str) -> dict[str, int | str]:
 
     Deletes (in order):
       1. Chat sessions + messages subcollections  (collection: sessions)
+         and their ADK session event logs         (collection: adk_sessions)
       2. Projects + files subcollections          (collection: projects)
       3. Leads                                    (collection: leads)
       4. User profile + preferences               (collection: users)
@@ -64,12 +66,16 @@ async def delete_user_data(uid: str) -> dict[str, int | str]:
 
     # ── 1. Chat sessions ──────────────────────────────────────────────────────
     deleted_sessions = 0
+    # ADK logs are keyed by the user who chatted: a claimed guest chat is under the guest uid.
+    adk_sessions = await purge_sessions(user_id=uid)
     async for session_doc in db.collection("sessions").where("userId", "==", uid).stream():
+        adk_sessions += await purge_sessions(session_id=session_doc.id)
         async for msg_doc in session_doc.reference.collection("messages").stream():
             await msg_doc.reference.delete()
         await session_doc.reference.delete()
         deleted_sessions += 1
     summary["sessions"] = deleted_sessions
+    summary["adk_sessions"] = adk_sessions
 
     # ── 2. Projects ───────────────────────────────────────────────────────────
     deleted_projects = 0
@@ -12,20 +12,21 @@ Behaviour:
 
 TTL: 24 hours (matches the quota window so a re-submit within a working day is safe).
 
-Scope: In-memory per Cloud Run instance.  For multi-instance deployments this
-       should be moved to a shared Firestore/Redis store, but single-instance
-       Cloud Run is the current deployment model.
+Storage: pluggable via IDEMPOTENCY_BACKEND (see idempotency_store.py). Default is
+         an in-memory LRU+TTL store per Cloud Run instance; set it to "firestore"
+         before scaling past one instance so replays and the in-flight 409 hold
+         across instances.
 
-Applicable paths: Only routes listed in _IDEMPOTENCY_PATHS.
+Applicable paths: Routes listed in _IDEMPOTENCY_PATHS, plus the parameterised
+                  quote/batch submission routes in _IDEMPOTENCY_PATH_PATTERNS.
 Excluded paths:   /chat/stream (streaming — never buffer) and any other SSE endpoint.
 """
-import asyncio
 import hashlib
 import json
 import logging
-import time
-from dataclasses import dataclass, field
+import re
 
+from src.middleware.idempotency_store import CachedResponse, IdempotencyStore, get_idempotency_store
 from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
 logger = logging.getLogger(__name__)
@@ -56,20 +57,6 @@ def _identity_prefix(headers: list[tuple[bytes, bytes]]) -> str:
         return f"ip:{client_ip}"
     return "anon"
 
-_TTL_SECONDS = 60 * 60 * 24  # 24 hours
-_MAX_CACHE_SIZE = 10_000      # Prevent unbounded memory growth on Cloud Run
-
-
-@dataclass
-class _CachedResponse:
-    status: int
-    headers: list
-    body: bytes
-    created_at: float = field(default_factory=time.monotonic)
-
-    def is_expired(self) -> bool:
-        return time.monotonic() - self.created_at > _TTL_SECONDS
-
 
 class IdempotencyMiddleware:
     """
@@ -85,31 +72,20 @@ class IdempotencyMiddleware:
         "/api/submit-lead",
     })
 
-    def __init__(self, app: ASGIApp) -> None:
+    # Parameterised submission routes (exact-match sets cannot express {project_id}).
+    _IDEMPOTENCY_PATH_PATTERNS: tuple[re.Pattern[str], ...] = (
+        re.compile(r"^/api/quote/[A-Za-z0-9_-]+/start$"),
+        re.compile(r"^/api/quote/batch$"),
+        re.compile(r"^/api/quote/batch/[A-Za-z0-9_-]+/submit$"),
+    )
+
+    def __init__(self, app: ASGIApp, store: IdempotencyStore | None = None) -> None:
         self.app = app
-        self._cache: dict[str, _CachedResponse] = {}
-        self._in_flight: set[str] = set()
-        self._lock = asyncio.Lock()
-
-    def _evict_expired(self) -> None:
-        """Remove expired entries and enforce max cache size. Called within the lock."""
-        expired = [k for k, v in self._cache.items() if v.is_expired()]
-        for k in expired:
-            del self._cache[k]
-
-        # LRU-style eviction: if still over capacity, drop oldest entries first
-        if len(self._cache) > _MAX_CACHE_SIZE:
-            overflow = len(self._cache) - _MAX_CACHE_SIZE
-            oldest_keys = sorted(
-                self._cache, key=lambda k: self._cache[k].created_at
-            )[:overflow]
-            for k in oldest_keys:
-                del self._cache[k]
-            logger.warning(
-                "[Idempotency] Cache over capacity — evicted %d oldest entries (size=%d)",
-                overflow,
-                len(self._cache),
-            )
+        self._store = store if store is not None else get_idempotency_store()
+
+    @classmethod
+    def _is_idempotent_path(cls, path: str) -> bool:
+        return path in cls._IDEMPOTENCY_PATHS or any(p.match(path) for p in cls._IDEMPOTENCY_PATH_PATTERNS)
 
     async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
         if scope["type"] != "http":
@@ -120,7 +96,7 @@ class IdempotencyMiddleware:
         method: str = scope.get("method", "")
 
         # Only intercept eligible POST endpoints
-        if method != "POST" or path not in self._IDEMPOTENCY_PATHS:
+        if method != "POST" or not self._is_idempotent_path(path):
             await self.app(scope, receive, send)
             return
 
@@ -145,31 +121,25 @@ class IdempotencyMiddleware:
         # user can never replay another user's cached response.
         idempotency_key = f"{_identity_prefix(scope.get('headers', []))}:{idempotency_key}"
 
-        async with self._lock:
-            # Replay a cached response
-            if idempotency_key in self._cache:
-                cached = self._cache[idempotency_key]
-                if not cached.is_expired():
-                    logger.info(
-                        "[Idempotency] Replaying cached response for key=%.20s… path=%s",
-                        idempotency_key,
-                        path,
-                    )
-                    await self._replay(send, cached)
-                    return
-                # Expired: evict and fall through to fresh processing
-                del self._cache[idempotency_key]
-
-            # Concurrent duplicate while original is in-flight
-            if idempotency_key in self._in_flight:
-                logger.warning(
-                    "[Idempotency] Concurrent duplicate for key=%.20s… — returning 409",
-                    idempotency_key,
-                )
-                await self._send_conflict(send, idempotency_key)
-                return
+        # Replay a cached response (expired entries are dropped by the store)
+        cached = await self._store.get(idempotency_key)
+        if cached is not None:
+            logger.info(
+                "[Idempotency] Replaying cached response for key=%.20s… path=%s",
+                idempotency_key,
+                path,
+            )
+            await self._replay(send, cached)
+            return
 
-            self._in_flight.add(idempotency_key)
+        # Concurrent duplicate while original is in-flight
+        if not await self._store.reserve(idempotency_key):
+            logger.warning(
+                "[Idempotency] Concurrent duplicate for key=%.20s… — returning 409",
+                idempotency_key,
+            )
+            await self._send_conflict(send, idempotency_key)
+            return
 
         # ── Process the request; capture the response body for caching ──
         response_status: list[int] = [200]
@@ -189,25 +159,24 @@ class IdempotencyMiddleware:
         try:
             await self.app(scope, receive, _capture_send)
         finally:
-            async with self._lock:
-                self._in_flight.discard(idempotency_key)
-                # Only cache successful responses (2xx)
-                if 200 <= response_status[0] < 300 and response_chunks:
-                    self._cache[idempotency_key] = _CachedResponse(
-                        status=response_status[0],
-                        headers=response_headers[0],
-                        body=b"".join(response_chunks),
-                    )
-                    self._evict_expired()
-                    logger.info(
-                        "[Idempotency] Cached response for key=%.20s… (status=%d, %d bytes)",
-                        idempotency_key,
-                        response_status[0],
-                        sum(len(c) for c in response_chunks),
-                    )
+            # Only cache successful responses (2xx)
+            if 200 <= response_status[0] < 300 and response_chunks:
+                body = b"".join(response_chunks)
+                await self._store.put(
+                    idempotency_key,
+                    CachedResponse(status=response_status[0], headers=response_headers[0], body=body),
+                )
+                logger.info(
+                    "[Idempotency] Cached response for key=%.20s… (status=%d, %d bytes)",
+                    idempotency_key,
+                    response_status[0],
+                    len(body),
+                )
+            else:
+                await self._store.release(idempotency_key)
 
     @staticmethod
-    async def _replay(send: Send, cached: _CachedResponse) -> None:
+    async def _replay(send: Send, cached: CachedResponse) -> None:
         await send({
             "type": "http.response.start",
             "status": cached.status,
@@ -0,0 +1,352 @@
+"""
+Storage backends for IdempotencyMiddleware.
+
+The middleware needs four operations on a key:
+  get      → replay a completed response (None if unknown/expired)
+  reserve  → mark the key in-flight; False if another request already holds it
+  put      → store the completed 2xx response (clears the in-flight marker)
+  release  → drop the in-flight marker without storing (non-2xx / crash)
+
+Backends (IDEMPOTENCY_BACKEND):
+  - memory    → InMemoryIdempotencyStore: OrderedDict LRU + TTL, O(1) amortized
+                per operation. Per-instance — the default for single-instance Cloud Run.
+  - sqlite    → SQLiteIdempotencyStore: a single-file store shared by every worker
+                on one host. Also the local stand-in for the shared backend in tests.
+  - firestore → FirestoreIdempotencyStore: shared across Cloud Run instances. The
+                in-flight marker is claimed with `create()` (fails if the doc exists),
+                and a stale marker is taken over with an `update()` conditioned on the
+                document's update_time, so two instances cannot both process the same key.
+
+In-flight markers older than _IN_FLIGHT_TIMEOUT_SECONDS are considered abandoned
+(instance crashed mid-request) and can be re-claimed.
+"""
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import UTC, datetime, timedelta
+from typing import Any
+
+from src.utils.async_utils import run_blocking
+
+logger = logging.getLogger(__name__)
+
+_TTL_SECONDS = 60 * 60 * 24  # 24 hours (matches the quota window)
+_MAX_CACHE_SIZE = 10_000      # In-memory bound — prevents unbounded growth on Cloud Run
+_IN_FLIGHT_TIMEOUT_SECONDS = 120
+# Firestore documents are capped at 1 MiB; larger bodies are served but not cached.
+_MAX_SHARED_BODY_BYTES = 900_000
+
+
+@dataclass
+class CachedResponse:
+    status: int
+    headers: list
+    body: bytes
+    # Wall clock (not monotonic) so entries stay comparable across processes.
+    created_at: float = field(default_factory=time.time)
+
+    def is_expired(self, ttl: float = _TTL_SECONDS) -> bool:
+        return time.time() - self.created_at > ttl
+
+    def headers_to_json(self) -> str:
+        return json.dumps([[bytes(k).decode("latin-1"), bytes(v).decode("latin-1")] for k, v in self.headers])
+
+    @staticmethod
+    def headers_from_json(raw: str) -> list:
+        return [[k.encode("latin-1"), v.encode("latin-1")] for k, v in json.loads(raw)]
+
+
+class IdempotencyStore(ABC):
+    """Backend interface for IdempotencyMiddleware (see module docstring)."""
+
+    def __init__(self, ttl_seconds: float = _TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+
+    @abstractmethod
+    async def get(self, key: str) -> CachedResponse | None: ...
+
+    @abstractmethod
+    async def reserve(self, key: str) -> bool: ...
+
+    @abstractmethod
+    async def put(self, key: str, response: CachedResponse) -> None: ...
+
+    @abstractmethod
+    async def release(self, key: str) -> None: ...
+
+
+class InMemoryIdempotencyStore(IdempotencyStore):
+    """LRU + TTL store on an OrderedDict.
+
+    Every operation is O(1) amortized: capacity eviction pops the LRU end, and
+    expired entries are dropped lazily on read plus opportunistically from the
+    LRU end on insert. All methods are synchronous inside the coroutine, so they
+    are atomic on the single event loop without a lock.
+    """
+
+    def __init__(self, ttl_seconds: float = _TTL_SECONDS, max_size: int = _MAX_CACHE_SIZE):
+        super().__init__(ttl_seconds)
+        self.max_size = max_size
+        self._cache: OrderedDict[str, CachedResponse] = OrderedDict()
+        self._in_flight: dict[str, float] = {}
+
+    def __len__(self) -> int:
+        return len(self._cache)
+
+    async def get(self, key: str) -> CachedResponse | None:
+        cached = self._cache.get(key)
+        if cached is None:
+            return None
+        if cached.is_expired(self.ttl_seconds):
+            del self._cache[key]
+            return None
+        self._cache.move_to_end(key)
+        return cached
+
+    async def reserve(self, key: str) -> bool:
+        started = self._in_flight.get(key)
+        if started is not None and time.monotonic() - started < _IN_FLIGHT_TIMEOUT_SECONDS:
+            return False
+        self._in_flight[key] = time.monotonic()
+        return True
+
+    async def put(self, key: str, response: CachedResponse) -> None:
+        self._in_flight.pop(key, None)
+        self._cache[key] = response
+        self._cache.move_to_end(key)
+        # Opportunistic sweep from the LRU end, stopping at the first live entry: O(1)
+        # amortized, not exhaustive (recency is by access, not age). Expired entries it
+        # misses are dropped by get() or evicted by capacity.
+        while self._cache:
+            oldest_key, oldest = next(iter(self._cache.items()))
+            if not oldest.is_expired(self.ttl_seconds):
+                break
+            del self._cache[oldest_key]
+        overflow = 0
+        while len(self._cache) > self.max_size:
+            self._cache.popitem(last=False)
+            overflow += 1
+        if overflow:
+            logger.warning(
+                "[Idempotency] Cache over capacity — evicted %d LRU entries (size=%d)",
+                overflow,
+                len(self._cache),
+            )
+
+    async def release(self, key: str) -> None:
+        self._in_flight.pop(key, None)
+
+
+class SQLiteIdempotencyStore(IdempotencyStore):
+    """Single-file store shared by all processes on one host.
+
+    Reservation is an atomic upsert inside one transaction, so concurrent workers
+    racing on the same key see exactly one winner. Expired rows are purged on
+    write, at most once per minute (indexed by created_at).
+    """
+
+    _PURGE_INTERVAL_SECONDS = 60
+
+    def __init__(self, path: str = "idempotency.sqlite3", ttl_seconds: float = _TTL_SECONDS):
+        super().__init__(ttl_seconds)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS idempotency ("
+            " key TEXT PRIMARY KEY, state TEXT NOT NULL, status INTEGER,"
+            " headers TEXT, body BLOB, created_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_idempotency_created ON idempotency(created_at)")
+        self._lock = threading.Lock()
+        self._last_purge = 0.0
+
+    def _get_sync(self, key: str) -> CachedResponse | None:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT status, headers, body, created_at FROM idempotency WHERE key = ? AND state = 'done'",
+                (key,),
+            ).fetchone()
+        if row is None:
+            return None
+        cached = CachedResponse(
+            status=row[0], headers=CachedResponse.headers_from_json(row[1]), body=bytes(row[2]), created_at=row[3]
+        )
+        return None if cached.is_expired(self.ttl_seconds) else cached
+
+    def _reserve_sync(self, key: str) -> bool:
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT state, created_at FROM idempotency WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    state, created_at = row
+                    live = (
+                        now - created_at < _IN_FLIGHT_TIMEOUT_SECONDS
+                        if state == "pending"
+                        else now - created_at <= self.ttl_seconds
+                    )
+                    if live:
+                        self._conn.execute("COMMIT")
+                        return False
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO idempotency (key, state, created_at) VALUES (?, 'pending', ?)",
+                    (key, now),
+                )
+                self._conn.execute("COMMIT")
+                return True
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def _put_sync(self, key: str, response: CachedResponse) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO idempotency (key, state, status, headers, body, created_at)"
+                " VALUES (?, 'done', ?, ?, ?, ?)",
+                (key, response.status, response.headers_to_json(), response.body, response.created_at),
+            )
+            now = time.time()
+            if now - self._last_purge >= self._PURGE_INTERVAL_SECONDS:
+                self._last_purge = now
+                self._conn.execute("DELETE FROM idempotency WHERE created_at < ?", (now - self.ttl_seconds,))
+
+    def _release_sync(self, key: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM idempotency WHERE key = ? AND state = 'pending'", (key,))
+
+    async def get(self, key: str) -> CachedResponse | None:
+        return await run_blocking(self._get_sync, key)
+
+    async def reserve(self, key: str) -> bool:
+        return await run_blocking(self._reserve_sync, key)
+
+    async def put(self, key: str, response: CachedResponse) -> None:
+        await run_blocking(self._put_sync, key, response)
+
+    async def release(self, key: str) -> None:
+        await run_blocking(self._release_sync, key)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class FirestoreIdempotencyStore(IdempotencyStore):
+    """Shared store on Firestore, for deployments with more than one instance.
+
+    Document ID is the SHA-256 of the scoped key (keys embed a token hash prefix
+    and caller-chosen text — neither belongs in a document path). `expires_at`
+    is set on every document so a Firestore TTL policy on that field can reap
+    old entries server-side.
+    """
+
+    def __init__(self, collection: str = "_idempotency_keys", ttl_seconds: float = _TTL_SECONDS):
+        super().__init__(ttl_seconds)
+        self.collection = collection
+
+    def _db(self) -> Any:
+        from src.db.firebase_client import get_async_firestore_client
+        return get_async_firestore_client()
+
+    def _ref(self, key: str) -> Any:
+        doc_id = hashlib.sha256(key.encode("utf-8")).hexdigest()
+        return self._db().collection(self.collection).document(doc_id)
+
+    def _expires_at(self, created_at: float) -> datetime:
+        return datetime.fromtimestamp(created_at, UTC) + timedelta(seconds=self.ttl_seconds)
+
+    async def get(self, key: str) -> CachedResponse | None:
+        snap = await self._ref(key).get()
+        if not snap.exists:
+            return None
+        data = snap.to_dict() or {}
+        if data.get("state") != "done":
+            return None
+        cached = CachedResponse(
+            status=data["status"],
+            headers=CachedResponse.headers_from_json(data["headers"]),
+            body=data["body"],
+            created_at=data["created_at"],
+        )
+        return None if cached.is_expired(self.ttl_seconds) else cached
+
+    async def reserve(self, key: str) -> bool:
+        from google.api_core.exceptions import AlreadyExists, FailedPrecondition, NotFound
+        from google.cloud.firestore import DELETE_FIELD
+
+        ref = self._ref(key)
+        now = time.time()
+        marker = {"state": "pending", "created_at": now, "expires_at": self._expires_at(now)}
+        try:
+            await ref.create(marker)
+            return True
+        except AlreadyExists:
+            pass
+        snap = await ref.get()
+        if not snap.exists:
+            # Released between our create() and get(): race for it once more.
+            try:
+                await ref.create(marker)
+                return True
+            except AlreadyExists:
+                return False
+        data = snap.to_dict() or {}
+        created_at = data.get("created_at", 0.0)
+        limit = _IN_FLIGHT_TIMEOUT_SECONDS if data.get("state") == "pending" else self.ttl_seconds
+        if now - created_at < limit:
+            return False
+        # Abandoned marker or expired response (TTL policy not yet run): take it over,
+        # only if nobody wrote the document since we read it. Of several instances
+        # racing for the same stale marker, exactly one update passes the precondition.
+        try:
+            await ref.update(
+                {**marker, "status": DELETE_FIELD, "headers": DELETE_FIELD, "body": DELETE_FIELD},
+                option=self._db().write_option(last_update_time=snap.update_time),
+            )
+        except (FailedPrecondition, NotFound):
+            return False
+        return True
+
+    async def put(self, key: str, response: CachedResponse) -> None:
+        ref = self._ref(key)
+        if len(response.body) > _MAX_SHARED_BODY_BYTES:
+            logger.warning("[Idempotency] Response too large to share (%d bytes) — not cached", len(response.body))
+            await ref.delete()
+            return
+        await ref.set({
+            "state": "done",
+            "status": response.status,
+            "headers": response.headers_to_json(),
+            "body": response.body,
+            "created_at": response.created_at,
+            "expires_at": self._expires_at(response.created_at),
+        })
+
+    async def release(self, key: str) -> None:
+        await self._ref(key).delete()
+
+
+# ── Factory ───────────────────────────────────────────────────────────────────
+
+def get_idempotency_store() -> IdempotencyStore:
+    """Build the store selected by IDEMPOTENCY_BACKEND (one per middleware instance)."""
+    from src.core.config import settings
+
+    backend = settings.IDEMPOTENCY_BACKEND.lower()
+    if backend == "firestore":
+        return FirestoreIdempotencyStore()
+    if backend == "sqlite":
+        return SQLiteIdempotencyStore(path=settings.IDEMPOTENCY_SQLITE_PATH)
+    if backend != "memory":
+        logger.warning("[Idempotency] Unknown IDEMPOTENCY_BACKEND=%r — using in-memory store", backend)
+    return InMemoryIdempotencyStore()
+
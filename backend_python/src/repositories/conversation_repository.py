@@ -1,10 +1,15 @@
 import logging
+import time
+from collections import OrderedDict
+from collections.abc import Callable
 from datetime import UTC, datetime, timedelta
 from typing import Any
 
+from google.api_core.exceptions import AlreadyExists, NotFound
 from google.cloud import firestore as async_firestore
 from pydantic import BaseModel
 
+from src.core.config import settings
 from src.db.firebase_client import get_async_firestore_client, get_firestore_client
 from src.db.projects import sync_project_cover
 
@@ -13,6 +18,102 @@ logger = logging.getLogger(__name__)
 # TTL for sessions and messages in days
 SESSION_TTL_DAYS = 30
 
+# Firestore caps a WriteBatch at 500 writes; one is reserved for the session doc.
+_MAX_MESSAGES_PER_BATCH = 499
+
+# (message_id or None for an auto id, message document data)
+_PendingMessage = tuple[str | None, dict[str, Any]]
+
+
+class _KnownSessions:
+    """
+    Short-TTL LRU of (session_id, user_id) pairs whose session and project docs
+    ensure_session has just verified, so repeat turns of a chat skip the reads.
+
+    Keyed by user too: a guest→user claim is a different key and always goes
+    to Firestore. Per instance and short-lived by design — a session deleted
+    elsewhere is re-created at most TTL seconds late.
+    """
+
+    def __init__(self, ttl_seconds: float, max_entries: int = 10_000):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: OrderedDict[tuple[str, str | None], float] = OrderedDict()
+
+    def hit(self, session_id: str, user_id: str | None) -> bool:
+        key = (session_id, user_id)
+        expires_at = self._entries.get(key)
+        if expires_at is None:
+            return False
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return False
+        self._entries.move_to_end(key)
+        return True
+
+    def add(self, session_id: str, user_id: str | None) -> None:
+        if self.ttl_seconds <= 0:
+            return
+        self._entries[(session_id, user_id)] = time.monotonic() + self.ttl_seconds
+        self._entries.move_to_end((session_id, user_id))
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def forget(self, session_id: str) -> None:
+        for key in [k for k in self._entries if k[0] == session_id]:
+            del self._entries[key]
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+_known_sessions = _KnownSessions(settings.SESSION_ENSURE_CACHE_TTL_SECONDS)
+# (session_id, user_id) pairs whose session doc _commit_messages has seen with an owner.
+_owned_sessions = _KnownSessions(settings.SESSION_ENSURE_CACHE_TTL_SECONDS)
+
+
+def forget_known_session(session_id: str) -> None:
+    """Drop a session from the ensure_session cache (call after deleting it)."""
+    _known_sessions.forget(session_id)
+    _owned_sessions.forget(session_id)
+
+
+class TurnWriter:
+    """
+    Persists the messages of one chat turn (see ConversationRepository.begin_turn).
+
+    Write-through (default): every `save()` is its own single-commit write.
+    Write-behind: `save()` only buffers; `flush()` — called once the stream has
+    ended — commits all of the turn's messages plus one session update in a
+    single WriteBatch. Timestamps are taken at `save()` time, so ordering is
+    the same either way.
+    """
+
+    def __init__(self, repo: "ConversationRepository", session_id: str, user_id: str | None, write_behind: bool):
+        self._repo = repo
+        self.session_id = session_id
+        self.user_id = user_id
+        self.write_behind = write_behind
+        self._pending: list[_PendingMessage] = []
+
+    async def save(self, role: str, content: str, **kwargs: Any) -> None:
+        """Same arguments as ConversationRepository.save_message (minus session/user)."""
+        if not self.write_behind:
+            await self._repo.save_message(self.session_id, role, content, user_id=self.user_id, **kwargs)
+            return
+        self._pending.append(self._repo._build_message(role, content, **kwargs))
+
+    async def flush(self) -> None:
+        """Commit buffered messages. Idempotent; never raises (like save_message)."""
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, []
+        try:
+            await self._repo._commit_messages(self.session_id, pending, self.user_id)
+            logger.info(f"[Repo] Flushed {len(pending)} turn messages to session {self.session_id}")
+        except Exception as e:  # noqa: BLE001 — persistence must not break the stream; logged with traceback
+            logger.error(f"[Repo] Error flushing turn messages: {str(e)}", exc_info=True)
+
 class ConversationRepository:
     """
     Repository for managing conversation data, sessions, and file metadata.
@@ -53,89 +154,153 @@ class ConversationRepository:
         lets the streamed message and its persisted row share one identity, so
         the client never has to swap a temporary SDK id for a Firestore id after
         the turn — the swap is what re-mounts the bubble and causes flicker.
+
+        The message and the session metadata update go out in one WriteBatch
+        (one round-trip, no read): see ``_commit_messages``.
         """
         try:
             if role == "user":
                 logger.info(f"[Repo] Saving user message to session {session_id} with timestamp {timestamp}")
 
-            db = self._get_async_db()
+            message = self._build_message(
+                role, content, metadata=metadata, tool_calls=tool_calls, tool_call_id=tool_call_id,
+                attachments=attachments, timestamp=timestamp, room_id=room_id, message_id=message_id,
+            )
+            await self._commit_messages(session_id, [message], user_id)
 
-            # 🛡️ Defense: Ensure Pydantic models are dumped
-            if tool_calls:
-                tool_calls = [tc.model_dump() if isinstance(tc, BaseModel) else tc for tc in tool_calls]
+            logger.info(f"[Repo] Saved {role} message to session {session_id}")
 
-            if attachments and isinstance(attachments, list):
-                attachments = [att.model_dump() if isinstance(att, BaseModel) else att for att in attachments]
-            elif isinstance(attachments, BaseModel):
-                attachments = attachments.model_dump()
+        except Exception as e:
+            logger.error(f"[Repo] Error saving message: {str(e)}", exc_info=True)
 
-            # 🚀 Use correct sentinel for Async Client
+    def begin_turn(self, session_id: str, user_id: str | None = None, write_behind: bool = False) -> TurnWriter:
+        """Message writer for one chat turn; `write_behind` batches the turn into one commit."""
+        return TurnWriter(self, session_id, user_id, write_behind)
 
-            # Calculate expireAt for TTL (30 days from now)
-            expire_at = datetime.now(UTC) + timedelta(days=SESSION_TTL_DAYS)
+    @staticmethod
+    def _build_message(
+        role: str,
+        content: str,
+        metadata: dict[str, Any] | None = None,
+        tool_calls: list[dict[str, Any]] | None = None,
+        tool_call_id: str | None = None,
+        attachments: Any | None = None,
+        timestamp: datetime | None = None,
+        room_id: str | None = None,
+        message_id: str | None = None,
+    ) -> _PendingMessage:
+        """Message document data (and its stable id, if any) as stored under sessions/{id}/messages."""
+        # 🛡️ Defense: Ensure Pydantic models are dumped
+        if tool_calls:
+            tool_calls = [tc.model_dump() if isinstance(tc, BaseModel) else tc for tc in tool_calls]
 
-            message_data = {
-                'role': role,
-                'content': content,
-                'timestamp': timestamp if timestamp else async_firestore.SERVER_TIMESTAMP,
-                'expireAt': expire_at
-            }
+        if attachments and isinstance(attachments, list):
+            attachments = [att.model_dump() if isinstance(att, BaseModel) else att for att in attachments]
+        elif isinstance(attachments, BaseModel):
+            attachments = attachments.model_dump()
 
-            if room_id:
-                metadata = metadata or {}
-                metadata['room_id'] = room_id
+        # Calculate expireAt for TTL (30 days from now)
+        expire_at = datetime.now(UTC) + timedelta(days=SESSION_TTL_DAYS)
 
-            if metadata:
-                message_data['metadata'] = metadata
+        message_data = {
+            'role': role,
+            'content': content,
+            'timestamp': timestamp if timestamp else async_firestore.SERVER_TIMESTAMP,
+            'expireAt': expire_at
+        }
 
-            if tool_calls:
-                message_data['tool_calls'] = tool_calls
+        if room_id:
+            metadata = metadata or {}
+            metadata['room_id'] = room_id
 
-            if tool_call_id:
-                message_data['tool_call_id'] = tool_call_id
+        if metadata:
+            message_data['metadata'] = metadata
 
-            if attachments:
-                message_data['attachments'] = attachments
+        if tool_calls:
+            message_data['tool_calls'] = tool_calls
 
-            # Add to messages subcollection.
-            # Stable id → document(id).set() so the row keeps the same identity
-            # as the streamed message; otherwise let Firestore auto-generate one.
-            messages_ref = db.collection('sessions').document(session_id).collection('messages')
-            if message_id:
-                await messages_ref.document(message_id).set(message_data)
-            else:
-                await messages_ref.add(message_data)
+        if tool_call_id:
+            message_data['tool_call_id'] = tool_call_id
 
-            # Update session metadata
-            session_ref = db.collection('sessions').document(session_id)
-            session_doc = await session_ref.get()
+        if attachments:
+            message_data['attachments'] = attachments
 
+        return message_id, message_data
+
+    async def _commit_messages(self, session_id: str, messages: list[_PendingMessage], user_id: str | None) -> None:
+        """
+        Write `messages` and bump the session metadata, one WriteBatch per 499 messages.
+
+        The batch first `update()`s the session doc, whose implicit exists
+        precondition fails with NotFound only for a brand-new session. Then —
+        and only then — the batch is retried with `create()`, which sets
+        createdAt and stamps the owner. `create()` cannot overwrite a concurrent
+        creator's doc (AlreadyExists → fall back to the update batch), so an
+        existing owner is never replaced (F-12).
+
+        An existing doc without a `userId` gets `user_id` stamped on the
+        update. Finding out takes a projected read, skipped for sessions that
+        ensure_session or an earlier commit already saw with an owner.
+        """
+        db = self._get_async_db()
+        session_ref = db.collection('sessions').document(session_id)
+        messages_ref = session_ref.collection('messages')
+        expire_at = datetime.now(UTC) + timedelta(days=SESSION_TTL_DAYS)
+
+        stamp_owner = False
+        if user_id and not (_known_sessions.hit(session_id, user_id) or _owned_sessions.hit(session_id, user_id)):
+            owner_snap = await session_ref.get(field_paths=['userId'])
+            stamp_owner = owner_snap.exists and not (owner_snap.to_dict() or {}).get('userId')
+
+        for start in range(0, len(messages), _MAX_MESSAGES_PER_BATCH):
+            chunk = messages[start:start + _MAX_MESSAGES_PER_BATCH]
+            # Stable id → document(id) so the row keeps the same identity as the
+            # streamed message; otherwise a client-side auto id. Refs are built
+            # once so a retried batch rewrites the same documents.
+            writes = [
+                (messages_ref.document(message_id) if message_id else messages_ref.document(), data)
+                for message_id, data in chunk
+            ]
             session_update = {
                 'updatedAt': async_firestore.SERVER_TIMESTAMP,
                 'sessionId': session_id,
-                'messageCount': async_firestore.Increment(1),
+                'messageCount': async_firestore.Increment(len(chunk)),
                 'expireAt': expire_at
             }
-
-            if not session_doc.exists:
-                session_update['createdAt'] = async_firestore.SERVER_TIMESTAMP
-
-            # SECURITY (F-12): stamp the owner on the session doc when it is not
-            # already set, so the Firestore ownership rule (sessions/*/messages
-            # read: exists(parent) && userId == uid) can authorize the owner's
-            # direct client reads. Never overwrite an existing owner — that would
-            # let one user hijack another's (already claimed) session.
+            if stamp_owner:
+                session_update['userId'] = user_id
+
+            def update_session(batch: Any, update: dict[str, Any] = session_update) -> None:
+                batch.update(session_ref, update)
+
+            try:
+                await self._commit_batch(db, writes, update_session)
+                continue
+            except NotFound:
+                pass
+
+            # First write to this session (ensure_session normally creates it first).
+            new_session = {**session_update, 'messageCount': len(chunk), 'createdAt': async_firestore.SERVER_TIMESTAMP}
+            # SECURITY (F-12): stamp the owner so the Firestore ownership rule
+            # (sessions/*/messages read: exists(parent) && userId == uid) can
+            # authorize the owner's direct client reads.
             if user_id:
-                existing_owner = (session_doc.to_dict() or {}).get('userId') if session_doc.exists else None
-                if not existing_owner:
-                    session_update['userId'] = user_id
-
-            await session_ref.set(session_update, merge=True)
-
-            logger.info(f"[Repo] Saved {role} message to session {session_id}")
-
-        except Exception as e:
-            logger.error(f"[Repo] Error saving message: {str(e)}", exc_info=True)
+                new_session['userId'] = user_id
+            try:
+                await self._commit_batch(db, writes, lambda batch, doc=new_session: batch.create(session_ref, doc))
+            except AlreadyExists:
+                await self._commit_batch(db, writes, update_session)
+
+        if user_id:
+            _owned_sessions.add(session_id, user_id)
+
+    @staticmethod
+    async def _commit_batch(db: Any, writes: list[tuple[Any, dict[str, Any]]], session_op: Callable[[Any], None]) -> None:
+        batch = db.batch()
+        for ref, data in writes:
+            batch.set(ref, data)
+        session_op(batch)
+        await batch.commit()
 
     async def get_context(
         self,
@@ -203,20 +368,32 @@ class ConversationRepository:
         """
         Ensure session document exists in Firestore.
         If user_id is provided and the session doesn't exist, it's created with that owner.
+
+        One `get_all` reads the session and project docs together; creation,
+        guest→user claiming and the project backfill then go out in a single
+        WriteBatch. Sessions verified for the same user within
+        SESSION_ENSURE_CACHE_TTL_SECONDS skip Firestore entirely.
         """
+        if _known_sessions.hit(session_id, user_id):
+            return
         try:
             db = self._get_async_db()
 
             session_ref = db.collection('sessions').document(session_id)
-            doc = await session_ref.get()
+            project_ref = db.collection('projects').document(session_id)
+            snaps = {snap.reference.path: snap async for snap in db.get_all([session_ref, project_ref])}
+            session_snap = snaps.get(session_ref.path)
+            project_snap = snaps.get(project_ref.path)
+            project_exists = project_snap is not None and project_snap.exists
 
             expire_at = datetime.now(UTC) + timedelta(days=SESSION_TTL_DAYS)
+            batch = db.batch()
 
-            if not doc.exists:
+            if session_snap is None or not session_snap.exists:
                 # Determine owner
                 owner_id = user_id if user_id else f"guest_{session_id[:8]}"
 
-                await session_ref.set({
+                batch.set(session_ref, {
                     'sessionId': session_id,
                     'userId': owner_id,
                     'title': 'Nuovo Progetto',
@@ -227,13 +404,9 @@ class ConversationRepository:
                     'expireAt': expire_at,
                     'messageCount': 0
                 })
-                logger.info(f"[Repo] Created new session {session_id} for user {owner_id}")
-
                 # Sync to Projects collection
-                project_ref = db.collection('projects').document(session_id)
-                project_snap = await project_ref.get()
-                if not project_snap.exists:
-                    await project_ref.set({
+                if not project_exists:
+                    batch.set(project_ref, {
                         'id': session_id,
                         'name': 'Nuovo Progetto',
                         'userId': owner_id,
@@ -242,42 +415,47 @@ class ConversationRepository:
                         'expireAt': expire_at,
                         'status': 'active'
                     })
+                await batch.commit()
+                logger.info(f"[Repo] Created new session {session_id} for user {owner_id}")
+                if not project_exists:
                     logger.info(f"[Repo] 🚀 Sync: Created project {session_id} from session")
             else:
                 # 🔄 Session Claiming Logic: If existing session is a guest one, and we have a real user, upgrade it.
-                session_data = doc.to_dict() or {}
+                session_data = session_snap.to_dict() or {}
                 current_owner = session_data.get('userId', '')
+                owner_id = current_owner
 
                 update_data: dict[str, Any] = {'expireAt': expire_at}
 
-                if user_id and (not current_owner or current_owner.startswith('guest_')):
+                claimed = bool(user_id and (not current_owner or current_owner.startswith('guest_')))
+                if claimed:
+                    owner_id = user_id
                     update_data['userId'] = user_id
                     update_data['updatedAt'] = async_firestore.SERVER_TIMESTAMP
-
                     # Also update project
-                    project_ref = db.collection('projects').document(session_id)
-                    project_snap = await project_ref.get()
-                    if project_snap.exists:
-                        await project_ref.update({'userId': user_id, 'updatedAt': async_firestore.SERVER_TIMESTAMP})
-                    logger.info(f"[Repo] 🔄 CLAIM: Session {session_id} migrated from {current_owner} to {user_id}")
+                    if project_exists:
+                        batch.update(project_ref, {'userId': user_id, 'updatedAt': async_firestore.SERVER_TIMESTAMP})
 
-                await session_ref.update(update_data)
+                batch.update(session_ref, update_data)
 
-                # Backfill check
-                project_ref = db.collection('projects').document(session_id)
-                project_snap = await project_ref.get()
-                if not project_snap.exists:
-                     session_data = doc.to_dict() or {}
-                     await project_ref.set({
+                # Backfill check (owned by the post-claim owner)
+                if not project_exists:
+                    batch.set(project_ref, {
                         'id': session_id,
                         'name': session_data.get('title', 'Progetto Recuperato'),
-                        'userId': session_data.get('userId', user_id or 'unknown'),
+                        'userId': owner_id or user_id or 'unknown',
                         'createdAt': session_data.get('createdAt', async_firestore.SERVER_TIMESTAMP),
                         'updatedAt': async_firestore.SERVER_TIMESTAMP,
                         'expireAt': expire_at,
                         'status': 'active'
                     })
-                     logger.info(f"[Repo] 🚀 Sync: Backfilled missing project {session_id}")
+                await batch.commit()
+                if claimed:
+                    logger.info(f"[Repo] 🔄 CLAIM: Session {session_id} migrated from {current_owner} to {user_id}")
+                if not project_exists:
+                    logger.info(f"[Repo] 🚀 Sync: Backfilled missing project {session_id}")
+
+            _known_sessions.add(session_id, user_id)
 
         except Exception as e:
             logger.error(f"[Repo] Error ensuring session: {str(e)}", exc_info=True)
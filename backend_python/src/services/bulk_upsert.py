@@ -0,0 +1,244 @@
+"""
+Rate-adaptive, resumable bulk upsert for RAGService.upsert_documents.
+
+Pinecone Integrated Inference embeds every upserted record, and the embedding
+model is rate limited in tokens per minute (multilingual-e5-large: 250k TPM).
+Ingestion used to send 50-record batches one at a time with a fixed 8 s pause,
+so a full prezzario re-ingest took tens of minutes whatever quota was free.
+
+`BulkUpserter` instead:
+
+  - estimates each batch's token cost from its text (≈ 4 chars per token, plus
+    a per-record overhead) and takes it from a token bucket refilled at
+    RAG_UPSERT_TOKENS_PER_MINUTE;
+  - keeps up to RAG_UPSERT_CONCURRENCY batches in flight;
+  - on a 429 (or RESOURCE_EXHAUSTED) waits the server's Retry-After, or an
+    exponential backoff with jitter, retries the batch, and halves the bucket
+    rate; successes grow it back additively (AIMD) up to the configured rate;
+  - records finished batches in a checkpoint file (id → content hash), so a
+    crashed ingest that is re-run with the same records skips what already
+    landed — but re-sends a record whose text changed in between. The file is
+    removed once the whole upsert succeeds;
+  - logs progress: records done, records/s, tokens/s and an ETA.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import math
+import os
+import random
+import time
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+from src.services.index_manifest import CONTENT_HASH_FIELD, content_hash
+
+logger = logging.getLogger(__name__)
+
+_CHARS_PER_TOKEN = 4.0
+_TOKENS_PER_RECORD_OVERHEAD = 8
+_BACKOFF_BASE_SECONDS = 1.0
+_BACKOFF_MAX_SECONDS = 60.0
+_MIN_RATE_FRACTION = 0.05  # AIMD never throttles below 5% of the configured rate
+
+
+def estimate_tokens(record: dict[str, Any]) -> int:
+    """Rough embedding-token cost of one record's text."""
+    return math.ceil(len(record.get("chunk_text", "")) / _CHARS_PER_TOKEN) + _TOKENS_PER_RECORD_OVERHEAD
+
+
+def is_rate_limited(exc: BaseException) -> bool:
+    status = getattr(exc, "status_code", None) or getattr(exc, "status", None)
+    if status == 429:
+        return True
+    text = str(exc)
+    return "429" in text or "Too Many Requests" in text or "RESOURCE_EXHAUSTED" in text
+
+
+def _retry_after(exc: BaseException) -> float | None:
+    headers = getattr(exc, "headers", None) or {}
+    value = next((v for k, v in headers.items() if k.lower() == "retry-after"), None)
+    try:
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+class TokenBucket:
+    """Async token bucket whose refill rate can be lowered and raised at runtime (AIMD)."""
+
+    def __init__(self, tokens_per_minute: float):
+        self.max_rate = tokens_per_minute / 60.0
+        self.rate = self.max_rate
+        self.capacity = tokens_per_minute / 60.0 * 10  # at most ~10 s of burst
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self, tokens: float) -> None:
+        """Wait until `tokens` are available. A request above capacity is admitted on a full bucket."""
+        async with self._lock:
+            need = min(tokens, self.capacity)
+            while True:
+                self._refill()
+                if self._tokens >= need:
+                    self._tokens -= tokens  # may go negative: oversized batches are paid back later
+                    return
+                await asyncio.sleep((need - self._tokens) / self.rate)
+
+    def slow_down(self) -> None:
+        self.rate = max(self.rate / 2, self.max_rate * _MIN_RATE_FRACTION)
+
+    def speed_up(self) -> None:
+        self.rate = min(self.rate + self.max_rate * 0.1, self.max_rate)
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+
+def _record_hash(record: dict[str, Any]) -> str:
+    return record.get(CONTENT_HASH_FIELD) or content_hash(record)
+
+
+class UpsertCheckpoint:
+    """Records already upserted for one (namespace, record set), as id → content hash, persisted as JSON."""
+
+    def __init__(self, path: str | Path, namespace: str, records: list[dict[str, Any]]):
+        self.path = Path(path)
+        digest = hashlib.sha256()
+        for record in records:
+            digest.update(str(record["_id"]).encode())
+            digest.update(b"\0")
+        self.key = f"{namespace}:{digest.hexdigest()[:16]}"
+        self.done: dict[str, str] = {}
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            logger.warning(f"[BulkUpsert] Ignoring unreadable checkpoint {self.path}: {e}")
+            return
+        if data.get("key") == self.key and isinstance(data.get("done"), dict):
+            self.done = data["done"]
+        else:
+            logger.info(f"[BulkUpsert] Checkpoint {self.path} is for another record set — starting over")
+
+    def is_done(self, record: dict[str, Any]) -> bool:
+        """True if this record, with this content, was already upserted."""
+        return self.done.get(record["_id"]) == _record_hash(record)
+
+    def mark(self, records: list[dict[str, Any]]) -> None:
+        self.done.update((r["_id"], _record_hash(r)) for r in records)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        tmp.write_text(json.dumps({"key": self.key, "done": self.done}, sort_keys=True), encoding="utf-8")
+        os.replace(tmp, self.path)
+
+    def clear(self) -> None:
+        self.path.unlink(missing_ok=True)
+
+
+@dataclass
+class UpsertReport:
+    records: int = 0
+    skipped: int = 0
+    batches: int = 0
+    retries: int = 0
+    tokens: int = 0
+    seconds: float = 0.0
+
+    @property
+    def records_per_second(self) -> float:
+        return self.records / self.seconds if self.seconds else 0.0
+
+
+class BulkUpserter:
+    """Send record batches through `send` under a token budget, a concurrency cap and 429 backoff."""
+
+    def __init__(
+        self,
+        send: Callable[[list[dict[str, Any]]], Awaitable[Any]],
+        tokens_per_minute: float | None,
+        concurrency: int = 4,
+        max_retries: int = 6,
+        checkpoint: UpsertCheckpoint | None = None,
+        label: str = "",
+    ):
+        self.send = send
+        self.bucket = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self.concurrency = max(1, concurrency)
+        self.max_retries = max_retries
+        self.checkpoint = checkpoint
+        self.label = label
+
+    async def run(self, records: list[dict[str, Any]], batch_size: int) -> UpsertReport:
+        """Upsert every record not already checkpointed. Raises if a batch ultimately fails."""
+        report = UpsertReport()
+        if self.checkpoint is not None and self.checkpoint.done:
+            pending = [r for r in records if not self.checkpoint.is_done(r)]
+            report.skipped = len(records) - len(pending)
+            logger.info(f"[BulkUpsert] {self.label}: resuming, {report.skipped} records already upserted")
+        else:
+            pending = list(records)
+        batches = [pending[i:i + batch_size] for i in range(0, len(pending), max(1, batch_size))]
+        total = len(pending)
+        started = time.monotonic()
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def one(batch: list[dict[str, Any]]) -> None:
+            tokens = sum(estimate_tokens(r) for r in batch)
+            async with semaphore:
+                await self._send_with_retry(batch, tokens, report)
+            report.records += len(batch)
+            report.batches += 1
+            report.tokens += tokens
+            if self.checkpoint is not None:
+                self.checkpoint.mark(batch)
+            elapsed = time.monotonic() - started
+            rate = report.records / elapsed if elapsed else 0.0
+            eta = (total - report.records) / rate if rate else 0.0
+            logger.info(
+                f"[BulkUpsert] {self.label}: {report.records}/{total} records "
+                f"({rate:.1f} rec/s, {report.tokens / elapsed if elapsed else 0:.0f} tok/s, ETA {eta:.0f}s)"
+            )
+
+        tasks = [asyncio.ensure_future(one(batch)) for batch in batches]
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()  # first failure stops the rest; finished batches stay checkpointed
+            report.seconds = time.monotonic() - started
+        if self.checkpoint is not None:
+            self.checkpoint.clear()
+        return report
+
+    async def _send_with_retry(self, batch: list[dict[str, Any]], tokens: int, report: UpsertReport) -> None:
+        for attempt in range(self.max_retries + 1):
+            if self.bucket is not None:
+                await self.bucket.acquire(tokens)
+            try:
+                await self.send(batch)
+            except Exception as exc:
+                if not is_rate_limited(exc) or attempt == self.max_retries:
+                    raise
+                if self.bucket is not None:
+                    self.bucket.slow_down()
+                delay = _retry_after(exc)
+                if delay is None:
+                    delay = min(_BACKOFF_MAX_SECONDS, _BACKOFF_BASE_SECONDS * 2 ** attempt)
+                    delay *= random.uniform(0.5, 1.0)
+                report.retries += 1
+                logger.warning(
+                    f"[BulkUpsert] {self.label}: rate limited (attempt {attempt + 1}), retrying in {delay:.1f}s"
+                )
+                await asyncio.sleep(delay)
+            else:
+                if self.bucket is not None:
+                    self.bucket.speed_up()
+                return
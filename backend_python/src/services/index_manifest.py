@@ -0,0 +1,104 @@
+"""
+Content-hash manifest for incremental re-indexing.
+
+Re-ingesting used to mean `--wipe` plus a full re-upsert: a search outage while
+the namespace refilled, and embedding cost for thousands of unchanged records.
+Record ids are deterministic (article code, else chunk text), so a manifest of
+
+    id → content hash (sha256 of the record's text and metadata)
+
+is enough to diff a fresh ingest against what the index already holds:
+upsert the records that are new or changed, delete the ids that disappeared,
+leave the rest alone (RAGService.sync_documents).
+
+The manifest lives in a local JSON file per namespace (data/manifests/). Every
+upserted record also carries its hash in the `content_hash` metadata field,
+so a missing or lost manifest is rebuilt from the index itself; records
+indexed before the field existed have no hash and are re-upserted once.
+"""
+import hashlib
+import json
+import logging
+import os
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+CONTENT_HASH_FIELD = "content_hash"
+_DEFAULT_DIR = Path(__file__).resolve().parents[2] / "data" / "manifests"
+
+
+def content_hash(record: dict[str, Any]) -> str:
+    """Hash of everything in a record except its id and the hash field itself."""
+    payload = {k: v for k, v in record.items() if k not in ("_id", CONTENT_HASH_FIELD)}
+    encoded = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()[:32]
+
+
+@dataclass
+class ManifestDiff:
+    upsert: list[dict[str, Any]] = field(default_factory=list)
+    delete: list[str] = field(default_factory=list)
+    unchanged: int = 0
+
+    def __str__(self) -> str:
+        return f"{len(self.upsert)} to upsert, {len(self.delete)} to delete, {self.unchanged} unchanged"
+
+
+class IndexManifest:
+    """id → content hash of one namespace, persisted as JSON."""
+
+    def __init__(self, path: str | Path, entries: dict[str, str] | None = None):
+        self.path = Path(path)
+        self.entries: dict[str, str] = dict(entries or {})
+
+    @classmethod
+    def for_namespace(cls, namespace: str, directory: str | Path | None = None) -> "IndexManifest":
+        return cls.load(Path(directory or _DEFAULT_DIR) / f"{namespace}.json")
+
+    @classmethod
+    def load(cls, path: str | Path) -> "IndexManifest":
+        manifest = cls(path)
+        try:
+            manifest.entries = json.loads(manifest.path.read_text(encoding="utf-8"))["entries"]
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"[IndexManifest] Ignoring unreadable manifest {manifest.path}: {e}")
+        return manifest
+
+    @property
+    def exists(self) -> bool:
+        return self.path.exists()
+
+    def diff(self, records: list[dict[str, Any]]) -> ManifestDiff:
+        """Compare a complete, freshly built record set (each with `_id` and `content_hash`) to the manifest."""
+        result = ManifestDiff()
+        latest = {record["_id"]: record for record in records}  # last duplicate wins, as on upsert
+        for rec_id, record in latest.items():
+            if self.entries.get(rec_id) == record[CONTENT_HASH_FIELD]:
+                result.unchanged += 1
+            else:
+                result.upsert.append(record)
+        result.delete = sorted(set(self.entries) - set(latest))
+        return result
+
+    def record(self, records: list[dict[str, Any]]) -> None:
+        for record in records:
+            self.entries[record["_id"]] = record[CONTENT_HASH_FIELD]
+
+    def forget(self, ids: list[str]) -> None:
+        for rec_id in ids:
+            self.entries.pop(rec_id, None)
+
+    def clear(self) -> None:
+        self.entries = {}
+        self.path.unlink(missing_ok=True)
+
+    def save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        tmp.write_text(json.dumps({"entries": self.entries}, ensure_ascii=False, sort_keys=True), encoding="utf-8")
+        os.replace(tmp, self.path)
@@ -8,18 +8,27 @@ Features:
   - WBS Assembly Intelligence: expands user intents into structured BOQ phases
   - Guided Questions: returns completeness_score + missing_info for C-option logic
   - Chain-of-Thought reasoning: Phase → Sub-work → SKU mapping
+
+The system prompt is static between price-book / assemblies changes: it is
+assembled once per (price book, assemblies) pair and, with a ContextCache,
+stored as a Gemini cached content so each analysis sends only the
+conversation and media.
 """
+import hashlib
 import json
 import logging
 from pathlib import Path
 from typing import Any, Literal
 
-from google import genai
 from google.genai import types as genai_types
 from pydantic import BaseModel, Field
 
 from src.core.config import settings
 from src.services.pricing_service import PricingService
+from src.utils.genai_client import get_genai_client, track_genai_call
+from src.utils.genai_context_cache import ContextCache, GeminiContextCache, is_cache_rejection
+from src.utils.media_cache import fetch_media_cached
+from src.vision.preprocess import prepare_image
 
 logger = logging.getLogger(__name__)
 
@@ -111,18 +120,25 @@ class InsightEngine:
 
     _ASSEMBLIES_PATH = Path(__file__).parent.parent / "data" / "renovation_assemblies.json"
 
-    def __init__(self, model_name: str | None = None) -> None:
+    # Class-level defaults so partially constructed engines (tests) behave like fresh ones.
+    context_cache: ContextCache | None = None
+    # (price book, assemblies, system prompt, prompt version) of the last assembly.
+    _prompt_memo: tuple[Any, Any, str, str] | None = None
+
+    def __init__(self, model_name: str | None = None, context_cache: ContextCache | None = None) -> None:
         self.model_name = model_name or settings.CHAT_MODEL_VERSION
-        self.client = genai.Client(api_key=settings.api_key)
+        self.client = get_genai_client()
+        self.context_cache = context_cache
         self._assemblies: dict[str, Any] | None = None
 
-    def _build_price_book_prompt(self) -> str:
+    def _build_price_book_prompt(self, price_book: list[dict] | tuple[dict, ...] | None = None) -> str:
         """
         Builds a category-grouped price book context for the LLM.
         Categorization significantly improves Gemini SKU selection accuracy
         over a flat list (grouping reduces hallucination of unknown SKUs).
         """
-        price_book = PricingService.load_price_book()
+        if price_book is None:
+            price_book = PricingService.load_price_book()
 
         if not price_book:
             logger.error("[InsightEngine] Master price book is empty.")
@@ -341,6 +357,39 @@ Il preventivo copre ESCLUSIVAMENTE i lavori per trasformare fisicamente lo spazi
 Analizza la conversazione e produci la risposta strutturata.
 """
 
+    def system_prompt(self) -> tuple[str, str]:
+        """
+        Returns (system prompt, version), rebuilt only when the price book or
+        the assemblies change.
+
+        The price book is compared by identity: a swapped PriceBookSnapshot
+        (live reload) carries a new items tuple. The version is a digest of the
+        prompt text and keys the Gemini context cache.
+        """
+        price_book = PricingService.load_price_book()
+        assemblies = self._load_assemblies()
+        memo = self._prompt_memo
+        if memo is None or memo[0] is not price_book or memo[1] is not assemblies:
+            prompt = self._build_system_prompt(self._build_price_book_prompt(price_book), self._build_assembly_prompt())
+            version = hashlib.sha256(prompt.encode()).hexdigest()[:16]
+            memo = self._prompt_memo = (price_book, assemblies, prompt, version)
+            logger.info("[InsightEngine] System prompt assembled.", extra={"version": version, "chars": len(prompt)})
+        return memo[2], memo[3]
+
+    async def _generate(self, parts: list[genai_types.Part], cached_content: str | None) -> Any:
+        with track_genai_call(self.model_name):
+            return await self.client.aio.models.generate_content(
+                model=self.model_name,
+                contents=[genai_types.Content(role="user", parts=parts)],
+                config=genai_types.GenerateContentConfig(
+                    temperature=0.1,
+                    response_mime_type="application/json",
+                    response_schema=InsightAnalysis,  # Pydantic-native, no manual parsing
+                    thinking_config=genai_types.ThinkingConfig(thinking_budget=2048),
+                    cached_content=cached_content,
+                ),
+            )
+
     async def analyze_project_for_quote(
         self,
         chat_history: list[dict[str, Any]],
@@ -363,9 +412,10 @@ Analizza la conversazione e produci la risposta strutturata.
         Raises:
             InsightEngineError: On Gemini failure or empty response.
         """
-        price_book_section = self._build_price_book_prompt()
-        assembly_section = self._build_assembly_prompt()
-        system_prompt = self._build_system_prompt(price_book_section, assembly_section)
+        system_prompt, prompt_version = self.system_prompt()
+        cached_content = None
+        if self.context_cache is not None:
+            cached_content = await self.context_cache.lookup(self.model_name, prompt_version, system_prompt)
 
         # Build structured conversation text
         history_lines = ["## Conversazione"]
@@ -374,70 +424,68 @@ Analizza la conversazione e produci la risposta strutturata.
             content = str(msg.get("content", ""))
             history_lines.append(f"**{role}**: {content}")
 
-        parts: list[genai_types.Part] = [
-            genai_types.Part(text=system_prompt),
-            genai_types.Part(text="\n".join(history_lines)),
-        ]
+        # With a cached prefix, the request carries only the conversation and media.
+        parts: list[genai_types.Part] = [] if cached_content else [genai_types.Part(text=system_prompt)]
+        parts.append(genai_types.Part(text="\n".join(history_lines)))
 
         # Attach media (SSRF-protected to Firebase Storage domain only)
         if media_urls:
             from urllib.parse import urlparse
 
-            import httpx
-
-            async with httpx.AsyncClient(timeout=10.0) as http_client:
-                for url in media_urls:
-                    try:
-                        parsed = urlparse(url)
-                        # SSRF guard: only fetch from our Firebase Storage bucket.
-                        # Mirrors the pattern in quote_tools._run_measurement_vision —
-                        # the bucket may be the virtual-hosted host, or the leading
-                        # path segment under storage.googleapis.com (where signed URLs
-                        # actually live). Fail-closed when the bucket is unconfigured.
-                        bucket = settings.FIREBASE_STORAGE_BUCKET or ""
-                        hostname_ok = parsed.hostname == bucket
-                        path_ok = (
-                            bool(bucket)
-                            and parsed.hostname == "storage.googleapis.com"
-                            and parsed.path.startswith(f"/{bucket}/")
-                        )
-                        if not (hostname_ok or path_ok):
-                            logger.warning(
-                                "[InsightEngine] Unauthorized media URL blocked.",
-                                extra={"host": parsed.netloc},
-                            )
-                            continue
-
-                        resp = await http_client.get(url)
-                        resp.raise_for_status()
-                        mime = "video/mp4" if "video" in url.lower() else "image/jpeg"
-                        parts.append(
-                            genai_types.Part(
-                                inline_data=genai_types.Blob(mime_type=mime, data=resp.content)
-                            )
+            for url in media_urls:
+                try:
+                    parsed = urlparse(url)
+                    # SSRF guard: only fetch from our Firebase Storage bucket.
+                    # Mirrors the pattern in quote_tools._run_measurement_vision —
+                    # the bucket may be the virtual-hosted host, or the leading
+                    # path segment under storage.googleapis.com (where signed URLs
+                    # actually live). Fail-closed when the bucket is unconfigured.
+                    bucket = settings.FIREBASE_STORAGE_BUCKET or ""
+                    hostname_ok = parsed.hostname == bucket
+                    path_ok = (
+                        bool(bucket)
+                        and parsed.hostname == "storage.googleapis.com"
+                        and parsed.path.startswith(f"/{bucket}/")
+                    )
+                    if not (hostname_ok or path_ok):
+                        logger.warning(
+                            "[InsightEngine] Unauthorized media URL blocked.",
+                            extra={"host": parsed.netloc},
                         )
-                        logger.debug("[InsightEngine] Media attached.", extra={"url": url})
-                    except Exception as exc:  # noqa: BLE001
-                        # Graceful degradation: skip broken media, continue analysis
-                        logger.error(
-                            "[InsightEngine] Failed to fetch media.",
-                            extra={"url": url, "error": str(exc)},
+                        continue
+
+                    fetched = await fetch_media_cached(url, timeout=10.0)
+                    mime = "video/mp4" if "video" in url.lower() else "image/jpeg"
+                    prepared = await prepare_image(fetched.data, mime, use="insight")
+                    parts.append(
+                        genai_types.Part(
+                            inline_data=genai_types.Blob(mime_type=prepared.mime_type, data=prepared.data)
                         )
-                        parts.append(genai_types.Part(text=f"[Immagine non accessibile: {url}]"))
+                    )
+                    logger.debug("[InsightEngine] Media attached.", extra={"url": url})
+                except Exception as exc:  # noqa: BLE001
+                    # Graceful degradation: skip broken media, continue analysis
+                    logger.error(
+                        "[InsightEngine] Failed to fetch media.",
+                        extra={"url": url, "error": str(exc)},
+                    )
+                    parts.append(genai_types.Part(text=f"[Immagine non accessibile: {url}]"))
 
         # ── Gemini call with native structured output ──────────────────────────
         try:
-            logger.info("[InsightEngine] Starting AI project analysis.")
-            response = await self.client.aio.models.generate_content(
-                model=self.model_name,
-                contents=[genai_types.Content(parts=parts)],
-                config=genai_types.GenerateContentConfig(
-                    temperature=0.1,
-                    response_mime_type="application/json",
-                    response_schema=InsightAnalysis,  # Pydantic-native, no manual parsing
-                    thinking_config=genai_types.ThinkingConfig(thinking_budget=2048),
-                ),
-            )
+            logger.info("[InsightEngine] Starting AI project analysis.", extra={"cached_prefix": bool(cached_content)})
+            try:
+                response = await self._generate(parts, cached_content)
+            except Exception as exc:
+                if not cached_content or self.context_cache is None or not is_cache_rejection(exc):
+                    raise
+                # The cached content expired or was deleted server-side: retry once inline.
+                logger.warning(
+                    "[InsightEngine] Cached-prefix call failed, retrying inline.",
+                    extra={"cached_content": cached_content, "error": str(exc)},
+                )
+                await self.context_cache.invalidate(self.model_name, prompt_version)
+                response = await self._generate([genai_types.Part(text=system_prompt), *parts], None)
 
             if not response.text:
                 logger.error("[InsightEngine] Empty response from Gemini.")
@@ -477,5 +525,8 @@ def get_insight_engine() -> InsightEngine:
     """Returns the singleton InsightEngine instance."""
     global _insight_engine
     if _insight_engine is None:
-        _insight_engine = InsightEngine()
+        context_cache = None
+        if settings.INSIGHT_CONTEXT_CACHE_ENABLED:
+            context_cache = GeminiContextCache(get_genai_client(), settings.INSIGHT_CONTEXT_CACHE_TTL_SECONDS)
+        _insight_engine = InsightEngine(context_cache=context_cache)
     return _insight_engine
@@ -0,0 +1,283 @@
+"""
+Offline lexical (BM25) index over the RAG chunks.
+
+When Pinecone is unreachable, `search_prezzario` and `retrieve_knowledge` used
+to answer `_RAG_UNAVAILABLE` and the agent stopped quoting. This index is built
+by `scripts/build_lexical_index.py` from the very chunks the ingestion scripts
+upsert (`ingest_prezzario.build_chunks`, `ingest_normative.chunk_markdown`),
+one file per namespace, and lets `RAGService.search` either:
+
+  - serve BM25 alone as a degraded fallback (RAG_LEXICAL_MODE="fallback"), or
+  - fuse BM25 with the dense results by RRF (RAG_LEXICAL_MODE="hybrid").
+
+Tokenization is Italian-aware: accents folded, elisions split ("dell'intonaco"
+→ "intonaco"), stopwords dropped, and a light stemmer that only strips
+inflection (gender/number), so "piastrelle"/"piastrella" and
+"demolizione"/"demolizioni" share a term.
+
+File layout (little-endian, one file per namespace):
+
+    magic b"SYDLEX01" | u64 header length | JSON header | pad to 4 bytes
+    | u32 doc_len[n_docs] | u32 doc_ids[n_postings] | u32 tfs[n_postings]
+
+The header holds the vocabulary (term → [offset, df]) and per-document
+id/metadata (including chunk_text); it is parsed onto each process's heap
+when the index opens, along with the per-document BM25 norms. Only the three
+arrays stay memory-mapped and are read as typed memoryviews, so the postings
+— the bulk of the file — are never copied into Python objects and worker
+processes share one page-cache copy of them.
+"""
+import hashlib
+import heapq
+import json
+import logging
+import math
+import mmap
+import re
+import struct
+import sys
+import threading
+import unicodedata
+from array import array
+from collections import Counter
+from pathlib import Path
+from typing import Any
+
+from src.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_MAGIC = b"SYDLEX01"
+_TOKENIZER_VERSION = 1
+_DEFAULT_DIR = Path(__file__).resolve().parents[2] / "data" / "lexical"
+_WORD = re.compile(r"[^\W_]+")
+
+# Articles, prepositions (incl. articulated/elided forms), conjunctions and
+# auxiliaries. Units ("mq", "cm") and numbers are deliberately kept.
+_STOPWORDS = frozenset("""
+a ad al alla alle allo agli ai all c che chi ci col con contro cui d da dal dalla dalle dallo dagli dai dall
+de degli dei del della delle dello dell di e ed gli i il in l la le lo ma ne negli nei nel nella nelle nello nell
+o od per piu po poi quale quali quella quelle quello questa queste questo qui se si sia sono su sul sulla sulle
+sullo sugli sui sull tra fra un una uno essere e ha hanno ho anche come dove quando non senza
+""".split())
+
+
+def _fold(text: str) -> str:
+    decomposed = unicodedata.normalize("NFKD", text.casefold())
+    return "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+
+
+def stem(token: str) -> str:
+    """Light Italian stemmer: strip gender/number inflection only."""
+    if len(token) <= 4 or not token.isalpha():
+        return token
+    for suffix, replacement in (("che", "c"), ("chi", "c"), ("ghe", "g"), ("ghi", "g")):
+        if token.endswith(suffix):
+            return token[: -len(suffix)] + replacement
+    if token[-1] in "aeio":
+        token = token[:-1]
+        if token.endswith("i") and len(token) > 4:  # sanitario/sanitari/sanitarie
+            token = token[:-1]
+    return token
+
+
+def tokenize(text: str) -> list[str]:
+    """Folded, stopword-free, stemmed terms of `text` (apostrophes split elisions)."""
+    terms = []
+    for word in _WORD.findall(_fold(text)):
+        if word in _STOPWORDS or (len(word) == 1 and not word.isdigit()):
+            continue
+        if word.isdigit():
+            word = word.lstrip("0") or "0"
+        terms.append(stem(word))
+    return terms
+
+
+def chunk_id(chunk: dict[str, Any]) -> str:
+    """Record id of an ingestion chunk, as RAGService.upsert_documents assigns it (code, else text hash)."""
+    key = chunk["codice"] if "codice" in chunk else chunk.get("text", "")
+    return hashlib.sha256(str(key).strip().encode("utf-8")).hexdigest()[:32]
+
+
+def write_lexical_index(path: str | Path, chunks: list[dict[str, Any]]) -> int:
+    """Build the index file for one namespace from ingestion chunks ('text' + metadata).
+
+    Returns the number of indexed documents.
+    """
+    docs: list[dict[str, Any]] = []
+    doc_len = array("I")
+    postings: dict[str, list[tuple[int, int]]] = {}
+    for chunk in chunks:
+        text = chunk.get("text", "")
+        terms = Counter(tokenize(text))
+        doc_no = len(docs)
+        metadata = {k: v for k, v in chunk.items() if k != "text"}
+        metadata["chunk_text"] = text
+        docs.append({"id": chunk_id(chunk), "metadata": metadata})
+        doc_len.append(sum(terms.values()))
+        for term, tf in terms.items():
+            postings.setdefault(term, []).append((doc_no, tf))
+
+    vocab: dict[str, list[int]] = {}
+    doc_ids, tfs = array("I"), array("I")
+    for term in sorted(postings):
+        vocab[term] = [len(doc_ids), len(postings[term])]
+        for doc_no, tf in postings[term]:
+            doc_ids.append(doc_no)
+            tfs.append(tf)
+
+    header = json.dumps({
+        "tokenizer": _TOKENIZER_VERSION,
+        "n_docs": len(docs),
+        "n_postings": len(doc_ids),
+        "avgdl": (sum(doc_len) / len(docs)) if docs else 0.0,
+        "vocab": vocab,
+        "docs": docs,
+    }, ensure_ascii=False).encode("utf-8")
+    pad = -(len(_MAGIC) + 8 + len(header)) % 4
+
+    if sys.byteorder != "little":
+        for arr in (doc_len, doc_ids, tfs):
+            arr.byteswap()
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    with open(tmp, "wb") as f:
+        f.write(_MAGIC)
+        f.write(struct.pack("<Q", len(header)))
+        f.write(header)
+        f.write(b"\0" * pad)
+        for arr in (doc_len, doc_ids, tfs):
+            arr.tofile(f)
+    tmp.replace(path)  # readers never see a half-written index
+    return len(docs)
+
+
+class LexicalIndex:
+    """Read-only BM25 index over one namespace, backed by a memory-mapped file."""
+
+    def __init__(self, path: str | Path, k1: float = 1.2, b: float = 0.75):
+        self.path = Path(path)
+        self.k1 = k1
+        self.b = b
+        with open(self.path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mmap[: len(_MAGIC)] != _MAGIC:
+            raise ValueError(f"{self.path} is not a lexical index")
+        if sys.byteorder != "little":
+            raise ValueError("lexical index files are little-endian; this host is not")
+        (header_len,) = struct.unpack_from("<Q", self._mmap, len(_MAGIC))
+        start = len(_MAGIC) + 8
+        header = json.loads(self._mmap[start:start + header_len])
+        if header.get("tokenizer") != _TOKENIZER_VERSION:
+            raise ValueError(f"{self.path} was built with another tokenizer; rebuild it")
+        self._vocab: dict[str, list[int]] = header["vocab"]
+        self._docs: list[dict[str, Any]] = header["docs"]
+        self.avgdl: float = header["avgdl"] or 1.0
+        n_docs, n_postings = header["n_docs"], header["n_postings"]
+
+        offset = start + header_len
+        offset += -offset % 4
+        view = memoryview(self._mmap)
+        self._doc_len = view[offset:offset + 4 * n_docs].cast("I")
+        offset += 4 * n_docs
+        self._doc_ids = view[offset:offset + 4 * n_postings].cast("I")
+        offset += 4 * n_postings
+        self._tfs = view[offset:offset + 4 * n_postings].cast("I")
+        # BM25 length normalization per document, computed once.
+        self._norm = array("d", (k1 * (1.0 - b + b * length / self.avgdl) for length in self._doc_len))
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def search(
+        self,
+        query: str,
+        top_k: int = 5,
+        filter_dict: dict[str, Any] | None = None,
+    ) -> list[dict[str, Any]]:
+        """BM25 top-k, in the same {'id', 'score', 'metadata'} shape as RAGService.search."""
+        n_docs = len(self._docs)
+        norm = self._norm
+        scores: dict[int, float] = {}
+        for term in set(tokenize(query)):
+            entry = self._vocab.get(term)
+            if entry is None:
+                continue
+            offset, df = entry
+            weight = math.log(1.0 + (n_docs - df + 0.5) / (df + 0.5)) * (self.k1 + 1.0)
+            for doc, tf in zip(self._doc_ids[offset:offset + df], self._tfs[offset:offset + df], strict=True):
+                scores[doc] = scores.get(doc, 0.0) + weight * tf / (tf + norm[doc])
+
+        if filter_dict:
+            scores = {d: s for d, s in scores.items() if _matches(self._docs[d]["metadata"], filter_dict)}
+        best = heapq.nlargest(top_k, scores.items(), key=lambda item: item[1])
+        return [
+            {
+                "id": self._docs[d]["id"],
+                "score": round(score, 4),
+                "metadata": dict(self._docs[d]["metadata"]),
+            }
+            for d, score in best
+        ]
+
+    def close(self) -> None:
+        for view in (self._doc_len, self._doc_ids, self._tfs):
+            view.release()
+        self._mmap.close()
+
+
+def _matches(metadata: dict[str, Any], filter_dict: dict[str, Any]) -> bool:
+    """Evaluate the subset of Pinecone's filter language the tools use ($eq, $in, bare value)."""
+    for field, condition in filter_dict.items():
+        value = metadata.get(field)
+        if isinstance(condition, dict):
+            if "$eq" in condition and value != condition["$eq"]:
+                return False
+            if "$in" in condition and value not in condition["$in"]:
+                return False
+        elif value != condition:
+            return False
+    return True
+
+
+def index_path(namespace: str) -> Path:
+    base = Path(settings.RAG_LEXICAL_INDEX_DIR) if settings.RAG_LEXICAL_INDEX_DIR else _DEFAULT_DIR
+    return base / f"{namespace}.bm25"
+
+
+_indexes: dict[str, LexicalIndex | None] = {}
+_lock = threading.Lock()
+
+
+def get_lexical_index(namespace: str) -> LexicalIndex | None:
+    """Process-wide index for `namespace`, opened on first use; None if disabled or not built."""
+    if settings.RAG_LEXICAL_MODE == "off":
+        return None
+    if namespace in _indexes:
+        return _indexes[namespace]
+    with _lock:
+        if namespace not in _indexes:
+            path = index_path(namespace)
+            index: LexicalIndex | None = None
+            try:
+                index = LexicalIndex(path)
+                logger.info(f"[LexicalIndex] Opened {path} ({len(index)} chunks)")
+            except FileNotFoundError:
+                logger.info(f"[LexicalIndex] {path} not built — no lexical retrieval for '{namespace}'")
+            except (OSError, ValueError) as e:
+                logger.error(f"[LexicalIndex] Could not open {path}: {e}")
+            _indexes[namespace] = index
+    return _indexes[namespace]
+
+
+def set_lexical_index(namespace: str, index: LexicalIndex | None) -> None:
+    """Pin the index served for `namespace` (None = no lexical retrieval there)."""
+    with _lock:
+        _indexes[namespace] = index
+
+
+def reset_lexical_indexes() -> None:
+    """Forget opened indexes; they are reopened from disk on next use."""
+    with _lock:
+        _indexes.clear()
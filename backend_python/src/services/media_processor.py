@@ -3,10 +3,10 @@ import io
 import logging
 from typing import IO, cast
 
-from google import genai
 from google.genai import types
 
 from src.core.config import settings
+from src.utils.genai_client import get_genai_client
 
 logger = logging.getLogger(__name__)
 
@@ -27,14 +27,7 @@ class MediaProcessor:
         if not self.api_key:
              raise RuntimeError("GEMINI_API_KEY is not set in configuration.")
 
-        self.client = genai.Client(api_key=self.api_key, http_options={'api_version': 'v1beta'})
-
-    def __del__(self):
-        # Best effort cleanup
-        try:
-            self.client.close()
-        except Exception:  # noqa: BLE001
-            pass
+        self.client = get_genai_client(api_version="v1beta")
 
     async def upload_video_for_analysis(self, file_stream: IO[bytes], mime_type: str, display_name: str) -> types.File:
         """
@@ -0,0 +1,166 @@
+"""
+In-process index of price-list articles by code.
+
+`retrieve_price_by_code` used to resolve an exact code like "A 3.02.14.a."
+with a Pinecone search plus a metadata `$in` filter, then fall back to a
+second semantic search: two network round-trips for a dictionary lookup.
+This index is built from the structured prezzario JSON produced by
+`scripts/extract_prezzario.py` (the same file `ingest_prezzario.py` uploads)
+and answers:
+
+  - exact lookups, after normalizing the code (case, spacing, trailing dot,
+    leading zeros): "a 3.2.14.A" and "A 3.02.14.a." are the same article;
+  - prefix / chapter lookups ("A 3.02.14" → its lettered sub-items),
+    matched on whole code segments;
+  - typo-tolerant lookups: codes within Levenshtein distance ≤ 1 of the
+    normalized input, found by walking a character trie with one DP row per
+    node (no full scan of the article list).
+
+Lookups are sub-millisecond and need no network, so exact codes keep
+resolving while Pinecone is down. Pinecone stays the fallback for codes the
+index does not know. The index is loaded once (warmed from `main.lifespan`);
+if the JSON is missing it stays empty and every lookup falls through.
+"""
+import json
+import logging
+import re
+import threading
+from pathlib import Path
+from typing import Any
+
+from src.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_DEFAULT_PATH = Path(__file__).resolve().parents[2] / "data" / "prezzario_lazio_2023_structured.json"
+_CODE_TOKEN = re.compile(r"[^\W\d_]+|\d+")
+_END = "\0"  # trie terminal marker (never part of a normalized code)
+
+
+def normalize_code(code: str) -> str:
+    """Canonical form of an article code: 'A 3.02.14.a.' → 'a.3.2.14.a'."""
+    tokens = _CODE_TOKEN.findall(code.casefold())
+    return ".".join((t.lstrip("0") or "0") if t.isdigit() else t for t in tokens)
+
+
+class PrezzarioIndex:
+    """Article records keyed by normalized code, plus a character trie over the keys."""
+
+    def __init__(self, articles: list[dict[str, Any]] | None = None):
+        self._by_code: dict[str, dict[str, Any]] = {}
+        self._trie: dict[str, Any] = {}
+        for article in articles or []:
+            self.add(article)
+
+    @classmethod
+    def load(cls, path: str | Path) -> "PrezzarioIndex":
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        articles = data.get("articoli", data) if isinstance(data, dict) else data
+        return cls(articles)
+
+    def __len__(self) -> int:
+        return len(self._by_code)
+
+    def add(self, article: dict[str, Any]) -> None:
+        key = normalize_code(str(article.get("codice", "")))
+        if not key:
+            return
+        self._by_code[key] = article
+        node = self._trie
+        for ch in key:
+            node = node.setdefault(ch, {})
+        node[_END] = key
+
+    # ── Lookups ───────────────────────────────────────────────────────────────
+
+    def lookup(self, code: str) -> dict[str, Any] | None:
+        """Exact match after normalization."""
+        return self._by_code.get(normalize_code(code))
+
+    def by_prefix(self, code: str, limit: int = 50) -> list[dict[str, Any]]:
+        """Articles under a chapter/prefix code, matched on whole segments, in code order."""
+        prefix = normalize_code(code)
+        if not prefix:
+            return []
+        node = self._trie
+        for ch in prefix:
+            node = node.get(ch)
+            if node is None:
+                return []
+        keys: list[str] = []
+        if _END in node:
+            keys.append(node[_END])
+        child = node.get(".")
+        if child is not None:
+            self._collect(child, keys)
+        return [self._by_code[k] for k in sorted(keys, key=_segment_sort_key)[:limit]]
+
+    def fuzzy(self, code: str, max_distance: int = 1, limit: int = 5) -> list[tuple[dict[str, Any], int]]:
+        """Articles whose normalized code is within `max_distance` edits, closest first."""
+        word = normalize_code(code)
+        if not word:
+            return []
+        matches: list[tuple[str, int]] = []
+        first_row = list(range(len(word) + 1))
+        stack = [(ch, child, first_row) for ch, child in self._trie.items() if ch != _END]
+        while stack:
+            ch, node, prev_row = stack.pop()
+            row = [prev_row[0] + 1]
+            for col in range(1, len(word) + 1):
+                row.append(min(
+                    row[col - 1] + 1,                                # insertion
+                    prev_row[col] + 1,                               # deletion
+                    prev_row[col - 1] + (word[col - 1] != ch),       # substitution
+                ))
+            if row[-1] <= max_distance and _END in node:
+                matches.append((node[_END], row[-1]))
+            if min(row) <= max_distance:
+                stack.extend((c, n, row) for c, n in node.items() if c != _END)
+        matches.sort(key=lambda m: (m[1], _segment_sort_key(m[0])))
+        return [(self._by_code[key], dist) for key, dist in matches[:limit]]
+
+    @staticmethod
+    def _collect(node: dict[str, Any], keys: list[str]) -> None:
+        stack = [node]
+        while stack:
+            current = stack.pop()
+            for ch, child in current.items():
+                if ch == _END:
+                    keys.append(child)
+                else:
+                    stack.append(child)
+
+
+def _segment_sort_key(key: str) -> tuple:
+    return tuple((0, int(t), "") if t.isdigit() else (1, 0, t) for t in key.split("."))
+
+
+_index: PrezzarioIndex | None = None
+_lock = threading.Lock()
+
+
+def get_prezzario_index() -> PrezzarioIndex:
+    """Process-wide index, loaded on first use from PREZZARIO_INDEX_PATH (empty if the file is missing)."""
+    global _index
+    if _index is None:
+        with _lock:
+            if _index is None:
+                path = Path(settings.PREZZARIO_INDEX_PATH) if settings.PREZZARIO_INDEX_PATH else _DEFAULT_PATH
+                try:
+                    _index = PrezzarioIndex.load(path)
+                    logger.info(f"[PrezzarioIndex] Loaded {len(_index)} articles from {path}")
+                except FileNotFoundError:
+                    logger.warning(f"[PrezzarioIndex] {path} not found — code lookups fall back to Pinecone")
+                    _index = PrezzarioIndex()
+                except (OSError, ValueError) as e:
+                    logger.error(f"[PrezzarioIndex] Could not load {path}: {e} — code lookups fall back to Pinecone")
+                    _index = PrezzarioIndex()
+    return _index
+
+
+def set_prezzario_index(index: PrezzarioIndex | None) -> None:
+    """Replace the process-wide index (None reloads from disk on next use)."""
+    global _index
+    with _lock:
+        _index = index
@@ -0,0 +1,161 @@
+"""
+Live reload of the master price book from Firestore (app_config/price_book).
+
+Admins edit the price book in the admin tool, which writes the whole item
+list plus `updated_at` to app_config/price_book (PriceBookRepository.save_items).
+The backend used to read only the bundled src/data/master_price_book.json,
+so an edit needed a redeploy.
+
+`PriceBookRefresher` polls the document every PRICE_BOOK_REFRESH_SECONDS,
+reading only `updated_at`. When it changes, the refresher reads the items,
+builds a new indexed PriceBookSnapshot off the event loop, and publishes it
+with PricingService.swap_snapshot. Readers never lock; derived caches (the
+listino index, InsightEngine's system prompt) key on the snapshot's items
+object, so they rebuild on their next use.
+
+Fallbacks:
+  - document missing → the bundled JSON;
+  - document malformed (no items, or an item missing a field readers use or
+    holding the wrong type — see `_valid_item`) → keep the current snapshot,
+    log an error;
+  - Firestore unreachable → keep the current snapshot, retry next interval.
+
+Polling (one small read per interval) was chosen over an on_snapshot listener:
+listeners need the sync client and its own thread plus reconnect handling,
+and a price-book edit a minute late is fine.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+from typing import Any, TypeGuard
+
+from src.core.config import settings
+from src.services.pricing_service import PriceBookSnapshot, PricingService
+
+logger = logging.getLogger(__name__)
+
+_COLLECTION = "app_config"
+_DOCUMENT = "price_book"
+
+
+# Fields every reader of the book indexes directly (PricingService, InsightEngine's prompt, the tools).
+_REQUIRED_TEXT = ("sku", "description", "unit")
+# Optional fields: absent is fine, but when present they must have the type readers expect.
+_OPTIONAL_TEXT = ("category", "subcategory")
+_OPTIONAL_NUMBER = ("range_min", "range_max")
+
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, int | float) and not isinstance(value, bool)
+
+
+def _valid_item(item: Any) -> bool:
+    if not isinstance(item, dict) or not item.get("sku"):
+        return False
+    return (
+        all(isinstance(item.get(field), str) for field in _REQUIRED_TEXT)
+        and _is_number(item.get("unit_price"))
+        and all(isinstance(item.get(field, ""), str) for field in _OPTIONAL_TEXT)
+        and all(item.get(field) is None or _is_number(item[field]) for field in _OPTIONAL_NUMBER)
+        and isinstance(item.get("tags", []), list)
+        and all(isinstance(tag, str) for tag in item.get("tags", []))
+    )
+
+
+def _valid_items(items: Any) -> TypeGuard[list[dict[str, Any]]]:
+    return bool(items) and isinstance(items, list) and all(_valid_item(item) for item in items)
+
+
+class PriceBookRefresher:
+    """Polls app_config/price_book and swaps newer versions into PricingService."""
+
+    def __init__(self, db: Any, interval: float):
+        self._ref = db.collection(_COLLECTION).document(_DOCUMENT)
+        self.interval = interval
+        self._seen_updated_at: Any = None
+        self._task: asyncio.Task | None = None
+
+    async def refresh_once(self) -> bool:
+        """Check for a newer price book and swap it in. Returns True when the snapshot changed."""
+        head = await self._ref.get(field_paths=["updated_at"])
+        if not head.exists:
+            return self._fall_back_to_bundled()
+        updated_at = (head.to_dict() or {}).get("updated_at")
+        if updated_at is not None and updated_at == self._seen_updated_at:
+            return False
+
+        doc = await self._ref.get()
+        data = (doc.to_dict() or {}) if doc.exists else {}
+        items = data.get("items")
+        self._seen_updated_at = data.get("updated_at", updated_at)
+        if not _valid_items(items):
+            logger.error(
+                f"[PriceBookRefresher] {_COLLECTION}/{_DOCUMENT} (updated_at={self._seen_updated_at}) is empty or "
+                f"malformed — keeping price book {PricingService.snapshot().version}."
+            )
+            return False
+
+        digest = hashlib.sha256(json.dumps(items, sort_keys=True, default=str).encode()).hexdigest()[:12]
+        version = f"firestore+{digest}"
+        if version == PricingService.snapshot().version:
+            return False
+        snapshot = await asyncio.to_thread(PriceBookSnapshot.build, items, version)
+        PricingService.swap_snapshot(snapshot)
+        return True
+
+    def _fall_back_to_bundled(self) -> bool:
+        self._seen_updated_at = None
+        if not PricingService.snapshot().version.startswith("firestore+"):
+            return False  # already serving the bundled JSON
+        logger.warning(f"[PriceBookRefresher] {_COLLECTION}/{_DOCUMENT} is gone — falling back to the bundled JSON.")
+        PricingService.swap_snapshot(PriceBookSnapshot.load())
+        return True
+
+    async def run(self) -> None:
+        while True:
+            try:
+                await self.refresh_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:  # noqa: BLE001 — the poller must outlive Firestore hiccups
+                logger.warning(f"[PriceBookRefresher] Refresh failed (keeping the current price book): {e}")
+            await asyncio.sleep(self.interval)
+
+    def start(self) -> asyncio.Task:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.run())
+        return self._task
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+_refresher: PriceBookRefresher | None = None
+
+
+def start_price_book_refresher(db: Any | None = None) -> PriceBookRefresher | None:
+    """Start the process-wide refresher (no-op when PRICE_BOOK_REFRESH_SECONDS is 0)."""
+    global _refresher
+    if settings.PRICE_BOOK_REFRESH_SECONDS <= 0:
+        return None
+    if _refresher is None:
+        if db is None:
+            from src.db.firebase_client import get_async_firestore_client
+            db = get_async_firestore_client()
+        _refresher = PriceBookRefresher(db, settings.PRICE_BOOK_REFRESH_SECONDS)
+    _refresher.start()
+    return _refresher
+
+
+async def stop_price_book_refresher() -> None:
+    global _refresher
+    if _refresher is not None:
+        await _refresher.stop()
+        _refresher = None
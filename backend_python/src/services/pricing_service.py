@@ -1,6 +1,25 @@
+"""
+Deterministic pricing over the master price book (src/data/master_price_book.json).
+
+The book is loaded once into an immutable `PriceBookSnapshot`: the items plus a
+sku → item dict, each item's price range and a version id. Every caller (quote
+building, SKU validation, the pricing tool, the listino search) reads the same
+shared snapshot, so per-SKU lookups are O(1) instead of a scan of the whole book.
+
+The bundled JSON is the starting point; admin edits in Firestore are swapped in
+at runtime by src/services/price_book_refresher.py through `swap_snapshot`.
+A swap is one reference assignment, so readers never take a lock: each call
+sees either the old or the new snapshot, whole. Anything derived from the book
+keys on the snapshot (its `version` or its `items` object) and rebuilds when
+that changes.
+"""
+import hashlib
 import json
 import logging
 import os
+from collections.abc import Iterable, Mapping
+from dataclasses import dataclass
+from types import MappingProxyType
 from typing import Any
 
 from src.schemas.quote import QuoteFinancials, QuoteItem, QuoteSchema
@@ -8,28 +27,78 @@ from src.utils.datetime_utils import utc_now
 
 logger = logging.getLogger(__name__)
 
+_PRICE_BOOK_PATH = os.path.join(os.path.dirname(__file__), "..", "data", "master_price_book.json")
+
+
+@dataclass(frozen=True)
+class PriceBookSnapshot:
+    """Read-only, indexed view of one version of the price book. Items must not be mutated."""
+
+    version: str
+    items: tuple[dict[str, Any], ...]
+    by_sku: Mapping[str, dict[str, Any]]
+    ranges: Mapping[str, tuple[float, float]]  # sku → (range_min, range_max), the unit price where unset
+
+    @classmethod
+    def build(cls, items: Iterable[dict[str, Any]], version: str = "") -> "PriceBookSnapshot":
+        items = tuple(items)
+        by_sku: dict[str, dict[str, Any]] = {}
+        ranges: dict[str, tuple[float, float]] = {}
+        for item in items:
+            sku = item["sku"]
+            if sku in by_sku:
+                logger.warning(f"[PricingService] Duplicate SKU {sku} in price book — keeping the first.")
+                continue
+            by_sku[sku] = item
+            unit_price = item.get("unit_price", 0.0)
+            low, high = item.get("range_min"), item.get("range_max")
+            ranges[sku] = (unit_price if low is None else low, unit_price if high is None else high)
+        return cls(
+            version=version,
+            items=items,
+            by_sku=MappingProxyType(by_sku),
+            ranges=MappingProxyType(ranges),
+        )
+
+    @classmethod
+    def load(cls, path: str = _PRICE_BOOK_PATH) -> "PriceBookSnapshot":
+        with open(path, "rb") as f:
+            raw = f.read()
+        data = json.loads(raw)
+        version = f"{data.get('version', 'unversioned')}+{hashlib.sha256(raw).hexdigest()[:12]}"
+        return cls.build(data["items"], version)
+
+
 class PricingService:
-    _master_price_book = None
+    _snapshot: PriceBookSnapshot | None = None
 
     @classmethod
-    def load_price_book(cls):
-        if cls._master_price_book is None:
-            data_path = os.path.join(os.path.dirname(__file__), "..", "data", "master_price_book.json")
+    def snapshot(cls) -> PriceBookSnapshot:
+        """The shared price book snapshot, loaded on first use."""
+        if cls._snapshot is None:
             try:
-                with open(data_path, encoding="utf-8") as f:
-                    cls._master_price_book = json.load(f)["items"]
+                cls._snapshot = PriceBookSnapshot.load()
+                logger.info(
+                    f"[PricingService] Loaded price book {cls._snapshot.version} ({len(cls._snapshot.items)} items)."
+                )
             except Exception as e:  # noqa: BLE001
                 logger.error(f"[PricingService] Error loading price book: {e}")
-                cls._master_price_book = []
-        return cls._master_price_book
+                cls._snapshot = PriceBookSnapshot.build((), "unavailable")
+        return cls._snapshot
+
+    @classmethod
+    def swap_snapshot(cls, snapshot: PriceBookSnapshot) -> None:
+        """Publish a new price book to every reader."""
+        cls._snapshot = snapshot
+        logger.info(f"[PricingService] Price book is now {snapshot.version} ({len(snapshot.items)} items).")
+
+    @classmethod
+    def load_price_book(cls) -> tuple[dict[str, Any], ...]:
+        return cls.snapshot().items
 
     @classmethod
     def get_item_by_sku(cls, sku: str) -> dict[str, Any] | None:
-        price_book = cls.load_price_book()
-        for item in price_book:
-            if item["sku"] == sku:
-                return item
-        return None
+        return cls.snapshot().by_sku.get(sku)
 
     @classmethod
     def calculate_item_total(cls, item: QuoteItem) -> float:
@@ -52,13 +121,14 @@ class PricingService:
         """
         sku_list: List of dicts with {"sku": str, "qty": float, "ai_reasoning": Optional[str]}
         """
+        by_sku = cls.snapshot().by_sku  # one version for the whole quote
         items = []
         for sku_data in sku_list:
             sku = sku_data["sku"]
             qty = sku_data["qty"]
             reasoning = sku_data.get("ai_reasoning")
 
-            master_item = cls.get_item_by_sku(sku)
+            master_item = by_sku.get(sku)
             if master_item:
                 unit_price = master_item["unit_price"]
                 total = round(qty * unit_price, 2)
@@ -0,0 +1,153 @@
+"""
+Query-result cache for RAGService.search.
+
+Agents re-run near-identical `search_prezzario` / `retrieve_knowledge` queries
+across sessions, and every one used to pay a Pinecone round-trip with
+integrated embedding (and optional rerank): 300–800 ms. Results are cached
+under
+
+    (namespace, namespace generation, normalized query, filter, top_k, rerank, min_score)
+
+where the query is NFKC-normalized, case-folded and whitespace-collapsed, and
+the filter is serialized with sorted keys.
+
+  - LRU bounded by entry count, each entry with a TTL (RAG_CACHE_*).
+  - `invalidate(namespace)` bumps the namespace generation, so every entry
+    cached before an upsert or wipe becomes unreachable at once. Writes done
+    by another process (the ingestion scripts) are only bounded by the TTL.
+  - Identical concurrent queries share one Pinecone call (single-flight).
+    The call runs in its own task, so a caller that goes away does not
+    cancel it for the others.
+  - Only successful searches are cached; a failed call is retried next time.
+
+Hits, misses and coalesced waits are exported as the OpenTelemetry counter
+`rag.cache.requests` (attrs: outcome, namespace; no-op until a MeterProvider
+is configured) and via `stats()`.
+"""
+import asyncio
+import copy
+import json
+import logging
+import time
+import unicodedata
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+from opentelemetry import metrics
+
+logger = logging.getLogger(__name__)
+_meter = metrics.get_meter(__name__)
+
+_requests = _meter.create_counter(
+    "rag.cache.requests", description="RAGService.search cache lookups (attrs: outcome, namespace)",
+)
+
+Results = list[dict[str, Any]]
+CacheKey = tuple[str, int, str, str, int, bool, float]
+
+
+def normalize_query(query: str) -> str:
+    """Case- and whitespace-insensitive form of a search query."""
+    return " ".join(unicodedata.normalize("NFKC", query).casefold().split())
+
+
+class QueryResultCache:
+    """TTL LRU of search results with per-namespace generations and single-flight.
+
+    Single-event-loop, like the rest of the app: no lock needed.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.enabled = max_entries > 0 and ttl_seconds > 0
+        self._items: OrderedDict[CacheKey, tuple[float, Results]] = OrderedDict()  # key -> (expires_at, results)
+        self._inflight: dict[CacheKey, asyncio.Task[Results]] = {}
+        self._generation: dict[str, int] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def key(
+        self,
+        namespace: str,
+        query: str,
+        top_k: int,
+        filter_dict: dict[str, Any] | None,
+        rerank: bool,
+        min_score: float,
+    ) -> CacheKey:
+        filter_repr = json.dumps(filter_dict, sort_keys=True, ensure_ascii=False, default=str) if filter_dict else ""
+        return (
+            namespace, self._generation.get(namespace, 0), normalize_query(query),
+            filter_repr, top_k, rerank, float(min_score or 0.0),
+        )
+
+    async def get_or_fetch(self, key: CacheKey, fetch: Callable[[], Awaitable[Results]]) -> Results:
+        """Return cached results for `key`, calling `fetch` at most once across concurrent callers."""
+        if not self.enabled:
+            return await fetch()
+        namespace = key[0]
+        entry = self._items.get(key)
+        if entry is not None:
+            if time.monotonic() < entry[0]:
+                self._items.move_to_end(key)
+                self._count("hit", namespace)
+                return copy.deepcopy(entry[1])
+            del self._items[key]
+
+        task = self._inflight.get(key)
+        if task is not None:
+            self._count("coalesced", namespace)
+        else:
+            self._count("miss", namespace)
+            task = asyncio.ensure_future(self._fetch_and_store(key, fetch))
+            self._inflight[key] = task
+            task.add_done_callback(lambda t, k=key: self._on_done(k, t))
+        return copy.deepcopy(await asyncio.shield(task))
+
+    def invalidate(self, namespace: str) -> None:
+        """Make every cached result for `namespace` unreachable (index content changed)."""
+        self._generation[namespace] = self._generation.get(namespace, 0) + 1
+        for key in [k for k in self._items if k[0] == namespace]:
+            del self._items[key]
+
+    def clear(self) -> None:
+        self._items.clear()
+
+    def stats(self) -> dict[str, int | float]:
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "entries": len(self._items),
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "hit_rate": round((self.hits + self.coalesced) / lookups, 3) if lookups else 0.0,
+        }
+
+    # ── Internals ─────────────────────────────────────────────────────────────
+
+    async def _fetch_and_store(self, key: CacheKey, fetch: Callable[[], Awaitable[Results]]) -> Results:
+        results = await fetch()
+        if self._generation.get(key[0], 0) == key[1]:  # not invalidated while in flight
+            self._items[key] = (time.monotonic() + self.ttl_seconds, copy.deepcopy(results))
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_entries:
+                self._items.popitem(last=False)
+        return results
+
+    def _on_done(self, key: CacheKey, task: asyncio.Task[Results]) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            task.exception()  # every waiter may be gone; mark the error retrieved
+
+    def _count(self, outcome: str, namespace: str) -> None:
+        if outcome == "hit":
+            self.hits += 1
+        elif outcome == "miss":
+            self.misses += 1
+        else:
+            self.coalesced += 1
+        _requests.add(1, {"outcome": outcome, "namespace": namespace})
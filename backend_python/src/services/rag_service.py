@@ -1,20 +1,38 @@
 """
 RAG Service using Pinecone and Serverless Integrated Inference.
 Provides semantic search capabilities over renovation knowledge base without needing local embedding.
+With RAG_VECTOR_BACKEND="local" the index is a LocalVectorBackend instead
+(src/services/vector_backend.py): same calls, in-process brute-force search.
 
 Namespaces:
     - 'prezzario': Structured price-list articles (Tariffa Regionale Lazio 2023)
     - 'normative': Regulatory knowledge, building codes, bonus fiscali
+
+Search results are cached per normalized query (src/services/rag_cache.py);
+upserts, deletes and namespace wipes through this service invalidate the namespace.
+Re-ingestion can be incremental: sync_documents diffs against a content-hash
+manifest (src/services/index_manifest.py) and touches only changed records.
+An offline BM25 index (src/services/lexical_index.py) answers when Pinecone
+cannot, and in RAG_LEXICAL_MODE="hybrid" is fused with the dense results.
 """
 import asyncio
 import hashlib
 import logging
-import uuid
+import statistics
+import time
+from collections import defaultdict, deque
+from collections.abc import Callable
+from pathlib import Path
 from typing import Any, Optional
 
 from pinecone import AwsRegion, CloudProvider, EmbedModel, IndexEmbed, Pinecone, SearchQuery
 
 from src.core.config import settings
+from src.services.bulk_upsert import BulkUpserter, UpsertCheckpoint
+from src.services.index_manifest import CONTENT_HASH_FIELD, IndexManifest, ManifestDiff, content_hash
+from src.services.lexical_index import LexicalIndex, get_lexical_index
+from src.services.rag_cache import QueryResultCache
+from src.services.vector_backend import LocalVectorBackend, VectorBackend, build_local_backend
 
 logger = logging.getLogger(__name__)
 
@@ -22,6 +40,91 @@ logger = logging.getLogger(__name__)
 NAMESPACE_PREZZARIO = "prezzario"
 NAMESPACE_NORMATIVE = "normative"
 
+_LATENCY_WINDOW = 200  # search latencies kept per namespace
+_HEDGE_MIN_SAMPLES = 20  # no hedging until the p95 estimate means something
+_DELETE_BATCH_SIZE = 1000  # Pinecone's cap on ids per delete call
+_LIST_PAGE_SIZE = 100  # Pinecone's cap on ids per list page
+
+
+class MultiNamespaceResults(list):
+    """Fused hits of a multi-namespace search; `timed_out` lists namespaces left out."""
+
+    def __init__(self, hits: list[dict[str, Any]], timed_out: list[str] | None = None):
+        super().__init__(hits)
+        self.timed_out = timed_out or []
+
+    @property
+    def partial(self) -> bool:
+        return bool(self.timed_out)
+
+
+def reciprocal_rank_fusion(ranked: dict[str, list[dict[str, Any]]], k: int = 60) -> list[dict[str, Any]]:
+    """Merge per-namespace rankings by RRF: fused_score = Σ 1 / (k + rank).
+
+    Hits are tagged with their `namespace`; a record returned by several
+    namespaces (same id) is kept once with the summed score.
+    """
+    fused: dict[Any, dict[str, Any]] = {}
+    for ns, hits in ranked.items():
+        for rank, hit in enumerate(hits, 1):
+            key = hit["id"] if hit.get("id") is not None else (ns, rank)
+            entry = fused.get(key)
+            if entry is None:
+                entry = fused[key] = {**hit, "namespace": ns, "fused_score": 0.0}
+            entry["fused_score"] += 1.0 / (k + rank)
+    return sorted(fused.values(), key=lambda h: h["fused_score"], reverse=True)
+
+
+def fuse_dense_lexical(
+    dense: list[dict[str, Any]],
+    lexical: list[dict[str, Any]],
+    k: int = 60,
+) -> list[dict[str, Any]]:
+    """RRF of the dense and BM25 rankings of one namespace.
+
+    Chunks ingested before ids became deterministic still carry random
+    Pinecone ids, so a record is matched across the two lists by its `codice`
+    (or its text), not its id. A record found by both keeps the dense hit's fields.
+
+    Cosine and BM25 values are not comparable, so each fused hit's `score` is
+    its RRF score (also kept as `fused_score`), whichever list it came from.
+    """
+    fused: dict[Any, dict[str, Any]] = {}
+    for hits in (dense, lexical):
+        for rank, hit in enumerate(hits, 1):
+            metadata = hit.get("metadata") or {}
+            key = metadata.get("codice") or metadata.get("chunk_text") or hit.get("id")
+            entry = fused.get(key)
+            if entry is None:
+                entry = fused[key] = {**hit, "fused_score": 0.0}
+            entry["fused_score"] += 1.0 / (k + rank)
+    for entry in fused.values():
+        entry["score"] = entry["fused_score"]
+    return sorted(fused.values(), key=lambda h: h["fused_score"], reverse=True)
+
+
+def _start_hybrid_bm25(
+    lexical: LexicalIndex | None,
+    query: str,
+    top_k: int,
+    filter_dict: dict[str, Any] | None,
+) -> "asyncio.Future[list[dict[str, Any]]] | None":
+    """Start the namespace's BM25 search alongside the dense one in hybrid mode (None otherwise)."""
+    if lexical is None or settings.RAG_LEXICAL_MODE != "hybrid":
+        return None
+    return asyncio.ensure_future(asyncio.to_thread(lexical.search, query, top_k, filter_dict))
+
+
+async def _fuse_hybrid(
+    dense: list[dict[str, Any]],
+    bm25: "asyncio.Future[list[dict[str, Any]]] | None",
+    top_k: int,
+) -> list[dict[str, Any]]:
+    """`dense` fused with the BM25 hits started by _start_hybrid_bm25 (unchanged outside hybrid mode)."""
+    if bm25 is None:
+        return dense
+    return fuse_dense_lexical(dense, await bm25, k=settings.RAG_RRF_K)[:top_k]
+
 
 class RAGService:
     """Service to handle retrieval and indexing operations using Pinecone
@@ -29,10 +132,24 @@ class RAGService:
 
     def __init__(self):
         self.pc: Pinecone | None = None
-        self.index = None
+        self.index: VectorBackend | None = None
+        self.cache = QueryResultCache(
+            max_entries=settings.RAG_CACHE_MAX_ENTRIES,
+            ttl_seconds=settings.RAG_CACHE_TTL_SECONDS,
+        )
+        # Recent Pinecone search latencies per namespace (seconds), for hedging.
+        self._latency: defaultdict[str, deque[float]] = defaultdict(lambda: deque(maxlen=_LATENCY_WINDOW))
         self._initialize()
 
     def _initialize(self):
+        if settings.RAG_VECTOR_BACKEND == "local":
+            try:
+                backend = build_local_backend()
+                self.index = backend
+                logger.info(f"Using local vector backend at {backend.root}")
+            except (OSError, ValueError) as e:
+                logger.error(f"Failed to initialize local vector backend: {e}", exc_info=True)
+            return
         try:
             if settings.PINECONE_API_KEY:
                 self.pc = Pinecone(api_key=settings.PINECONE_API_KEY)
@@ -90,75 +207,115 @@ class RAGService:
 
         Returns:
             List of result dicts with 'id', 'score', and 'metadata' keys.
+            Served from the query cache when the same search ran recently.
+            If Pinecone is not initialized or the search fails, the namespace's
+            BM25 index answers instead (BM25 scores, min_score not applied);
+            in hybrid mode both rankings are fused and `score` is the RRF score.
         """
+        lexical = get_lexical_index(namespace)
         if not self.index:
+            if lexical is not None:
+                logger.warning(f"RAGService: Pinecone index not initialized — BM25 fallback for '{namespace}'.")
+                return await asyncio.to_thread(lexical.search, query, top_k, filter_dict)
             logger.warning("RAGService: Pinecone index not initialized.")
             return []
-        index = self.index  # local narrows Optional across the to_thread closure below
+        index = self.index
 
         use_rerank = settings.RAG_RERANK_ENABLED if rerank is None else rerank
         threshold = settings.RAG_MIN_SCORE if min_score is None else min_score
+        key = self.cache.key(namespace, query, top_k, filter_dict, use_rerank, threshold)
 
+        bm25 = _start_hybrid_bm25(lexical, query, top_k, filter_dict)
         try:
-            # Over-fetch candidates when reranking so the cross-encoder has a
-            # meaningful pool to re-order; otherwise fetch exactly top_k.
-            fetch_k = top_k * max(1, settings.RAG_RERANK_OVERFETCH) if use_rerank else top_k
-            query_kwargs: dict[str, Any] = {
-                "inputs": {"text": query},
-                "top_k": fetch_k,
-            }
-            if filter_dict:
-                query_kwargs["filter"] = filter_dict
+            dense = await self.cache.get_or_fetch(
+                key,
+                lambda: self._query_index(index, query, top_k, filter_dict, namespace, use_rerank, threshold),
+            )
+        except asyncio.CancelledError:
+            if bm25 is not None:
+                bm25.cancel()  # don't leave the BM25 future behind the cancelled search
+            raise
+        except Exception as e:
+            logger.error(f"Failed to search Pinecone: {e}", exc_info=True)
+            if lexical is not None:
+                logger.warning(f"RAGService: BM25 fallback for '{namespace}'.")
+                return await (bm25 or asyncio.to_thread(lexical.search, query, top_k, filter_dict))
+            return []
+        return await _fuse_hybrid(dense, bm25, top_k)
 
-            search_kwargs: dict[str, Any] = {
-                "namespace": namespace,
-                "query": SearchQuery(**query_kwargs),
+    async def _query_index(
+        self,
+        index: Any,
+        query: str,
+        top_k: int,
+        filter_dict: dict[str, Any] | None,
+        namespace: str,
+        use_rerank: bool,
+        threshold: float,
+    ) -> list[dict[str, Any]]:
+        """One Pinecone search (integrated embedding + optional rerank). Raises on failure."""
+        # Over-fetch candidates when reranking so the cross-encoder has a
+        # meaningful pool to re-order; otherwise fetch exactly top_k.
+        fetch_k = top_k * max(1, settings.RAG_RERANK_OVERFETCH) if use_rerank else top_k
+        query_kwargs: dict[str, Any] = {
+            "inputs": {"text": query},
+            "top_k": fetch_k,
+        }
+        if filter_dict:
+            query_kwargs["filter"] = filter_dict
+
+        search_kwargs: dict[str, Any] = {
+            "namespace": namespace,
+            "query": SearchQuery(**query_kwargs),
+        }
+        if use_rerank:
+            # Pinecone hosted reranker expects a plain dict (the SearchRerank
+            # object is not JSON-serializable by the data-plane client).
+            search_kwargs["rerank"] = {
+                "model": settings.RAG_RERANK_MODEL,
+                "rank_fields": ["chunk_text"],
+                "top_n": top_k,
             }
-            if use_rerank:
-                # Pinecone hosted reranker expects a plain dict (the SearchRerank
-                # object is not JSON-serializable by the data-plane client).
-                search_kwargs["rerank"] = {
-                    "model": settings.RAG_RERANK_MODEL,
-                    "rank_fields": ["chunk_text"],
-                    "top_n": top_k,
-                }
-
-            # Pinecone SDK call is synchronous → offload to a thread so it
-            # never blocks the asyncio event loop (e.g. concurrent chat streams).
+
+        # Pinecone SDK call is synchronous → offload to a thread so it
+        # never blocks the asyncio event loop (e.g. concurrent chat streams).
+        started = time.perf_counter()
+        try:
             response = await asyncio.to_thread(
                 lambda: index.search(**search_kwargs)
             )
-
-            dict_resp = response.to_dict() if hasattr(response, 'to_dict') else (response or {})
-            hits = dict_resp.get("result", {}).get("hits", []) or dict_resp.get("matches", [])
-
-            results = []
-            for match in hits:
-                record = match.get("fields", match.get("metadata", {})) or {}
-                # SDK to_dict() emits 'score_'/'id_'; raw/MCP forms use '_score'/'_id'.
-                score = (
-                    match.get("score_")
-                    or match.get("_score")
-                    or match.get("score")
-                    or 0.0
-                )
-                rec_id = (
-                    match.get("id_")
-                    or match.get("_id")
-                    or match.get("id")
-                    or record.get("_id")
-                )
-                if threshold and score < threshold:
-                    continue
-                results.append({
-                    "id": rec_id,
-                    "score": score,
-                    "metadata": record,
-                })
-            return results
-        except Exception as e:
-            logger.error(f"Failed to search Pinecone: {e}", exc_info=True)
-            return []
+        finally:
+            # Failed and cancelled (deadline) calls count too, so a namespace
+            # that errors or stalls raises its p95 instead of vanishing from it.
+            self._latency[namespace].append(time.perf_counter() - started)
+
+        dict_resp = response.to_dict() if hasattr(response, 'to_dict') else (response or {})
+        hits = dict_resp.get("result", {}).get("hits", []) or dict_resp.get("matches", [])
+
+        results = []
+        for match in hits:
+            record = match.get("fields", match.get("metadata", {})) or {}
+            # SDK to_dict() emits 'score_'/'id_'; raw/MCP forms use '_score'/'_id'.
+            score = (
+                match.get("score_")
+                or match.get("_score")
+                or match.get("score")
+                or 0.0
+            )
+            rec_id = (
+                match.get("id_")
+                or match.get("_id")
+                or match.get("id")
+                or record.get("_id")
+            )
+            if threshold and score < threshold:
+                continue
+            results.append({
+                "id": rec_id,
+                "score": score,
+                "metadata": record,
+            })
+        return results
 
     async def search_multi_namespace(
         self,
@@ -166,39 +323,110 @@ class RAGService:
         namespaces: list[str] | None = None,
         top_k: int = 5,
         filter_dict: dict[str, Any] | None = None,
-    ) -> list[dict[str, Any]]:
+    ) -> "MultiNamespaceResults":
         """
-        Search across multiple namespaces and merge results by score.
+        Search several namespaces concurrently and fuse the rankings.
         Useful when the agent needs both pricing and regulatory info.
 
+        Each namespace gets its own deadline (RAG_NAMESPACE_TIMEOUT_SECONDS);
+        a namespace that misses it is left out and listed in `timed_out`, so
+        the caller still gets the namespaces that answered. With
+        RAG_HEDGE_ENABLED, a namespace that is slower than its observed p95
+        gets one duplicate request and the first answer wins.
+
+        Cosine and rerank scores are not comparable across namespaces, so
+        the lists are merged by reciprocal-rank fusion (RAG_RRF_K); each hit
+        keeps its original `score` and gains `fused_score`.
+
         Args:
             query: Natural language query.
             namespaces: List of namespaces to search. Defaults to all.
-            top_k: Results per namespace.
+            top_k: Results per namespace, and size of the fused list.
             filter_dict: Optional metadata filter.
 
         Returns:
-            Merged results sorted by score (descending).
+            Fused results (best first), each tagged with its `namespace`.
         """
         if namespaces is None:
             namespaces = [NAMESPACE_PREZZARIO, NAMESPACE_NORMATIVE]
-
-        all_results: list[dict[str, Any]] = []
-        for ns in namespaces:
-            ns_results = await self.search(
-                query=query,
-                top_k=top_k,
-                filter_dict=filter_dict,
-                namespace=ns,
+        timeout = settings.RAG_NAMESPACE_TIMEOUT_SECONDS
+
+        async def one(ns: str) -> list[dict[str, Any]] | None:
+            try:
+                return await asyncio.wait_for(self._search_hedged(query, top_k, filter_dict, ns), timeout)
+            except TimeoutError:
+                logger.warning(f"RAGService: namespace '{ns}' missed its {timeout:.1f}s deadline — partial results.")
+                return None
+
+        per_namespace = await asyncio.gather(*(one(ns) for ns in namespaces))
+        ranked = {ns: hits for ns, hits in zip(namespaces, per_namespace, strict=True) if hits is not None}
+        timed_out = [ns for ns, hits in zip(namespaces, per_namespace, strict=True) if hits is None]
+        fused = reciprocal_rank_fusion(ranked, k=settings.RAG_RRF_K)
+        return MultiNamespaceResults(fused[:top_k], timed_out=timed_out)
+
+    async def _search_hedged(
+        self,
+        query: str,
+        top_k: int,
+        filter_dict: dict[str, Any] | None,
+        namespace: str,
+    ) -> list[dict[str, Any]]:
+        """`search`, plus one uncached duplicate if the first attempt outlives the namespace p95."""
+        primary = asyncio.ensure_future(
+            self.search(query=query, top_k=top_k, filter_dict=filter_dict, namespace=namespace)
+        )
+        delay = self._hedge_delay(namespace)
+        if delay is None or self.index is None:
+            return await primary
+        index = self.index
+        hedge: asyncio.Future | None = None
+        try:
+            done, _ = await asyncio.wait({primary}, timeout=delay)
+            if done:
+                return primary.result()
+            logger.info(f"RAGService: hedging '{namespace}' search after {delay * 1000:.0f} ms (p95).")
+            hedge = asyncio.ensure_future(self._hedge_attempt(index, query, top_k, filter_dict, namespace))
+            done, _ = await asyncio.wait({primary, hedge}, return_when=asyncio.FIRST_COMPLETED)
+            if primary in done or hedge.exception() is not None:
+                return await primary  # a failed hedge falls back to the primary
+            return hedge.result()
+        finally:
+            primary.cancel()
+            if hedge is not None:
+                hedge.cancel()
+                if hedge.done() and not hedge.cancelled():
+                    hedge.exception()  # a failed hedge is expected; don't log it as unretrieved
+
+    async def _hedge_attempt(
+        self,
+        index: Any,
+        query: str,
+        top_k: int,
+        filter_dict: dict[str, Any] | None,
+        namespace: str,
+    ) -> list[dict[str, Any]]:
+        """The hedge: `search` without its cache and fallback, so its hits have the primary's shape. Raises on failure."""
+        bm25 = _start_hybrid_bm25(get_lexical_index(namespace), query, top_k, filter_dict)
+        try:
+            # Straight to the index: through the cache it would just join the primary's flight.
+            dense = await self._query_index(
+                index, query, top_k, filter_dict, namespace,
+                settings.RAG_RERANK_ENABLED, settings.RAG_MIN_SCORE,
             )
-            # Tag each result with its namespace for traceability
-            for r in ns_results:
-                r["namespace"] = ns
-            all_results.extend(ns_results)
-
-        # Sort by relevance score (descending) and take top_k
-        all_results.sort(key=lambda x: x.get("score", 0.0), reverse=True)
-        return all_results[:top_k]
+        except BaseException:
+            if bm25 is not None:
+                bm25.cancel()
+            raise
+        return await _fuse_hybrid(dense, bm25, top_k)
+
+    def _hedge_delay(self, namespace: str) -> float | None:
+        """Observed p95 Pinecone latency for `namespace`, once there are enough samples."""
+        if not settings.RAG_HEDGE_ENABLED:
+            return None
+        samples = self._latency.get(namespace)
+        if not samples or len(samples) < _HEDGE_MIN_SAMPLES:
+            return None
+        return statistics.quantiles(samples, n=20)[-1]
 
     # ── Upsert ────────────────────────────────────────────────────────────────
 
@@ -206,6 +434,8 @@ class RAGService:
         self,
         chunks: list[dict[str, Any]],
         namespace: str = NAMESPACE_NORMATIVE,
+        checkpoint_path: str | Path | None = None,
+        manifest: IndexManifest | None = None,
     ) -> bool:
         """
         Takes a list of document chunks and upserts them using Integrated Inference.
@@ -214,46 +444,124 @@ class RAGService:
             - 'text': The text content (will be mapped to 'chunk_text' for Pinecone field_map)
 
         Optional fields are stored as metadata alongside the embedding.
+
+        Batches are paced by a token bucket (RAG_UPSERT_TOKENS_PER_MINUTE), run
+        up to RAG_UPSERT_CONCURRENCY at a time and back off on 429s; see
+        src/services/bulk_upsert.py. With `checkpoint_path`, finished batches
+        are recorded there and a re-run with the same chunks resumes. With
+        `manifest`, the upserted ids and content hashes are recorded and saved
+        on success (see sync_documents).
         """
         if not self.index:
             logger.error("RAGService not fully initialized. Cannot upsert.")
             return False
+        records = self.build_records(chunks)
+        if not await self._upsert_records(records, namespace, checkpoint_path):
+            return False
+        if manifest is not None:
+            manifest.record(records)
+            manifest.save()
+        return True
+
+    async def sync_documents(
+        self,
+        chunks: list[dict[str, Any]],
+        namespace: str,
+        manifest: IndexManifest,
+        checkpoint_path: str | Path | None = None,
+    ) -> ManifestDiff | None:
+        """
+        Incremental re-index: make `namespace` hold exactly `chunks`, touching only what changed.
+
+        `chunks` must be the complete, current document set. Records whose
+        content hash differs from the manifest (or that are new) are upserted,
+        ids in the manifest but not in `chunks` are deleted, the rest is left
+        alone. A manifest that does not exist yet is bootstrapped from the
+        `content_hash` metadata already in the index. The manifest is saved
+        after each step, so a failed sync is simply re-run.
 
+        Returns the applied diff, or None on failure.
+        """
+        if not self.index:
+            logger.error("RAGService not fully initialized. Cannot sync.")
+            return None
+        if not manifest.exists:
+            logger.info(f"No manifest for '{namespace}' — rebuilding it from the index")
+            try:
+                manifest.entries = await asyncio.to_thread(self.fetch_content_hashes, namespace)
+            except Exception as e:
+                logger.error(f"Failed to read content hashes from '{namespace}': {e}", exc_info=True)
+                return None
+
+        diff = manifest.diff(self.build_records(chunks))
+        logger.info(f"Sync '{namespace}': {diff}")
+        if diff.upsert:
+            if not await self._upsert_records(diff.upsert, namespace, checkpoint_path):
+                return None
+            manifest.record(diff.upsert)
+            manifest.save()
+        if diff.delete:
+            if not await self.delete_ids(namespace, diff.delete):
+                return None
+            manifest.forget(diff.delete)
+        manifest.save()
+        return diff
+
+    def build_records(self, chunks: list[dict[str, Any]]) -> list[dict[str, Any]]:
+        """Chunks → index records: deterministic `_id`, `chunk_text`, metadata and its `content_hash`."""
         records = []
         for chunk in chunks:
             record = chunk.copy()
-            # Use deterministic ID if 'codice' is present (idempotent for prezzario)
+            # Deterministic IDs keep re-ingestion idempotent (and resumable):
+            # by article code for prezzario, by text for everything else.
             if "codice" in record:
                 record["_id"] = self._deterministic_id(record["codice"])
             else:
-                record["_id"] = str(uuid.uuid4())
+                record["_id"] = self._deterministic_id(chunk.get("text", ""))
 
             # Map 'text' → 'chunk_text' for Pinecone Integrated Inference field_map
             record["chunk_text"] = chunk.get("text", "")
             if "text" in record:
                 del record["text"]
+            record[CONTENT_HASH_FIELD] = content_hash(record)
             records.append(record)
+        return records
 
+    async def _upsert_records(
+        self,
+        records: list[dict[str, Any]],
+        namespace: str,
+        checkpoint_path: str | Path | None = None,
+    ) -> bool:
+        index = self.index
+        if index is None:
+            logger.error("RAGService not fully initialized. Cannot upsert.")
+            return False
+        # The local backend rewrites its files per call and has no rate limit:
+        # one batch, no throttling.
+        local = isinstance(index, LocalVectorBackend)
+        upserter = BulkUpserter(
+            send=lambda batch: asyncio.to_thread(index.upsert_records, namespace=namespace, records=batch),
+            tokens_per_minute=None if local else settings.RAG_UPSERT_TOKENS_PER_MINUTE,
+            concurrency=1 if local else settings.RAG_UPSERT_CONCURRENCY,
+            max_retries=settings.RAG_UPSERT_MAX_RETRIES,
+            checkpoint=UpsertCheckpoint(checkpoint_path, namespace, records) if checkpoint_path else None,
+            label=namespace,
+        )
         try:
-            batch_size = 50
-            total_batches = (len(records) + batch_size - 1) // batch_size
-            for i in range(0, len(records), batch_size):
-                batch = records[i:i + batch_size]
-                batch_num = i // batch_size + 1
-                logger.info(f"Upserting batch {batch_num}/{total_batches} ({len(batch)} records)...")
-                # Sync SDK call → offload to a thread to avoid blocking the event loop.
-                await asyncio.to_thread(
-                    self.index.upsert_records, namespace=namespace, records=batch
-                )
-                if i + batch_size < len(records):
-                    # Async sleep: respects the 250k TPM rate limit for
-                    # multilingual-e5-large WITHOUT freezing the event loop.
-                    await asyncio.sleep(8)
-            logger.info(f"Successfully upserted {len(records)} chunks to Pinecone in namespace '{namespace}'.")
+            report = await upserter.run(records, max(len(records), 1) if local else settings.RAG_UPSERT_BATCH_SIZE)
+            logger.info(
+                f"Successfully upserted {report.records} chunks in namespace '{namespace}' "
+                f"({report.skipped} already done, {report.retries} retries, "
+                f"{report.seconds:.1f}s, {report.records_per_second:.1f} rec/s)."
+            )
             return True
         except Exception as e:
             logger.error(f"Failed to upsert to Pinecone: {e}", exc_info=True)
             return False
+        finally:
+            # Earlier batches may have landed even if a later one failed.
+            self.cache.invalidate(namespace)
 
     # ── Namespace Management ──────────────────────────────────────────────────
 
@@ -274,6 +582,68 @@ class RAGService:
                 return True
             logger.error(f"Failed to wipe namespace {namespace}: {e}")
             return False
+        finally:
+            # After the delete: a search racing it must not re-fill the cache with pre-wipe hits.
+            self.cache.invalidate(namespace)
+
+    async def delete_ids(self, namespace: str, ids: list[str]) -> bool:
+        """Delete specific records by id (in batches of _DELETE_BATCH_SIZE)."""
+        if not self.index:
+            logger.error("RAGService: Pinecone index not initialized. Cannot delete records.")
+            return False
+        try:
+            for start in range(0, len(ids), _DELETE_BATCH_SIZE):
+                batch = ids[start:start + _DELETE_BATCH_SIZE]
+                await asyncio.to_thread(self.index.delete, ids=batch, namespace=namespace)
+            logger.info(f"Deleted {len(ids)} records from namespace '{namespace}'.")
+            return True
+        except Exception as e:
+            logger.error(f"Failed to delete records from {namespace}: {e}", exc_info=True)
+            return False
+        finally:
+            self.cache.invalidate(namespace)
+
+    def fetch_content_hashes(self, namespace: str) -> dict[str, str]:
+        """id → `content_hash` metadata of every record in `namespace` (blocking; list + fetch).
+
+        Records upserted before the hash was stored map to "", so a sync re-upserts them once.
+        """
+        index = self.index
+        if index is None:
+            raise RuntimeError("RAGService not fully initialized. Cannot list records.")
+        hashes: dict[str, str] = {}
+        for page in index.list(namespace=namespace, limit=_LIST_PAGE_SIZE):
+            ids = [item.id for item in page.vectors]
+            fetched = index.fetch(ids=ids, namespace=namespace)
+            for rec_id, vector in fetched.vectors.items():
+                hashes[rec_id] = (vector.metadata or {}).get(CONTENT_HASH_FIELD, "")
+        return hashes
+
+    async def wait_for_namespace(
+        self,
+        namespace: str,
+        condition: Callable[[int], bool],
+        timeout: float = 30.0,
+        interval: float = 0.5,
+    ) -> bool:
+        """Poll the index stats until `condition(vector_count)` holds (Pinecone is eventually consistent).
+
+        Returns False on timeout or when stats are unavailable.
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            stats = await asyncio.to_thread(self.get_stats)
+            if stats is None:
+                return False
+            if condition(stats["namespaces"].get(namespace, 0)):
+                return True
+            if time.monotonic() >= deadline:
+                return False
+            await asyncio.sleep(interval)
+
+    def cache_stats(self) -> dict[str, int | float]:
+        """Hit/miss counters of the search query cache."""
+        return self.cache.stats()
 
     def get_stats(self) -> dict[str, Any] | None:
         """Returns index statistics (namespaces, vector counts)."""
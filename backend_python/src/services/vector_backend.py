@@ -0,0 +1,434 @@
+"""
+Vector backends for RAGService.
+
+RAGService talks to its vector index through the small surface of Pinecone's
+`Index` it actually uses — `search`, `upsert_records`, `delete`,
+`describe_index_stats`, and `list` + `fetch` for the content-hash sync —
+written down here as the `VectorBackend` protocol,
+with the SDK's keyword-only signatures. Pinecone's `Index` (REST or gRPC)
+satisfies it as-is; `LocalVectorBackend` is an in-process implementation for
+dev, CI and disaster recovery (RAG_VECTOR_BACKEND="local").
+
+LocalVectorBackend, one directory per namespace holding immutable versions:
+
+    CURRENT              name of the live version directory
+    <version>/
+      vectors.npy        float32 [n, dim], L2-normalized — or int8 [n, dim] with
+      scales.npy         float32 [n] per-row dequantization scales (RAG_LOCAL_QUANTIZE)
+      records.json       [{"_id": ..., <metadata>..., "chunk_text": ...}, ...]
+
+A write builds a new version directory and then swaps CURRENT with one
+`os.replace`, so a reader — in this process or another — always opens a
+matching set of files. The previous version is kept for readers that resolved
+CURRENT just before the swap; older ones are removed.
+
+Vectors are opened with `np.load(mmap_mode="r")`, so a namespace costs page
+cache rather than heap and is shared between worker processes. A search is a
+brute-force cosine scan: block-wise matmul of the query batch against the
+matrix, then `argpartition` for the top k. Metadata filters (`$eq`, `$in`,
+bare values) are evaluated on dictionary-encoded columns (one int32 code per
+record and field), so a filter is a vectorized mask, never a Python loop.
+`scripts/bench_vector_backend.py` measures where brute force stops being
+viable.
+
+The embedder is pluggable (RAG_LOCAL_EMBEDDER): "genai" embeds with Gemini
+through the shared client registry; "hashing" is a deterministic feature-
+hashing embedder with no network, for tests and offline runs. Vectors built
+with one embedder are meaningless to the other — rebuild when switching.
+"""
+import hashlib
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+from collections.abc import Iterator, Mapping, Sequence
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Protocol
+
+import numpy as np
+
+from src.core.config import settings
+from src.services.lexical_index import tokenize
+
+logger = logging.getLogger(__name__)
+
+EMBED_MODEL = "gemini-embedding-001"
+_DEFAULT_DIR = Path(__file__).resolve().parents[2] / "data" / "vectors"
+_SCAN_BLOCK = 65_536  # rows per matmul block: bounds the int8→float32 temporary
+_EMBED_BATCH = 100  # texts per embed_content call
+_CURRENT = "CURRENT"
+
+
+class VectorBackend(Protocol):
+    """The part of Pinecone's `Index` that RAGService uses (always called with keywords)."""
+
+    def search(self, *, namespace: str, query: Any, rerank: Mapping[str, Any] | None = None) -> Any: ...
+
+    def upsert_records(self, *, records: list[dict[str, Any]], namespace: str) -> Any: ...
+
+    def delete(self, *, ids: Sequence[str] | None = None, delete_all: bool = False, namespace: str = "") -> Any: ...
+
+    def describe_index_stats(self) -> Any: ...
+
+    # Last: in a class body, `list` shadows the builtin for the annotations below it.
+    def list(self, *, limit: int | None = None, namespace: str = "") -> Iterator[Any]:
+        """Pages of ids: each page's `.vectors` holds items with an `.id`."""
+        ...
+
+    def fetch(self, *, ids: Sequence[str], namespace: str = "") -> Any:
+        """`.vectors`: id → item with `.metadata`, for the ids that exist."""
+        ...
+
+
+# ── Embedders ─────────────────────────────────────────────────────────────────
+
+
+class Embedder(Protocol):
+    dim: int
+
+    def embed(self, texts: list[str], *, query: bool = False) -> np.ndarray:
+        """float32 [len(texts), dim], rows L2-normalized."""
+        ...
+
+
+class HashingEmbedder:
+    """Deterministic bag-of-terms feature hashing (signed), on the BM25 tokenizer's terms.
+
+    No network and no model: similar texts share terms, so share dimensions.
+    Good enough for tests and offline smoke runs, not for semantic quality.
+    """
+
+    def __init__(self, dim: int = 256):
+        self.dim = dim
+
+    def embed(self, texts: list[str], *, query: bool = False) -> np.ndarray:
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for term in tokenize(text):
+                digest = int.from_bytes(hashlib.blake2b(term.encode(), digest_size=8).digest(), "little")
+                out[row, digest % self.dim] += 1.0 if digest >> 63 else -1.0
+        return _normalize(out)
+
+
+class GenAIEmbedder:
+    """Gemini embeddings through the shared google-genai client."""
+
+    def __init__(self, model: str = EMBED_MODEL, dim: int = 768):
+        self.model = model
+        self.dim = dim
+
+    def embed(self, texts: list[str], *, query: bool = False) -> np.ndarray:
+        from google.genai import types
+
+        from src.utils.genai_client import get_genai_client, track_genai_call
+
+        client = get_genai_client()
+        config = types.EmbedContentConfig(
+            task_type="RETRIEVAL_QUERY" if query else "RETRIEVAL_DOCUMENT",
+            output_dimensionality=self.dim,
+        )
+        rows: list[list[float]] = []
+        for start in range(0, len(texts), _EMBED_BATCH):
+            batch: list[types.ContentUnion] = [*texts[start:start + _EMBED_BATCH]]
+            with track_genai_call(self.model):
+                response = client.models.embed_content(model=self.model, contents=batch, config=config)
+            for embedding in response.embeddings or []:
+                if embedding.values is None:
+                    raise ValueError(f"{self.model} returned an embedding without values")
+                rows.append(embedding.values)
+        return _normalize(np.asarray(rows, dtype=np.float32).reshape(len(texts), self.dim))
+
+
+def build_embedder(name: str | None = None) -> Embedder:
+    name = (name or settings.RAG_LOCAL_EMBEDDER).lower()
+    if name == "hashing":
+        return HashingEmbedder()
+    if name == "genai":
+        return GenAIEmbedder()
+    raise ValueError(f"Unknown RAG_LOCAL_EMBEDDER {name!r} (expected 'genai' or 'hashing')")
+
+
+def _normalize(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.where(norms == 0, 1.0, norms)
+
+
+# ── Local backend ─────────────────────────────────────────────────────────────
+
+
+class _Namespace:
+    """Vectors (memory-mapped) plus records and dictionary-encoded metadata columns."""
+
+    def __init__(self, vectors: np.ndarray, scales: np.ndarray | None, records: list[dict[str, Any]]):
+        self.vectors = vectors
+        self.scales = scales
+        self.records = records
+        self.row_of = {rec["_id"]: row for row, rec in enumerate(records)}
+        self._columns: dict[str, tuple[np.ndarray, dict[Any, int]]] = {}
+
+    def column(self, field: str) -> tuple[np.ndarray, dict[Any, int]]:
+        """int32 code per record (-1 = missing/unhashable) and the value → code vocabulary."""
+        cached = self._columns.get(field)
+        if cached is None:
+            vocab: dict[Any, int] = {}
+            codes = np.full(len(self.records), -1, dtype=np.int32)
+            for row, rec in enumerate(self.records):
+                value = rec.get(field)
+                if value is None or isinstance(value, (list, dict)):
+                    continue
+                codes[row] = vocab.setdefault(value, len(vocab))
+            cached = self._columns[field] = (codes, vocab)
+        return cached
+
+    def mask(self, filter_dict: dict[str, Any]) -> np.ndarray:
+        keep = np.ones(len(self.records), dtype=bool)
+        for field, condition in filter_dict.items():
+            codes, vocab = self.column(field)
+            if not isinstance(condition, dict):
+                condition = {"$eq": condition}
+            for op, operand in condition.items():
+                if op == "$eq":
+                    keep &= codes == vocab.get(operand, -2)
+                elif op == "$in":
+                    keep &= np.isin(codes, [vocab[v] for v in operand if v in vocab])
+                else:
+                    raise ValueError(f"Unsupported filter operator {op!r} (local backend handles $eq, $in)")
+        return keep
+
+    def top_k(self, queries: np.ndarray, k: int, mask: np.ndarray | None = None) -> tuple[np.ndarray, np.ndarray]:
+        """Best `k` rows per query: (rows [q, k'], scores [q, k']) best first; k' ≤ k."""
+        rows = np.flatnonzero(mask) if mask is not None else None
+        n = len(rows) if rows is not None else len(self.records)
+        k = min(k, n)
+        if k == 0:
+            return np.empty((len(queries), 0), dtype=np.int64), np.empty((len(queries), 0), dtype=np.float32)
+
+        scores = np.empty((len(queries), n), dtype=np.float32)
+        for start in range(0, n, _SCAN_BLOCK):
+            stop = min(start + _SCAN_BLOCK, n)
+            sel = rows[start:stop] if rows is not None else slice(start, stop)
+            block = np.asarray(self.vectors[sel], dtype=np.float32)
+            part = queries @ block.T
+            if self.scales is not None:
+                part *= self.scales[sel]
+            scores[:, start:stop] = part
+
+        best = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        best_scores = np.take_along_axis(scores, best, axis=1)
+        order = np.argsort(-best_scores, axis=1)
+        best = np.take_along_axis(best, order, axis=1)
+        best_scores = np.take_along_axis(best_scores, order, axis=1)
+        if rows is not None:
+            best = rows[best]
+        return best, best_scores
+
+
+class LocalVectorBackend:
+    """Brute-force cosine search over memory-mapped `.npy` vectors (see module docstring)."""
+
+    def __init__(self, root: str | Path, embedder: Embedder, quantize: bool = False):
+        self.root = Path(root)
+        self.embedder = embedder
+        self.quantize = quantize
+        self._namespaces: dict[str, _Namespace] = {}
+        self._lock = threading.Lock()  # writers; searches read an immutable snapshot
+
+    # ── VectorBackend ─────────────────────────────────────────────────────────
+
+    def search(self, namespace: str, query: Any, rerank: Mapping[str, Any] | None = None) -> dict[str, Any]:
+        """Pinecone-shaped response for a SearchQuery(inputs={"text": ...}, top_k, filter).
+
+        `rerank` has no local model; only its `top_n` is honoured.
+        """
+        ns = self._load(namespace)
+        top_k = query.top_k
+        if rerank and rerank.get("top_n"):
+            top_k = min(top_k, rerank["top_n"])
+        if ns is None or not ns.records:
+            return {"result": {"hits": []}}
+        mask = ns.mask(query.filter) if getattr(query, "filter", None) else None
+        vector = self.embedder.embed([query.inputs["text"]], query=True)
+        rows, scores = ns.top_k(vector, top_k, mask)
+        hits = []
+        for row, score in zip(rows[0], scores[0], strict=True):
+            record = ns.records[row]
+            hits.append({
+                "_id": record["_id"],
+                "_score": float(score),
+                "fields": {k: v for k, v in record.items() if k != "_id"},
+            })
+        return {"result": {"hits": hits}}
+
+    def upsert_records(self, namespace: str, records: list[dict[str, Any]]) -> None:
+        """Insert or replace records by `_id`, embedding their `chunk_text`; persisted atomically."""
+        if not records:
+            return
+        new_vectors = self.embedder.embed([r.get("chunk_text", "") for r in records])
+        with self._lock:
+            current = self._load(namespace)
+            if current is None or not current.records:
+                merged_records: list[dict[str, Any]] = []
+                merged_vectors = np.empty((0, self.embedder.dim), dtype=np.float32)
+            else:
+                merged_records = list(current.records)
+                merged_vectors = self._dequantize(current)
+            row_of = {rec["_id"]: row for row, rec in enumerate(merged_records)}
+            appended = []
+            for record, vector in zip(records, new_vectors, strict=True):
+                row = row_of.get(record["_id"])
+                if row is None:
+                    row_of[record["_id"]] = len(merged_records)
+                    merged_records.append(dict(record))
+                    appended.append(vector)
+                else:
+                    merged_records[row] = dict(record)
+                    merged_vectors[row] = vector
+            if appended:
+                merged_vectors = np.vstack([merged_vectors, np.asarray(appended, dtype=np.float32)])
+            self._write(namespace, merged_vectors, merged_records)
+            self._namespaces.pop(namespace, None)
+
+    def delete(self, ids: Sequence[str] | None = None, delete_all: bool = False, namespace: str = "") -> None:
+        """Drop the given ids, or the whole namespace with `delete_all=True`."""
+        if not namespace or not (delete_all or ids is not None):
+            raise ValueError("LocalVectorBackend.delete needs a namespace and either ids or delete_all=True")
+        with self._lock:
+            if delete_all:
+                directory = self.root / namespace
+                (directory / _CURRENT).unlink(missing_ok=True)
+                self._prune(directory, keep=())
+                self._namespaces.pop(namespace, None)
+                return
+            current = self._load(namespace)
+            if current is None or not ids:
+                return
+            drop = set(ids)
+            keep = [row for row, rec in enumerate(current.records) if rec["_id"] not in drop]
+            if len(keep) == len(current.records):
+                return
+            vectors = self._dequantize(current)[keep]
+            self._write(namespace, vectors, [current.records[row] for row in keep])
+            self._namespaces.pop(namespace, None)
+
+    def records(self, namespace: str) -> list[dict[str, Any]]:
+        """Stored records (id, text and metadata) of a namespace, in row order."""
+        with self._lock:
+            current = self._load(namespace)
+            return list(current.records) if current is not None else []
+
+    def describe_index_stats(self) -> SimpleNamespace:
+        counts = {}
+        if self.root.is_dir():
+            for directory in sorted(p for p in self.root.iterdir() if (p / _CURRENT).exists()):
+                ns = self._load(directory.name)
+                counts[directory.name] = SimpleNamespace(vector_count=len(ns.records) if ns else 0)
+        return SimpleNamespace(
+            total_vector_count=sum(c.vector_count for c in counts.values()),
+            dimension=self.embedder.dim,
+            namespaces=counts,
+        )
+
+    # ── Direct access (benchmarks, batch jobs) ────────────────────────────────
+
+    def query_vectors(
+        self,
+        namespace: str,
+        vectors: np.ndarray,
+        top_k: int,
+        filter_dict: dict[str, Any] | None = None,
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Top-k rows and scores for a batch of already-embedded, normalized queries."""
+        ns = self._load(namespace)
+        if ns is None:
+            raise KeyError(namespace)
+        return ns.top_k(np.asarray(vectors, dtype=np.float32), top_k, ns.mask(filter_dict) if filter_dict else None)
+
+    # ── Storage ───────────────────────────────────────────────────────────────
+
+    def _live_version(self, namespace: str) -> Path | None:
+        directory = self.root / namespace
+        try:
+            return directory / (directory / _CURRENT).read_text(encoding="utf-8").strip()
+        except FileNotFoundError:
+            return None
+
+    def _load(self, namespace: str) -> _Namespace | None:
+        ns = self._namespaces.get(namespace)
+        if ns is not None:
+            return ns
+        directory = self._live_version(namespace)
+        if directory is None:
+            return None
+        records = json.loads((directory / "records.json").read_text(encoding="utf-8"))
+        vectors = np.load(directory / "vectors.npy", mmap_mode="r")
+        scales_path = directory / "scales.npy"
+        scales = np.load(scales_path) if vectors.dtype == np.int8 and scales_path.exists() else None
+        if len(vectors) != len(records):
+            raise ValueError(f"{directory}: {len(vectors)} vectors for {len(records)} records — rebuild the namespace")
+        ns = self._namespaces[namespace] = _Namespace(vectors, scales, records)
+        return ns
+
+    @staticmethod
+    def _dequantize(ns: _Namespace) -> np.ndarray:
+        vectors = np.array(ns.vectors, dtype=np.float32)
+        if ns.scales is not None:
+            vectors *= ns.scales[:, None]
+        return vectors
+
+    def _write(self, namespace: str, vectors: np.ndarray, records: list[dict[str, Any]]) -> None:
+        """Write a new version of the namespace and make it live (see module docstring)."""
+        directory = self.root / namespace
+        previous = self._live_version(namespace)
+        version = directory / f"v{time.time_ns()}-{os.getpid()}"
+        version.mkdir(parents=True)
+        if self.quantize:
+            scales = np.abs(vectors).max(axis=1) / 127.0
+            scales[scales == 0] = 1.0
+            np.save(version / "scales.npy", scales.astype(np.float32))
+            np.save(version / "vectors.npy", np.round(vectors / scales[:, None]).astype(np.int8))
+        else:
+            np.save(version / "vectors.npy", vectors.astype(np.float32))
+        (version / "records.json").write_text(json.dumps(records, ensure_ascii=False), encoding="utf-8")
+        tmp = directory / f"{_CURRENT}.tmp"
+        tmp.write_text(version.name, encoding="utf-8")
+        os.replace(tmp, directory / _CURRENT)
+        self._prune(directory, keep=(version, previous))
+
+    @staticmethod
+    def _prune(directory: Path, keep: tuple[Path | None, ...]) -> None:
+        """Remove version directories not in `keep` (open memory maps keep their inodes)."""
+        if not directory.is_dir():
+            return
+        for path in directory.iterdir():
+            if path.is_dir() and path not in keep:
+                shutil.rmtree(path, ignore_errors=True)
+
+    # ── Listing (VectorBackend; last, since `list` shadows the builtin here) ───
+
+    def list(self, *, prefix: str | None = None, limit: int | None = None, namespace: str = "") -> Iterator[Any]:
+        """Pinecone-shaped id pages of at most `limit` ids, in row order."""
+        ids = [rec["_id"] for rec in self.records(namespace) if prefix is None or rec["_id"].startswith(prefix)]
+        size = limit or 100
+        for start in range(0, len(ids), size):
+            yield SimpleNamespace(vectors=[SimpleNamespace(id=rec_id) for rec_id in ids[start:start + size]])
+
+    def fetch(self, *, ids: Sequence[str], namespace: str = "") -> SimpleNamespace:
+        """Pinecone-shaped fetch: `.vectors` maps each stored id to its metadata (no values)."""
+        ns = self._load(namespace)
+        vectors: dict[str, SimpleNamespace] = {}
+        if ns is None:
+            return SimpleNamespace(namespace=namespace, vectors=vectors)
+        for rec_id in ids:
+            row = ns.row_of.get(rec_id)
+            if row is not None:
+                metadata = {k: v for k, v in ns.records[row].items() if k != "_id"}
+                vectors[rec_id] = SimpleNamespace(id=rec_id, metadata=metadata)
+        return SimpleNamespace(namespace=namespace, vectors=vectors)
+
+
+def build_local_backend() -> LocalVectorBackend:
+    root = Path(settings.RAG_LOCAL_VECTOR_DIR) if settings.RAG_LOCAL_VECTOR_DIR else _DEFAULT_DIR
+    return LocalVectorBackend(root, build_embedder(), quantize=settings.RAG_LOCAL_QUANTIZE)
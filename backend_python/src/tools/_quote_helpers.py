@@ -27,8 +27,7 @@ def build_chat_summary(history: list[dict[str, Any]], limit_chars: int = 500) ->
 
 def validate_sku_suggestions(suggestions: list[Any]) -> list[str]:
     """Verifies that suggested SKUs exist in the Price Book. Returns unknown SKUs."""
-    price_book = PricingService.load_price_book()
-    valid_skus = {i["sku"] for i in price_book}
+    valid_skus = PricingService.snapshot().by_sku
 
     unknown_skus = []
     for s in suggestions:
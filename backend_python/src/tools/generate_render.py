@@ -7,6 +7,7 @@ from src.api.gemini_imagen import generate_image_i2i, generate_image_t2i
 from src.db.messages import save_file_metadata
 from src.storage.upload import upload_base64_image as _upload_base64_image_sync
 from src.utils.download import download_image_smart
+from src.utils.media_cache import get_media_cache
 from src.vision.triage import analyze_image_triage
 
 logger = logging.getLogger(__name__)
@@ -57,8 +58,14 @@ async def generate_render_wrapper(
 
         # MODE: MODIFICATION (I2I)
         if mode == "modification" and source_image_url:
-            # Download source image (Smart Download)
-            source_bytes, source_mime_type = await download_image_smart(source_image_url)
+            # Download source image (Smart Download) through the process-wide
+            # media cache. Smart Download reads Firebase objects with the Admin
+            # SDK, so its bytes live under the "admin" scope, apart from loaders
+            # whose URL credential storage checks.
+            source = await get_media_cache().get_or_load(
+                source_image_url, lambda: download_image_smart(source_image_url), scope="admin"
+            )
+            source_bytes, source_mime_type = source.data, source.mime_type
 
             # VALIDATION: Check if we got an actual image (not error XML/HTML)
             if not source_mime_type.startswith("image/"):
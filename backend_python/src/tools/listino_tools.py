@@ -6,12 +6,22 @@ the master price book holds composite "fornitura e posa" packages with a
 customer-friendly price RANGE. This tool answers quick "quanto costa X?"
 questions; the analytic prezzario stays the fallback for niche items and the
 detailed/formal quote.
+
+Matching runs on an inverted index built once per price-book snapshot
+(`_ListinoIndex`, rebuilt when the book is reloaded): each item's normalized,
+stemmed terms (shared Italian stemmer, so "finestre" finds "finestra") with
+BM25 weights, plus a trigram index over the vocabulary for typos ("finsetra").
+A query only touches the postings of its own terms, not the whole catalog.
 """
 import logging
+import math
 import re
 import unicodedata
+from collections import defaultdict
+from collections.abc import Sequence
 from typing import Any
 
+from src.services.lexical_index import stem
 from src.services.pricing_service import PricingService
 
 logger = logging.getLogger(__name__)
@@ -47,6 +57,124 @@ def _searchable(item: dict[str, Any]) -> str:
     return " ".join(parts)
 
 
+# ── Inverted index ────────────────────────────────────────────────────────────
+
+_BM25_K1 = 1.2
+_BM25_B = 0.75
+_FUZZY_WEIGHT = 0.5  # a typo-corrected term scores half an exact one
+_MIN_FUZZY_LEN = 4
+
+
+def _trigrams(term: str) -> set[str]:
+    padded = f"$${term}$"
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _within_distance(a: str, b: str, limit: int) -> bool:
+    """Optimal-string-alignment distance (edits + adjacent transpositions) of a and b is <= limit."""
+    if abs(len(a) - len(b)) > limit:
+        return False
+    prev2: list[int] = []
+    prev = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        cur = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = a[i - 1] != b[j - 1]
+            cur[j] = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                cur[j] = min(cur[j], prev2[j - 2] + 1)
+        if min(cur) > limit:
+            return False
+        prev2, prev = prev, cur
+    return prev[-1] <= limit
+
+
+class _ListinoIndex:
+    """BM25 inverted index over one price-book snapshot, with trigram fuzzy term lookup."""
+
+    def __init__(self, items: Sequence[dict[str, Any]]):
+        self.items = items
+        self.docs: list[dict[str, Any]] = []
+        self.postings: dict[str, list[tuple[int, int]]] = defaultdict(list)
+        lengths: list[int] = []
+        for item in items:
+            terms = [stem(t) for t in _normalize(_searchable(item))]
+            if not terms:
+                continue
+            doc = len(self.docs)
+            self.docs.append(item)
+            lengths.append(len(terms))
+            counts: dict[str, int] = {}
+            for term in terms:
+                counts[term] = counts.get(term, 0) + 1
+            for term, tf in counts.items():
+                self.postings[term].append((doc, tf))
+        self.postings = dict(self.postings)
+        avg_len = sum(lengths) / len(lengths) if lengths else 1.0
+        self.norm = [_BM25_K1 * (1 - _BM25_B + _BM25_B * n / avg_len) for n in lengths]
+        n_docs = len(self.docs)
+        self.idf = {
+            term: math.log(1 + (n_docs - len(p) + 0.5) / (len(p) + 0.5)) for term, p in self.postings.items()
+        }
+        self.by_trigram: dict[str, list[str]] = defaultdict(list)
+        for term in self.postings:
+            if len(term) >= _MIN_FUZZY_LEN:
+                for gram in _trigrams(term):
+                    self.by_trigram[gram].append(term)
+        self.by_trigram = dict(self.by_trigram)
+
+    def expand(self, term: str) -> list[tuple[str, float]]:
+        """Index terms standing for a query term: itself, else its near-spellings (weighted down)."""
+        if term in self.postings:
+            return [(term, 1.0)]
+        if len(term) < _MIN_FUZZY_LEN:
+            return []
+        limit = 1 if len(term) < 8 else 2
+        grams = _trigrams(term)
+        shared: dict[str, int] = {}
+        for gram in grams:
+            for candidate in self.by_trigram.get(gram, ()):
+                shared[candidate] = shared.get(candidate, 0) + 1
+        # Each edit breaks at most 3 trigrams: fewer shared ones cannot be within `limit`.
+        need = max(1, len(grams) - 3 * limit)
+        return [
+            (candidate, _FUZZY_WEIGHT)
+            for candidate, count in shared.items()
+            if count >= need and _within_distance(term, candidate, limit)
+        ]
+
+    def search(self, q_tokens: list[str]) -> list[tuple[int, float, dict[str, Any]]]:
+        """(matched query tokens, BM25 score, item) for every item matching at least one token."""
+        coverage: dict[int, int] = {}
+        scores: dict[int, float] = {}
+        expansions: dict[str, list[tuple[str, float]]] = {}
+        for token in q_tokens:
+            term = stem(token)
+            if term not in expansions:
+                expansions[term] = self.expand(term)
+                for index_term, weight in expansions[term]:
+                    idf = self.idf[index_term] * weight
+                    for doc, tf in self.postings[index_term]:
+                        scores[doc] = scores.get(doc, 0.0) + idf * tf * (_BM25_K1 + 1) / (tf + self.norm[doc])
+            matched = {doc for index_term, _ in expansions[term] for doc, _ in self.postings[index_term]}
+            for doc in matched:
+                coverage[doc] = coverage.get(doc, 0) + 1
+        ranked = sorted(coverage, key=lambda doc: (-coverage[doc], -scores[doc], doc))
+        return [(coverage[doc], scores[doc], self.docs[doc]) for doc in ranked]
+
+
+_index: _ListinoIndex | None = None
+
+
+def _get_index(items: Sequence[dict[str, Any]]) -> _ListinoIndex:
+    """Index of `items`, rebuilt only when the price book object changes (e.g. a live reload)."""
+    global _index
+    index = _index
+    if index is None or index.items is not items:
+        index = _index = _ListinoIndex(items)
+    return index
+
+
 def _format_eur(v: float) -> str:
     return f"{v:,.0f}".replace(",", ".")
 
@@ -69,20 +197,13 @@ async def search_listino(query: str, top_k: int = 4) -> str:
     if not q_tokens:
         return NO_LISTINO_MATCH
 
-    items = PricingService.load_price_book()
+    snapshot = PricingService.snapshot()
+    items = snapshot.items
     if not items:
         logger.error("[Listino] master price book is empty/unavailable.")
         return NO_LISTINO_MATCH
 
-    scored: list[tuple[int, dict[str, Any]]] = []
-    for item in items:
-        item_tokens = set(_normalize(_searchable(item)))
-        if not item_tokens:
-            continue
-        score = sum(1 for t in q_tokens if t in item_tokens)
-        if score > 0:
-            scored.append((score, item))
-
+    scored = _get_index(items).search(q_tokens)
     if not scored:
         return NO_LISTINO_MATCH
 
@@ -90,21 +211,20 @@ async def search_listino(query: str, top_k: int = 4) -> str:
     # tokens (best >= 2, e.g. "finestra pvc"), restrict to items hitting that
     # best score so a weaker single-token match ("finestra alluminio") doesn't
     # dilute a specific request. For single-token queries ("finestra"), show
-    # all matches so the customer sees the available variants.
-    scored.sort(key=lambda s: s[0], reverse=True)
+    # all matches so the customer sees the available variants. Items with the
+    # same number of matched tokens are ordered by BM25.
     best = scored[0][0]
     threshold = best if best >= 2 else 1
-    top = [it for sc, it in scored if sc >= threshold][:top_k]
+    top = [it for sc, _, it in scored if sc >= threshold][:top_k]
 
     lines = ["Listino SYD — prezzi indicativi chiavi in mano (fornitura + posa):", ""]
     for it in top:
-        rmin = it.get("range_min")
-        rmax = it.get("range_max")
+        low, high = snapshot.ranges[it["sku"]]
         unit = it.get("unit", "")
-        if rmin and rmax:
-            price = f"€{_format_eur(rmin)}–€{_format_eur(rmax)}/{unit}"
+        if low != high:
+            price = f"€{_format_eur(low)}–€{_format_eur(high)}/{unit}"
         else:
-            price = f"~€{_format_eur(it.get('unit_price', 0))}/{unit}"
+            price = f"~€{_format_eur(low)}/{unit}"
         lines.append(f"- {it.get('description')}: {price}")
     lines.append("")
     lines.append(
@@ -3,8 +3,6 @@ import logging
 from typing import Any
 from urllib.parse import urlparse
 
-import httpx
-from google import genai
 from google.genai import types as genai_types
 from pydantic import BaseModel, Field
 from src.core.config import settings
@@ -12,6 +10,8 @@ from src.db.firebase_client import get_async_firestore_client
 from src.repositories.conversation_repository import ConversationRepository
 from src.services.insight_engine import InsightEngineError, get_insight_engine
 from src.services.pricing_service import PricingService
+from src.utils.genai_client import get_genai_client, track_genai_call
+from src.utils.media_cache import fetch_media_cached
 from src.vision.measure_room import format_measurements_for_insight, measure_room_from_photo
 
 logger = logging.getLogger(__name__)
@@ -46,8 +46,7 @@ def validate_sku_suggestions(suggestions: list[Any]) -> list[str]:
     Verifies that suggested SKUs exist in the Price Book.
     Pattern: QUANTITY_SURVEYOR.md
     """
-    price_book = PricingService.load_price_book()
-    valid_skus = {i["sku"] for i in price_book}
+    valid_skus = PricingService.snapshot().by_sku
 
     unknown_skus = []
     for s in suggestions:
@@ -162,15 +161,13 @@ async def _run_measurement_vision(media_urls: list[str]) -> str:
             continue
 
         try:
-            async with httpx.AsyncClient(timeout=15.0) as http_client:
-                resp = await http_client.get(url)
-                resp.raise_for_status()
+            fetched = await fetch_media_cached(url, timeout=15.0)
 
-            mime_type = resp.headers.get("content-type", "image/jpeg").split(";")[0].strip()
+            mime_type = fetched.mime_type.split(";")[0].strip()
             if not mime_type.startswith("image/"):
                 continue
 
-            measurements = await measure_room_from_photo(resp.content, mime_type)
+            measurements = await measure_room_from_photo(fetched.data, mime_type)
             return format_measurements_for_insight(measurements)
 
         except Exception as exc:  # noqa: BLE001
@@ -180,6 +177,7 @@ async def _run_measurement_vision(media_urls: list[str]) -> str:
     return ""  # No accessible image found — InsightEngine uses defaults
 
 
+_STRUCTURAL_VISION_MODEL = "gemini-3.1-flash-lite-preview"
 _STRUCTURAL_VISION_PROMPT = (
     "Sei un geometra esperto in ristrutturazioni edili italiane. "
     "Ti vengono mostrate DUE immagini:\n"
@@ -268,41 +266,39 @@ async def _run_render_structural_vision(
         return ""
 
     try:
-        async with httpx.AsyncClient(timeout=20.0) as http_client:
-            photo_resp, render_resp = await asyncio.gather(
-                http_client.get(photo_url),
-                http_client.get(render_url),
-            )
-            photo_resp.raise_for_status()
-            render_resp.raise_for_status()
+        photo, render = await asyncio.gather(
+            fetch_media_cached(photo_url, timeout=20.0),
+            fetch_media_cached(render_url, timeout=20.0),
+        )
 
-        photo_mime = photo_resp.headers.get("content-type", "image/jpeg").split(";")[0].strip()
-        render_mime = render_resp.headers.get("content-type", "image/jpeg").split(";")[0].strip()
+        photo_mime = photo.mime_type.split(";")[0].strip()
+        render_mime = render.mime_type.split(";")[0].strip()
 
         if not photo_mime.startswith("image/") or not render_mime.startswith("image/"):
             logger.warning("[StructuralVision] Non-image content-type, skipping.")
             return ""
 
-        client = genai.Client(api_key=settings.api_key)
-        response = await client.aio.models.generate_content(
-            model="gemini-3.1-flash-lite-preview",
-            contents=genai_types.Content(
-                parts=[
-                    genai_types.Part(text=_STRUCTURAL_VISION_PROMPT),
-                    genai_types.Part(
-                        inline_data=genai_types.Blob(
-                            mime_type=photo_mime, data=photo_resp.content
-                        )
-                    ),
-                    genai_types.Part(
-                        inline_data=genai_types.Blob(
-                            mime_type=render_mime, data=render_resp.content
-                        )
-                    ),
-                ]
-            ),
-            config=genai_types.GenerateContentConfig(temperature=0.1),
-        )
+        client = get_genai_client()
+        with track_genai_call(_STRUCTURAL_VISION_MODEL):
+            response = await client.aio.models.generate_content(
+                model=_STRUCTURAL_VISION_MODEL,
+                contents=genai_types.Content(
+                    parts=[
+                        genai_types.Part(text=_STRUCTURAL_VISION_PROMPT),
+                        genai_types.Part(
+                            inline_data=genai_types.Blob(
+                                mime_type=photo_mime, data=photo.data
+                            )
+                        ),
+                        genai_types.Part(
+                            inline_data=genai_types.Blob(
+                                mime_type=render_mime, data=render.data
+                            )
+                        ),
+                    ]
+                ),
+                config=genai_types.GenerateContentConfig(temperature=0.1),
+            )
 
         text = ""
         content = response.candidates[0].content if response.candidates else None
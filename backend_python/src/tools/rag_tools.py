@@ -4,12 +4,16 @@ RAG Tools wrappers for ADK consumption.
 Provides:
     - retrieve_knowledge: Semantic search across all namespaces (normative + prezzario)
     - retrieve_price_by_code: Exact lookup of a price-list article by its code
+      (in-process code index first, Pinecone as the fallback)
     - search_prezzario: Semantic search specifically in the price list
 """
 import logging
 import re
+from typing import Any
 
-from src.services.rag_service import NAMESPACE_PREZZARIO, get_rag_service
+from src.services.lexical_index import get_lexical_index
+from src.services.prezzario_index import get_prezzario_index
+from src.services.rag_service import NAMESPACE_NORMATIVE, NAMESPACE_PREZZARIO, get_rag_service
 
 logger = logging.getLogger(__name__)
 
@@ -58,8 +62,9 @@ async def retrieve_knowledge(query: str) -> str:
     """
     rag_service = get_rag_service()
 
-    if not rag_service.pc:
-        logger.error("[RAG] retrieve_knowledge called but Pinecone is not configured.")
+    lexical_ready = any(get_lexical_index(ns) is not None for ns in (NAMESPACE_PREZZARIO, NAMESPACE_NORMATIVE))
+    if rag_service.index is None and not lexical_ready:
+        logger.error("[RAG] retrieve_knowledge called but no vector index is configured.")
         return _RAG_UNAVAILABLE
 
     try:
@@ -69,9 +74,16 @@ async def retrieve_knowledge(query: str) -> str:
         )
 
         if not results:
+            if results.partial:
+                return _RAG_UNAVAILABLE
             return "No relevant information found in the knowledge base."
 
         formatted_output = "Relevant findings from knowledge base:\n\n"
+        if results.partial:
+            formatted_output = (
+                f"Partial results: namespace(s) {', '.join(results.timed_out)} did not answer in time.\n\n"
+                + formatted_output
+            )
         for idx, result in enumerate(results, 1):
             metadata = result.get("metadata", {})
             score = result.get("score", 0.0)
@@ -120,8 +132,8 @@ async def search_prezzario(query: str, categoria: str = "") -> str:
     """
     rag_service = get_rag_service()
 
-    if not rag_service.pc:
-        logger.error("[RAG] search_prezzario called but Pinecone is not configured.")
+    if rag_service.index is None and get_lexical_index(NAMESPACE_PREZZARIO) is None:
+        logger.error("[RAG] search_prezzario called but no vector index is configured.")
         return _RAG_UNAVAILABLE
 
     try:
@@ -177,6 +189,66 @@ def _codice_variants(codice: str) -> list[str]:
     return variants
 
 
+_MAX_CHAPTER_ITEMS = 15
+
+
+def _format_article(metadata: dict[str, Any], codice_articolo: str, approximate: bool = False) -> str:
+    codice = metadata.get("codice", codice_articolo)
+    descrizione = metadata.get("chunk_text", metadata.get("descrizione", "N/D"))
+    prezzo = metadata.get("prezzo_euro", 0.0)
+    unita = metadata.get("unita_misura", "")
+    categoria = metadata.get("categoria", "")
+
+    output = f"📋 Articolo {codice}\n"
+    output += f"Categoria: {categoria}\n"
+    output += f"Descrizione: {descrizione}\n"
+    if prezzo and prezzo > 0:
+        output += f"Prezzo unitario: €{prezzo:.2f}/{unita}\n"
+    else:
+        output += "Prezzo: a corpo / da definire\n"
+
+    if approximate:
+        output += "\n⚠️ Nota: corrispondenza approssimativa (codice esatto non trovato)."
+    return output
+
+
+def _lookup_code_locally(codice_articolo: str) -> str | None:
+    """Resolve a code from the in-process index: exact, chapter prefix, then one-typo matches.
+
+    Returns None when the index is empty or knows nothing close, so the caller
+    falls back to Pinecone.
+    """
+    index = get_prezzario_index()
+    if not len(index):
+        return None
+
+    article = index.lookup(codice_articolo)
+    if article is not None:
+        return _format_article(article, codice_articolo)
+
+    chapter = index.by_prefix(codice_articolo, limit=_MAX_CHAPTER_ITEMS + 1)
+    if chapter:
+        output = f"📂 Voci del capitolo {codice_articolo.strip()}:\n\n"
+        for art in chapter[:_MAX_CHAPTER_ITEMS]:
+            prezzo = art.get("prezzo_euro", 0.0)
+            price = f"€{prezzo:.2f}/{art.get('unita_misura', '')}" if prezzo and prezzo > 0 else "a corpo/N.D."
+            output += f"- [{art.get('codice', '')}] {art.get('descrizione', '')} — {price}\n"
+        if len(chapter) > _MAX_CHAPTER_ITEMS:
+            output += "\n(elenco troncato: indica il codice completo della voce)"
+        return output
+
+    near = index.fuzzy(codice_articolo, max_distance=1)
+    if len(near) == 1:
+        return _format_article(near[0][0], codice_articolo, approximate=True)
+    if near:
+        codes = ", ".join(art.get("codice", "") for art, _ in near)
+        return (
+            f"Articolo '{codice_articolo}' non trovato. Codici simili nel prezzario: {codes}. "
+            "Chiedi all'utente quale intende."
+        )
+    return None
+
+
 async def retrieve_price_by_code(codice_articolo: str) -> str:
     """Looks up a specific price-list article by its exact code.
 
@@ -190,15 +262,19 @@ async def retrieve_price_by_code(codice_articolo: str) -> str:
     Returns:
         Full details of the matching article, or a message if not found.
     """
+    if not codice_articolo or not codice_articolo.strip():
+        return "Codice articolo non valido o vuoto."
+
+    local = _lookup_code_locally(codice_articolo)
+    if local is not None:
+        return local
+
     rag_service = get_rag_service()
 
-    if not rag_service.pc:
-        logger.error("[RAG] retrieve_price_by_code called but Pinecone is not configured.")
+    if rag_service.index is None:
+        logger.error("[RAG] retrieve_price_by_code called but no vector index is configured.")
         return _RAG_UNAVAILABLE
 
-    if not codice_articolo or not codice_articolo.strip():
-        return "Codice articolo non valido o vuoto."
-
     try:
         # Exact lookup via metadata filter on the indexed `codice` field.
         # This is deterministic: a code like 'A 3.02.14.a.' resolves to that
@@ -237,25 +313,7 @@ async def retrieve_price_by_code(codice_articolo: str) -> str:
             results_fallback = exact_results
 
         target = exact_match or results_fallback[0]
-        metadata = target.get("metadata", {})
-        codice = metadata.get("codice", codice_articolo)
-        descrizione = metadata.get("chunk_text", metadata.get("descrizione", "N/D"))
-        prezzo = metadata.get("prezzo_euro", 0.0)
-        unita = metadata.get("unita_misura", "")
-        categoria = metadata.get("categoria", "")
-
-        output = f"📋 Articolo {codice}\n"
-        output += f"Categoria: {categoria}\n"
-        output += f"Descrizione: {descrizione}\n"
-        if prezzo and prezzo > 0:
-            output += f"Prezzo unitario: €{prezzo:.2f}/{unita}\n"
-        else:
-            output += "Prezzo: a corpo / da definire\n"
-
-        if not exact_match:
-            output += "\n⚠️ Nota: corrispondenza approssimativa (codice esatto non trovato)."
-
-        return output
+        return _format_article(target.get("metadata", {}), codice_articolo, approximate=not exact_match)
     except Exception as e:
         logger.error(f"RAG retrieve_price_by_code error: {e}", exc_info=True)
         return _RAG_UNAVAILABLE
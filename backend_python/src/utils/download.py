@@ -2,9 +2,8 @@
 import ipaddress
 import logging
 import mimetypes
-from urllib.parse import unquote, urljoin, urlparse, urlunparse
+from urllib.parse import unquote, urlparse, urlunparse
 
-import httpx
 from firebase_admin import storage
 from src.core.config import settings
 from starlette.concurrency import run_in_threadpool
@@ -34,12 +33,6 @@ _GEMINI_FILE_HOST = "generativelanguage.googleapis.com"
 _FIREBASE_CLIENT_HOST = "firebasestorage.googleapis.com"
 _GCS_SIGNED_HOST = "storage.googleapis.com"
 
-# Cap on redirect hops we are willing to follow while re-validating each target.
-_MAX_REDIRECTS = 3
-_REDIRECT_STATUS = frozenset({301, 302, 303, 307, 308})
-# Cap on downloaded body size (bytes) to avoid resource exhaustion.
-_MAX_DOWNLOAD_BYTES = 50 * 1024 * 1024  # 50 MB
-
 
 def is_gemini_file_uri(value: str) -> bool:
     """True if `value` is a Gemini File API URI (native file reference, not a fetchable image).
@@ -216,62 +209,28 @@ async def download_image_smart(url: str, timeout: float = 30.0) -> tuple[bytes,
         "Accept": "image/webp,image/apng,image/*,*/*;q=0.8",
     }
 
-    # follow_redirects is disabled so we can re-validate every hop against the
-    # SSRF allowlist — a redirect from an allowlisted host to an internal IP
-    # would otherwise bypass the guard.
-    async with httpx.AsyncClient(timeout=timeout, follow_redirects=False) as client:
-        current_url = url
-        try:
-            for _ in range(_MAX_REDIRECTS + 1):
-                # Validate and rebuild with an allowlisted constant host, so the
-                # request can only reach an allowlisted host (redirects included).
-                safe_url = _build_allowlisted_request_url(current_url)
-
-                # Stream the response so the size cap is enforced as bytes
-                # arrive, instead of buffering the full body via client.get()
-                # and only checking its length afterwards (which would let a
-                # malicious/compromised allowlisted origin exhaust memory).
-                async with client.stream("GET", safe_url, headers=headers) as resp:
-                    if resp.status_code in _REDIRECT_STATUS:
-                        location = resp.headers.get("location")
-                        if not location:
-                            raise Exception("Redirect response without Location header")
-                        current_url = urljoin(current_url, location)
-                        continue
-
-                    resp.raise_for_status()
-
-                    content_length = resp.headers.get("content-length")
-                    if content_length and int(content_length) > _MAX_DOWNLOAD_BYTES:
-                        raise Exception(
-                            f"Declared content-length ({content_length} bytes) exceeds size cap"
-                        )
-
-                    chunks: list[bytes] = []
-                    total_bytes = 0
-                    async for chunk in resp.aiter_bytes():
-                        total_bytes += len(chunk)
-                        if total_bytes > _MAX_DOWNLOAD_BYTES:
-                            raise Exception(f"Downloaded body exceeds size cap (>{_MAX_DOWNLOAD_BYTES} bytes)")
-                        chunks.append(chunk)
-                    file_bytes = b"".join(chunks)
-
-                content_type = resp.headers.get("content-type")
-                if not content_type or (
-                    not content_type.startswith("image/") and not content_type.startswith("video/")
-                ):
-                    guessed_type, _ = mimetypes.guess_type(current_url)
-                    content_type = guessed_type or "application/octet-stream"
-                    logger.warning(
-                        f"[SmartDownload] ⚠️ Response content-type "
-                        f"'{resp.headers.get('content-type')}' suspicious. Fallback guess: {content_type}"
-                    )
-
-                logger.info(f"[SmartDownload] ✅ HTTP download SUCCESS: {len(file_bytes)} bytes, Type: {content_type}")
-                return file_bytes, content_type
-
-            raise Exception(f"Too many redirects (>{_MAX_REDIRECTS})")
-
-        except Exception as e:
-            logger.error(f"[SmartDownload] ❌ HTTP download failed: {e}")
-            raise Exception(f"Failed to download image: {str(e)}") from e
+    # Shared pooled client: the SSRF allowlist is re-checked on every redirect
+    # hop and the 50 MB cap is enforced while streaming (see http_client).
+    from src.utils.http_client import fetch_media_bytes
+
+    try:
+        fetched = await fetch_media_bytes(url, timeout=timeout, headers=headers)
+        file_bytes = fetched.data
+
+        content_type = fetched.content_type
+        if not content_type or (
+            not content_type.startswith("image/") and not content_type.startswith("video/")
+        ):
+            guessed_type, _ = mimetypes.guess_type(fetched.url)
+            content_type = guessed_type or "application/octet-stream"
+            logger.warning(
+                f"[SmartDownload] ⚠️ Response content-type "
+                f"'{fetched.content_type}' suspicious. Fallback guess: {content_type}"
+            )
+
+        logger.info(f"[SmartDownload] ✅ HTTP download SUCCESS: {len(file_bytes)} bytes, Type: {content_type}")
+        return file_bytes, content_type
+
+    except Exception as e:
+        logger.error(f"[SmartDownload] ❌ HTTP download failed: {e}")
+        raise Exception(f"Failed to download image: {str(e)}") from e
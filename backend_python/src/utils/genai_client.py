@@ -0,0 +1,167 @@
+"""
+App-lifetime registry of google-genai clients.
+
+Every vision/imagen call used to build its own `genai.Client(api_key=...)`,
+which re-creates the SDK's HTTP transport and connection pool (and its TLS
+handshake to generativelanguage.googleapis.com) on each request. The registry
+keeps one client per (api_version, backend) for the whole process.
+
+`track_genai_call(model)` wraps a single model call and records, per model:
+  - call latency (`genai.call.duration` histogram, ms);
+  - in-flight calls (`genai.calls.in_flight` up/down counter);
+  - errors (`genai.call.errors` counter).
+Metrics are OpenTelemetry (no-op until a MeterProvider is configured) and are
+also kept in-process for `genai_client_stats()`, which /ready reports.
+
+Lifecycle: `warm_up_genai_clients()` / `close_genai_clients()` are called from
+`main.lifespan`. Outside the app (scripts, tests) clients are created lazily
+on first use. Shared clients must not be closed by callers.
+
+Usage:
+    client = get_genai_client()
+    with track_genai_call(MODEL):
+        response = await client.aio.models.generate_content(model=MODEL, ...)
+"""
+import logging
+import threading
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Literal
+
+from google import genai
+from google.genai import types as genai_types
+from opentelemetry import metrics
+from src.core.config import settings
+
+logger = logging.getLogger(__name__)
+_meter = metrics.get_meter(__name__)
+
+Backend = Literal["gemini_api", "vertex"]
+
+_call_duration = _meter.create_histogram(
+    "genai.call.duration", unit="ms", description="Latency of google-genai model calls (attr: model)",
+)
+_calls_in_flight = _meter.create_up_down_counter(
+    "genai.calls.in_flight", description="google-genai model calls currently running (attr: model)",
+)
+_call_errors = _meter.create_counter(
+    "genai.call.errors", description="google-genai model calls that raised (attr: model)",
+)
+
+
+@dataclass
+class _ModelStats:
+    calls: int = 0
+    errors: int = 0
+    in_flight: int = 0
+    total_ms: float = 0.0
+    max_ms: float = 0.0
+
+
+class GenAIClientRegistry:
+    """One lazily built `genai.Client` per (api_version, backend).
+
+    Clients are built under a lock because sync callers (thread-pool warm-up,
+    InsightEngine) and the event loop can race on the first use.
+    """
+
+    def __init__(self) -> None:
+        self._clients: dict[tuple[str | None, Backend], genai.Client] = {}
+        self._lock = threading.Lock()
+        self._stats: dict[str, _ModelStats] = {}
+
+    def _build(self, api_version: str | None, backend: Backend) -> genai.Client:
+        http_options = genai_types.HttpOptions(api_version=api_version) if api_version else None
+        if backend == "vertex":
+            return genai.Client(
+                vertexai=True,
+                project=settings.GOOGLE_CLOUD_PROJECT,
+                location=settings.ADK_LOCATION,
+                http_options=http_options,
+            )
+        return genai.Client(api_key=settings.api_key, http_options=http_options)
+
+    def get(self, api_version: str | None = None, backend: Backend = "gemini_api") -> genai.Client:
+        key = (api_version, backend)
+        client = self._clients.get(key)
+        if client is None:
+            with self._lock:
+                client = self._clients.get(key)
+                if client is None:
+                    client = self._build(api_version, backend)
+                    self._clients[key] = client
+                    logger.info("[GenAI] Shared client created (api_version=%s, backend=%s)", api_version, backend)
+        return client
+
+    @contextmanager
+    def track(self, model: str) -> Iterator[None]:
+        stats = self._stats.setdefault(model, _ModelStats())
+        attrs = {"model": model}
+        stats.in_flight += 1
+        _calls_in_flight.add(1, attrs)
+        started = time.perf_counter()
+        try:
+            yield
+        except BaseException:
+            stats.errors += 1
+            _call_errors.add(1, attrs)
+            raise
+        finally:
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            stats.in_flight -= 1
+            stats.calls += 1
+            stats.total_ms += elapsed_ms
+            stats.max_ms = max(stats.max_ms, elapsed_ms)
+            _calls_in_flight.add(-1, attrs)
+            _call_duration.record(elapsed_ms, attrs)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "clients": [f"{version or 'default'}/{backend}" for version, backend in self._clients],
+            "models": {
+                model: {
+                    "calls": s.calls,
+                    "errors": s.errors,
+                    "in_flight": s.in_flight,
+                    "latency_ms_avg": round(s.total_ms / s.calls, 1) if s.calls else 0.0,
+                    "latency_ms_max": round(s.max_ms, 1),
+                }
+                for model, s in self._stats.items()
+            },
+        }
+
+    async def aclose(self) -> None:
+        with self._lock:
+            clients, self._clients = self._clients, {}
+        for client in clients.values():
+            await client.aio.aclose()
+            client.close()
+
+
+_registry = GenAIClientRegistry()
+
+
+def get_genai_client(api_version: str | None = None, backend: Backend = "gemini_api") -> genai.Client:
+    """Return the shared client for (api_version, backend), building it on first use."""
+    return _registry.get(api_version, backend)
+
+
+def track_genai_call(model: str):
+    """Context manager recording latency, in-flight count and errors for one model call."""
+    return _registry.track(model)
+
+
+def genai_client_stats() -> dict[str, Any]:
+    return _registry.stats()
+
+
+def warm_up_genai_clients() -> None:
+    """Build the default client up front so the first vision call does not pay for it."""
+    get_genai_client()
+
+
+async def close_genai_clients() -> None:
+    """Close every shared client's transport. Called once from the app lifespan shutdown."""
+    await _registry.aclose()
@@ -0,0 +1,127 @@
+"""
+Gemini explicit context caching for large, static prompt prefixes.
+
+InsightEngine sends the same system prompt (role, WBS assemblies, the whole
+price book) with every analysis; only the conversation and media change.
+With a `ContextCache`, the prefix is uploaded once as a Gemini cached content
+and each request references it by name (`GenerateContentConfig.cached_content`),
+so the prefix is neither re-sent nor billed at the full input-token rate.
+
+Entries are keyed by (model, version), where the version identifies the
+prefix content: a new price book or assemblies file produces a new version
+and a new cache. The superseded cache is only forgotten, never deleted —
+requests already in flight here or on other instances may still reference
+it — and expires on its TTL. Callers treat a None name as "send the prefix
+inline", which is also what happens when cache creation fails (negatively
+cached for a short while, so an outage does not add a failing round trip to
+every request).
+
+When a call that references a cache fails, `is_cache_rejection` tells whether
+the cache itself was refused — NOT_FOUND (expired or deleted), or an
+INVALID_ARGUMENT whose message names the cached content — the only case worth
+invalidating and retrying inline. Any other 400 (a corrupt or oversized image,
+say) would fail inline too; rate limits, timeouts and server errors are
+transient. Invalidating only forgets the entry: the cache is never deleted
+server-side, since calls in flight elsewhere may still be using it.
+
+`GeminiContextCache` is the production implementation; tests use a local fake
+implementing the same Protocol.
+"""
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import Any, Protocol
+
+from google.genai import errors as genai_errors
+from google.genai import types as genai_types
+from src.utils.genai_client import track_genai_call
+
+logger = logging.getLogger(__name__)
+
+# Recreate a cache this long before it expires, so no request references a cache that dies mid-call.
+_REFRESH_MARGIN_SECONDS = 120.0
+# After a failed creation, send the prefix inline for this long before trying again.
+_RETRY_AFTER_FAILURE_SECONDS = 300.0
+
+
+def is_cache_rejection(exc: BaseException) -> bool:
+    """True when a request failed because its cached content was refused (see module docstring)."""
+    if not isinstance(exc, genai_errors.ClientError):
+        return False
+    if exc.code == 404:
+        return True
+    message = (exc.message or "").lower().replace("_", "").replace(" ", "")
+    return exc.code == 400 and "cachedcontent" in message
+
+
+class ContextCache(Protocol):
+    async def lookup(self, model: str, version: str, prefix: str) -> str | None:
+        """Name of a cached content holding `prefix` for `model` (created if needed); None → send it inline."""
+        ...
+
+    async def invalidate(self, model: str, version: str) -> None:
+        """Forget the entry (e.g. the server rejected the cached content); the next lookup recreates it."""
+        ...
+
+
+@dataclass(frozen=True)
+class _Entry:
+    name: str | None
+    expires_at: float
+
+
+class GeminiContextCache:
+    """Cached contents created through `client.aio.caches`, one per (model, version)."""
+
+    def __init__(self, client: Any, ttl_seconds: int, display_name: str = "syd-insight") -> None:
+        self.client = client
+        self.ttl_seconds = ttl_seconds
+        self.display_name = display_name
+        self._entries: dict[tuple[str, str], _Entry] = {}
+        self._locks: dict[tuple[str, str], asyncio.Lock] = {}
+
+    def _fresh(self, key: tuple[str, str]) -> _Entry | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        margin = _REFRESH_MARGIN_SECONDS if entry.name else 0.0
+        return entry if entry.expires_at - margin > time.monotonic() else None
+
+    async def lookup(self, model: str, version: str, prefix: str) -> str | None:
+        key = (model, version)
+        entry = self._fresh(key)
+        if entry is not None:
+            return entry.name
+        # One creation per key: concurrent analyses wait for it instead of each uploading the prefix.
+        async with self._locks.setdefault(key, asyncio.Lock()):
+            entry = self._fresh(key)
+            if entry is None:
+                entry = await self._create(model, version, prefix)
+                # Superseded versions are forgotten, not deleted: in-flight calls may still use them.
+                for old in [k for k in self._entries if k[0] == model and k != key]:
+                    del self._entries[old]
+                    self._locks.pop(old, None)
+                self._entries[key] = entry
+        return entry.name
+
+    async def _create(self, model: str, version: str, prefix: str) -> _Entry:
+        try:
+            with track_genai_call(model):
+                cached = await self.client.aio.caches.create(
+                    model=model,
+                    config=genai_types.CreateCachedContentConfig(
+                        contents=[genai_types.Content(role="user", parts=[genai_types.Part(text=prefix)])],
+                        ttl=f"{self.ttl_seconds}s",
+                        display_name=f"{self.display_name}-{version}",
+                    ),
+                )
+        except Exception as e:  # noqa: BLE001 — caching is an optimization; callers fall back to the inline prefix
+            logger.warning(f"[ContextCache] Could not cache the prompt prefix for {model} ({version}): {e}")
+            return _Entry(None, time.monotonic() + _RETRY_AFTER_FAILURE_SECONDS)
+        logger.info(f"[ContextCache] Cached prompt prefix for {model} ({version}) as {cached.name}.")
+        return _Entry(cached.name, time.monotonic() + self.ttl_seconds)
+
+    async def invalidate(self, model: str, version: str) -> None:
+        # Forget only: another request may still be using the cache, which expires on its TTL.
+        self._entries.pop((model, version), None)
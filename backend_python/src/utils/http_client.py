@@ -0,0 +1,192 @@
+"""
+App-lifetime pooled HTTP client for media fetches.
+
+Every media download used to open its own `httpx.AsyncClient`, paying a fresh
+TCP + TLS handshake to the same storage host for each image of a multi-image
+turn. The registry below keeps one pooled client per purpose for the whole
+process: HTTP/2 keep-alive (one multiplexed connection per host), a global
+connection cap, and a per-host in-flight cap.
+
+`fetch_media_bytes()` is the single entry point for outbound media GETs. It
+enforces, in one place:
+  - the SSRF allowlist (`download._build_allowlisted_request_url`), re-checked
+    on every redirect hop (redirects are never followed automatically);
+  - the 50 MB body cap, applied while streaming rather than after buffering.
+
+Lifecycle: `startup_http_clients()` / `close_http_clients()` are called from
+`main.lifespan`. Outside the app (scripts, tests) the client is created lazily
+on first use.
+"""
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from urllib.parse import urljoin, urlparse
+
+import httpx
+from src.core.config import settings
+from src.utils.download import _build_allowlisted_request_url
+
+logger = logging.getLogger(__name__)
+
+MAX_MEDIA_BYTES = 50 * 1024 * 1024  # 50 MB
+_MAX_REDIRECTS = 3
+_REDIRECT_STATUS = frozenset({301, 302, 303, 307, 308})
+_DEFAULT_TIMEOUT = httpx.Timeout(15.0, connect=5.0)
+_USER_AGENT = "RenovationAI-Backend/1.0"
+
+
+class MediaFetchError(Exception):
+    """Raised when a media response is rejected (size cap, redirect loop, bad redirect)."""
+
+
+@dataclass(frozen=True)
+class FetchedMedia:
+    data: bytes
+    content_type: str | None
+    url: str  # final URL after redirects
+
+
+def _http2_available() -> bool:
+    if not settings.HTTP_CLIENT_HTTP2:
+        return False
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        logger.warning("[HttpClient] 'h2' not installed — shared pool falls back to HTTP/1.1")
+        return False
+    return True
+
+
+class HttpClientRegistry:
+    """Named pooled clients plus per-host concurrency slots.
+
+    httpx clients and asyncio semaphores are bound to the loop they were first
+    used on, so the registry rebuilds its state if the running loop changes
+    (pytest-asyncio runs each test on a fresh loop; production has exactly one).
+    """
+
+    def __init__(self) -> None:
+        self._clients: dict[str, httpx.AsyncClient] = {}
+        self._host_slots: dict[str, asyncio.Semaphore] = {}
+        self._loop: asyncio.AbstractEventLoop | None = None
+
+    def _check_loop(self) -> None:
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        if self._loop is not loop:
+            if self._clients:
+                logger.debug("[HttpClient] Event loop changed — rebuilding pooled clients")
+            self._clients = {}
+            self._host_slots = {}
+            self._loop = loop
+
+    def _build(self) -> httpx.AsyncClient:
+        return httpx.AsyncClient(
+            http2=_http2_available(),
+            timeout=_DEFAULT_TIMEOUT,
+            follow_redirects=False,
+            limits=httpx.Limits(
+                max_connections=settings.HTTP_CLIENT_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.HTTP_CLIENT_MAX_CONNECTIONS,
+                keepalive_expiry=settings.HTTP_CLIENT_KEEPALIVE_SECONDS,
+            ),
+            headers={"User-Agent": _USER_AGENT},
+        )
+
+    def get(self, name: str = "media") -> httpx.AsyncClient:
+        self._check_loop()
+        client = self._clients.get(name)
+        if client is None or client.is_closed:
+            client = self._build()
+            self._clients[name] = client
+        return client
+
+    def host_slot(self, host: str) -> asyncio.Semaphore:
+        self._check_loop()
+        slot = self._host_slots.get(host)
+        if slot is None:
+            slot = asyncio.Semaphore(settings.HTTP_CLIENT_MAX_PER_HOST)
+            self._host_slots[host] = slot
+        return slot
+
+    async def aclose(self) -> None:
+        clients, self._clients = self._clients, {}
+        self._host_slots = {}
+        for client in clients.values():
+            await client.aclose()
+
+
+_registry = HttpClientRegistry()
+
+
+def get_http_client(name: str = "media") -> httpx.AsyncClient:
+    """Return the shared pooled client (created lazily if the app lifespan did not)."""
+    return _registry.get(name)
+
+
+def startup_http_clients() -> None:
+    """Create the shared pool up front so the first request does not pay for it."""
+    get_http_client()
+    logger.info("[HttpClient] Shared media HTTP pool ready (http2=%s)", _http2_available())
+
+
+async def close_http_clients() -> None:
+    """Close every pooled connection. Called once from the app lifespan shutdown."""
+    await _registry.aclose()
+
+
+async def fetch_media_bytes(
+    url: str,
+    *,
+    timeout: float | None = None,
+    headers: dict[str, str] | None = None,
+    max_bytes: int = MAX_MEDIA_BYTES,
+) -> FetchedMedia:
+    """GET an allowlisted media URL through the shared pool.
+
+    Raises ValueError if the URL (or any redirect target) fails the SSRF
+    allowlist, httpx.HTTPStatusError on a non-2xx response, and MediaFetchError
+    if the body exceeds `max_bytes` or the redirect chain is too long.
+    """
+    client = get_http_client()
+    request_timeout = httpx.Timeout(timeout, connect=min(timeout, 5.0)) if timeout else _DEFAULT_TIMEOUT
+    current_url = url
+    for _ in range(_MAX_REDIRECTS + 1):
+        # Rebuilt on a constant allowlisted host — redirects included.
+        safe_url = _build_allowlisted_request_url(current_url)
+        host = urlparse(safe_url).hostname or ""
+        started = time.perf_counter()
+        async with _registry.host_slot(host):
+            async with client.stream("GET", safe_url, headers=headers, timeout=request_timeout) as resp:
+                if resp.status_code in _REDIRECT_STATUS:
+                    location = resp.headers.get("location")
+                    if not location:
+                        raise MediaFetchError("Redirect response without Location header")
+                    current_url = urljoin(current_url, location)
+                    continue
+
+                resp.raise_for_status()
+                ttfb_ms = (time.perf_counter() - started) * 1000
+
+                content_length = resp.headers.get("content-length")
+                if content_length and int(content_length) > max_bytes:
+                    raise MediaFetchError(f"Declared content-length ({content_length} bytes) exceeds size cap")
+
+                chunks: list[bytes] = []
+                total = 0
+                async for chunk in resp.aiter_bytes():
+                    total += len(chunk)
+                    if total > max_bytes:
+                        raise MediaFetchError(f"Downloaded body exceeds size cap (>{max_bytes} bytes)")
+                    chunks.append(chunk)
+
+        logger.debug(
+            "[HttpClient] Fetched %d bytes from %s (ttfb=%.1fms, total=%.1fms)",
+            total, host, ttfb_ms, (time.perf_counter() - started) * 1000,
+        )
+        return FetchedMedia(data=b"".join(chunks), content_type=resp.headers.get("content-type"), url=current_url)
+
+    raise MediaFetchError(f"Too many redirects (>{_MAX_REDIRECTS})")
@@ -0,0 +1,304 @@
+"""
+Process-wide, content-addressed cache of downloaded media bytes.
+
+One quote turn touches the same room photo several times: the orchestrator
+inlines it for the agent, `_run_measurement_vision` measures it, InsightEngine
+re-attaches every upload and `generate_render` downloads the source again.
+All of them go through `MediaCache.get_or_load()`, so each object is fetched
+from storage once.
+
+Keys:
+  - Firebase / GCS URLs are keyed by `gs://<bucket>/<path>` plus the
+    `generation` query parameter when present, plus a hash of the remaining
+    query (download token, signature, expiry). A hit is therefore only served
+    to a caller presenting the same credential the bytes were fetched with;
+    a different or revoked token misses and goes to storage, which checks it.
+  - Any other URL is keyed by the URL itself (fragment dropped).
+  - A loader that fetches with the service account (Admin SDK, bypassing the
+    storage rules) passes `scope="admin"`, which suffixes the key with
+    `@admin`: bytes it fetched are only served to other privileged loaders,
+    never to a caller whose URL credential storage has not checked.
+
+Blobs are stored by SHA-256 of their bytes, so identical content reached via
+different keys (e.g. two signed URLs for the same object) is held once. The
+memory tier is an LRU bounded by a byte budget; with MEDIA_CACHE_SPILL_DIR
+set, evicted blobs move to a disk tier with its own byte budget. Concurrent
+requests for the same key share one fetch (single-flight), run as its own
+task so cancelling the request that started it does not fail the others.
+Failed fetches are never cached.
+"""
+import asyncio
+import hashlib
+import logging
+import mimetypes
+import os
+import time
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse, urlunparse
+
+from src.utils.async_utils import run_blocking
+from src.utils.download import _parse_firebase_url
+
+logger = logging.getLogger(__name__)
+
+_DEFAULT_MIME = "application/octet-stream"
+
+MediaLoader = Callable[[], Awaitable[tuple[bytes, str | None]]]
+
+
+@dataclass(frozen=True)
+class CachedMedia:
+    data: bytes
+    mime_type: str
+    digest: str  # sha256 hex of `data`
+
+    def view(self) -> memoryview:
+        """Zero-copy view over the cached bytes."""
+        return memoryview(self.data)
+
+
+@dataclass
+class _Alias:
+    digest: str
+    mime_type: str
+    expires_at: float
+
+
+# Query parameters that select the object rather than authorize access to it.
+_OBJECT_PARAMS = frozenset({"generation", "alt"})
+
+
+def media_key(url: str) -> str:
+    """Normalize a media URL to its cache key (see module docstring)."""
+    parsed = urlparse(url)
+    storage = _parse_firebase_url(url)
+    if storage is not None:
+        bucket, path = storage
+        params = parse_qs(parsed.query)
+        key = f"gs://{bucket}/{path}"
+        generation = params.get("generation", [""])[0]
+        if generation:
+            key = f"{key}#{generation}"
+        credentials = sorted((k, v) for k, vs in params.items() if k not in _OBJECT_PARAMS for v in vs)
+        if credentials:
+            key = f"{key}@{hashlib.sha256(repr(credentials).encode()).hexdigest()[:16]}"
+        return key
+    return urlunparse(parsed._replace(fragment=""))
+
+
+def _scoped(key: str, scope: str | None) -> str:
+    return f"{key}@{scope}" if scope else key
+
+
+class MediaCache:
+    """Byte-budgeted LRU of media blobs with optional disk spill.
+
+    Bookkeeping runs on the single event loop, so it needs no lock; disk
+    reads and writes are offloaded with run_blocking.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int,
+        ttl_seconds: float = 3600.0,
+        spill_dir: str | None = None,
+        spill_max_bytes: int = 0,
+    ):
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._blobs: OrderedDict[str, bytes] = OrderedDict()
+        self._mem_bytes = 0
+        self._aliases: dict[str, _Alias] = {}
+        self._inflight: dict[str, asyncio.Task[CachedMedia]] = {}
+        self._spill_dir = Path(spill_dir) if spill_dir else None
+        self._spill_max_bytes = spill_max_bytes
+        self._spilled: OrderedDict[str, int] = OrderedDict()  # digest -> size
+        self._spill_bytes = 0
+        if self._spill_dir is not None:
+            self._spill_dir.mkdir(parents=True, exist_ok=True)
+        self.hits = 0
+        self.misses = 0
+        self.disk_hits = 0
+        self.shared_waits = 0
+
+    # ── Public API ────────────────────────────────────────────────────────────
+
+    async def get_or_load(self, url: str, loader: MediaLoader, scope: str | None = None) -> CachedMedia:
+        """Return the cached media for `url`, calling `loader` at most once on a miss.
+
+        `scope` names a privileged loader's key namespace (see module docstring).
+        """
+        key = _scoped(media_key(url), scope)
+        cached = await self._lookup(key)
+        if cached is not None:
+            self.hits += 1
+            return cached
+
+        pending = self._inflight.get(key)
+        if pending is not None:
+            self.shared_waits += 1
+            return await asyncio.shield(pending)
+
+        self.misses += 1
+        # The fetch is its own task, awaited through shield() by the caller that
+        # started it and by every waiter alike: cancelling one request does not
+        # cancel the shared fetch under the others.
+        task = asyncio.get_running_loop().create_task(self._load(key, loader))
+        self._inflight[key] = task
+        task.add_done_callback(lambda done: self._fetch_done(key, done))
+        return await asyncio.shield(task)
+
+    async def _load(self, key: str, loader: MediaLoader) -> CachedMedia:
+        data, mime = await loader()
+        return await self._store(key, bytes(data), mime or _DEFAULT_MIME)
+
+    def _fetch_done(self, key: str, task: "asyncio.Task[CachedMedia]") -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            # Callers re-raise it; mark retrieved so a fetch whose callers all
+            # went away does not log "exception was never retrieved".
+            task.exception()
+
+    def invalidate(self, url: str, scope: str | None = None) -> None:
+        self._aliases.pop(_scoped(media_key(url), scope), None)
+
+    def clear(self) -> None:
+        self._blobs.clear()
+        self._aliases.clear()
+        self._mem_bytes = 0
+        for digest in list(self._spilled):
+            self._unlink_spilled(digest)
+
+    def stats(self) -> dict[str, int | float]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._aliases),
+            "blobs": len(self._blobs),
+            "memory_bytes": self._mem_bytes,
+            "spill_bytes": self._spill_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "disk_hits": self.disk_hits,
+            "shared_waits": self.shared_waits,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
+
+    # ── Internals ─────────────────────────────────────────────────────────────
+
+    async def _lookup(self, key: str) -> CachedMedia | None:
+        alias = self._aliases.get(key)
+        if alias is None:
+            return None
+        if time.monotonic() >= alias.expires_at:
+            del self._aliases[key]
+            return None
+        data = self._blobs.get(alias.digest)
+        if data is not None:
+            self._blobs.move_to_end(alias.digest)
+            return CachedMedia(data=data, mime_type=alias.mime_type, digest=alias.digest)
+        if alias.digest in self._spilled:
+            data = await run_blocking(self._read_spilled, alias.digest)
+            if data is not None:
+                self.disk_hits += 1
+                await self._admit(alias.digest, data)
+                return CachedMedia(data=data, mime_type=alias.mime_type, digest=alias.digest)
+        # Blob evicted from every tier — the alias is dangling.
+        self._aliases.pop(key, None)
+        return None
+
+    async def _store(self, key: str, data: bytes, mime: str) -> CachedMedia:
+        digest = hashlib.sha256(data).hexdigest()
+        media = CachedMedia(data=data, mime_type=mime, digest=digest)
+        if len(data) > self.max_bytes:
+            return media  # Larger than the whole budget: serve, don't cache.
+        self._aliases[key] = _Alias(digest=digest, mime_type=mime, expires_at=time.monotonic() + self.ttl_seconds)
+        if digest in self._blobs:
+            self._blobs.move_to_end(digest)
+        else:
+            await self._admit(digest, data)
+        if len(self._aliases) > 4 * (len(self._blobs) + len(self._spilled)) + 1024:
+            self._prune_aliases()
+        return media
+
+    async def _admit(self, digest: str, data: bytes) -> None:
+        self._blobs[digest] = data
+        self._mem_bytes += len(data)
+        evicted: list[tuple[str, bytes]] = []
+        while self._mem_bytes > self.max_bytes and self._blobs:
+            old_digest, old_data = self._blobs.popitem(last=False)
+            self._mem_bytes -= len(old_data)
+            evicted.append((old_digest, old_data))
+        if evicted and self._spill_dir is not None:
+            for old_digest, old_data in evicted:
+                if old_digest not in self._spilled:
+                    await run_blocking(self._write_spilled, old_digest, old_data)
+                    self._spilled[old_digest] = len(old_data)
+                    self._spill_bytes += len(old_data)
+                self._spilled.move_to_end(old_digest)
+            while self._spill_bytes > self._spill_max_bytes and self._spilled:
+                self._unlink_spilled(next(iter(self._spilled)))
+
+    def _prune_aliases(self) -> None:
+        """Drop expired aliases and those whose blob left every tier (amortized O(1))."""
+        now = time.monotonic()
+        self._aliases = {
+            key: alias
+            for key, alias in self._aliases.items()
+            if alias.expires_at > now and (alias.digest in self._blobs or alias.digest in self._spilled)
+        }
+
+    def _spill_path(self, digest: str) -> Path:
+        assert self._spill_dir is not None
+        return self._spill_dir / digest
+
+    def _write_spilled(self, digest: str, data: bytes) -> None:
+        path = self._spill_path(digest)
+        tmp = path.with_suffix(".tmp")
+        tmp.write_bytes(data)
+        os.replace(tmp, path)
+
+    def _read_spilled(self, digest: str) -> bytes | None:
+        try:
+            return self._spill_path(digest).read_bytes()
+        except OSError:
+            return None
+
+    def _unlink_spilled(self, digest: str) -> None:
+        size = self._spilled.pop(digest, 0)
+        self._spill_bytes -= size
+        try:
+            self._spill_path(digest).unlink(missing_ok=True)
+        except OSError as exc:
+            logger.warning("[MediaCache] Could not remove spilled blob %s: %s", digest[:12], exc)
+
+
+_media_cache: MediaCache | None = None
+
+
+def get_media_cache() -> MediaCache:
+    global _media_cache
+    if _media_cache is None:
+        from src.core.config import settings
+
+        _media_cache = MediaCache(
+            max_bytes=settings.MEDIA_CACHE_MAX_BYTES,
+            ttl_seconds=settings.MEDIA_CACHE_TTL_SECONDS,
+            spill_dir=settings.MEDIA_CACHE_SPILL_DIR,
+            spill_max_bytes=settings.MEDIA_CACHE_SPILL_MAX_BYTES,
+        )
+    return _media_cache
+
+
+async def fetch_media_cached(url: str, *, timeout: float = 15.0) -> CachedMedia:
+    """Fetch an allowlisted media URL over the shared HTTP pool, through the cache."""
+    from src.utils.http_client import fetch_media_bytes
+
+    async def _load() -> tuple[bytes, str | None]:
+        fetched = await fetch_media_bytes(url, timeout=timeout)
+        return fetched.data, fetched.content_type or mimetypes.guess_type(urlparse(url).path)[0]
+
+    return await get_media_cache().get_or_load(url, _load)
@@ -1,9 +1,16 @@
 
+import asyncio
+import contextlib
 import json
 import logging
 from collections.abc import AsyncGenerator, AsyncIterator
 from typing import Any
 
+try:  # optional speedup: ~3-5x faster than json.dumps for these small frames
+    import orjson
+except ImportError:  # pragma: no cover - exercised only where orjson is absent
+    orjson = None
+
 logger = logging.getLogger(__name__)
 
 # ──────────────────────────────────────────────────────────────────────────────
@@ -41,9 +48,118 @@ TEXT_PART_ID = "0"
 _DONE = "data: [DONE]\n\n"
 
 
+def _dumps(obj: Any) -> str:
+    """Compact JSON with raw UTF-8 (no \\u escapes); orjson when installed."""
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj).decode()
+        except TypeError:
+            pass  # e.g. ints beyond 64 bits or non-str keys: let json decide
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+
+
 def _sse(chunk: dict[str, Any]) -> str:
     """Serialize one UI message chunk as an SSE `data:` event."""
-    return f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n"
+    return f"data: {_dumps(chunk)}\n\n"
+
+
+# Pre-encoded frames: the lifecycle frames never change, and a text-delta frame
+# only differs in its `delta` string, so only that is serialized per token.
+_TEXT_START = _sse({"type": "text-start", "id": TEXT_PART_ID})
+_TEXT_END = _sse({"type": "text-end", "id": TEXT_PART_ID})
+_FINISH = _sse({"type": "finish"})
+_TEXT_DELTA_PREFIX = 'data: {"type":"text-delta","id":' + _dumps(TEXT_PART_ID) + ',"delta":'
+_FRAME_SUFFIX = "}\n\n"
+
+
+def _sse_chunk(chunk: dict[str, Any]) -> str:
+    if chunk.get("type") == "text-delta" and chunk.get("id") == TEXT_PART_ID and len(chunk) == 3:
+        return _TEXT_DELTA_PREFIX + _dumps(chunk["delta"]) + _FRAME_SUFFIX
+    return _sse(chunk)
+
+
+_EOF = object()
+
+
+class _SourceError:
+    __slots__ = ("exc",)
+
+    def __init__(self, exc: Exception):
+        self.exc = exc
+
+
+async def _coalesce_text(
+    source: AsyncIterator[dict[str, Any]],
+    window_s: float,
+    max_chars: int,
+) -> AsyncGenerator[dict[str, Any], None]:
+    """
+    Merge adjacent `text-delta` chunks so a token-level model stream becomes a
+    few frames per `window_s` instead of one frame per token.
+
+    Leading-edge throttle: a delta arriving more than `window_s` after the last
+    emitted text goes out immediately (first-token latency is untouched);
+    deltas arriving sooner are buffered until the window closes, the buffer
+    reaches `max_chars`, or any other chunk arrives (order is preserved, so
+    the v6 reducer sees the same concatenated text and the same part order).
+
+    `source` is drained by a single pump task so that a timer can flush the
+    buffer while the source is idle. Keeping the source in one task matters:
+    `_stream_events` holds an `asyncio.timeout` across its yields, which is
+    bound to the task that entered it.
+    """
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue[Any] = asyncio.Queue(maxsize=256)
+
+    async def pump() -> None:
+        try:
+            async for chunk in source:
+                await queue.put(chunk)
+        except Exception as exc:  # noqa: BLE001 — re-raised on the consumer side, in order
+            await queue.put(_SourceError(exc))
+            return
+        await queue.put(_EOF)
+
+    pump_task = asyncio.create_task(pump())
+    buf: list[str] = []
+    buf_chars = 0
+    last_emit = float("-inf")
+
+    def merged() -> dict[str, Any]:
+        nonlocal buf, buf_chars, last_emit
+        chunk = {"type": "text-delta", "id": TEXT_PART_ID, "delta": "".join(buf)}
+        buf, buf_chars, last_emit = [], 0, loop.time()
+        return chunk
+
+    try:
+        while True:
+            if buf:
+                try:
+                    async with asyncio.timeout_at(last_emit + window_s):
+                        item = await queue.get()
+                except TimeoutError:
+                    yield merged()
+                    continue
+            else:
+                item = await queue.get()
+
+            if type(item) is dict and item.get("type") == "text-delta" and item.get("id") == TEXT_PART_ID:
+                buf.append(item["delta"])
+                buf_chars += len(item["delta"])
+                if buf_chars >= max_chars or loop.time() - last_emit >= window_s:
+                    yield merged()
+                continue
+            if buf:
+                yield merged()
+            if item is _EOF:
+                return
+            if isinstance(item, _SourceError):
+                raise item.exc
+            yield item
+    finally:
+        pump_task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await pump_task
 
 
 async def stream_text(text: str) -> AsyncGenerator[dict[str, Any], None]:
@@ -161,6 +277,9 @@ async def stream_reasoning(step_data: dict[str, Any]) -> AsyncGenerator[dict[str
 async def to_ui_message_stream(
     source: AsyncIterator[dict[str, Any]],
     message_id: str | None = None,
+    *,
+    coalesce_window_ms: float = 0.0,
+    coalesce_max_chars: int = 1024,
 ) -> AsyncGenerator[str, None]:
     """
     Wrap a stream of v6 UI message chunk dicts as a serialized SSE byte stream,
@@ -173,37 +292,47 @@ async def to_ui_message_stream(
     - `text-start` / `text-end` brackets around any run of `text-delta` chunks,
     - a trailing `finish` chunk and the `[DONE]` sentinel.
 
+    With `coalesce_window_ms > 0`, adjacent `text-delta` chunks are merged
+    (see `_coalesce_text`) — up to `coalesce_max_chars` characters per frame.
+
     Errors raised by `source` are surfaced as a v6 `error` chunk and the stream
     is closed cleanly. On client disconnect (GeneratorExit) nothing is yielded,
     avoiding "async generator ignored GeneratorExit" runtime errors.
     """
+    coalesced: AsyncGenerator[dict[str, Any], None] | None = None
+    if coalesce_window_ms > 0:
+        coalesced = _coalesce_text(source, coalesce_window_ms / 1000, coalesce_max_chars)
+    chunks: AsyncIterator[dict[str, Any]] = coalesced if coalesced is not None else source
     text_open = False
     start_chunk: dict[str, Any] = {"type": "start"}
     if message_id:
         start_chunk["messageId"] = message_id
     yield _sse(start_chunk)
     try:
-        async for chunk in source:
+        async for chunk in chunks:
             ctype = chunk.get("type")
             if ctype == "text-delta":
                 if not text_open:
-                    yield _sse({"type": "text-start", "id": TEXT_PART_ID})
+                    yield _TEXT_START
                     text_open = True
-                yield _sse(chunk)
+                yield _sse_chunk(chunk)
             else:
                 if text_open:
-                    yield _sse({"type": "text-end", "id": TEXT_PART_ID})
+                    yield _TEXT_END
                     text_open = False
                 yield _sse(chunk)
         if text_open:
-            yield _sse({"type": "text-end", "id": TEXT_PART_ID})
+            yield _TEXT_END
             text_open = False
-        yield _sse({"type": "finish"})
+        yield _FINISH
         yield _DONE
     except Exception as exc:  # noqa: BLE001 — convert any error into a clean v6 error frame
         logger.error("Error while streaming UI message: %s", exc, exc_info=True)
         if text_open:
-            yield _sse({"type": "text-end", "id": TEXT_PART_ID})
+            yield _TEXT_END
         yield _sse({"type": "error", "errorText": "Errore durante la generazione della risposta."})
-        yield _sse({"type": "finish"})
+        yield _FINISH
         yield _DONE
+    finally:
+        if coalesced is not None:
+            await coalesced.aclose()  # stops the pump task (and with it `source`) on disconnect
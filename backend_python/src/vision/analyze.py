@@ -2,11 +2,11 @@ import json
 import logging
 import time
 
-from google import genai
 from google.genai import types as genai_types
 from pydantic import BaseModel, Field
-from src.core.config import settings
 from src.utils.download import is_gemini_file_uri
+from src.utils.genai_client import get_genai_client, track_genai_call
+from src.vision.result_cache import get_vision_cache, vision_cache_key
 
 logger = logging.getLogger(__name__)
 
@@ -35,9 +35,12 @@ class RoomAnalysis(BaseModel):
     special_features: list[str] = Field(default_factory=list, description="fireplace, staircase, etc.")
 
 
-async def analyze_room_structure(image_bytes: bytes) -> RoomAnalysis:
+async def analyze_room_structure(image_bytes: bytes, use_cache: bool = True) -> RoomAnalysis:
     """
     Analyze room structure from uploaded photo using Gemini Vision.
+
+    Results are cached per image (src/vision/result_cache.py); `use_cache=False`
+    forces a fresh model call.
     """
     model_name = "gemini-3.1-flash-lite-preview"
 
@@ -74,8 +77,14 @@ CRITICAL RULES:
 4. Return ONLY the JSON object, nothing else
 5. Ensure the JSON is valid and parseable"""
 
+    cache = get_vision_cache()
+    cache_key = vision_cache_key(image_bytes, "room_structure", system_prompt, model_name)
+    if use_cache and (cached := await cache.get(cache_key)) is not None:
+        logger.info("[Vision] Room analysis served from cache")
+        return RoomAnalysis.model_validate(cached)
+
     try:
-        client = genai.Client(api_key=settings.api_key)
+        client = get_genai_client()
 
         # Determine content part based on input type
         try:
@@ -97,14 +106,15 @@ CRITICAL RULES:
             )
 
         start_time = time.time()
-        response = await client.aio.models.generate_content(
-            model=model_name,
-            contents=[genai_types.Content(parts=[
-                genai_types.Part(text=system_prompt),
-                image_part,
-            ])],
-            config=genai_types.GenerateContentConfig(temperature=0.1),
-        )
+        with track_genai_call(model_name):
+            response = await client.aio.models.generate_content(
+                model=model_name,
+                contents=[genai_types.Content(parts=[
+                    genai_types.Part(text=system_prompt),
+                    image_part,
+                ])],
+                config=genai_types.GenerateContentConfig(temperature=0.1),
+            )
         elapsed = time.time() - start_time
         logger.info(f"[Vision] Analysis complete in {elapsed:.1f}s")
 
@@ -116,6 +126,7 @@ CRITICAL RULES:
         parsed = json.loads(cleaned_output)
         analysis = RoomAnalysis(**parsed)
         logger.info(f"[Vision] Analyzed room: {analysis.room_type}, {analysis.approximate_size_sqm}mq")
+        await cache.put(cache_key, analysis.model_dump())
         return analysis
 
     except (json.JSONDecodeError, ValueError) as e:
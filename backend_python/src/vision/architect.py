@@ -1,10 +1,11 @@
 import json
 import logging
 
-from google import genai
 from google.genai import types as genai_types
 from pydantic import BaseModel
-from src.core.config import settings
+from src.utils.genai_client import get_genai_client, track_genai_call
+from src.vision.preprocess import prepare_image
+from src.vision.result_cache import get_vision_cache, vision_cache_key
 
 logger = logging.getLogger(__name__)
 
@@ -32,10 +33,14 @@ async def generate_architectural_prompt(
     target_style: str,
     keep_elements: list[str] | None = None,
     mime_type: str = "image/jpeg",
-    user_instructions: str = ""
+    user_instructions: str = "",
+    use_cache: bool = True,
 ) -> ArchitectOutput:
     """
     The Architect: Generates a narrative-based structural plan for image generation.
+
+    The rendered prompt (style, preservation list, user instructions) is part of
+    the cache key, so only an identical request on the same photo is reused.
     """
     if keep_elements is None:
         keep_elements = []
@@ -126,22 +131,30 @@ Respond with ONLY valid JSON. No markdown, no explanations:
 }}
 """
 
+    cache = get_vision_cache()
+    cache_key = vision_cache_key(image_bytes, "architect", system_prompt, model_name, use="i2i")
+    if use_cache and (cached := await cache.get(cache_key)) is not None:
+        logger.info("[Architect] Plan served from cache")
+        return ArchitectOutput.model_validate(cached)
+
     try:
-        client = genai.Client(api_key=settings.api_key)
-
-        response = await client.aio.models.generate_content(
-            model=model_name,
-            contents=[genai_types.Content(parts=[
-                genai_types.Part(text=system_prompt),
-                genai_types.Part(inline_data=genai_types.Blob(
-                    mime_type=mime_type,
-                    # genai Blob.data wants RAW bytes (the SDK base64-encodes it
-                    # for the wire); a base64 str would double-encode.
-                    data=image_bytes,
-                )),
-            ])],
-            config=genai_types.GenerateContentConfig(temperature=0.4),
-        )
+        prepared = await prepare_image(image_bytes, mime_type, use="i2i")
+        client = get_genai_client()
+
+        with track_genai_call(model_name):
+            response = await client.aio.models.generate_content(
+                model=model_name,
+                contents=[genai_types.Content(parts=[
+                    genai_types.Part(text=system_prompt),
+                    genai_types.Part(inline_data=genai_types.Blob(
+                        mime_type=prepared.mime_type,
+                        # genai Blob.data wants RAW bytes (the SDK base64-encodes it
+                        # for the wire); a base64 str would double-encode.
+                        data=prepared.data,
+                    )),
+                ])],
+                config=genai_types.GenerateContentConfig(temperature=0.4),
+            )
 
         raw_output = response.text or ""
         if not raw_output:
@@ -156,12 +169,14 @@ Respond with ONLY valid JSON. No markdown, no explanations:
                 raise ValueError("Missing required fields")
 
             logger.info("[Architect] Structured Output Generated")
-            return ArchitectOutput(
+            output = ArchitectOutput(
                 structural_skeleton=parsed["structuralSkeleton"],
                 material_plan=parsed["materialPlan"],
                 furnishing_strategy=parsed["furnishingStrategy"],
                 technical_notes=parsed.get("technicalNotes", "24mm lens, f/8, photorealistic 8K, natural lighting")
             )
+            await cache.put(cache_key, output.model_dump())
+            return output
 
         except (json.JSONDecodeError, ValueError) as e:
             logger.error(f"[Architect] JSON Parse Error: {e}")
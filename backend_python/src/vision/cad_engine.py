@@ -3,10 +3,10 @@ import json
 import logging
 
 from ezdxf.filemanagement import new as ezdxf_new
-from google import genai
 from google.genai import types as genai_types
 from pydantic import BaseModel, Field
-from src.core.config import settings
+from src.utils.genai_client import get_genai_client, track_genai_call
+from src.vision.preprocess import prepare_image
 
 logger = logging.getLogger(__name__)
 
@@ -80,21 +80,25 @@ async def analyze_floorplan_vector(image_bytes: bytes) -> CadVectorData:
     """
 
     try:
-        client = genai.Client(api_key=settings.api_key)
-
-        response = await client.aio.models.generate_content(
-            model=model_name,
-            contents=[genai_types.Content(parts=[
-                genai_types.Part(text=system_prompt),
-                genai_types.Part(inline_data=genai_types.Blob(
-                    mime_type="image/jpeg",
-                    # genai Blob.data wants RAW bytes (the SDK base64-encodes it
-                    # for the wire); a base64 str would double-encode.
-                    data=image_bytes,
-                )),
-            ])],
-            config=genai_types.GenerateContentConfig(temperature=0.1),
-        )
+        # Pixel coordinates (and the scale reference) are all measured on the
+        # normalized image, so the DXF scale stays consistent.
+        prepared = await prepare_image(image_bytes, use="cad")
+        client = get_genai_client()
+
+        with track_genai_call(model_name):
+            response = await client.aio.models.generate_content(
+                model=model_name,
+                contents=[genai_types.Content(parts=[
+                    genai_types.Part(text=system_prompt),
+                    genai_types.Part(inline_data=genai_types.Blob(
+                        mime_type=prepared.mime_type,
+                        # genai Blob.data wants RAW bytes (the SDK base64-encodes it
+                        # for the wire); a base64 str would double-encode.
+                        data=prepared.data,
+                    )),
+                ])],
+                config=genai_types.GenerateContentConfig(temperature=0.1),
+            )
 
         raw_output = (response.text or "").replace("```json", "").replace("```", "").strip()
         parsed = json.loads(raw_output)
@@ -10,14 +10,17 @@ CRITICAL: Output feeds directly into InsightEngine SKU quantity estimation.
 """
 import logging
 
-from google import genai
 from google.genai import types
 from pydantic import BaseModel, Field
-from src.core.config import settings
+from src.utils.genai_client import get_genai_client, track_genai_call
 from src.utils.json_parser import extract_json_response
+from src.vision.preprocess import prepare_image
+from src.vision.result_cache import get_vision_cache, vision_cache_key
 
 logger = logging.getLogger(__name__)
 
+MEASURE_MODEL = "gemini-3.1-flash-lite-preview"
+
 
 # ── Domain Exception ───────────────────────────────────────────────────────────
 
@@ -175,6 +178,7 @@ RICORDA: Misura SOLO superfici fisiche della stanza. NON includere mobili o arre
 async def measure_room_from_photo(
     image_bytes: bytes,
     mime_type: str = "image/jpeg",
+    use_cache: bool = True,
 ) -> RoomMeasurements:
     """
     Analyzes a room photo using Gemini 2.5 Flash with Python code execution
@@ -188,6 +192,7 @@ async def measure_room_from_photo(
     Args:
         image_bytes: Raw image bytes (JPEG/PNG).
         mime_type: MIME type of the image.
+        use_cache: Set False to skip the vision result cache and re-measure.
 
     Returns:
         RoomMeasurements with floor_mq, walls_mq, per-surface conditions, and confidence score.
@@ -195,17 +200,24 @@ async def measure_room_from_photo(
     Raises:
         Exception: If Gemini call fails. Callers should catch and fall back to defaults.
     """
+    cache = get_vision_cache()
+    cache_key = vision_cache_key(image_bytes, "measure_room", _MEASURE_PROMPT, MEASURE_MODEL, use="measurement")
+    if use_cache and (cached := await cache.get(cache_key)) is not None:
+        logger.info("[MeasureRoom] Measurement served from cache.")
+        return RoomMeasurements.model_validate(cached)
+
     logger.info("[MeasureRoom] Starting agentic room measurement analysis...")
 
-    client = genai.Client(api_key=settings.api_key)
+    prepared = await prepare_image(image_bytes, mime_type, use="measurement")
+    client = get_genai_client()
 
-    try:
+    with track_genai_call(MEASURE_MODEL):
         response = await client.aio.models.generate_content(
-            model="gemini-3.1-flash-lite-preview",
+            model=MEASURE_MODEL,
             contents=[
                 types.Content(parts=[
                     types.Part(text=_MEASURE_PROMPT),
-                    types.Part(inline_data=types.Blob(mime_type=mime_type, data=image_bytes)),
+                    types.Part(inline_data=types.Blob(mime_type=prepared.mime_type, data=prepared.data)),
                 ])
             ],
             config=types.GenerateContentConfig(
@@ -213,8 +225,6 @@ async def measure_room_from_photo(
                 temperature=0.1,
             ),
         )
-    finally:
-        client.close()
 
     if not response.text:
         raise MeasurementError("Empty response from Gemini.")
@@ -235,6 +245,7 @@ async def measure_room_from_photo(
             "scale_ref": result.scale_reference,
         },
     )
+    await cache.put(cache_key, result.model_dump())
     return result
 
 
@@ -0,0 +1,275 @@
+"""
+Pre-model image normalization.
+
+Phone photos arrive at 4–12 MB and 12+ MP, and Gemini downsamples them anyway.
+Before an image goes out as `inline_data`, `prepare_image()`:
+  1. applies the EXIF orientation (the pixels, not a tag the model may ignore);
+  2. downscales to the long edge configured for the use case
+     (settings.VISION_LONG_EDGE — e.g. 1024 px for triage, 2048 px for CAD);
+  3. re-encodes as JPEG or WebP at settings.VISION_ENCODE_QUALITY, which also
+     drops EXIF metadata (GPS, device serials) from what leaves the backend.
+
+Results are cached by (SHA-256 of the source, use case, encode settings), so a
+photo that is triaged, measured and inlined in the same turn is decoded once per
+profile. The work runs in the threadpool via run_blocking.
+
+A JPEG or WebP that is already small enough and needs no rotation keeps its
+encoded pixels: only the metadata segments/chunks (EXIF, XMP, IPTC, comments)
+are cut out of the byte stream, losslessly. The same happens when re-encoding
+would grow the file. Any other decodable image is always re-encoded, so no
+photo leaves the backend with its EXIF. Only what Pillow cannot decode (video,
+PDF, corrupt bytes) passes through unchanged.
+"""
+import hashlib
+import io
+import logging
+import struct
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Literal
+
+from PIL import Image, ImageOps, UnidentifiedImageError
+from src.core.config import settings
+from src.utils.async_utils import run_blocking
+
+logger = logging.getLogger(__name__)
+
+ImageUse = Literal["chat", "triage", "measurement", "i2i", "cad", "insight"]
+
+_DEFAULT_LONG_EDGE = 1536
+_EXIF_ORIENTATION_TAG = 0x0112
+_FORMATS = {"jpeg": ("JPEG", "image/jpeg"), "webp": ("WEBP", "image/webp")}
+
+
+@dataclass(frozen=True)
+class PreparedImage:
+    data: bytes
+    mime_type: str
+    width: int
+    height: int
+    source_bytes: int
+    source_digest: str  # sha256 hex of the original bytes
+    transformed: bool  # False when the source's encoded pixels were kept (metadata stripped, if any)
+
+
+class _PreparedCache:
+    """Thread-safe LRU bounded by total encoded bytes (shared by worker threads)."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._items: OrderedDict[tuple, PreparedImage] = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: tuple) -> PreparedImage | None:
+        with self._lock:
+            item = self._items.get(key)
+            if item is not None:
+                self._items.move_to_end(key)
+            return item
+
+    def put(self, key: tuple, item: PreparedImage) -> None:
+        size = len(item.data)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self._bytes -= len(old.data)
+            self._items[key] = item
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, evicted = self._items.popitem(last=False)
+                self._bytes -= len(evicted.data)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+            self._bytes = 0
+
+
+_cache = _PreparedCache(settings.VISION_PREPROCESS_CACHE_BYTES)
+
+
+def long_edge_for(use: ImageUse) -> int:
+    return settings.VISION_LONG_EDGE.get(use, _DEFAULT_LONG_EDGE)
+
+
+def preprocess_profile(use: ImageUse) -> str:
+    """The settings prepare_image(use=...) applies, as a short cache-key component."""
+    if not settings.VISION_PREPROCESS_ENABLED:
+        return "raw"
+    return f"{long_edge_for(use)}-{settings.VISION_ENCODE_FORMAT.lower()}-q{settings.VISION_ENCODE_QUALITY}"
+
+
+def _passthrough(
+    data: bytes, mime_type: str, digest: str, size: tuple[int, int] = (0, 0), source_bytes: int | None = None,
+) -> PreparedImage:
+    return PreparedImage(
+        data=data, mime_type=mime_type, width=size[0], height=size[1],
+        source_bytes=len(data) if source_bytes is None else source_bytes, source_digest=digest, transformed=False,
+    )
+
+
+# JPEG segments that carry no pixel or colour data: APP1 (EXIF/XMP), APP3–APP13
+# (vendor/IPTC), APP15, COM. APP0 (JFIF), APP2 (ICC profile) and APP14 (Adobe
+# colour transform) are needed to decode the image as intended.
+_JPEG_DROP = {0xE1, *range(0xE3, 0xEE), 0xEF, 0xFE}
+_WEBP_DROP = {b"EXIF", b"XMP "}
+_VP8X_EXIF_XMP_FLAGS = 0x08 | 0x04
+
+
+def _strip_jpeg_metadata(data: bytes) -> bytes | None:
+    """Drop metadata segments before the scan data. None if the stream is not parseable."""
+    if data[:2] != b"\xff\xd8":
+        return None
+    kept, pos, dropped = [data[:2]], 2, False
+    while pos + 4 <= len(data):
+        if data[pos] != 0xFF:
+            return None
+        marker = data[pos + 1]
+        if marker == 0xFF:  # fill byte before a marker
+            pos += 1
+            continue
+        if marker == 0xDA:  # start of scan: the rest is entropy-coded data
+            kept.append(data[pos:])
+            return b"".join(kept) if dropped else data
+        (length,) = struct.unpack(">H", data[pos + 2:pos + 4])
+        end = pos + 2 + length
+        if length < 2 or end > len(data):
+            return None
+        if marker in _JPEG_DROP:
+            dropped = True
+        else:
+            kept.append(data[pos:end])
+        pos = end
+    return None
+
+
+def _strip_webp_metadata(data: bytes) -> bytes | None:
+    """Drop EXIF/XMP chunks from a RIFF WebP and clear their VP8X flags. None if not parseable."""
+    if data[:4] != b"RIFF" or data[8:12] != b"WEBP":
+        return None
+    chunks, pos, dropped = [], 12, False
+    while pos + 8 <= len(data):
+        fourcc = data[pos:pos + 4]
+        (size,) = struct.unpack("<I", data[pos + 4:pos + 8])
+        end = pos + 8 + size + (size & 1)
+        if end > len(data) + (size & 1):
+            return None
+        chunk = data[pos:end]
+        if fourcc in _WEBP_DROP:
+            dropped = True
+        elif fourcc == b"VP8X" and size >= 1:
+            chunk = chunk[:8] + bytes([chunk[8] & ~_VP8X_EXIF_XMP_FLAGS & 0xFF]) + chunk[9:]
+        chunks.append(chunk)
+        pos = end
+    if not dropped:
+        return data
+    body = b"WEBP" + b"".join(chunks)
+    return b"RIFF" + struct.pack("<I", len(body)) + body
+
+
+def strip_metadata(data: bytes, src_format: str | None) -> bytes | None:
+    """Losslessly remove metadata from a JPEG/WebP stream (same object back if there was none).
+
+    None for other formats or a stream that cannot be parsed — the caller re-encodes instead.
+    """
+    if src_format == "JPEG":
+        return _strip_jpeg_metadata(data)
+    if src_format == "WEBP":
+        return _strip_webp_metadata(data)
+    return None
+
+
+def normalize_image(
+    data: bytes,
+    mime_type: str = "image/jpeg",
+    *,
+    long_edge: int,
+    encode_format: str = "jpeg",
+    quality: int = 85,
+    digest: str | None = None,
+) -> PreparedImage:
+    """Synchronous core of prepare_image() (no caching). Safe to call from any thread."""
+    digest = digest or hashlib.sha256(data).hexdigest()
+    pil_format, out_mime = _FORMATS.get(encode_format.lower(), _FORMATS["jpeg"])
+    try:
+        img = Image.open(io.BytesIO(data))
+        src_format = img.format
+        src_size = img.size
+        orientation = img.getexif().get(_EXIF_ORIENTATION_TAG, 1)
+        needs_resize = max(src_size) > long_edge
+        if not needs_resize and orientation in (1, None):
+            stripped = strip_metadata(data, src_format)
+            if stripped is not None:
+                return _passthrough(stripped, mime_type, digest, src_size, len(data))
+        # JPEG only: let libjpeg decode at 1/2, 1/4 or 1/8 scale — far cheaper
+        # than a full-resolution decode followed by a resize.
+        img.draft("RGB", (long_edge, long_edge))
+        img = ImageOps.exif_transpose(img)
+        if max(img.size) > long_edge:
+            img.thumbnail((long_edge, long_edge), Image.Resampling.LANCZOS)
+        if img.mode not in ("RGB", "L") and not (pil_format == "WEBP" and img.mode == "RGBA"):
+            if img.mode in ("RGBA", "LA", "P"):
+                rgba = img.convert("RGBA")
+                background = Image.new("RGB", rgba.size, (255, 255, 255))
+                background.paste(rgba, mask=rgba.getchannel("A"))
+                img = background
+            else:
+                img = img.convert("RGB")
+        out = io.BytesIO()
+        img.save(out, format=pil_format, quality=quality, optimize=pil_format == "JPEG")
+    except (UnidentifiedImageError, OSError, ValueError, Image.DecompressionBombError) as exc:
+        logger.debug("[Preprocess] Passing through undecodable input (%s): %s", mime_type, exc)
+        return _passthrough(data, mime_type, digest)
+
+    encoded = out.getvalue()
+    if len(encoded) >= len(data) and orientation in (1, None):
+        # Re-encoding a small, well-compressed source can grow it; keep the
+        # original pixels when its metadata can be stripped losslessly.
+        stripped = strip_metadata(data, src_format)
+        if stripped is not None:
+            return _passthrough(stripped, mime_type, digest, src_size, len(data))
+    return PreparedImage(
+        data=encoded, mime_type=out_mime, width=img.width, height=img.height,
+        source_bytes=len(data), source_digest=digest, transformed=True,
+    )
+
+
+def _prepare_sync(data: bytes, mime_type: str, use: ImageUse) -> PreparedImage:
+    started = time.perf_counter()
+    digest = hashlib.sha256(data).hexdigest()
+    long_edge = long_edge_for(use)
+    encode_format = settings.VISION_ENCODE_FORMAT
+    quality = settings.VISION_ENCODE_QUALITY
+    key = (digest, long_edge, encode_format, quality)
+    cached = _cache.get(key)
+    if cached is not None:
+        return cached
+    prepared = normalize_image(
+        data, mime_type, long_edge=long_edge, encode_format=encode_format, quality=quality, digest=digest,
+    )
+    if prepared.transformed:
+        # Pass-throughs are not cached: they echo the caller's MIME type, and
+        # deciding to pass through only reads the image header.
+        _cache.put(key, prepared)
+        logger.info(
+            "[Preprocess] %s: %d → %d bytes (%dx%d) in %.0fms",
+            use, prepared.source_bytes, len(prepared.data), prepared.width, prepared.height,
+            (time.perf_counter() - started) * 1000,
+        )
+    return prepared
+
+
+async def prepare_image(data: bytes, mime_type: str = "image/jpeg", use: ImageUse = "chat") -> PreparedImage:
+    """Normalize an image for a Gemini call (see module docstring). Never raises on bad input."""
+    if not settings.VISION_PREPROCESS_ENABLED or not mime_type.startswith("image/"):
+        return _passthrough(data, mime_type, "")
+    return await run_blocking(_prepare_sync, data, mime_type, use)
+
+
+def clear_preprocess_cache() -> None:
+    _cache.clear()
@@ -0,0 +1,257 @@
+"""
+Deterministic cache of vision-model results.
+
+Triage, room measurement, the Architect plan and room-structure analysis all
+run at low temperature on the same uploaded photo, often several times per
+session (re-renders, re-quotes, history replays). Each result is cached under
+
+    (function, model, sha256(prompt)[:16], preprocess profile, sha256(image bytes))
+
+so a changed prompt template, model or preprocessing setting (long edge,
+encode format, quality — what the model actually sees) never serves a stale
+answer, and a second render or quote on the same photo skips the Gemini call
+entirely.
+Prompts that embed call parameters (the Architect's style and preservation
+list) are hashed after rendering, so those parameters are part of the key.
+
+Tiers:
+  - memory: LRU bounded by entry count (VISION_CACHE_MAX_ENTRIES);
+  - persistent (VISION_CACHE_BACKEND): "sqlite" (a local file, survives
+    restarts of a long-lived instance) or "firestore" (shared by every
+    instance; documents carry `expireAt` for the collection's TTL policy).
+Both honour VISION_CACHE_TTL_SECONDS. A persistent-tier failure is logged and
+treated as a miss — the cache never makes a vision call fail.
+
+Only successful, parsed results are stored; fallbacks produced after a model
+or parse error are not. `use_cache=False` on a vision function skips the
+lookup and forces a fresh model call (whose result replaces the cached one);
+VISION_CACHE_ENABLED=false turns the cache off entirely.
+
+Values are JSON-serializable dicts (pydantic results go through model_dump).
+"""
+import copy
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import Any, Protocol
+
+from src.core.config import settings
+from src.utils.async_utils import run_blocking
+from src.vision.preprocess import ImageUse, preprocess_profile
+
+logger = logging.getLogger(__name__)
+
+# The sqlite tier drops expired rows at most this often (from put()).
+_PURGE_INTERVAL_SECONDS = 300.0
+
+
+def vision_cache_key(image: bytes, function: str, prompt: str, model: str, use: ImageUse | None = None) -> str:
+    """Cache key for one vision call (see module docstring); `use` is the prepare_image profile, None if raw."""
+    prompt_hash = hashlib.sha256(prompt.encode()).hexdigest()[:16]
+    profile = preprocess_profile(use) if use is not None else "raw"
+    image_hash = hashlib.sha256(image).hexdigest()
+    return f"{function}:{model}:{prompt_hash}:{profile}:{image_hash}"
+
+
+class ResultStore(Protocol):
+    """Persistent tier. `expires_at` is a Unix timestamp (wall clock)."""
+
+    async def get(self, key: str) -> dict[str, Any] | None: ...
+
+    async def put(self, key: str, value: dict[str, Any], expires_at: float) -> None: ...
+
+
+class SqliteResultStore:
+    """Single-file store; blocking sqlite calls run in the threadpool.
+
+    Expired rows are skipped on read and purged (via the expires_at index) at
+    most every _PURGE_INTERVAL_SECONDS, not on every write.
+    """
+
+    def __init__(self, path: str):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._next_purge = 0.0
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS vision_results "
+                "(key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS vision_results_expires_at ON vision_results (expires_at)"
+            )
+
+    def _get_sync(self, key: str) -> dict[str, Any] | None:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM vision_results WHERE key = ? AND expires_at > ?", (key, time.time())
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def _put_sync(self, key: str, value: dict[str, Any], expires_at: float) -> None:
+        payload = json.dumps(value, ensure_ascii=False)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO vision_results (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, payload, expires_at),
+            )
+            now = time.time()
+            if now >= self._next_purge:
+                self._next_purge = now + _PURGE_INTERVAL_SECONDS
+                self._conn.execute("DELETE FROM vision_results WHERE expires_at <= ?", (now,))
+
+    async def get(self, key: str) -> dict[str, Any] | None:
+        return await run_blocking(self._get_sync, key)
+
+    async def put(self, key: str, value: dict[str, Any], expires_at: float) -> None:
+        await run_blocking(self._put_sync, key, value, expires_at)
+
+
+class FirestoreResultStore:
+    """One document per key in `collection`; `expireAt` drives Firestore's TTL deletion."""
+
+    def __init__(self, collection: str = "vision_cache"):
+        self.collection = collection
+
+    def _ref(self, key: str):
+        from src.db.firebase_client import get_async_firestore_client
+
+        return get_async_firestore_client().collection(self.collection).document(key)
+
+    async def get(self, key: str) -> dict[str, Any] | None:
+        snap = await self._ref(key).get()
+        if not snap.exists:
+            return None
+        doc = snap.to_dict() or {}
+        expire_at = doc.get("expireAt")
+        if expire_at is None or expire_at <= datetime.now(UTC):
+            return None  # TTL deletion runs lazily server-side
+        return json.loads(doc["result"])
+
+    async def put(self, key: str, value: dict[str, Any], expires_at: float) -> None:
+        await self._ref(key).set({
+            "result": json.dumps(value, ensure_ascii=False),
+            "expireAt": datetime.fromtimestamp(expires_at, UTC),
+            "createdAt": datetime.now(UTC),
+        })
+
+
+class VisionResultCache:
+    """Memory LRU in front of an optional persistent ResultStore.
+
+    Memory bookkeeping runs on the event loop only, so it needs no lock.
+    Values are copied in and out, so callers may mutate what they get back.
+    """
+
+    def __init__(
+        self,
+        max_entries: int,
+        ttl_seconds: float,
+        store: ResultStore | None = None,
+        enabled: bool = True,
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.enabled = enabled and max_entries > 0 and ttl_seconds > 0
+        self._store = store
+        self._items: OrderedDict[str, tuple[float, dict[str, Any]]] = OrderedDict()  # key -> (expires_at, value)
+        self.hits = 0
+        self.store_hits = 0
+        self.misses = 0
+        self.store_errors = 0
+
+    async def get(self, key: str) -> dict[str, Any] | None:
+        if not self.enabled:
+            return None
+        entry = self._items.get(key)
+        if entry is not None:
+            if time.time() < entry[0]:
+                self._items.move_to_end(key)
+                self.hits += 1
+                return copy.deepcopy(entry[1])
+            del self._items[key]
+        if self._store is not None:
+            try:
+                value = await self._store.get(key)
+            except Exception as exc:  # noqa: BLE001 — a broken tier degrades to a miss, logged below
+                self.store_errors += 1
+                logger.warning("[VisionCache] Persistent tier read failed: %s", exc)
+                value = None
+            if value is not None:
+                self.store_hits += 1
+                self._remember(key, copy.deepcopy(value), time.time() + self.ttl_seconds)
+                return value
+        self.misses += 1
+        return None
+
+    async def put(self, key: str, value: dict[str, Any]) -> None:
+        if not self.enabled:
+            return
+        expires_at = time.time() + self.ttl_seconds
+        self._remember(key, copy.deepcopy(value), expires_at)
+        if self._store is not None:
+            try:
+                await self._store.put(key, value, expires_at)
+            except Exception as exc:  # noqa: BLE001 — the memory tier already holds the result, logged below
+                self.store_errors += 1
+                logger.warning("[VisionCache] Persistent tier write failed: %s", exc)
+
+    def clear(self) -> None:
+        self._items.clear()
+
+    def stats(self) -> dict[str, int | float | bool]:
+        lookups = self.hits + self.store_hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._items),
+            "hits": self.hits,
+            "store_hits": self.store_hits,
+            "misses": self.misses,
+            "store_errors": self.store_errors,
+            "hit_rate": round((self.hits + self.store_hits) / lookups, 3) if lookups else 0.0,
+        }
+
+    def _remember(self, key: str, value: dict[str, Any], expires_at: float) -> None:
+        self._items[key] = (expires_at, value)
+        self._items.move_to_end(key)
+        while len(self._items) > self.max_entries:
+            self._items.popitem(last=False)
+
+
+def _build_store() -> ResultStore | None:
+    backend = settings.VISION_CACHE_BACKEND.lower()
+    if backend == "sqlite":
+        return SqliteResultStore(settings.VISION_CACHE_SQLITE_PATH)
+    if backend == "firestore":
+        return FirestoreResultStore(settings.VISION_CACHE_FIRESTORE_COLLECTION)
+    if backend not in ("", "none", "memory"):
+        logger.warning("[VisionCache] Unknown VISION_CACHE_BACKEND %r — using memory only", backend)
+    return None
+
+
+_vision_cache: VisionResultCache | None = None
+
+
+def get_vision_cache() -> VisionResultCache:
+    global _vision_cache
+    if _vision_cache is None:
+        _vision_cache = VisionResultCache(
+            max_entries=settings.VISION_CACHE_MAX_ENTRIES,
+            ttl_seconds=settings.VISION_CACHE_TTL_SECONDS,
+            store=_build_store() if settings.VISION_CACHE_ENABLED else None,
+            enabled=settings.VISION_CACHE_ENABLED,
+        )
+    return _vision_cache
+
+
+def reset_vision_cache() -> None:
+    """Drop the process-wide cache (settings are re-read on next use)."""
+    global _vision_cache
+    _vision_cache = None
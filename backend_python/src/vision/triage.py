@@ -1,13 +1,16 @@
 import logging
 from typing import Any
 
-from google import genai
 from google.genai import types
-from src.core.config import settings
+from src.utils.genai_client import get_genai_client, track_genai_call
 from src.utils.json_parser import extract_json_response
+from src.vision.preprocess import prepare_image
+from src.vision.result_cache import get_vision_cache, vision_cache_key
 
 logger = logging.getLogger(__name__)
 
+TRIAGE_MODEL = "gemini-3.1-flash-lite-preview"
+
 TRIAGE_PROMPT = """You are an expert interior architect and structural engineer analyzing this image.
 
 **CRITICAL: Execute the following Chain of Thought (CoT) process before answering:**
@@ -50,24 +53,34 @@ Provide your analysis:
 ```
 """
 
-async def analyze_image_triage(image_data: bytes) -> dict[str, Any]:
+async def analyze_image_triage(image_data: bytes, use_cache: bool = True) -> dict[str, Any]:
     """
     Perform initial triage analysis on an interior space image.
     Uses google-genai SDK with Gemini 3 Flash.
+
+    Successful results are cached per image (src/vision/result_cache.py);
+    `use_cache=False` forces a fresh model call.
     """
+    cache = get_vision_cache()
+    cache_key = vision_cache_key(image_data, "triage", TRIAGE_PROMPT, TRIAGE_MODEL, use="triage")
+    if use_cache and (cached := await cache.get(cache_key)) is not None:
+        logger.info(f"Triage served from cache: {cached.get('roomType', 'unknown')} room")
+        return cached
+
     try:
-        client = genai.Client(api_key=settings.api_key)
+        prepared = await prepare_image(image_data, use="triage")
+        client = get_genai_client()
 
         logger.info("Performing triage analysis on image (Gemini 2.5 Flash)...")
 
-        try:
+        with track_genai_call(TRIAGE_MODEL):
             response = await client.aio.models.generate_content(
-                model="gemini-3.1-flash-lite-preview",
+                model=TRIAGE_MODEL,
                 contents=[
                     types.Content(
                         parts=[
                             types.Part(text=TRIAGE_PROMPT),
-                            types.Part(inline_data=types.Blob(mime_type="image/jpeg", data=image_data)),
+                            types.Part(inline_data=types.Blob(mime_type=prepared.mime_type, data=prepared.data)),
                         ]
                     )
                 ],
@@ -75,8 +88,6 @@ async def analyze_image_triage(image_data: bytes) -> dict[str, Any]:
                     tools=[{"code_execution": {}}]
                 )
             )
-        finally:
-             client.close()
 
         if not response.text:
             raise Exception("No response from vision model")
@@ -89,7 +100,7 @@ async def analyze_image_triage(image_data: bytes) -> dict[str, Any]:
 
         logger.info(f"Triage complete: {analysis.get('roomType', 'unknown')} room detected")
 
-        return {
+        result = {
             "success": True,
             "roomType": analysis.get("roomType", "unknown"),
             "currentStyle": analysis.get("currentStyle", "contemporary"),
@@ -97,6 +108,8 @@ async def analyze_image_triage(image_data: bytes) -> dict[str, Any]:
             "condition": analysis.get("condition", "good"),
             "renovationNotes": analysis.get("renovationNotes", "")
         }
+        await cache.put(cache_key, result)
+        return result
 
     except Exception as e:
         logger.error(f"Triage analysis failed: {str(e)}", exc_info=True)
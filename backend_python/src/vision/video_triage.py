@@ -14,14 +14,15 @@ import tempfile
 from pathlib import Path
 from typing import Any
 
-from google import genai
 from google.genai import types
-from src.core.config import settings
 from src.models.video_types import VideoMetadata, VideoTriageResult
+from src.utils.genai_client import get_genai_client, track_genai_call
 from src.utils.json_parser import extract_json_response
 
 logger = logging.getLogger(__name__)
 
+VIDEO_TRIAGE_MODEL = "gemini-3.1-flash-lite-preview"
+
 # Video Triage Prompt - Multimodal (Visual + Audio)
 VIDEO_TRIAGE_PROMPT = """You are an expert interior architect analyzing this renovation video.
 
@@ -220,7 +221,7 @@ async def analyze_video_with_gemini(video_path: str) -> dict[str, Any]:
     Returns:
         Dict with triage analysis results
     """
-    client = genai.Client(api_key=settings.api_key)
+    client = get_genai_client()
 
     try:
         logger.info("Uploading video to Gemini File API...")
@@ -251,23 +252,24 @@ async def analyze_video_with_gemini(video_path: str) -> dict[str, Any]:
         logger.info("Video ready. Performing multimodal analysis (visual + audio)...")
 
         # Generate content using video + prompt
-        response = await client.aio.models.generate_content(
-            model="gemini-3.1-flash-lite-preview",
-            contents=[
-                types.Content(
-                    parts=[
-                        types.Part(text=VIDEO_TRIAGE_PROMPT),
-                        types.Part(file_data=types.FileData(
-                            file_uri=video_file.uri,
-                            mime_type=video_file.mime_type
-                        ))
-                    ]
+        with track_genai_call(VIDEO_TRIAGE_MODEL):
+            response = await client.aio.models.generate_content(
+                model=VIDEO_TRIAGE_MODEL,
+                contents=[
+                    types.Content(
+                        parts=[
+                            types.Part(text=VIDEO_TRIAGE_PROMPT),
+                            types.Part(file_data=types.FileData(
+                                file_uri=video_file.uri,
+                                mime_type=video_file.mime_type
+                            ))
+                        ]
+                    )
+                ],
+                config=types.GenerateContentConfig(
+                    tools=[{"code_execution": {}}]
                 )
-            ],
-            config=types.GenerateContentConfig(
-                tools=[{"code_execution": {}}]
             )
-        )
 
         # Clean up uploaded file
         try:
@@ -308,8 +310,6 @@ async def analyze_video_with_gemini(video_path: str) -> dict[str, Any]:
             "renovationNotes": "Unable to perform video analysis. Please try a different video or contact support.",
             "audioTranscript": None
         }
-    finally:
-        client.close()
 
 
 async def analyze_video_triage(video_data: bytes, metadata: dict[str, Any] | None = None) -> VideoTriageResult:
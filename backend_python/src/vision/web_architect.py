@@ -1,10 +1,9 @@
 import json
 import logging
 
-from google import genai
 from google.genai import types as genai_types
 from pydantic import BaseModel, Field
-from src.core.config import settings
+from src.utils.genai_client import get_genai_client, track_genai_call
 
 logger = logging.getLogger(__name__)
 
@@ -64,21 +63,22 @@ async def analyze_web_mockup(
     """
 
     try:
-        client = genai.Client(api_key=settings.api_key)
+        client = get_genai_client()
 
-        response = await client.aio.models.generate_content(
-            model=model_name,
-            contents=[genai_types.Content(parts=[
-                genai_types.Part(text=system_prompt),
-                genai_types.Part(inline_data=genai_types.Blob(
-                    mime_type=mime_type,
-                    # genai Blob.data wants RAW bytes (the SDK base64-encodes it
-                    # for the wire); a base64 str would double-encode.
-                    data=image_bytes,
-                )),
-            ])],
-            config=genai_types.GenerateContentConfig(temperature=0.2),
-        )
+        with track_genai_call(model_name):
+            response = await client.aio.models.generate_content(
+                model=model_name,
+                contents=[genai_types.Content(parts=[
+                    genai_types.Part(text=system_prompt),
+                    genai_types.Part(inline_data=genai_types.Blob(
+                        mime_type=mime_type,
+                        # genai Blob.data wants RAW bytes (the SDK base64-encodes it
+                        # for the wire); a base64 str would double-encode.
+                        data=image_bytes,
+                    )),
+                ])],
+                config=genai_types.GenerateContentConfig(temperature=0.2),
+            )
 
         raw_output = response.text or ""
         cleaned_output = raw_output.replace("```json", "").replace("```", "").strip()
@@ -26,6 +26,45 @@ if not os.environ.get("GEMINI_API_KEY"):
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 
+@pytest.fixture(autouse=True)
+def _reset_media_cache():
+    """The media byte cache is process-wide; keep it from leaking bytes across tests."""
+    from src.utils.media_cache import get_media_cache
+    get_media_cache().clear()
+    yield
+    get_media_cache().clear()
+
+
+@pytest.fixture(autouse=True)
+def _reset_known_sessions():
+    """The repository's known-session caches are process-wide; start every test cold."""
+    from src.repositories.conversation_repository import _known_sessions, _owned_sessions
+    _known_sessions.clear()
+    _owned_sessions.clear()
+    yield
+    _known_sessions.clear()
+    _owned_sessions.clear()
+
+
+@pytest.fixture(autouse=True)
+def _reset_vision_cache():
+    """Vision results are cached process-wide; a cached answer would mask each test's mock."""
+    from src.vision.result_cache import reset_vision_cache
+    reset_vision_cache()
+    yield
+    reset_vision_cache()
+
+
+@pytest.fixture(autouse=True)
+def _no_lexical_indexes():
+    """BM25 indexes built under data/lexical would change what RAG searches return; start without."""
+    from src.services.lexical_index import reset_lexical_indexes, set_lexical_index
+    for namespace in ("prezzario", "normative"):
+        set_lexical_index(namespace, None)
+    yield
+    reset_lexical_indexes()
+
+
 
 @pytest.fixture
 def mock_env_development(monkeypatch):
@@ -5,6 +5,7 @@ Verifies keyword matching, range formatting, and the no-match sentinel.
 from unittest.mock import patch
 
 import pytest
+from src.services.pricing_service import PriceBookSnapshot
 from src.tools import listino_tools
 from src.tools.listino_tools import NO_LISTINO_MATCH, _normalize, search_listino
 
@@ -28,6 +29,7 @@ _FAKE_BOOK = [
         "tags": ["demolizione", "tramezzi"], "range_min": 20.0, "range_max": 30.0,
     },
 ]
+_FAKE_SNAPSHOT = PriceBookSnapshot.build(_FAKE_BOOK, "test")
 
 
 def test_normalize_drops_stopwords_and_accents():
@@ -36,7 +38,7 @@ def test_normalize_drops_stopwords_and_accents():
 
 @pytest.mark.asyncio
 async def test_finds_pvc_window_with_range():
-    with patch.object(listino_tools.PricingService, "load_price_book", return_value=_FAKE_BOOK):
+    with patch.object(listino_tools.PricingService, "_snapshot", _FAKE_SNAPSHOT):
         out = await search_listino("quanto costa una finestra in PVC")
     assert "finestra PVC" in out
     assert "€320–€630/cad" in out
@@ -47,7 +49,7 @@ async def test_finds_pvc_window_with_range():
 
 @pytest.mark.asyncio
 async def test_generic_finestra_shows_variants():
-    with patch.object(listino_tools.PricingService, "load_price_book", return_value=_FAKE_BOOK):
+    with patch.object(listino_tools.PricingService, "_snapshot", _FAKE_SNAPSHOT):
         out = await search_listino("quanto costa una finestra")
     # Single token "finestra" matches both variants → show them.
     assert "PVC" in out and "alluminio" in out
@@ -55,18 +57,43 @@ async def test_generic_finestra_shows_variants():
 
 @pytest.mark.asyncio
 async def test_returns_sentinel_when_no_match():
-    with patch.object(listino_tools.PricingService, "load_price_book", return_value=_FAKE_BOOK):
+    with patch.object(listino_tools.PricingService, "_snapshot", _FAKE_SNAPSHOT):
         out = await search_listino("quanto costa una piscina interrata")
     assert out == NO_LISTINO_MATCH
 
 
 @pytest.mark.asyncio
 async def test_sentinel_on_empty_query():
-    with patch.object(listino_tools.PricingService, "load_price_book", return_value=_FAKE_BOOK):
+    with patch.object(listino_tools.PricingService, "_snapshot", _FAKE_SNAPSHOT):
         assert await search_listino("quanto costa?") == NO_LISTINO_MATCH
 
 
 @pytest.mark.asyncio
 async def test_sentinel_when_book_unavailable():
-    with patch.object(listino_tools.PricingService, "load_price_book", return_value=[]):
+    with patch.object(listino_tools.PricingService, "_snapshot", PriceBookSnapshot.build((), "unavailable")):
         assert await search_listino("finestra pvc") == NO_LISTINO_MATCH
+
+
+@pytest.mark.asyncio
+async def test_plural_and_typo_queries_match():
+    with patch.object(listino_tools.PricingService, "_snapshot", _FAKE_SNAPSHOT):
+        plural = await search_listino("quanto costano le finestre in pvc")
+        typo = await search_listino("finsetra pvc")
+        no_match = await search_listino("pvx")  # too short to correct
+    assert "finestra PVC" in plural and "alluminio" not in plural
+    assert "finestra PVC" in typo and "alluminio" not in typo
+    assert no_match == NO_LISTINO_MATCH
+
+
+def test_index_ranks_by_coverage_then_bm25_and_is_reused():
+    index = listino_tools._get_index(_FAKE_BOOK)
+    assert listino_tools._get_index(_FAKE_BOOK) is index
+    hits = index.search(["finestra", "alluminio"])
+    assert [(cov, item["sku"]) for cov, _, item in hits] == [(2, "INF-FIN-002"), (1, "INF-FIN-001")]
+    assert listino_tools._get_index(list(_FAKE_BOOK)) is not index  # new book → new index
+
+
+def test_edit_distance_bound():
+    assert listino_tools._within_distance("finsetr", "finestr", 1)  # transposition
+    assert listino_tools._within_distance("demolizon", "demolizion", 1)
+    assert not listino_tools._within_distance("interrat", "intern", 2)
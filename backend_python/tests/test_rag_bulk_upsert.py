@@ -0,0 +1,151 @@
+"""
+Tests for rate-adaptive, resumable bulk upserts (src/services/bulk_upsert.py)
+and their use by RAGService.upsert_documents.
+"""
+import asyncio
+import time
+from collections import defaultdict, deque
+from unittest.mock import MagicMock, patch
+
+import pytest
+from src.core import config
+from src.services.bulk_upsert import BulkUpserter, TokenBucket, UpsertCheckpoint, estimate_tokens, is_rate_limited
+from src.services.rag_cache import QueryResultCache
+from src.services.rag_service import RAGService
+
+
+class _RateLimited(Exception):
+    status_code = 429
+    headers = {"Retry-After": "0"}
+
+
+def _records(n: int) -> list[dict]:
+    return [{"_id": f"r{i}", "chunk_text": "x" * 40} for i in range(n)]
+
+
+def test_estimate_tokens_and_rate_limit_detection():
+    assert estimate_tokens({"chunk_text": "x" * 40}) == 10 + 8
+    assert is_rate_limited(_RateLimited())
+    assert is_rate_limited(RuntimeError("(429) Too Many Requests"))
+    assert not is_rate_limited(RuntimeError("(400) Bad Request"))
+
+
+class TestTokenBucket:
+    async def test_waits_for_refill_once_the_burst_is_spent(self):
+        bucket = TokenBucket(tokens_per_minute=60_000)  # 1000 tok/s, 10k burst
+        await bucket.acquire(10_000)
+        started = time.monotonic()
+        await bucket.acquire(200)
+        assert time.monotonic() - started >= 0.15
+
+    def test_aimd_bounds(self):
+        bucket = TokenBucket(tokens_per_minute=60_000)
+        for _ in range(20):
+            bucket.slow_down()
+        assert bucket.rate == pytest.approx(bucket.max_rate * 0.05)
+        for _ in range(50):
+            bucket.speed_up()
+        assert bucket.rate == bucket.max_rate
+
+
+class TestBulkUpserter:
+    async def test_retries_rate_limited_batches(self):
+        calls = []
+
+        async def send(batch):
+            calls.append(len(batch))
+            if len(calls) == 1:
+                raise _RateLimited()
+
+        upserter = BulkUpserter(send, tokens_per_minute=None, max_retries=2)
+        report = await upserter.run(_records(5), batch_size=5)
+        assert calls == [5, 5]
+        assert report.retries == 1 and report.records == 5
+
+    async def test_other_errors_fail_fast(self):
+        async def send(batch):
+            raise RuntimeError("(400) Bad Request")
+
+        with pytest.raises(RuntimeError):
+            await BulkUpserter(send, tokens_per_minute=None, max_retries=5).run(_records(3), batch_size=3)
+
+    async def test_caps_batches_in_flight(self):
+        in_flight = peak = 0
+
+        async def send(batch):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+
+        await BulkUpserter(send, tokens_per_minute=None, concurrency=2).run(_records(10), batch_size=1)
+        assert peak == 2
+
+    async def test_resumes_from_checkpoint(self, tmp_path):
+        path = tmp_path / "ckpt.json"
+        records = _records(6)
+        sent: list[str] = []
+
+        async def flaky(batch):
+            if batch[0]["_id"] == "r4":
+                raise RuntimeError("connection reset")
+            sent.extend(r["_id"] for r in batch)
+
+        with pytest.raises(RuntimeError):
+            await BulkUpserter(flaky, None, concurrency=1,
+                               checkpoint=UpsertCheckpoint(path, "prezzario", records)).run(records, batch_size=2)
+        assert sent == ["r0", "r1", "r2", "r3"]
+
+        async def healthy(batch):
+            sent.extend(r["_id"] for r in batch)
+
+        report = await BulkUpserter(healthy, None,
+                                    checkpoint=UpsertCheckpoint(path, "prezzario", records)).run(records, batch_size=2)
+        assert sent[4:] == ["r4", "r5"]
+        assert report.skipped == 4
+        assert not path.exists()  # cleared after a complete run
+
+    def test_checkpoint_of_another_record_set_is_ignored(self, tmp_path):
+        path = tmp_path / "ckpt.json"
+        UpsertCheckpoint(path, "prezzario", _records(3)).mark(_records(1))
+        assert UpsertCheckpoint(path, "prezzario", _records(4)).done == {}
+        assert set(UpsertCheckpoint(path, "prezzario", _records(3)).done) == {"r0"}
+
+    async def test_record_whose_text_changed_between_runs_is_resent(self, tmp_path):
+        path = tmp_path / "ckpt.json"
+        records = _records(4)
+
+        async def crash_on_r3(batch):
+            if batch[0]["_id"] == "r3":
+                raise RuntimeError("connection reset")
+
+        with pytest.raises(RuntimeError):
+            await BulkUpserter(crash_on_r3, None, concurrency=1,
+                               checkpoint=UpsertCheckpoint(path, "prezzario", records)).run(records, batch_size=1)
+
+        records[0] = {**records[0], "chunk_text": "testo corretto"}  # same id, new text
+        sent: list[str] = []
+
+        async def healthy(batch):
+            sent.extend(r["_id"] for r in batch)
+
+        report = await BulkUpserter(healthy, None,
+                                    checkpoint=UpsertCheckpoint(path, "prezzario", records)).run(records, batch_size=1)
+        assert sent == ["r0", "r3"]  # r1, r2 skipped; r0 re-sent with its new text
+        assert report.skipped == 2
+
+
+async def test_upsert_documents_batches_with_deterministic_ids():
+    svc = RAGService.__new__(RAGService)
+    svc.pc = object()
+    svc.index = MagicMock()
+    svc.cache = QueryResultCache(max_entries=8, ttl_seconds=60)
+    svc._latency = defaultdict(lambda: deque(maxlen=200))
+    chunks = [{"text": f"paragrafo {i}"} for i in range(5)]
+    with patch.object(config.settings, "RAG_UPSERT_BATCH_SIZE", 2):
+        assert await svc.upsert_documents(chunks, namespace="normative")
+    batches = [c.kwargs["records"] for c in svc.index.upsert_records.call_args_list]
+    assert sorted(len(b) for b in batches) == [1, 2, 2]
+    ids = {r["_id"] for b in batches for r in b}
+    assert RAGService._deterministic_id("paragrafo 0") in ids  # re-ingest overwrites, never duplicates
@@ -0,0 +1,201 @@
+"""
+Tests for the offline BM25 index (src/services/lexical_index.py) and its use
+by RAGService.search and the RAG tools when Pinecone is unavailable.
+"""
+import asyncio
+import threading
+import time
+from collections import defaultdict, deque
+from unittest.mock import MagicMock, patch
+
+import pytest
+from src.core import config
+from src.services import lexical_index
+from src.services.lexical_index import LexicalIndex, set_lexical_index, tokenize, write_lexical_index
+from src.services.rag_cache import QueryResultCache
+from src.services.rag_service import RAGService, fuse_dense_lexical
+from src.tools import rag_tools
+
+_CHUNKS = [
+    {"text": "Codice articolo: A 3.02.14.a.. Demolizione di pavimento in piastrelle di ceramica.",
+     "codice": "A 3.02.14.a.", "categoria": "Demolizioni e Rimozioni", "unita_misura": "mq", "prezzo_euro": 12.5},
+    {"text": "Codice articolo: A 3.02.15.a.. Demolizione di massetto in calcestruzzo.",
+     "codice": "A 3.02.15.a.", "categoria": "Demolizioni e Rimozioni", "unita_misura": "mq", "prezzo_euro": 9.0},
+    {"text": "Codice articolo: A 14.01.15.c.. Tinteggiatura di pareti con idropittura traspirante.",
+     "codice": "A 14.01.15.c.", "categoria": "Tinteggiature", "unita_misura": "mq", "prezzo_euro": 6.1},
+]
+
+
+@pytest.fixture
+def prezzario_index(tmp_path):
+    path = tmp_path / "prezzario.bm25"
+    write_lexical_index(path, _CHUNKS)
+    index = LexicalIndex(path)
+    yield index
+    index.close()
+
+
+class TestTokenize:
+    def test_folds_accents_splits_elisions_and_drops_stopwords(self):
+        assert tokenize("Rimozione dell'intonaco più vecchio") == ["rimozion", "intonac", "vecch"]
+
+    def test_inflections_share_a_stem(self):
+        assert tokenize("piastrelle ceramiche sanitari demolizioni") == tokenize(
+            "piastrella ceramica sanitario demolizione"
+        )
+
+    def test_numbers_lose_leading_zeros(self):
+        assert tokenize("spessore 080 mm") == ["spessor", "80", "mm"]
+
+
+class TestLexicalIndex:
+    def test_ranks_the_matching_article_first(self, prezzario_index):
+        hits = prezzario_index.search("demolire pavimenti in ceramica", top_k=2)
+        assert hits[0]["metadata"]["codice"] == "A 3.02.14.a."
+        assert hits[0]["metadata"]["chunk_text"].startswith("Codice articolo: A 3.02.14.a.")
+        assert hits[0]["score"] > (hits[1]["score"] if len(hits) > 1 else 0)
+
+    def test_ids_match_the_pinecone_ids_of_coded_articles(self, prezzario_index):
+        hit = prezzario_index.search("tinteggiatura idropittura", top_k=1)[0]
+        assert hit["id"] == RAGService._deterministic_id("A 14.01.15.c.")
+
+    def test_filter_and_unknown_terms(self, prezzario_index):
+        hits = prezzario_index.search("demolizione", filter_dict={"categoria": {"$eq": "Tinteggiature"}})
+        assert hits == []
+        assert prezzario_index.search("zzzz") == []
+
+    def test_rejects_foreign_files(self, tmp_path):
+        bogus = tmp_path / "x.bm25"
+        bogus.write_bytes(b"not an index at all")
+        with pytest.raises(ValueError):
+            LexicalIndex(bogus)
+
+    def test_missing_file_means_no_index(self, tmp_path):
+        lexical_index.reset_lexical_indexes()
+        with patch.object(config.settings, "RAG_LEXICAL_INDEX_DIR", str(tmp_path)):
+            assert lexical_index.get_lexical_index("prezzario") is None
+
+
+def test_fuse_dense_lexical_merges_records_by_code():
+    dense = [{"id": "d1", "score": 0.9, "metadata": {"codice": "A 1."}},
+             {"id": "d2", "score": 0.8, "metadata": {"codice": "A 2."}}]
+    lexical = [{"id": "l2", "score": 7.0, "metadata": {"codice": "A 2."}},
+               {"id": "l3", "score": 5.0, "metadata": {"codice": "A 3."}}]
+    fused = fuse_dense_lexical(dense, lexical, k=60)
+    assert [h["metadata"]["codice"] for h in fused] == ["A 2.", "A 1.", "A 3."]
+    assert fused[0]["id"] == "d2"  # dense fields win for shared records
+    assert all(h["score"] == h["fused_score"] for h in fused)  # RRF, not a cosine/BM25 mix
+
+
+# ── RAGService integration ────────────────────────────────────────────────────
+
+
+def _service(index=None):
+    svc = RAGService.__new__(RAGService)
+    svc.pc = object() if index is not None else None
+    svc.index = index
+    svc.cache = QueryResultCache(max_entries=64, ttl_seconds=60)
+    svc._latency = defaultdict(lambda: deque(maxlen=200))
+    return svc
+
+
+@pytest.mark.asyncio
+async def test_search_serves_bm25_when_pinecone_missing(prezzario_index):
+    set_lexical_index("prezzario", prezzario_index)
+    hits = await _service().search("massetto", namespace="prezzario")
+    assert hits[0]["metadata"]["codice"] == "A 3.02.15.a."
+
+
+@pytest.mark.asyncio
+async def test_search_falls_back_to_bm25_when_pinecone_fails(prezzario_index):
+    set_lexical_index("prezzario", prezzario_index)
+    index = MagicMock()
+    index.search.side_effect = RuntimeError("503")
+    hits = await _service(index).search("idropittura", namespace="prezzario")
+    assert hits[0]["metadata"]["codice"] == "A 14.01.15.c."
+
+
+@pytest.mark.asyncio
+async def test_hybrid_mode_fuses_dense_and_bm25(prezzario_index):
+    set_lexical_index("prezzario", prezzario_index)
+    index = MagicMock()
+    index.search.return_value = MagicMock(to_dict=lambda: {"result": {"hits": [
+        {"id_": "x", "score_": 0.8, "fields": {"codice": "A 9.99.1.a.", "chunk_text": "Altro articolo"}},
+    ]}})
+    with patch.object(config.settings, "RAG_LEXICAL_MODE", "hybrid"), \
+         patch.object(config.settings, "RAG_RERANK_ENABLED", False):
+        hits = await _service(index).search("massetto calcestruzzo", top_k=5, namespace="prezzario")
+    assert {h["metadata"]["codice"] for h in hits} == {"A 9.99.1.a.", "A 3.02.15.a."}
+    assert all("fused_score" in h for h in hits)
+
+
+@pytest.mark.asyncio
+async def test_cancelled_hybrid_search_cancels_bm25(prezzario_index):
+    set_lexical_index("prezzario", prezzario_index)
+    release = threading.Event()
+    index = MagicMock()
+    index.search.side_effect = lambda **_: release.wait(5)
+    prezzario_index.search = lambda *_: release.wait(5) and []
+    futures = []
+    real_ensure_future = asyncio.ensure_future
+
+    def track(aw):
+        futures.append(real_ensure_future(aw))
+        return futures[-1]
+
+    with patch.object(config.settings, "RAG_LEXICAL_MODE", "hybrid"), \
+         patch.object(config.settings, "RAG_RERANK_ENABLED", False), \
+         patch("src.services.rag_service.asyncio.ensure_future", side_effect=track):
+        task = asyncio.create_task(_service(index).search("massetto", namespace="prezzario"))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+    release.set()
+    bm25 = futures[0]  # created before the dense search
+    assert bm25.cancelled()
+
+
+@pytest.mark.asyncio
+async def test_winning_hedge_is_fused_like_the_primary(prezzario_index):
+    set_lexical_index("prezzario", prezzario_index)
+    calls = {"n": 0}
+
+    def search(**_kwargs):
+        calls["n"] += 1
+        if calls["n"] == 1:
+            time.sleep(0.5)  # the primary hits a slow replica
+        return MagicMock(to_dict=lambda: {"result": {"hits": [
+            {"id_": "x", "score_": 0.8, "fields": {"codice": "A 9.99.1.a.", "chunk_text": "Altro articolo"}},
+        ]}})
+
+    index = MagicMock()
+    index.search.side_effect = search
+    svc = _service(index)
+    svc._latency["prezzario"].extend([0.01] * 30)  # observed p95 ≈ 10 ms
+    with patch.object(config.settings, "RAG_LEXICAL_MODE", "hybrid"), \
+         patch.object(config.settings, "RAG_HEDGE_ENABLED", True), \
+         patch.object(config.settings, "RAG_RERANK_ENABLED", False), \
+         patch.object(config.settings, "RAG_MIN_SCORE", 0.0):
+        hits = await svc._search_hedged("massetto calcestruzzo", 5, None, "prezzario")
+    assert index.search.call_count == 2  # the hedge answered
+    assert {h["metadata"]["codice"] for h in hits} == {"A 9.99.1.a.", "A 3.02.15.a."}
+    assert all(h["score"] == h["fused_score"] for h in hits)  # RRF, not the hedge's raw cosine
+
+
+@pytest.mark.asyncio
+async def test_fallback_mode_leaves_dense_results_alone(prezzario_index):
+    set_lexical_index("prezzario", prezzario_index)
+    index = MagicMock()
+    index.search.return_value = MagicMock(to_dict=lambda: {"result": {"hits": []}})
+    with patch.object(config.settings, "RAG_RERANK_ENABLED", False):
+        assert await _service(index).search("massetto", namespace="prezzario") == []
+
+
+@pytest.mark.asyncio
+async def test_search_prezzario_tool_answers_offline(prezzario_index):
+    set_lexical_index("prezzario", prezzario_index)
+    with patch.object(rag_tools, "get_rag_service", return_value=_service()):
+        out = await rag_tools.search_prezzario("tinteggiatura pareti")
+    assert "A 14.01.15.c." in out
+    assert "€6.10/mq" in out
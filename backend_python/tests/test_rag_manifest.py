@@ -0,0 +1,113 @@
+"""
+Tests for incremental re-indexing: the content-hash manifest
+(src/services/index_manifest.py) and RAGService.sync_documents.
+"""
+from collections import defaultdict, deque
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+from src.services.index_manifest import CONTENT_HASH_FIELD, IndexManifest, content_hash
+from src.services.rag_cache import QueryResultCache
+from src.services.rag_service import RAGService
+from src.services.vector_backend import HashingEmbedder, LocalVectorBackend
+
+_ARTICLES = [
+    {"text": "Demolizione di pavimento in ceramica", "codice": "A 03.01.01.a", "prezzo_euro": 12.5},
+    {"text": "Demolizione di massetto", "codice": "A 03.01.02.a", "prezzo_euro": 9.0},
+    {"text": "Tinteggiatura con idropittura", "codice": "A 14.01.15.c", "prezzo_euro": 6.1},
+]
+
+
+def _service(index) -> RAGService:
+    svc = RAGService.__new__(RAGService)
+    svc.pc = None
+    svc.index = index
+    svc.cache = QueryResultCache(max_entries=8, ttl_seconds=60)
+    svc._latency = defaultdict(lambda: deque(maxlen=200))
+    return svc
+
+
+def _local(tmp_path) -> LocalVectorBackend:
+    return LocalVectorBackend(tmp_path / "vectors", HashingEmbedder(dim=64))
+
+
+def _stored(backend: LocalVectorBackend) -> dict[str, dict]:
+    return {rec["codice"]: rec for rec in backend.records("prezzario")}
+
+
+class TestIndexManifest:
+    def test_hash_ignores_id_and_tracks_metadata(self):
+        record = {"_id": "x", "chunk_text": "posa", "prezzo_euro": 1.0}
+        assert content_hash(record) == content_hash({**record, "_id": "y", CONTENT_HASH_FIELD: "old"})
+        assert content_hash(record) != content_hash({**record, "prezzo_euro": 1.5})
+
+    def test_diff_and_round_trip(self, tmp_path):
+        manifest = IndexManifest(tmp_path / "m.json", {"a": "h1", "b": "h2", "gone": "h3"})
+        diff = manifest.diff([
+            {"_id": "a", CONTENT_HASH_FIELD: "h1"},
+            {"_id": "b", CONTENT_HASH_FIELD: "changed"},
+            {"_id": "new", CONTENT_HASH_FIELD: "h4"},
+        ])
+        assert [r["_id"] for r in diff.upsert] == ["b", "new"]
+        assert diff.delete == ["gone"] and diff.unchanged == 1
+        manifest.save()
+        assert IndexManifest.load(tmp_path / "m.json").entries == manifest.entries
+        assert not IndexManifest.load(tmp_path / "missing.json").exists
+
+
+async def test_sync_upserts_changed_and_deletes_removed_records(tmp_path):
+    backend = _local(tmp_path)
+    svc = _service(backend)
+    manifest = IndexManifest(tmp_path / "prezzario.json")
+    first = await svc.sync_documents(_ARTICLES, "prezzario", manifest)
+    assert len(first.upsert) == 3 and first.delete == []
+
+    backend.upsert_records = MagicMock(wraps=backend.upsert_records)
+    updated = [dict(_ARTICLES[0], prezzo_euro=13.0), _ARTICLES[2]]
+    diff = await svc.sync_documents(updated, "prezzario", IndexManifest.load(tmp_path / "prezzario.json"))
+
+    sent = [r["codice"] for call in backend.upsert_records.call_args_list for r in call.kwargs["records"]]
+    assert sent == ["A 03.01.01.a"]  # the unchanged article is not re-embedded
+    assert diff.delete == [RAGService._deterministic_id("A 03.01.02.a")] and diff.unchanged == 1
+    stored = _stored(backend)
+    assert sorted(stored) == ["A 03.01.01.a", "A 14.01.15.c"]
+    assert stored["A 03.01.01.a"]["prezzo_euro"] == 13.0
+    assert IndexManifest.load(tmp_path / "prezzario.json").entries == {
+        rec["_id"]: rec[CONTENT_HASH_FIELD] for rec in stored.values()
+    }
+
+
+async def test_missing_manifest_is_rebuilt_from_the_index(tmp_path):
+    backend = _local(tmp_path)
+    svc = _service(backend)
+    assert await svc.upsert_documents(_ARTICLES, namespace="prezzario")  # no manifest kept
+    backend.upsert_records = MagicMock(wraps=backend.upsert_records)
+
+    diff = await svc.sync_documents(_ARTICLES[:2], "prezzario", IndexManifest(tmp_path / "prezzario.json"))
+
+    backend.upsert_records.assert_not_called()
+    assert diff.unchanged == 2 and len(diff.delete) == 1
+    assert (tmp_path / "prezzario.json").exists()
+
+
+def test_fetch_content_hashes_pages_through_pinecone():
+    index = MagicMock()
+    index.list.return_value = iter([
+        SimpleNamespace(vectors=[SimpleNamespace(id="a"), SimpleNamespace(id="b")]),
+        SimpleNamespace(vectors=[SimpleNamespace(id="c")]),
+    ])
+    metadata = {"a": {CONTENT_HASH_FIELD: "h1"}, "b": {}, "c": None}
+    index.fetch.side_effect = lambda ids, namespace: SimpleNamespace(
+        vectors={i: SimpleNamespace(metadata=metadata[i]) for i in ids}
+    )
+    assert _service(index).fetch_content_hashes("normative") == {"a": "h1", "b": "", "c": ""}
+    assert index.fetch.call_count == 2
+
+
+async def test_delete_ids_batches_and_invalidates_the_cache():
+    index = MagicMock()
+    svc = _service(index)
+    svc.cache.invalidate = MagicMock()
+    assert await svc.delete_ids("normative", [str(i) for i in range(2500)])
+    assert [len(c.kwargs["ids"]) for c in index.delete.call_args_list] == [1000, 1000, 500]
+    svc.cache.invalidate.assert_called_once_with("normative")
@@ -2,13 +2,19 @@
 Tests for RAGService.search (src/services/rag_service.py).
 
 Focus: the result parsing (SDK to_dict emits score_/id_), min_score
-filtering, and rerank request shaping (over-fetch + rerank payload).
+filtering, rerank request shaping (over-fetch + rerank payload), and the
+query-result cache (src/services/rag_cache.py).
 """
+import asyncio
+import threading
+import time
+from collections import defaultdict, deque
 from unittest.mock import MagicMock, patch
 
 import pytest
 from src.core import config
-from src.services.rag_service import RAGService
+from src.services.rag_cache import QueryResultCache, normalize_query
+from src.services.rag_service import RAGService, reciprocal_rank_fusion
 
 
 class _FakeResp:
@@ -31,6 +37,8 @@ def _service_with_hits(hits):
     svc.pc = object()
     svc.index = MagicMock()
     svc.index.search.return_value = _FakeResp(hits)
+    svc.cache = QueryResultCache(max_entries=64, ttl_seconds=60)
+    svc._latency = defaultdict(lambda: deque(maxlen=200))
     return svc
 
 
@@ -91,3 +99,221 @@ async def test_search_returns_empty_when_index_missing():
     svc.pc = None
     svc.index = None
     assert await svc.search("x") == []
+
+
+# ── Query-result cache ────────────────────────────────────────────────────────
+
+
+def test_normalize_query_ignores_case_and_spacing():
+    assert normalize_query("  Demolizione   PAVIMENTO\n") == normalize_query("demolizione pavimento")
+
+
+@pytest.mark.asyncio
+async def test_repeated_search_is_served_from_cache():
+    svc = _service_with_hits([_hit("A 1.", 0.9)])
+    first = await svc.search("Demolizione pavimento", top_k=3, rerank=False, min_score=0.0)
+    second = await svc.search("demolizione  pavimento", top_k=3, rerank=False, min_score=0.0)
+    assert first == second
+    assert svc.index.search.call_count == 1
+    assert svc.cache_stats()["hits"] == 1
+
+
+@pytest.mark.asyncio
+async def test_cached_results_are_isolated_from_caller_mutation():
+    svc = _service_with_hits([_hit("A 1.", 0.9)])
+    first = await svc.search("demolizione", rerank=False, min_score=0.0)
+    first[0]["namespace"] = "prezzario"
+    second = await svc.search("demolizione", rerank=False, min_score=0.0)
+    assert "namespace" not in second[0]
+
+
+@pytest.mark.asyncio
+async def test_different_parameters_are_different_entries():
+    svc = _service_with_hits([_hit("A 1.", 0.9)])
+    await svc.search("demolizione", top_k=3, rerank=False, min_score=0.0)
+    await svc.search("demolizione", top_k=5, rerank=False, min_score=0.0)
+    await svc.search("demolizione", top_k=3, rerank=False, min_score=0.0, namespace="prezzario")
+    await svc.search("demolizione", top_k=3, rerank=False, min_score=0.0,
+                     filter_dict={"categoria": {"$eq": "Demolizioni"}})
+    assert svc.index.search.call_count == 4
+
+
+@pytest.mark.asyncio
+async def test_upsert_invalidates_namespace():
+    svc = _service_with_hits([_hit("A 1.", 0.9)])
+    await svc.search("demolizione", namespace="prezzario", rerank=False, min_score=0.0)
+    await svc.search("demolizione", namespace="normative", rerank=False, min_score=0.0)
+    await svc.upsert_documents([{"text": "nuovo articolo", "codice": "A 9."}], namespace="prezzario")
+    await svc.search("demolizione", namespace="prezzario", rerank=False, min_score=0.0)
+    await svc.search("demolizione", namespace="normative", rerank=False, min_score=0.0)
+    assert svc.index.search.call_count == 3  # only prezzario was re-queried
+
+
+@pytest.mark.asyncio
+async def test_delete_namespace_invalidates_namespace():
+    svc = _service_with_hits([_hit("A 1.", 0.9)])
+    await svc.search("demolizione", namespace="prezzario", rerank=False, min_score=0.0)
+    await svc.delete_namespace("prezzario")
+    await svc.search("demolizione", namespace="prezzario", rerank=False, min_score=0.0)
+    assert svc.index.search.call_count == 2
+
+
+@pytest.mark.asyncio
+async def test_search_during_delete_namespace_is_not_cached():
+    svc = _service_with_hits([_hit("A 1.", 0.9)])
+    loop = asyncio.get_running_loop()
+
+    def delete(**_kwargs):
+        # A search lands (and is cached) while the wipe is in flight.
+        asyncio.run_coroutine_threadsafe(
+            svc.search("demolizione", namespace="prezzario", rerank=False, min_score=0.0), loop,
+        ).result(timeout=5)
+
+    svc.index.delete.side_effect = delete
+    await svc.delete_namespace("prezzario")
+    await svc.search("demolizione", namespace="prezzario", rerank=False, min_score=0.0)
+    assert svc.index.search.call_count == 2
+
+
+@pytest.mark.asyncio
+async def test_concurrent_identical_queries_share_one_call():
+    svc = _service_with_hits([])
+    release = threading.Event()
+
+    def slow_search(**_kwargs):
+        release.wait(timeout=5)
+        return _FakeResp([_hit("A 1.", 0.9)])
+
+    svc.index.search.side_effect = slow_search
+    tasks = [asyncio.create_task(svc.search("demolizione", rerank=False, min_score=0.0)) for _ in range(5)]
+    await asyncio.sleep(0.05)
+    release.set()
+    results = await asyncio.gather(*tasks)
+    assert svc.index.search.call_count == 1
+    assert all(r == results[0] for r in results)
+    assert svc.cache_stats()["coalesced"] == 4
+
+
+@pytest.mark.asyncio
+async def test_failed_search_is_not_cached():
+    svc = _service_with_hits([_hit("A 1.", 0.9)])
+    svc.index.search.side_effect = [RuntimeError("pinecone 503"), _FakeResp([_hit("A 1.", 0.9)])]
+    assert await svc.search("demolizione", rerank=False, min_score=0.0) == []
+    assert len(await svc.search("demolizione", rerank=False, min_score=0.0)) == 1
+    assert svc.index.search.call_count == 2
+
+
+@pytest.mark.asyncio
+async def test_cache_expires_after_ttl():
+    svc = _service_with_hits([_hit("A 1.", 0.9)])
+    with patch("src.services.rag_cache.time.monotonic", return_value=100.0):
+        await svc.search("demolizione", rerank=False, min_score=0.0)
+    with patch("src.services.rag_cache.time.monotonic", return_value=161.0):
+        await svc.search("demolizione", rerank=False, min_score=0.0)
+    assert svc.index.search.call_count == 2
+
+
+# ── Multi-namespace fan-out ───────────────────────────────────────────────────
+
+
+def _service_by_namespace(hits_by_ns, delay_by_ns=None):
+    """index.search answers per namespace, optionally after a (thread) delay."""
+    svc = _service_with_hits([])
+    delay_by_ns = delay_by_ns or {}
+
+    def search(namespace, query, **_kwargs):
+        time.sleep(delay_by_ns.get(namespace, 0.0))
+        return _FakeResp(hits_by_ns[namespace])
+
+    svc.index.search.side_effect = search
+    return svc
+
+
+def test_rrf_interleaves_namespaces_by_rank_not_raw_score():
+    fused = reciprocal_rank_fusion({
+        "prezzario": [{"id": "p1", "score": 0.99}, {"id": "p2", "score": 0.98}],
+        "normative": [{"id": "n1", "score": 0.40}],
+    }, k=60)
+    assert [h["id"] for h in fused] == ["p1", "n1", "p2"]
+    assert fused[1]["namespace"] == "normative"
+    assert fused[1]["score"] == 0.40  # original score kept alongside fused_score
+
+
+@pytest.mark.asyncio
+async def test_multi_namespace_searches_run_concurrently():
+    svc = _service_by_namespace(
+        {"prezzario": [_hit("A 1.", 0.9)], "normative": [_hit("N 1.", 0.5)]},
+        delay_by_ns={"prezzario": 0.2, "normative": 0.2},
+    )
+    with patch.object(config.settings, "RAG_RERANK_ENABLED", False), \
+         patch.object(config.settings, "RAG_MIN_SCORE", 0.0):
+        started = time.perf_counter()
+        res = await svc.search_multi_namespace("bagno", top_k=5)
+        elapsed = time.perf_counter() - started
+    assert elapsed < 0.35  # sequential would be ≥ 0.4
+    assert {r["namespace"] for r in res} == {"prezzario", "normative"}
+    assert not res.partial
+
+
+@pytest.mark.asyncio
+async def test_slow_namespace_yields_tagged_partial_results():
+    svc = _service_by_namespace(
+        {"prezzario": [_hit("A 1.", 0.9)], "normative": [_hit("N 1.", 0.5)]},
+        delay_by_ns={"normative": 0.5},
+    )
+    with patch.object(config.settings, "RAG_NAMESPACE_TIMEOUT_SECONDS", 0.1), \
+         patch.object(config.settings, "RAG_RERANK_ENABLED", False), \
+         patch.object(config.settings, "RAG_MIN_SCORE", 0.0):
+        res = await svc.search_multi_namespace("bagno", top_k=5)
+    assert [r["namespace"] for r in res] == ["prezzario"]
+    assert res.partial
+    assert res.timed_out == ["normative"]
+
+
+@pytest.mark.asyncio
+async def test_hedged_request_wins_when_primary_stalls():
+    svc = _service_with_hits([])
+    calls = {"n": 0}
+
+    def search(namespace, query, **_kwargs):
+        calls["n"] += 1
+        if calls["n"] == 1:
+            time.sleep(0.5)  # the primary hits a slow replica
+        return _FakeResp([_hit("A 1.", 0.9)])
+
+    svc.index.search.side_effect = search
+    svc._latency["prezzario"].extend([0.01] * 30)  # observed p95 ≈ 10 ms
+    with patch.object(config.settings, "RAG_HEDGE_ENABLED", True), \
+         patch.object(config.settings, "RAG_RERANK_ENABLED", False), \
+         patch.object(config.settings, "RAG_MIN_SCORE", 0.0):
+        started = time.perf_counter()
+        res = await svc.search_multi_namespace("bagno", namespaces=["prezzario"], top_k=3)
+        elapsed = time.perf_counter() - started
+    assert [r["metadata"]["codice"] for r in res] == ["A 1."]
+    assert elapsed < 0.4
+    assert svc.index.search.call_count == 2
+
+
+@pytest.mark.asyncio
+async def test_failed_search_still_records_latency():
+    svc = _service_with_hits([])
+
+    def search(**_kwargs):
+        time.sleep(0.05)
+        raise RuntimeError("pinecone 503")
+
+    svc.index.search.side_effect = search
+    with patch("src.services.rag_service.get_lexical_index", return_value=None):
+        assert await svc.search("demolizione", namespace="prezzario", rerank=False, min_score=0.0) == []
+    assert len(svc._latency["prezzario"]) == 1
+    assert svc._latency["prezzario"][0] >= 0.05
+
+
+@pytest.mark.asyncio
+async def test_no_hedge_without_enough_latency_samples():
+    svc = _service_by_namespace({"prezzario": [_hit("A 1.", 0.9)]})
+    with patch.object(config.settings, "RAG_HEDGE_ENABLED", True), \
+         patch.object(config.settings, "RAG_RERANK_ENABLED", False), \
+         patch.object(config.settings, "RAG_MIN_SCORE", 0.0):
+        await svc.search_multi_namespace("bagno", namespaces=["prezzario"])
+    assert svc.index.search.call_count == 1
@@ -8,14 +8,23 @@ which could return a wrong-but-similar article.
 from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
+from src.services.prezzario_index import PrezzarioIndex, set_prezzario_index
 from src.tools import rag_tools
 from src.tools.rag_tools import _codice_variants, retrieve_price_by_code
 
 
+@pytest.fixture(autouse=True)
+def _local_index():
+    """Empty code index by default, so lookups exercise the Pinecone path."""
+    set_prezzario_index(PrezzarioIndex())
+    yield
+    set_prezzario_index(None)
+
+
 def _make_rag_service(search_side_effect):
-    """Build a mock RAGService with pc truthy and an async search()."""
+    """Build a mock RAGService with an index and an async search()."""
     svc = MagicMock()
-    svc.pc = object()  # truthy → passes the "configured" guard
+    svc.index = object()  # not None → passes the "configured" guard
     svc.search = AsyncMock(side_effect=search_side_effect)
     return svc
 
@@ -96,7 +105,57 @@ async def test_not_found_when_both_searches_empty():
 @pytest.mark.asyncio
 async def test_returns_unavailable_when_pinecone_down():
     svc = MagicMock()
-    svc.pc = None
+    svc.index = None
     with patch.object(rag_tools, "get_rag_service", return_value=svc):
         out = await retrieve_price_by_code("A 3.01.15.f.")
     assert "non è" in out and "raggiungibile" in out
+
+
+# ── In-process code index ─────────────────────────────────────────────────────
+
+_ARTICLES = [
+    {"codice": "A 3.02.14.a.", "descrizione": "Demolizione pavimento in ceramica", "unita_misura": "mq",
+     "prezzo_euro": 12.5, "categoria": "Demolizioni e Rimozioni"},
+    {"codice": "A 3.02.14.b.", "descrizione": "Demolizione pavimento in marmo", "unita_misura": "mq",
+     "prezzo_euro": 16.0, "categoria": "Demolizioni e Rimozioni"},
+    {"codice": "A 14.01.15.c.", "descrizione": "Tinteggiatura con idropittura", "unita_misura": "mq",
+     "prezzo_euro": 6.1, "categoria": "Tinteggiature"},
+]
+
+
+@pytest.mark.asyncio
+async def test_local_index_answers_exact_code_without_pinecone():
+    set_prezzario_index(PrezzarioIndex(_ARTICLES))
+    svc = MagicMock()
+    svc.index = None  # Pinecone down
+    with patch.object(rag_tools, "get_rag_service", return_value=svc):
+        out = await retrieve_price_by_code("a 3.2.14.A")
+    assert "A 3.02.14.a." in out
+    assert "€12.50/mq" in out
+    assert "approssimativa" not in out
+
+
+@pytest.mark.asyncio
+async def test_local_index_lists_chapter_for_prefix_code():
+    set_prezzario_index(PrezzarioIndex(_ARTICLES))
+    out = await retrieve_price_by_code("A 3.02.14")
+    assert "A 3.02.14.a." in out and "A 3.02.14.b." in out
+    assert "A 14.01.15.c." not in out
+
+
+@pytest.mark.asyncio
+async def test_local_index_tolerates_one_typo():
+    set_prezzario_index(PrezzarioIndex(_ARTICLES))
+    out = await retrieve_price_by_code("A 14.01.16.c.")
+    assert "A 14.01.15.c." in out
+    assert "approssimativa" in out
+
+
+@pytest.mark.asyncio
+async def test_local_index_miss_falls_back_to_pinecone():
+    set_prezzario_index(PrezzarioIndex(_ARTICLES))
+    svc = _make_rag_service([[_prezzario_hit("A 20.01.1.")]])
+    with patch.object(rag_tools, "get_rag_service", return_value=svc):
+        out = await retrieve_price_by_code("A 20.01.1.")
+    assert svc.search.call_count == 1
+    assert "A 20.01.1." in out
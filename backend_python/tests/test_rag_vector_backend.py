@@ -0,0 +1,138 @@
+"""
+Tests for the local vector backend (src/services/vector_backend.py) and
+RAGService running on top of it with the deterministic hashing embedder.
+"""
+from collections import defaultdict, deque
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+from pinecone import SearchQuery
+from src.core import config
+from src.services.rag_cache import QueryResultCache
+from src.services.rag_service import RAGService
+from src.services.vector_backend import HashingEmbedder, LocalVectorBackend
+
+_RECORDS = [
+    {"_id": "a", "chunk_text": "Demolizione di pavimento in piastrelle di ceramica", "categoria": "Demolizioni",
+     "prezzo_euro": 12.5},
+    {"_id": "b", "chunk_text": "Demolizione di massetto in calcestruzzo", "categoria": "Demolizioni",
+     "prezzo_euro": 9.0},
+    {"_id": "c", "chunk_text": "Tinteggiatura di pareti con idropittura traspirante", "categoria": "Tinteggiature",
+     "prezzo_euro": 6.1},
+]
+
+
+def _backend(tmp_path, quantize=False) -> LocalVectorBackend:
+    backend = LocalVectorBackend(tmp_path, HashingEmbedder(dim=128), quantize=quantize)
+    backend.upsert_records("prezzario", _RECORDS)
+    return backend
+
+
+def _ids(response) -> list[str]:
+    return [hit["_id"] for hit in response["result"]["hits"]]
+
+
+class TestHashingEmbedder:
+    def test_is_deterministic_and_normalized(self):
+        first = HashingEmbedder(64).embed(["posa di piastrelle"])
+        second = HashingEmbedder(64).embed(["posa di piastrelle"])
+        assert np.array_equal(first, second)
+        assert np.isclose(np.linalg.norm(first[0]), 1.0)
+
+    def test_shared_terms_mean_higher_similarity(self):
+        vectors = HashingEmbedder(256).embed(["piastrelle ceramica", "piastrella in ceramica", "tinteggiatura"])
+        assert vectors[0] @ vectors[1] > vectors[0] @ vectors[2]
+
+
+class TestLocalVectorBackend:
+    def test_search_ranks_the_closest_record_first(self, tmp_path):
+        response = _backend(tmp_path).search("prezzario", SearchQuery(inputs={"text": "massetto"}, top_k=2))
+        assert _ids(response)[0] == "b"
+        assert response["result"]["hits"][0]["fields"]["chunk_text"].startswith("Demolizione di massetto")
+
+    def test_filters_on_metadata_columns(self, tmp_path):
+        backend = _backend(tmp_path)
+        query = SearchQuery(inputs={"text": "demolizione"}, top_k=5, filter={"categoria": {"$eq": "Tinteggiature"}})
+        assert _ids(backend.search("prezzario", query)) == ["c"]
+        query = SearchQuery(inputs={"text": "demolizione"}, top_k=5, filter={"categoria": {"$in": ["Demolizioni"]}})
+        assert sorted(_ids(backend.search("prezzario", query))) == ["a", "b"]
+        query = SearchQuery(inputs={"text": "demolizione"}, top_k=5, filter={"categoria": "Impianti"})
+        assert _ids(backend.search("prezzario", query)) == []
+
+    def test_persists_and_upserts_by_id(self, tmp_path):
+        _backend(tmp_path).upsert_records("prezzario", [{"_id": "b", "chunk_text": "Rimozione di infissi"}])
+        reopened = LocalVectorBackend(tmp_path, HashingEmbedder(dim=128))
+        assert reopened.describe_index_stats().namespaces["prezzario"].vector_count == 3
+        assert _ids(reopened.search("prezzario", SearchQuery(inputs={"text": "infissi"}, top_k=1))) == ["b"]
+
+    def test_int8_quantization_keeps_the_ranking(self, tmp_path):
+        exact = _backend(tmp_path / "f32")
+        quantized = _backend(tmp_path / "i8", quantize=True)
+        assert np.load(quantized._live_version("prezzario") / "vectors.npy").dtype == np.int8
+        query = SearchQuery(inputs={"text": "pavimento ceramica"}, top_k=3)
+        assert _ids(quantized.search("prezzario", query)) == _ids(exact.search("prezzario", query))
+
+    def test_batched_query_vectors(self, tmp_path):
+        backend = _backend(tmp_path)
+        queries = backend.embedder.embed(["massetto", "idropittura"], query=True)
+        rows, scores = backend.query_vectors("prezzario", queries, top_k=1)
+        assert rows.shape == (2, 1)
+        assert [_RECORDS[r]["_id"] for r in rows[:, 0]] == ["b", "c"]
+        assert (scores > 0).all()
+
+    def test_delete_namespace(self, tmp_path):
+        backend = _backend(tmp_path)
+        backend.delete(delete_all=True, namespace="prezzario")
+        assert _ids(backend.search("prezzario", SearchQuery(inputs={"text": "massetto"}, top_k=3))) == []
+
+    def test_writes_swap_whole_versions(self, tmp_path):
+        backend = _backend(tmp_path)
+        first = backend._live_version("prezzario")
+        backend.upsert_records("prezzario", [{"_id": "d", "chunk_text": "Posa di parquet"}])
+        second = backend._live_version("prezzario")
+        backend.upsert_records("prezzario", [{"_id": "e", "chunk_text": "Rasatura di pareti"}])
+        third = backend._live_version("prezzario")
+        assert len({first, second, third}) == 3
+        # Only the live version and the one before it remain.
+        assert sorted(p for p in (tmp_path / "prezzario").iterdir() if p.is_dir()) == sorted([second, third])
+        # A reader that resolved CURRENT before the last swap still sees a matching set.
+        stale = LocalVectorBackend(tmp_path, HashingEmbedder(dim=128))
+        with patch.object(stale, "_live_version", return_value=second):
+            assert len(stale.records("prezzario")) == 4
+
+    def test_list_and_fetch_are_pinecone_shaped(self, tmp_path):
+        backend = _backend(tmp_path)
+        pages = list(backend.list(namespace="prezzario", limit=2))
+        assert [[item.id for item in page.vectors] for page in pages] == [["a", "b"], ["c"]]
+        fetched = backend.fetch(ids=["c", "missing"], namespace="prezzario")
+        assert list(fetched.vectors) == ["c"]
+        assert fetched.vectors["c"].metadata["categoria"] == "Tinteggiature"
+        assert backend.fetch(ids=["a"], namespace="other").vectors == {}
+
+    def test_delete_ids(self, tmp_path):
+        backend = _backend(tmp_path, quantize=True)
+        backend.delete(ids=["b", "missing"], namespace="prezzario")
+        assert [r["_id"] for r in backend.records("prezzario")] == ["a", "c"]
+        query = SearchQuery(inputs={"text": "idropittura"}, top_k=3)
+        assert _ids(LocalVectorBackend(tmp_path, HashingEmbedder(dim=128)).search("prezzario", query))[0] == "c"
+
+
+@pytest.mark.asyncio
+async def test_rag_service_round_trip_on_local_backend(tmp_path):
+    svc = RAGService.__new__(RAGService)
+    svc.pc = None
+    svc.index = LocalVectorBackend(tmp_path, HashingEmbedder(dim=128))
+    svc.cache = QueryResultCache(max_entries=64, ttl_seconds=60)
+    svc._latency = defaultdict(lambda: deque(maxlen=200))
+
+    ok = await svc.upsert_documents(
+        [{"text": "Tinteggiatura di pareti con idropittura", "codice": "A 14.01.15.c.", "prezzo_euro": 6.1}],
+        namespace="prezzario",
+    )
+    assert ok
+    with patch.object(config.settings, "RAG_RERANK_ENABLED", True):  # no local reranker: top_n only
+        hits = await svc.search("idropittura pareti", top_k=3, namespace="prezzario")
+    assert hits[0]["id"] == RAGService._deterministic_id("A 14.01.15.c.")
+    assert hits[0]["metadata"]["prezzo_euro"] == 6.1
+    assert svc.get_stats()["namespaces"] == {"prezzario": 1}
@@ -0,0 +1,246 @@
+"""
+In-memory stand-in for the async Firestore client (google.cloud.firestore.AsyncClient).
+
+Covers the surface the repositories use — document get/set/update/create/delete,
+auto ids, collection `stream` (with equality `where` and `limit`), `get_all`, and atomic WriteBatch commits with the SERVER_TIMESTAMP,
+Increment and DELETE_FIELD transforms — with the same preconditions as the
+real service (`update` → NotFound, `create` → AlreadyExists, an update with a
+stale `write_option(last_update_time=...)` → FailedPrecondition, the whole
+batch fails as one). Snapshots carry `update_time`.
+
+Every server call counts as one round-trip in `rpcs` and can be given an
+artificial latency, so tests can assert round-trip counts and benchmarks can
+compare call patterns (scripts/bench_conversation_persistence.py).
+"""
+import asyncio
+import copy
+import uuid
+from collections import Counter
+from collections.abc import AsyncIterator
+from datetime import UTC, datetime, timedelta
+from types import SimpleNamespace
+from typing import Any
+
+from google.api_core.exceptions import AlreadyExists, FailedPrecondition, NotFound
+from google.cloud import firestore
+from google.cloud.firestore_v1.transforms import Increment
+
+
+class FakeSnapshot:
+    def __init__(self, ref: "FakeDocumentRef", data: dict[str, Any] | None, update_time: datetime | None = None):
+        self.reference = ref
+        self.id = ref.id
+        self._data = data
+        self.update_time = update_time
+
+    @property
+    def exists(self) -> bool:
+        return self._data is not None
+
+    def to_dict(self) -> dict[str, Any] | None:
+        return copy.deepcopy(self._data)
+
+    def get(self, field: str) -> Any:
+        return (self._data or {}).get(field)
+
+
+class FakeDocumentRef:
+    def __init__(self, db: "FakeFirestore", path: str):
+        self._db = db
+        self.path = path
+        self.id = path.rsplit("/", 1)[-1]
+
+    def collection(self, name: str) -> "FakeCollectionRef":
+        return FakeCollectionRef(self._db, f"{self.path}/{name}")
+
+    async def get(self, field_paths: list[str] | None = None) -> FakeSnapshot:
+        await self._db._rpc("get")
+        snapshot = self._db._snapshot(self)
+        if field_paths is not None and snapshot.exists:
+            snapshot._data = {k: v for k, v in snapshot._data.items() if k in field_paths}
+        return snapshot
+
+    async def set(self, data: dict[str, Any], merge: bool = False) -> None:
+        await self._db._rpc("set")
+        self._db._apply([("set", self, data, merge)])
+
+    async def update(self, data: dict[str, Any], option: Any = None) -> None:
+        await self._db._rpc("update")
+        if option is not None and self._db.update_times.get(self.path) != option.last_update_time:
+            raise FailedPrecondition(f"Document changed since {option.last_update_time}: {self.path}")
+        self._db._apply([("update", self, data, True)])
+
+    async def create(self, data: dict[str, Any]) -> None:
+        await self._db._rpc("create")
+        self._db._apply([("create", self, data, False)])
+
+    async def delete(self) -> None:
+        await self._db._rpc("delete")
+        self._db.docs.pop(self.path, None)
+        self._db.update_times.pop(self.path, None)
+
+
+class FakeCollectionRef:
+    def __init__(self, db: "FakeFirestore", path: str):
+        self._db = db
+        self.path = path
+
+    def document(self, doc_id: str | None = None) -> FakeDocumentRef:
+        return FakeDocumentRef(self._db, f"{self.path}/{doc_id or uuid.uuid4().hex[:20]}")
+
+    async def add(self, data: dict[str, Any]) -> tuple[datetime, FakeDocumentRef]:
+        ref = self.document()
+        await ref.set(data)
+        return datetime.now(UTC), ref
+
+    def where(self, field: str, op: str, value: Any) -> "FakeQuery":
+        return FakeQuery(self).where(field, op, value)
+
+    def limit(self, count: int) -> "FakeQuery":
+        return FakeQuery(self).limit(count)
+
+    async def stream(self) -> AsyncIterator[FakeSnapshot]:
+        async for snap in FakeQuery(self).stream():
+            yield snap
+
+
+class FakeQuery:
+    """Equality filters and a limit over one collection; other operators are not modelled."""
+
+    def __init__(self, collection: FakeCollectionRef, filters: tuple[tuple[str, Any], ...] = (),
+                 count: int | None = None):
+        self._collection = collection
+        self._filters = filters
+        self._count = count
+
+    def where(self, field: str, op: str, value: Any) -> "FakeQuery":
+        if op != "==":
+            raise NotImplementedError(f"FakeQuery supports only '==' filters, got {op!r}")
+        return FakeQuery(self._collection, (*self._filters, (field, value)), self._count)
+
+    def limit(self, count: int) -> "FakeQuery":
+        return FakeQuery(self._collection, self._filters, count)
+
+    async def stream(self) -> AsyncIterator[FakeSnapshot]:
+        db = self._collection._db
+        await db._rpc("query")
+        matched = [
+            doc_id for doc_id, data in db.children(self._collection.path).items()
+            if all(data.get(field) == value for field, value in self._filters)
+        ]
+        for doc_id in matched[:self._count]:
+            yield db._snapshot(self._collection.document(doc_id))
+
+
+class FakeWriteBatch:
+    def __init__(self, db: "FakeFirestore"):
+        self._db = db
+        self._ops: list[tuple[str, FakeDocumentRef, dict[str, Any], bool]] = []
+
+    def set(self, ref: FakeDocumentRef, data: dict[str, Any], merge: bool = False) -> None:
+        self._ops.append(("set", ref, data, merge))
+
+    def update(self, ref: FakeDocumentRef, data: dict[str, Any]) -> None:
+        self._ops.append(("update", ref, data, True))
+
+    def create(self, ref: FakeDocumentRef, data: dict[str, Any]) -> None:
+        self._ops.append(("create", ref, data, False))
+
+    def delete(self, ref: FakeDocumentRef) -> None:
+        self._ops.append(("delete", ref, {}, False))
+
+    async def commit(self) -> list[Any]:
+        if len(self._ops) > 500:
+            raise ValueError("A write batch can contain at most 500 writes")
+        await self._db._rpc("commit")
+        self._db._apply(self._ops)
+        return []
+
+
+class FakeFirestore:
+    """Async Firestore client fake. `rtt` is the simulated seconds per server call."""
+
+    def __init__(self, rtt: float = 0.0):
+        self.rtt = rtt
+        self.docs: dict[str, dict[str, Any]] = {}
+        self.update_times: dict[str, datetime] = {}
+        self._last_commit = datetime.min.replace(tzinfo=UTC)
+        self.rpcs: Counter[str] = Counter()
+
+    # ── Client surface ────────────────────────────────────────────────────────
+
+    def collection(self, name: str) -> FakeCollectionRef:
+        return FakeCollectionRef(self, name)
+
+    def document(self, path: str) -> FakeDocumentRef:
+        return FakeDocumentRef(self, path)
+
+    def batch(self) -> FakeWriteBatch:
+        return FakeWriteBatch(self)
+
+    @staticmethod
+    def write_option(last_update_time: datetime) -> SimpleNamespace:
+        return SimpleNamespace(last_update_time=last_update_time)
+
+    async def get_all(self, refs: list[FakeDocumentRef]) -> AsyncIterator[FakeSnapshot]:
+        await self._rpc("get_all")
+        for ref in refs:
+            yield self._snapshot(ref)
+
+    # ── Helpers for tests ─────────────────────────────────────────────────────
+
+    def data(self, path: str) -> dict[str, Any] | None:
+        return self.docs.get(path)
+
+    def children(self, collection_path: str) -> dict[str, dict[str, Any]]:
+        prefix = collection_path + "/"
+        return {
+            p[len(prefix):]: d for p, d in self.docs.items()
+            if p.startswith(prefix) and "/" not in p[len(prefix):]
+        }
+
+    @property
+    def round_trips(self) -> int:
+        return sum(self.rpcs.values())
+
+    # ── Internals ─────────────────────────────────────────────────────────────
+
+    async def _rpc(self, kind: str) -> None:
+        self.rpcs[kind] += 1
+        await asyncio.sleep(self.rtt)
+
+    def _snapshot(self, ref: FakeDocumentRef) -> FakeSnapshot:
+        return FakeSnapshot(ref, copy.deepcopy(self.docs.get(ref.path)), self.update_times.get(ref.path))
+
+    def _apply(self, ops: list[tuple[str, FakeDocumentRef, dict[str, Any], bool]]) -> None:
+        # Preconditions are checked against the state before the batch, then
+        # all writes land together — a failed precondition writes nothing.
+        for kind, ref, _, _ in ops:
+            if kind == "update" and ref.path not in self.docs:
+                raise NotFound(f"No document to update: {ref.path}")
+            if kind == "create" and ref.path in self.docs:
+                raise AlreadyExists(f"Document already exists: {ref.path}")
+        # Strictly increasing, like real commit times, so update_time preconditions never collide.
+        now = self._last_commit = max(datetime.now(UTC), self._last_commit + timedelta(microseconds=1))
+        for kind, ref, data, merge in ops:
+            if kind == "delete":
+                self.docs.pop(ref.path, None)
+                self.update_times.pop(ref.path, None)
+                continue
+            current = self.docs.get(ref.path) if merge or kind == "update" else None
+            doc = dict(current or {})
+            for key, value in data.items():
+                if value is firestore.DELETE_FIELD:
+                    doc.pop(key, None)
+                else:
+                    doc[key] = self._resolve(value, doc.get(key), now)
+            self.docs[ref.path] = doc
+            self.update_times[ref.path] = now
+
+    @staticmethod
+    def _resolve(value: Any, current: Any, now: datetime) -> Any:
+        if value is firestore.SERVER_TIMESTAMP:
+            return now
+        if isinstance(value, Increment):
+            return (current if isinstance(current, int | float) else 0) + value.value
+        return copy.deepcopy(value)
@@ -13,8 +13,12 @@ Mocking:
 - Session service → InMemorySessionService
 - Filters → pass-through
 """
+import asyncio
 from unittest.mock import AsyncMock, MagicMock, patch
 
+import pytest
+from src.adk.adk_orchestrator import ADKOrchestrator
+
 # ── Helpers ──────────────────────────────────────────────────────────────────
 
 def _make_text_event(text: str, author: str = "syd_orchestrator", partial: bool = False):
@@ -156,14 +160,20 @@ def _setup_mocks(mock_get_session, mock_get_repo, mock_settings):
     mock_settings.ADK_LOCATION = "us-central1"
     mock_settings.ADK_CMEK_KEY_NAME = ""
     mock_settings.FIREBASE_STORAGE_BUCKET = "test.appspot.com"
+    mock_settings.ADK_PRERUN_DEADLINE_SECONDS = 20.0
+    mock_settings.SSE_COALESCE_WINDOW_MS = 20.0
+    mock_settings.SSE_COALESCE_MAX_CHARS = 1024
 
     session_svc = AsyncMock()
     session_svc.get_session = AsyncMock(return_value=MagicMock())
     session_svc.create_session = AsyncMock()
     mock_get_session.return_value = session_svc
 
+    mock_settings.CHAT_PERSIST_WRITE_BEHIND = False
+
     repo = AsyncMock()
     repo.save_message = AsyncMock()
+    repo.begin_turn = MagicMock(return_value=AsyncMock())
     mock_get_repo.return_value = repo
 
 
@@ -310,3 +320,128 @@ class TestADKOrchestratorStreamChat:
         # partial=False text must be present as a v6 text-delta (not dropped)
         delta = next(p for p in parsed if isinstance(p, dict) and p.get("type") == "text-delta")
         assert "Risposta" in delta["delta"]
+
+
+class TestADKOrchestratorPreRun:
+    """Tests for the concurrent pre-run stage (ADKOrchestrator._prerun)."""
+
+    @staticmethod
+    def _settings(deadline: float = 5.0) -> MagicMock:
+        s = MagicMock()
+        s.ADK_PRERUN_DEADLINE_SECONDS = deadline
+        s.FIREBASE_STORAGE_BUCKET = "test.appspot.com"
+        return s
+
+    @patch("src.adk.adk_orchestrator.get_conversation_repository")
+    @patch("src.adk.adk_orchestrator.get_session_service")
+    async def test_steps_run_concurrently(self, mock_get_session, mock_get_repo):
+        """Profile lookup and session load overlap instead of running back to back."""
+        async def slow_session(**kwargs):
+            await asyncio.sleep(0.2)
+            return MagicMock()
+
+        async def slow_profile(uid):
+            await asyncio.sleep(0.2)
+            return True
+
+        mock_get_session.return_value = MagicMock(get_session=slow_session)
+        mock_get_repo.return_value = AsyncMock()
+        orch = _make_orchestrator_with_events([])
+        req, _ = _make_request_and_user()
+
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        with patch.object(ADKOrchestrator, "_load_phone_on_file", side_effect=slow_profile):
+            prerun = await orch._prerun(req, "uid-1", "s-1", "ciao", False, self._settings())
+        elapsed = loop.time() - started
+
+        assert elapsed < 0.35
+        assert prerun.phone_on_file is True
+        assert prerun.sanitized_input == "ciao"
+        assert prerun.dropped == []
+        assert {"sanitize", "profile", "session", "total"} <= prerun.timings_ms.keys()
+
+    @patch("src.adk.adk_orchestrator.get_conversation_repository")
+    @patch("src.adk.adk_orchestrator.get_session_service")
+    async def test_slow_optional_step_dropped_at_deadline(self, mock_get_session, mock_get_repo):
+        """A profile lookup that misses the deadline is cancelled; the turn proceeds."""
+        async def hung_profile(uid):
+            await asyncio.sleep(10)
+            return True
+
+        mock_get_session.return_value = MagicMock(get_session=AsyncMock(return_value=MagicMock()))
+        mock_get_repo.return_value = AsyncMock()
+        orch = _make_orchestrator_with_events([])
+        req, _ = _make_request_and_user()
+
+        with patch.object(ADKOrchestrator, "_load_phone_on_file", side_effect=hung_profile):
+            prerun = await orch._prerun(req, "uid-1", "s-1", "ciao", False, self._settings(0.1))
+
+        assert prerun.phone_on_file is False
+        assert prerun.dropped == ["profile"]
+
+    @patch("src.adk.adk_orchestrator.get_conversation_repository")
+    @patch("src.adk.adk_orchestrator.get_session_service")
+    async def test_history_injected_only_for_new_session(self, mock_get_session, mock_get_repo):
+        """Preloaded history is replayed into a created session and ignored otherwise."""
+        history = [{"role": "user", "content": "ciao"}]
+        repo = AsyncMock()
+        repo.get_context = AsyncMock(return_value=history)
+        mock_get_repo.return_value = repo
+        orch = _make_orchestrator_with_events([])
+        req, _ = _make_request_and_user()
+
+        svc = MagicMock()
+        svc.get_session = AsyncMock(return_value=None)
+        svc.create_session = AsyncMock(return_value=MagicMock())
+        mock_get_session.return_value = svc
+        with patch.object(ADKOrchestrator, "_inject_history", new=AsyncMock()) as inject:
+            await orch._prerun(req, "uid-1", "s-1", "ciao", True, self._settings())
+        inject.assert_awaited_once()
+        assert inject.await_args.args[-1] == history
+
+        svc.get_session = AsyncMock(return_value=MagicMock())
+        repo.get_context.reset_mock()
+        with patch.object(ADKOrchestrator, "_inject_history", new=AsyncMock()) as inject:
+            await orch._prerun(req, "uid-1", "s-1", "ciao", True, self._settings())
+        inject.assert_not_awaited()
+        repo.get_context.assert_not_called()  # warm turn: no Firestore history read at all
+
+    @patch("src.adk.adk_orchestrator.get_conversation_repository")
+    @patch("src.adk.adk_orchestrator.get_session_service")
+    async def test_session_deadline_is_fatal(self, mock_get_session, mock_get_repo):
+        """The session is required: missing the deadline on it raises TimeoutError."""
+        async def hung_session(**kwargs):
+            await asyncio.sleep(10)
+
+        mock_get_session.return_value = MagicMock(get_session=hung_session)
+        mock_get_repo.return_value = AsyncMock()
+        orch = _make_orchestrator_with_events([])
+        req, _ = _make_request_and_user()
+
+        with pytest.raises(TimeoutError):
+            await orch._prerun(req, "uid-1", "s-1", "ciao", True, self._settings(0.05))
+
+
+class TestADKOrchestratorPersistence:
+    """Turn messages go through the repository's TurnWriter."""
+
+    @patch("src.core.config.settings")
+    @patch("src.adk.adk_orchestrator.get_conversation_repository")
+    @patch("src.adk.adk_orchestrator.get_session_service")
+    async def test_tool_result_and_reply_saved_then_flushed(self, mock_get_session, mock_get_repo, mock_settings):
+        _setup_mocks(mock_get_session, mock_get_repo, mock_settings)
+        mock_settings.CHAT_PERSIST_WRITE_BEHIND = True
+        writer = mock_get_repo.return_value.begin_turn.return_value
+
+        events = [_make_function_response_event(), _make_text_event("Fatto!")]
+        orch = _make_orchestrator_with_events(events)
+        req, user = _make_request_and_user()
+        await _collect_chunks(orch.stream_chat(req, user))
+
+        mock_get_repo.return_value.begin_turn.assert_called_once_with(
+            "test-session-123", "test-user-abc", write_behind=True,
+        )
+        roles = [c.kwargs["role"] for c in writer.save.await_args_list]
+        assert roles == ["tool", "assistant"]
+        writer.flush.assert_awaited_once()
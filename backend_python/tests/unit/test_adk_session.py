@@ -8,6 +8,12 @@ Mocking Notes:
 - We mock vertexai and google.adk imports to avoid requiring GCP credentials.
 - We test both InMemorySessionService (local) and VertexAiSessionService (prod) paths.
 """
+from unittest.mock import patch
+
+import pytest
+from google.adk.events import Event, EventActions
+from google.genai import types
+from src.adk.durable_session import DurableSessionService, SQLiteEventLog, compact_event
 
 
 class TestGetSessionServiceSingleton:
@@ -25,14 +31,241 @@ class TestGetSessionServiceSingleton:
         svc2 = get_session_service()
         assert svc1 is svc2, "get_session_service() must return a singleton"
 
-    def test_local_uses_in_memory(self):
-        """InMemorySessionService is always used (no Reasoning Engine deployment)."""
+    def test_memory_backend_uses_in_memory(self):
+        """ADK_SESSION_BACKEND=memory keeps the volatile InMemorySessionService."""
         from src.adk.session import get_session_service
-        svc = get_session_service()
-        assert "InMemorySessionService" in type(svc).__name__
+        from src.core.config import settings
+        with patch.object(settings, "ADK_SESSION_BACKEND", "memory"):
+            svc = get_session_service()
+        assert type(svc).__name__ == "InMemorySessionService"
+
+    def test_auto_uses_firestore_log_in_production(self):
+        from src.adk.durable_session import DurableSessionService, FirestoreEventLog
+        from src.adk.session import get_session_service
+        from src.core.config import settings
+        with patch.object(settings, "ADK_SESSION_BACKEND", "auto"), patch.object(settings, "ENV", "production"):
+            svc = get_session_service()
+        assert isinstance(svc, DurableSessionService)
+        assert isinstance(svc.log, FirestoreEventLog)
+
+    def test_auto_uses_sqlite_log_in_development(self, tmp_path):
+        from src.adk.durable_session import SQLiteEventLog
+        from src.adk.session import get_session_service
+        from src.core.config import settings
+        with patch.object(settings, "ADK_SESSION_BACKEND", "auto"), \
+             patch.object(settings, "ENV", "development"), \
+             patch.object(settings, "ADK_SESSION_SQLITE_PATH", str(tmp_path / "s.sqlite3")):
+            svc = get_session_service()
+        assert isinstance(svc.log, SQLiteEventLog)
 
     def test_singleton_not_none(self):
         """The singleton must never return None."""
         from src.adk.session import get_session_service
         svc = get_session_service()
         assert svc is not None
+
+
+def _event(text: str, partial: bool = False, state_delta: dict | None = None) -> Event:
+    return Event(
+        invocation_id="inv",
+        author="user",
+        partial=partial,
+        content=types.Content(role="user", parts=[types.Part(text=text)]),
+        actions=EventActions(state_delta=state_delta or {}),
+    )
+
+
+@pytest.fixture
+def log_path(tmp_path):
+    return str(tmp_path / "sessions.sqlite3")
+
+
+class TestDurableSessionService:
+    """The event log must make sessions survive a process restart."""
+
+    async def _new_session(self, svc, sid="s1"):
+        return await svc.create_session(app_name="app", user_id="u1", session_id=sid)
+
+    async def test_session_survives_restart(self, log_path):
+        svc = DurableSessionService(SQLiteEventLog(log_path))
+        session = await self._new_session(svc)
+        await svc.append_event(session, _event("ciao", state_delta={"room": "bagno"}))
+        await svc.append_event(session, _event("preventivo"))
+        await svc.flush()
+
+        restarted = DurableSessionService(SQLiteEventLog(log_path))
+        restored = await restarted.get_session(app_name="app", user_id="u1", session_id="s1")
+        assert restored is not None
+        assert [e.content.parts[0].text for e in restored.events] == ["ciao", "preventivo"]
+        assert restored.state["room"] == "bagno"
+        assert restarted.cold_loads == 1
+
+    async def test_unknown_session_returns_none(self, log_path):
+        svc = DurableSessionService(SQLiteEventLog(log_path))
+        assert await svc.get_session(app_name="app", user_id="u1", session_id="missing") is None
+
+    async def test_hot_hit_does_not_touch_log(self, log_path):
+        svc = DurableSessionService(SQLiteEventLog(log_path))
+        await self._new_session(svc)
+        with patch.object(svc.log, "load") as load:
+            assert await svc.get_session(app_name="app", user_id="u1", session_id="s1") is not None
+        load.assert_not_called()
+
+    async def test_partial_events_are_not_persisted(self, log_path):
+        svc = DurableSessionService(SQLiteEventLog(log_path))
+        session = await self._new_session(svc)
+        await svc.append_event(session, _event("stream chunk", partial=True))
+        await svc.flush()
+        stored = await svc.log.load(("app", "u1", "s1"))
+        assert stored.events == []
+
+    async def test_lru_eviction_reloads_from_log(self, log_path):
+        svc = DurableSessionService(SQLiteEventLog(log_path), hot_max=1)
+        first = await self._new_session(svc, "s1")
+        await svc.append_event(first, _event("uno"))
+        await self._new_session(svc, "s2")  # evicts s1 from the hot tier
+        assert "s1" not in svc.sessions["app"]["u1"]
+        restored = await svc.get_session(app_name="app", user_id="u1", session_id="s1")
+        assert [e.content.parts[0].text for e in restored.events] == ["uno"]
+
+    async def test_append_after_eviction_does_not_raise(self, log_path):
+        svc = DurableSessionService(SQLiteEventLog(log_path), hot_max=1)
+        held = await self._new_session(svc, "s1")
+        await self._new_session(svc, "s2")
+        await svc.append_event(held, _event("late"))  # runner still holds the evicted Session
+        await svc.flush()
+        stored = await svc.log.load(("app", "u1", "s1"))
+        assert len(stored.events) == 1
+
+    async def test_hot_entry_picks_up_appends_from_another_instance(self, log_path):
+        a = DurableSessionService(SQLiteEventLog(log_path))
+        b = DurableSessionService(SQLiteEventLog(log_path))
+        await a.append_event(await self._new_session(a), _event("uno"))
+        await a.flush()
+        assert len((await b.get_session(app_name="app", user_id="u1", session_id="s1")).events) == 1
+
+        held = await a.get_session(app_name="app", user_id="u1", session_id="s1")
+        await a.append_event(held, _event("due"))  # routed to instance A
+        await a.flush()
+
+        restored = await b.get_session(app_name="app", user_id="u1", session_id="s1")  # B is still hot
+        assert [e.content.parts[0].text for e in restored.events] == ["uno", "due"]
+        assert b.cold_loads == 2
+
+    async def test_own_writes_keep_the_hot_entry_current(self, log_path):
+        svc = DurableSessionService(SQLiteEventLog(log_path))
+        session = await self._new_session(svc)
+        await svc.append_event(session, _event("uno"))
+        await svc.flush()
+        await svc.append_event(session, _event("due"))  # still queued
+        assert await svc.get_session(app_name="app", user_id="u1", session_id="s1") is not None
+        await svc.flush()
+        assert await svc.get_session(app_name="app", user_id="u1", session_id="s1") is not None
+        assert svc.cold_loads == 0
+
+    async def test_delete_removes_log_records(self, log_path):
+        svc = DurableSessionService(SQLiteEventLog(log_path))
+        await self._new_session(svc)
+        await svc.delete_session(app_name="app", user_id="u1", session_id="s1")
+        await svc.flush()
+        assert await svc.log.load(("app", "u1", "s1")) is None
+        assert (await svc.list_sessions(app_name="app", user_id="u1")).sessions == []
+
+
+def test_compact_event_drops_inline_media():
+    event = Event(
+        invocation_id="inv",
+        author="user",
+        content=types.Content(role="user", parts=[
+            types.Part(inline_data=types.Blob(mime_type="image/jpeg", data=b"\xff" * 4096)),
+            types.Part(text="[URL Immagine Caricata per riferimento o tool: https://x/y.jpg]"),
+        ]),
+    )
+    data = compact_event(event)
+    parts = data["content"]["parts"]
+    assert "inlineData" not in parts[0]
+    assert "image/jpeg" in parts[0]["text"]
+    assert parts[1]["text"].endswith("y.jpg]")
+    assert Event.model_validate(data).id == event.id
+
+
+async def test_firestore_delete_of_a_long_session_splits_batches():
+    from src.adk.durable_session import FirestoreEventLog, LogOp
+    from tests.unit.firestore_fake import FakeFirestore
+
+    db = FakeFirestore()
+    key = ("app", "u1", "s1")
+    log = FirestoreEventLog()
+    with patch("src.db.firebase_client.get_async_firestore_client", return_value=db):
+        await log.write([LogOp("create", key, {"state": {}}, 1.0)])
+        await log.write([LogOp("event", key, {"id": f"e{i}"}, 2.0 + i) for i in range(600)])
+        assert len(db.children("adk_sessions/app:u1:s1/events")) == 600
+
+        await log.write([LogOp("delete", key)])
+
+    assert db.docs == {}
+    assert db.rpcs["commit"] > 4  # every batch stayed under Firestore's 500-write limit
+
+
+class TestPurge:
+    """GDPR erasure must remove the log records, the hot entries and any queued writes."""
+
+    async def test_purge_by_user_deletes_log_memory_and_queued_records(self):
+        from src.adk.durable_session import FirestoreEventLog
+        from tests.unit.firestore_fake import FakeFirestore
+
+        db = FakeFirestore()
+        svc = DurableSessionService(FirestoreEventLog())
+        with patch("src.db.firebase_client.get_async_firestore_client", return_value=db):
+            mine = await svc.create_session(app_name="app", user_id="u1", session_id="s1")
+            other = await svc.create_session(app_name="app", user_id="u2", session_id="s2")
+            await svc.append_event(mine, _event("indirizzo di casa"))
+            await svc.append_event(other, _event("ciao"))
+            await svc.flush()
+            await svc.append_event(mine, _event("ancora in coda"))  # not yet written
+
+            with patch.object(svc.log, "write", wraps=svc.log.write) as write:
+                assert await svc.purge(app_name="app", user_id="u1") == 1
+                await svc.flush()
+            written = [op.kind for call in write.call_args_list for op in call.args[0]]
+            assert written == ["delete"]  # the queued event was dropped, not written then deleted
+
+            assert not any(path.startswith("adk_sessions/app:u1:s1") for path in db.docs)
+            assert db.data("adk_sessions/app:u2:s2") is not None
+            assert "s1" not in svc.sessions["app"].get("u1", {})
+            assert ("app", "u1", "s1") not in svc._hot
+            assert await svc.get_session(app_name="app", user_id="u1", session_id="s1") is None
+            assert await svc.get_session(app_name="app", user_id="u2", session_id="s2") is not None
+
+    async def test_firestore_purge_by_session_spans_users_in_bounded_batches(self):
+        from src.adk.durable_session import FirestoreEventLog, LogOp
+        from tests.unit.firestore_fake import FakeFirestore
+
+        db = FakeFirestore()
+        log = FirestoreEventLog()
+        guest, owner, unrelated = ("app", "guest", "s1"), ("app", "u1", "s1"), ("app", "u1", "s2")
+        with patch("src.db.firebase_client.get_async_firestore_client", return_value=db):
+            await log.write([LogOp("create", key, {"state": {}}, 1.0) for key in (guest, owner, unrelated)])
+            await log.write([LogOp("event", guest, {"id": f"e{i}"}, 2.0 + i) for i in range(600)])
+            await log.write([LogOp("event", unrelated, {"id": "e0"}, 2.0)])
+            db.rpcs.clear()
+
+            assert await log.purge("app", None, "s1") == 2
+
+        assert set(db.docs) == {"adk_sessions/app:u1:s2", "adk_sessions/app:u1:s2/events/e0"}
+        assert db.rpcs["commit"] > 1  # 600 event deletes never went into one batch
+
+    async def test_sqlite_purge_by_session(self, log_path):
+        svc = DurableSessionService(SQLiteEventLog(log_path))
+        await svc.append_event(await svc.create_session(app_name="app", user_id="u1", session_id="s1"), _event("uno"))
+        await svc.create_session(app_name="app", user_id="u1", session_id="s2")
+        await svc.flush()
+
+        assert await svc.purge(app_name="app", session_id="s1") == 1
+        assert await svc.log.load(("app", "u1", "s1")) is None
+        assert [s.id for s in (await svc.list_sessions(app_name="app", user_id="u1")).sessions] == ["s2"]
+
+    async def test_purge_requires_a_user_or_a_session(self, log_path):
+        svc = DurableSessionService(SQLiteEventLog(log_path))
+        with pytest.raises(ValueError):
+            await svc.purge(app_name="app")
@@ -0,0 +1,154 @@
+"""Tests for /chat/stream admission control (src/core/admission.py)."""
+import asyncio
+import gc
+
+import pytest
+from src.core.admission import AdmissionController, guard_stream
+from src.core.exceptions import ServiceOverloaded
+
+
+async def _settle():
+    for _ in range(3):
+        await asyncio.sleep(0)
+
+
+class TestAdmissionController:
+    async def test_admits_up_to_cap_without_waiting(self):
+        ctl = AdmissionController(max_concurrent=2, max_queue=4, queue_timeout=1.0)
+        a = await ctl.acquire("u1")
+        b = await ctl.acquire("u2")
+        assert ctl.stats()["in_flight"] == 2
+        assert a.waited_ms == b.waited_ms == 0.0
+
+    async def test_queued_request_admitted_on_release(self):
+        ctl = AdmissionController(max_concurrent=1, max_queue=4, queue_timeout=1.0)
+        first = await ctl.acquire("u1")
+        waiter = asyncio.create_task(ctl.acquire("u2"))
+        await _settle()
+        assert ctl.stats()["queue_depth"] == 1
+        first.release()
+        slot = await waiter
+        assert slot.uid == "u2"
+        assert ctl.stats()["queue_depth"] == 0
+        assert ctl.stats()["in_flight"] == 1
+
+    async def test_queue_full_rejects_with_retry_after(self):
+        ctl = AdmissionController(max_concurrent=1, max_queue=1, queue_timeout=1.0)
+        await ctl.acquire("u1")
+        queued = asyncio.create_task(ctl.acquire("u2"))
+        await _settle()
+        with pytest.raises(ServiceOverloaded) as exc:
+            await ctl.acquire("u3")
+        assert exc.value.status_code == 503
+        assert exc.value.detail["reason"] == "queue_full"
+        assert exc.value.detail["retry_after"] >= 1
+        queued.cancel()
+
+    async def test_wait_deadline_rejects_and_dequeues(self):
+        ctl = AdmissionController(max_concurrent=1, max_queue=4, queue_timeout=0.05)
+        await ctl.acquire("u1")
+        with pytest.raises(ServiceOverloaded) as exc:
+            await ctl.acquire("u2")
+        assert exc.value.detail["reason"] == "queue_timeout"
+        assert ctl.stats()["queue_depth"] == 0
+        assert ctl.stats()["rejected_queue_timeout"] == 1
+
+    async def test_cancelled_waiter_leaves_queue(self):
+        ctl = AdmissionController(max_concurrent=1, max_queue=4, queue_timeout=1.0)
+        first = await ctl.acquire("u1")
+        waiter = asyncio.create_task(ctl.acquire("u2"))
+        await _settle()
+        waiter.cancel()
+        await _settle()
+        assert ctl.stats()["queue_depth"] == 0
+        first.release()
+        assert ctl.stats()["in_flight"] == 0
+
+    async def test_release_is_idempotent(self):
+        ctl = AdmissionController(max_concurrent=1, max_queue=0, queue_timeout=1.0)
+        slot = await ctl.acquire("u1")
+        slot.release()
+        slot.release()
+        assert ctl.stats()["in_flight"] == 0
+
+
+class TestFairScheduling:
+    async def test_round_robin_across_users(self):
+        """A user with a burst of requests does not starve a user with one."""
+        ctl = AdmissionController(max_concurrent=1, max_queue=10, queue_timeout=1.0)
+        holder = await ctl.acquire("seed")
+        order: list[str] = []
+
+        async def request(uid: str):
+            slot = await ctl.acquire(uid)
+            order.append(uid)
+            await asyncio.sleep(0)
+            slot.release()
+
+        tasks = [asyncio.create_task(request("heavy")) for _ in range(4)]
+        await _settle()
+        tasks.append(asyncio.create_task(request("light")))
+        await _settle()
+        holder.release()
+        await asyncio.gather(*tasks)
+        assert order.index("light") == 1
+
+    async def test_costly_requests_get_proportionally_fewer_turns(self):
+        """DRR: a cost-4 (multimodal) user is admitted once per four text turns."""
+        ctl = AdmissionController(max_concurrent=1, max_queue=20, queue_timeout=1.0)
+        holder = await ctl.acquire("seed")
+        order: list[str] = []
+
+        async def request(uid: str, cost: int):
+            slot = await ctl.acquire(uid, cost=cost)
+            order.append(uid)
+            await asyncio.sleep(0)
+            slot.release()
+
+        tasks = [asyncio.create_task(request("media", 4)) for _ in range(2)]
+        tasks += [asyncio.create_task(request("text", 1)) for _ in range(8)]
+        await _settle()
+        holder.release()
+        await asyncio.gather(*tasks)
+        assert order[:5].count("text") == 4
+        assert order[:5].count("media") == 1
+
+
+class TestGuardStream:
+    async def test_slot_released_when_stream_ends(self):
+        ctl = AdmissionController(max_concurrent=1, max_queue=0, queue_timeout=1.0)
+        slot = await ctl.acquire("u1")
+
+        async def stream():
+            yield "a"
+            yield "b"
+
+        assert [c async for c in guard_stream(stream(), slot)] == ["a", "b"]
+        assert slot.released
+
+    async def test_slot_released_when_stream_fails(self):
+        ctl = AdmissionController(max_concurrent=1, max_queue=0, queue_timeout=1.0)
+        slot = await ctl.acquire("u1")
+
+        async def stream():
+            yield "a"
+            raise RuntimeError("boom")
+
+        with pytest.raises(RuntimeError):
+            async for _ in guard_stream(stream(), slot):
+                pass
+        assert slot.released
+
+    async def test_slot_released_when_never_iterated(self):
+        """Client gone before the first chunk: the finalizer gives the slot back."""
+        ctl = AdmissionController(max_concurrent=1, max_queue=0, queue_timeout=1.0)
+        slot = await ctl.acquire("u1")
+
+        async def stream():
+            yield "a"
+
+        wrapped = guard_stream(stream(), slot)
+        del wrapped
+        gc.collect()
+        assert slot.released
+        assert ctl.stats()["in_flight"] == 0
@@ -4,11 +4,13 @@ Tests for ConversationRepository — Firestore-backed conversation storage.
 Patches are applied at the IMPORT SITE (conversation_repository module),
 not at the definition site, to correctly intercept already-bound names.
 """
+import asyncio
 from datetime import UTC, datetime
 from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
 from pydantic import BaseModel
+from tests.unit.firestore_fake import FakeFirestore
 
 _MODULE = "src.repositories.conversation_repository"
 
@@ -74,195 +76,175 @@ def _doc(data: dict, exists: bool = True):
 # ════════════════════════════════════════════════════════════════════════════
 
 class TestSaveMessage:
+    """save_message runs against the in-memory Firestore fake (tests/unit/firestore_fake.py)."""
 
-    def _setup_db(self, mock_db, session_exists: bool = True):
-        """Wire mock_db for save_message call chain."""
-        session_doc = _doc({}, exists=session_exists)
+    @pytest.fixture
+    def fake(self):
+        return FakeFirestore()
 
-        sess_ref = MagicMock()
-        sess_ref.get = AsyncMock(return_value=session_doc)
-        sess_ref.set = AsyncMock()
+    @pytest.fixture
+    def fake_repo(self, fake):
+        with patch(f"{_MODULE}.get_async_firestore_client", return_value=fake):
+            from src.repositories.conversation_repository import ConversationRepository
+            yield ConversationRepository()
 
-        msgs_ref = MagicMock()
-        msgs_ref.add = AsyncMock()
-        sess_ref.collection.return_value = msgs_ref
+    @staticmethod
+    def _messages(fake, session_id="s1"):
+        return fake.children(f"sessions/{session_id}/messages")
 
-        mock_db.collection.return_value.document.return_value = sess_ref
-        return sess_ref, msgs_ref
+    @staticmethod
+    def _only_message(fake, session_id="s1"):
+        msgs = TestSaveMessage._messages(fake, session_id)
+        assert len(msgs) == 1
+        return next(iter(msgs.values()))
 
     @pytest.mark.asyncio
-    async def test_saves_basic_message(self, repo, mock_db, mock_fs):
-        sess_ref, msgs_ref = self._setup_db(mock_db)
+    async def test_saves_basic_message(self, fake_repo, fake):
+        await fake_repo.save_message(session_id="s1", role="user", content="Hello")
 
-        with patch(f"{_MODULE}.get_firestore_client", return_value=mock_db), \
-             patch(f"{_MODULE}.get_async_firestore_client", return_value=mock_db), \
-             patch(f"{_MODULE}.async_firestore", mock_fs):
-            await repo.save_message(session_id="s1", role="user", content="Hello")
-
-        msgs_ref.add.assert_called_once()
-        data = msgs_ref.add.call_args[0][0]
+        data = self._only_message(fake)
         assert data["role"] == "user"
         assert data["content"] == "Hello"
 
     @pytest.mark.asyncio
-    async def test_explicit_message_id_uses_document_set_not_add(self, repo, mock_db, mock_fs):
+    async def test_explicit_message_id_used_as_document_id(self, fake_repo, fake):
         # A stable id (assigned by the orchestrator / forwarded from the client)
         # must be used as the Firestore document id so the streamed message and
         # its persisted row share one identity — no post-turn id swap on the client.
-        sess_ref, msgs_ref = self._setup_db(mock_db)
-        doc_ref = MagicMock()
-        doc_ref.set = AsyncMock()
-        msgs_ref.document.return_value = doc_ref
+        await fake_repo.save_message("s1", "assistant", "Hi", message_id="assist-123")
 
-        with patch(f"{_MODULE}.get_firestore_client", return_value=mock_db), \
-             patch(f"{_MODULE}.get_async_firestore_client", return_value=mock_db), \
-             patch(f"{_MODULE}.async_firestore", mock_fs):
-            await repo.save_message("s1", "assistant", "Hi", message_id="assist-123")
-
-        msgs_ref.document.assert_called_once_with("assist-123")
-        doc_ref.set.assert_called_once()
-        msgs_ref.add.assert_not_called()
-        data = doc_ref.set.call_args[0][0]
+        data = fake.data("sessions/s1/messages/assist-123")
         assert data["role"] == "assistant"
         assert data["content"] == "Hi"
 
     @pytest.mark.asyncio
-    async def test_auto_id_used_when_message_id_absent(self, repo, mock_db, mock_fs):
-        sess_ref, msgs_ref = self._setup_db(mock_db)
-
-        with patch(f"{_MODULE}.get_firestore_client", return_value=mock_db), \
-             patch(f"{_MODULE}.get_async_firestore_client", return_value=mock_db), \
-             patch(f"{_MODULE}.async_firestore", mock_fs):
-            await repo.save_message("s1", "user", "Hello")
-
-        msgs_ref.add.assert_called_once()
-        msgs_ref.document.assert_not_called()
+    async def test_auto_id_used_when_message_id_absent(self, fake_repo, fake):
+        await fake_repo.save_message("s1", "user", "Hello")
+        await fake_repo.save_message("s1", "user", "Hello")
+        assert len(self._messages(fake)) == 2
 
     @pytest.mark.asyncio
-    async def test_timestamp_used_when_provided(self, repo, mock_db, mock_fs):
-        self._setup_db(mock_db)
+    async def test_timestamp_used_when_provided(self, fake_repo, fake):
         ts = datetime(2024, 1, 1, tzinfo=UTC)
+        await fake_repo.save_message("s1", "assistant", "Hi", timestamp=ts)
+        assert self._only_message(fake)["timestamp"] == ts
 
-        with patch(f"{_MODULE}.get_firestore_client", return_value=mock_db), \
-             patch(f"{_MODULE}.get_async_firestore_client", return_value=mock_db), \
-             patch(f"{_MODULE}.async_firestore", mock_fs):
-            await repo.save_message("s1", "assistant", "Hi", timestamp=ts)
+    def test_server_timestamp_when_none(self):
+        from google.cloud import firestore
+        from src.repositories.conversation_repository import ConversationRepository
 
-        msgs_ref = mock_db.collection.return_value.document.return_value.collection.return_value
-        data = msgs_ref.add.call_args[0][0]
-        assert data["timestamp"] == ts
+        _, data = ConversationRepository._build_message("user", "msg")
+        assert data["timestamp"] is firestore.SERVER_TIMESTAMP
 
     @pytest.mark.asyncio
-    async def test_server_timestamp_when_none(self, repo, mock_db, mock_fs):
-        self._setup_db(mock_db)
-
-        with patch(f"{_MODULE}.get_firestore_client", return_value=mock_db), \
-             patch(f"{_MODULE}.get_async_firestore_client", return_value=mock_db), \
-             patch(f"{_MODULE}.async_firestore", mock_fs):
-            await repo.save_message("s1", "user", "msg")
-
-        msgs_ref = mock_db.collection.return_value.document.return_value.collection.return_value
-        data = msgs_ref.add.call_args[0][0]
-        assert data["timestamp"] == "SERVER_TIMESTAMP"
+    async def test_metadata_included_when_provided(self, fake_repo, fake):
+        await fake_repo.save_message("s1", "user", "msg", metadata={"src": "web"})
+        assert self._only_message(fake)["metadata"] == {"src": "web"}
 
     @pytest.mark.asyncio
-    async def test_metadata_included_when_provided(self, repo, mock_db, mock_fs):
-        self._setup_db(mock_db)
-
-        with patch(f"{_MODULE}.get_firestore_client", return_value=mock_db), \
-             patch(f"{_MODULE}.get_async_firestore_client", return_value=mock_db), \
-             patch(f"{_MODULE}.async_firestore", mock_fs):
-            await repo.save_message("s1", "user", "msg", metadata={"src": "web"})
-
-        msgs_ref = mock_db.collection.return_value.document.return_value.collection.return_value
-        data = msgs_ref.add.call_args[0][0]
-        assert data["metadata"] == {"src": "web"}
+    async def test_room_id_goes_into_metadata(self, fake_repo, fake):
+        await fake_repo.save_message("s1", "user", "msg", room_id="bagno")
+        assert self._only_message(fake)["metadata"] == {"room_id": "bagno"}
 
     @pytest.mark.asyncio
-    async def test_metadata_omitted_when_none(self, repo, mock_db, mock_fs):
-        self._setup_db(mock_db)
-
-        with patch(f"{_MODULE}.get_firestore_client", return_value=mock_db), \
-             patch(f"{_MODULE}.get_async_firestore_client", return_value=mock_db), \
-             patch(f"{_MODULE}.async_firestore", mock_fs):
-            await repo.save_message("s1", "user", "msg")
-
-        msgs_ref = mock_db.collection.return_value.document.return_value.collection.return_value
-        data = msgs_ref.add.call_args[0][0]
-        assert "metadata" not in data
+    async def test_metadata_omitted_when_none(self, fake_repo, fake):
+        await fake_repo.save_message("s1", "user", "msg")
+        assert "metadata" not in self._only_message(fake)
 
     @pytest.mark.asyncio
-    async def test_plain_dict_tool_calls_stored(self, repo, mock_db, mock_fs):
-        self._setup_db(mock_db)
+    async def test_plain_dict_tool_calls_stored(self, fake_repo, fake):
         tcs = [{"name": "gen_render", "args": {}}]
-
-        with patch(f"{_MODULE}.get_firestore_client", return_value=mock_db), \
-             patch(f"{_MODULE}.get_async_firestore_client", return_value=mock_db), \
-             patch(f"{_MODULE}.async_firestore", mock_fs):
-            await repo.save_message("s1", "assistant", "", tool_calls=tcs)
-
-        msgs_ref = mock_db.collection.return_value.document.return_value.collection.return_value
-        data = msgs_ref.add.call_args[0][0]
-        assert data["tool_calls"] == tcs
+        await fake_repo.save_message("s1", "assistant", "", tool_calls=tcs)
+        assert self._only_message(fake)["tool_calls"] == tcs
 
     @pytest.mark.asyncio
-    async def test_pydantic_tool_calls_are_dumped(self, repo, mock_db, mock_fs):
-        self._setup_db(mock_db)
-
+    async def test_pydantic_tool_calls_are_dumped(self, fake_repo, fake):
         # A real Pydantic model — the repo dumps it via isinstance(x, BaseModel).
         class _ToolCall(BaseModel):
             name: str
 
-        pydantic_tc = _ToolCall(name="tool")
+        await fake_repo.save_message("s1", "assistant", "", tool_calls=[_ToolCall(name="tool")])
+        assert self._only_message(fake)["tool_calls"] == [{"name": "tool"}]
 
-        with patch(f"{_MODULE}.get_firestore_client", return_value=mock_db), \
-             patch(f"{_MODULE}.get_async_firestore_client", return_value=mock_db), \
-             patch(f"{_MODULE}.async_firestore", mock_fs):
-            await repo.save_message("s1", "assistant", "", tool_calls=[pydantic_tc])
+    @pytest.mark.asyncio
+    async def test_tool_call_id_stored(self, fake_repo, fake):
+        await fake_repo.save_message("s1", "tool", "result", tool_call_id="tc-1")
+        assert self._only_message(fake)["tool_call_id"] == "tc-1"
 
-        msgs_ref = mock_db.collection.return_value.document.return_value.collection.return_value
-        data = msgs_ref.add.call_args[0][0]
-        assert data["tool_calls"] == [{"name": "tool"}]
+    @pytest.mark.asyncio
+    async def test_attachments_stored(self, fake_repo, fake):
+        atts = [{"url": "gs://b/f.jpg"}]
+        await fake_repo.save_message("s1", "user", "see image", attachments=atts)
+        assert self._only_message(fake)["attachments"] == atts
 
     @pytest.mark.asyncio
-    async def test_tool_call_id_stored(self, repo, mock_db, mock_fs):
-        self._setup_db(mock_db)
+    async def test_existing_session_is_one_commit_and_no_read(self, fake_repo, fake):
+        # The chat routes run ensure_session first, which already knows the owner.
+        fake.docs["sessions/s1"] = {"userId": "owner", "messageCount": 3}
+        await fake_repo.ensure_session("s1", "owner")
+        fake.rpcs.clear()
+        await fake_repo.save_message("s1", "user", "hi", user_id="owner")
+
+        assert fake.rpcs == {"commit": 1}
+        session = fake.data("sessions/s1")
+        assert session["messageCount"] == 4
+        assert "updatedAt" in session and "expireAt" in session
 
-        with patch(f"{_MODULE}.get_firestore_client", return_value=mock_db), \
-             patch(f"{_MODULE}.get_async_firestore_client", return_value=mock_db), \
-             patch(f"{_MODULE}.async_firestore", mock_fs):
-            await repo.save_message("s1", "tool", "result", tool_call_id="tc-1")
+    @pytest.mark.asyncio
+    async def test_creates_session_doc_when_missing(self, fake_repo, fake):
+        await fake_repo.save_message("new-sess", "user", "hi", user_id="u1")
 
-        msgs_ref = mock_db.collection.return_value.document.return_value.collection.return_value
-        data = msgs_ref.add.call_args[0][0]
-        assert data["tool_call_id"] == "tc-1"
+        session = fake.data("sessions/new-sess")
+        assert isinstance(session["createdAt"], datetime)
+        assert session["userId"] == "u1"
+        assert session["messageCount"] == 1
+        assert len(self._messages(fake, "new-sess")) == 1
 
     @pytest.mark.asyncio
-    async def test_attachments_stored(self, repo, mock_db, mock_fs):
-        self._setup_db(mock_db)
-        atts = [{"url": "gs://b/f.jpg"}]
+    async def test_never_overwrites_existing_owner(self, fake_repo, fake):
+        # SECURITY (F-12): a save on behalf of another uid must not hijack the session.
+        fake.docs["sessions/s1"] = {"userId": "owner", "createdAt": "then"}
+        await fake_repo.save_message("s1", "user", "hi", user_id="intruder")
 
-        with patch(f"{_MODULE}.get_firestore_client", return_value=mock_db), \
-             patch(f"{_MODULE}.get_async_firestore_client", return_value=mock_db), \
-             patch(f"{_MODULE}.async_firestore", mock_fs):
-            await repo.save_message("s1", "user", "see image", attachments=atts)
+        session = fake.data("sessions/s1")
+        assert session["userId"] == "owner"
+        assert session["createdAt"] == "then"
+
+    @pytest.mark.asyncio
+    async def test_stamps_owner_on_ownerless_session(self, fake_repo, fake):
+        # SECURITY (F-12): without userId the owner's direct client reads are denied.
+        fake.docs["sessions/s1"] = {"messageCount": 1}
+        await fake_repo.save_message("s1", "user", "hi", user_id="u1")
 
-        msgs_ref = mock_db.collection.return_value.document.return_value.collection.return_value
-        data = msgs_ref.add.call_args[0][0]
-        assert data["attachments"] == atts
+        session = fake.data("sessions/s1")
+        assert session["userId"] == "u1"
+        assert session["messageCount"] == 2
 
     @pytest.mark.asyncio
-    async def test_creates_session_doc_when_missing(self, repo, mock_db, mock_fs):
-        sess_ref, _ = self._setup_db(mock_db, session_exists=False)
+    async def test_owner_read_only_on_first_commit(self, fake_repo, fake):
+        fake.docs["sessions/s1"] = {"userId": "owner", "messageCount": 0}
+        await fake_repo.save_message("s1", "user", "hi", user_id="owner")
+        await fake_repo.save_message("s1", "assistant", "hello", user_id="owner")
 
-        with patch(f"{_MODULE}.get_firestore_client", return_value=mock_db), \
-             patch(f"{_MODULE}.get_async_firestore_client", return_value=mock_db), \
-             patch(f"{_MODULE}.async_firestore", mock_fs):
-            await repo.save_message("new-sess", "user", "hi")
+        assert fake.rpcs == {"get": 1, "commit": 2}
 
-        sess_ref.set.assert_called_once()
-        call_data = sess_ref.set.call_args[0][0]
-        assert call_data.get("createdAt") == "SERVER_TIMESTAMP"
+    @pytest.mark.asyncio
+    async def test_create_race_falls_back_to_update(self, fake_repo, fake):
+        # Another writer creates the session between our NotFound and our create().
+        real_apply = fake._apply
+
+        def racing_apply(ops):
+            if any(kind == "create" for kind, *_ in ops) and "sessions/s1" not in fake.docs:
+                fake.docs["sessions/s1"] = {"userId": "first", "messageCount": 1}
+            return real_apply(ops)
+
+        fake._apply = racing_apply
+        await fake_repo.save_message("s1", "user", "hi", user_id="second")
+
+        session = fake.data("sessions/s1")
+        assert session["userId"] == "first"
+        assert session["messageCount"] == 2
+        assert len(self._messages(fake)) == 1
 
     @pytest.mark.asyncio
     async def test_swallows_exceptions(self, repo, mock_db, mock_fs):
@@ -275,6 +257,68 @@ class TestSaveMessage:
             await repo.save_message("s1", "user", "msg")
 
 
+class TestTurnWriter:
+
+    @pytest.fixture
+    def fake(self):
+        fake = FakeFirestore()
+        fake.docs["sessions/s1"] = {"userId": "u1", "messageCount": 0}
+        return fake
+
+    @pytest.fixture
+    async def fake_repo(self, fake):
+        with patch(f"{_MODULE}.get_async_firestore_client", return_value=fake):
+            from src.repositories.conversation_repository import ConversationRepository
+            repo = ConversationRepository()
+            # As in the chat routes: the turn starts after ensure_session.
+            await repo.ensure_session("s1", "u1")
+            fake.rpcs.clear()
+            yield repo
+
+    @pytest.mark.asyncio
+    async def test_write_through_commits_each_message(self, fake_repo, fake):
+        turn = fake_repo.begin_turn("s1", "u1")
+        await turn.save(role="tool", content="r1", tool_call_id="c1")
+        await turn.save(role="assistant", content="done", message_id="a1")
+        await turn.flush()
+
+        assert fake.rpcs == {"commit": 2}
+        assert fake.data("sessions/s1")["messageCount"] == 2
+
+    @pytest.mark.asyncio
+    async def test_write_behind_flushes_turn_in_one_commit(self, fake_repo, fake):
+        turn = fake_repo.begin_turn("s1", "u1", write_behind=True)
+        await turn.save(role="tool", content="r1", tool_call_id="c1")
+        await turn.save(role="tool", content="r2", tool_call_id="c2")
+        await turn.save(role="assistant", content="done", message_id="a1")
+        assert fake.round_trips == 0
+
+        await turn.flush()
+        await turn.flush()  # idempotent
+
+        assert fake.rpcs == {"commit": 1}
+        assert len(fake.children("sessions/s1/messages")) == 3
+        assert fake.data("sessions/s1/messages/a1")["content"] == "done"
+        assert fake.data("sessions/s1")["messageCount"] == 3
+
+    @pytest.mark.asyncio
+    async def test_large_turn_split_to_batch_limit(self, fake_repo, fake):
+        turn = fake_repo.begin_turn("s1", "u1", write_behind=True)
+        for i in range(600):
+            await turn.save(role="tool", content=str(i))
+        await turn.flush()
+
+        assert fake.rpcs == {"commit": 2}
+        assert fake.data("sessions/s1")["messageCount"] == 600
+
+    @pytest.mark.asyncio
+    async def test_flush_failure_is_swallowed(self, fake_repo, fake):
+        turn = fake_repo.begin_turn("s1", "u1", write_behind=True)
+        await turn.save(role="tool", content="r1")
+        with patch.object(fake, "batch", side_effect=RuntimeError("Firestore down")):
+            await turn.flush()  # must not raise
+
+
 # ════════════════════════════════════════════════════════════════════════════
 # get_context
 # ════════════════════════════════════════════════════════════════════════════
@@ -366,84 +410,108 @@ class TestGetContext:
 # ════════════════════════════════════════════════════════════════════════════
 
 class TestEnsureSession:
+    """ensure_session runs against the in-memory Firestore fake (tests/unit/firestore_fake.py)."""
 
-    def _build_collections(self, mock_db, session_doc, project_doc):
-        """Build distinct refs for sessions and projects collections."""
-        sess_ref = MagicMock()
-        sess_ref.get = AsyncMock(return_value=session_doc)
-        sess_ref.set = AsyncMock()
-        sess_ref.update = AsyncMock()
+    @pytest.fixture
+    def fake(self):
+        return FakeFirestore()
 
-        proj_ref = MagicMock()
-        proj_ref.get = AsyncMock(return_value=project_doc)
-        proj_ref.set = AsyncMock()
-        proj_ref.update = AsyncMock()
+    @pytest.fixture
+    def fake_repo(self, fake):
+        with patch(f"{_MODULE}.get_async_firestore_client", return_value=fake):
+            from src.repositories.conversation_repository import ConversationRepository
+            yield ConversationRepository()
 
-        def _coll(name):
-            c = MagicMock()
-            c.document.return_value = sess_ref if name == "sessions" else proj_ref
-            return c
+    @pytest.mark.asyncio
+    async def test_creates_session_and_project_when_new(self, fake_repo, fake):
+        await fake_repo.ensure_session("new-sess", user_id="user123")
 
-        mock_db.collection.side_effect = _coll
-        return sess_ref, proj_ref
+        assert fake.data("sessions/new-sess")["userId"] == "user123"
+        assert fake.data("projects/new-sess")["userId"] == "user123"
+        assert fake.rpcs == {"get_all": 1, "commit": 1}
 
     @pytest.mark.asyncio
-    async def test_creates_session_and_project_when_new(self, repo, mock_db, mock_fs):
-        sess_ref, proj_ref = self._build_collections(
-            mock_db, _doc({}, exists=False), _doc({}, exists=False)
-        )
+    async def test_guest_id_when_no_user(self, fake_repo, fake):
+        await fake_repo.ensure_session("abcdefgh-rest", user_id=None)
+        assert fake.data("sessions/abcdefgh-rest")["userId"] == "guest_abcdefgh"
 
-        with patch(f"{_MODULE}.get_firestore_client", return_value=mock_db), \
-             patch(f"{_MODULE}.get_async_firestore_client", return_value=mock_db), \
-             patch(f"{_MODULE}.async_firestore", mock_fs):
-            await repo.ensure_session("new-sess", user_id="user123")
+    @pytest.mark.asyncio
+    async def test_claims_guest_session_for_real_user(self, fake_repo, fake):
+        fake.docs["sessions/sess1"] = {"userId": "guest_abcdefgh"}
+        fake.docs["projects/sess1"] = {"userId": "guest_abcdefgh"}
 
-        sess_ref.set.assert_called_once()
-        proj_ref.set.assert_called_once()
-        proj_data = proj_ref.set.call_args[0][0]
-        assert proj_data["userId"] == "user123"
+        await fake_repo.ensure_session("sess1", user_id="real-uid")
+
+        assert fake.data("sessions/sess1")["userId"] == "real-uid"
+        assert fake.data("projects/sess1")["userId"] == "real-uid"
+        assert fake.rpcs == {"get_all": 1, "commit": 1}
 
     @pytest.mark.asyncio
-    async def test_guest_id_when_no_user(self, repo, mock_db, mock_fs):
-        sess_ref, _ = self._build_collections(
-            mock_db, _doc({}, exists=False), _doc({}, exists=False)
-        )
+    async def test_does_not_claim_owned_session(self, fake_repo, fake):
+        fake.docs["sessions/sess1"] = {"userId": "owner"}
+        fake.docs["projects/sess1"] = {"userId": "owner"}
 
-        with patch(f"{_MODULE}.get_firestore_client", return_value=mock_db), \
-             patch(f"{_MODULE}.get_async_firestore_client", return_value=mock_db), \
-             patch(f"{_MODULE}.async_firestore", mock_fs):
-            await repo.ensure_session("abcdefgh-rest", user_id=None)
+        await fake_repo.ensure_session("sess1", user_id="someone-else")
 
-        sess_data = sess_ref.set.call_args[0][0]
-        assert sess_data["userId"].startswith("guest_")
+        assert fake.data("sessions/sess1")["userId"] == "owner"
+        assert fake.data("projects/sess1")["userId"] == "owner"
+        assert "expireAt" in fake.data("sessions/sess1")
 
     @pytest.mark.asyncio
-    async def test_claims_guest_session_for_real_user(self, repo, mock_db, mock_fs):
-        sess_doc = _doc({"userId": "guest_abcdefgh"}, exists=True)
-        proj_doc = _doc({}, exists=True)
-        sess_ref, proj_ref = self._build_collections(mock_db, sess_doc, proj_doc)
+    async def test_backfills_missing_project(self, fake_repo, fake):
+        fake.docs["sessions/sess1"] = {"userId": "real-user", "title": "Proj"}
 
-        with patch(f"{_MODULE}.get_firestore_client", return_value=mock_db), \
-             patch(f"{_MODULE}.get_async_firestore_client", return_value=mock_db), \
-             patch(f"{_MODULE}.async_firestore", mock_fs):
-            await repo.ensure_session("sess1", user_id="real-uid")
+        await fake_repo.ensure_session("sess1", user_id="real-user")
 
-        sess_ref.update.assert_called_once()
-        update = sess_ref.update.call_args[0][0]
-        assert update["userId"] == "real-uid"
+        project = fake.data("projects/sess1")
+        assert project["name"] == "Proj"
+        assert project["userId"] == "real-user"
 
     @pytest.mark.asyncio
-    async def test_backfills_missing_project(self, repo, mock_db, mock_fs):
-        sess_doc = _doc({"userId": "real-user", "title": "Proj"}, exists=True)
-        proj_doc = _doc({}, exists=False)
-        _, proj_ref = self._build_collections(mock_db, sess_doc, proj_doc)
+    async def test_claim_and_backfill_in_one_commit(self, fake_repo, fake):
+        fake.docs["sessions/sess1"] = {"userId": "guest_abcdefgh", "title": "Bagno"}
 
-        with patch(f"{_MODULE}.get_firestore_client", return_value=mock_db), \
-             patch(f"{_MODULE}.get_async_firestore_client", return_value=mock_db), \
-             patch(f"{_MODULE}.async_firestore", mock_fs):
-            await repo.ensure_session("sess1", user_id="real-user")
+        await fake_repo.ensure_session("sess1", user_id="real-uid")
+
+        assert fake.data("sessions/sess1")["userId"] == "real-uid"
+        assert fake.data("projects/sess1")["userId"] == "real-uid"
+        assert fake.rpcs == {"get_all": 1, "commit": 1}
+
+    @pytest.mark.asyncio
+    async def test_repeat_turn_served_from_known_good_cache(self, fake_repo, fake):
+        await fake_repo.ensure_session("sess1", user_id="u1")
+        await fake_repo.ensure_session("sess1", user_id="u1")
+        assert fake.rpcs == {"get_all": 1, "commit": 1}
+
+        # A different caller (e.g. the guest→user claim) is not served from the cache.
+        await fake_repo.ensure_session("sess1", user_id="u2")
+        assert fake.rpcs["get_all"] == 2
 
-        proj_ref.set.assert_called_once()
+    @pytest.mark.asyncio
+    async def test_cache_entry_expires(self, fake_repo, fake):
+        from src.repositories import conversation_repository as mod
+
+        with patch.object(mod._known_sessions, "ttl_seconds", 0.01):
+            await fake_repo.ensure_session("sess1", user_id="u1")
+            await asyncio.sleep(0.02)
+            await fake_repo.ensure_session("sess1", user_id="u1")
+        assert fake.rpcs["get_all"] == 2
+
+    @pytest.mark.asyncio
+    async def test_forget_known_session(self, fake_repo, fake):
+        from src.repositories.conversation_repository import forget_known_session
+
+        await fake_repo.ensure_session("sess1", user_id="u1")
+        forget_known_session("sess1")
+        await fake_repo.ensure_session("sess1", user_id="u1")
+        assert fake.rpcs["get_all"] == 2
+
+    @pytest.mark.asyncio
+    async def test_failure_is_not_cached(self, fake_repo, fake):
+        with patch.object(fake, "batch", side_effect=RuntimeError("DB error")):
+            await fake_repo.ensure_session("sess1", user_id="u1")  # no raise
+        await fake_repo.ensure_session("sess1", user_id="u1")
+        assert fake.data("sessions/sess1")["userId"] == "u1"
 
     @pytest.mark.asyncio
     async def test_swallows_exceptions(self, repo, mock_db, mock_fs):
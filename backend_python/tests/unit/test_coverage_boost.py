@@ -342,7 +342,7 @@ class TestDownloadImageSmart:
         assert mime == "image/png"
 
     @patch("src.utils.download.storage")
-    @patch("src.utils.download.httpx.AsyncClient")
+    @patch("src.utils.http_client.get_http_client")
     async def test_admin_sdk_fallback_to_http(self, mock_httpx_cls, mock_storage):
         from src.utils.download import download_image_smart
         # Admin SDK fails
@@ -359,7 +359,7 @@ class TestDownloadImageSmart:
         assert content == b"\xff\xd8\xff\xe0"
         assert mime == "image/jpeg"
 
-    @patch("src.utils.download.httpx.AsyncClient")
+    @patch("src.utils.http_client.get_http_client")
     async def test_regular_http_download(self, mock_httpx_cls):
         from src.utils.download import download_image_smart
         _mock_stream_client(
@@ -370,7 +370,7 @@ class TestDownloadImageSmart:
         assert content == b"\x89PNG\r\n\x1a\n"
         assert mime == "image/png"
 
-    @patch("src.utils.download.httpx.AsyncClient")
+    @patch("src.utils.http_client.get_http_client")
     async def test_suspicious_content_type_fallback(self, mock_httpx_cls):
         from src.utils.download import download_image_smart
         _mock_stream_client(
@@ -380,7 +380,7 @@ class TestDownloadImageSmart:
         content, mime = await download_image_smart("https://storage.googleapis.com/test-bucket/photo.png")
         assert mime == "image/png"  # guessed from URL
 
-    @patch("src.utils.download.httpx.AsyncClient")
+    @patch("src.utils.http_client.get_http_client")
     async def test_missing_content_type_header(self, mock_httpx_cls):
         from src.utils.download import download_image_smart
         _mock_stream_client(mock_httpx_cls, 200, {}, body=b"data")
@@ -388,7 +388,7 @@ class TestDownloadImageSmart:
         content, mime = await download_image_smart("https://storage.googleapis.com/test-bucket/unknown")
         assert mime == "application/octet-stream"
 
-    @patch("src.utils.download.httpx.AsyncClient")
+    @patch("src.utils.http_client.get_http_client")
     async def test_http_error_propagation(self, mock_httpx_cls):
         from src.utils.download import download_image_smart
         _mock_stream_client(
@@ -420,12 +420,12 @@ class TestDownloadImageSmart:
 
 class TestMediaProcessor:
     @patch("src.services.media_processor.settings")
-    @patch("src.services.media_processor.genai")
-    def test_init_with_api_key(self, mock_genai, mock_settings):
+    @patch("src.services.media_processor.get_genai_client")
+    def test_init_with_api_key(self, mock_get_client, mock_settings):
         from src.services.media_processor import MediaProcessor
         mock_settings.GEMINI_API_KEY = "test-key"
         MediaProcessor()
-        mock_genai.Client.assert_called_once()
+        mock_get_client.assert_called_once_with(api_version="v1beta")
 
     @patch("src.services.media_processor.settings")
     def test_init_without_api_key_raises(self, mock_settings):
@@ -435,8 +435,8 @@ class TestMediaProcessor:
             MediaProcessor()
 
     @patch("src.services.media_processor.settings")
-    @patch("src.services.media_processor.genai")
-    async def test_upload_success(self, mock_genai, mock_settings):
+    @patch("src.services.media_processor.get_genai_client")
+    async def test_upload_success(self, mock_get_client, mock_settings):
         from src.services.media_processor import MediaProcessor
         mock_settings.GEMINI_API_KEY = "test-key"
 
@@ -446,29 +446,29 @@ class TestMediaProcessor:
 
         mock_client = MagicMock()
         mock_client.aio.files.upload = AsyncMock(return_value=mock_uploaded)
-        mock_genai.Client.return_value = mock_client
+        mock_get_client.return_value = mock_client
 
         processor = MediaProcessor()
         result = await processor.upload_video_for_analysis(io.BytesIO(b"data"), "video/mp4", "test.mp4")
         assert result.uri == "files/123"
 
     @patch("src.services.media_processor.settings")
-    @patch("src.services.media_processor.genai")
-    async def test_upload_failure_raises(self, mock_genai, mock_settings):
+    @patch("src.services.media_processor.get_genai_client")
+    async def test_upload_failure_raises(self, mock_get_client, mock_settings):
         from src.services.media_processor import MediaProcessor, VideoProcessingError
         mock_settings.GEMINI_API_KEY = "test-key"
 
         mock_client = MagicMock()
         mock_client.aio.files.upload = AsyncMock(side_effect=Exception("Network error"))
-        mock_genai.Client.return_value = mock_client
+        mock_get_client.return_value = mock_client
 
         processor = MediaProcessor()
         with pytest.raises(VideoProcessingError, match="Video upload failed"):
             await processor.upload_video_for_analysis(io.BytesIO(b"data"), "video/mp4", "test.mp4")
 
     @patch("src.services.media_processor.settings")
-    @patch("src.services.media_processor.genai")
-    async def test_wait_for_processing_active(self, mock_genai, mock_settings):
+    @patch("src.services.media_processor.get_genai_client")
+    async def test_wait_for_processing_active(self, mock_get_client, mock_settings):
         from src.services.media_processor import MediaProcessor
         mock_settings.GEMINI_API_KEY = "test-key"
 
@@ -478,15 +478,15 @@ class TestMediaProcessor:
 
         mock_client = MagicMock()
         mock_client.aio.files.get = AsyncMock(return_value=mock_file)
-        mock_genai.Client.return_value = mock_client
+        mock_get_client.return_value = mock_client
 
         processor = MediaProcessor()
         result = await processor.wait_for_processing("files/123", timeout_seconds=5)
         assert result is mock_file
 
     @patch("src.services.media_processor.settings")
-    @patch("src.services.media_processor.genai")
-    async def test_wait_for_processing_failed(self, mock_genai, mock_settings):
+    @patch("src.services.media_processor.get_genai_client")
+    async def test_wait_for_processing_failed(self, mock_get_client, mock_settings):
         from src.services.media_processor import MediaProcessor, VideoProcessingError
         mock_settings.GEMINI_API_KEY = "test-key"
 
@@ -496,15 +496,15 @@ class TestMediaProcessor:
 
         mock_client = MagicMock()
         mock_client.aio.files.get = AsyncMock(return_value=mock_file)
-        mock_genai.Client.return_value = mock_client
+        mock_get_client.return_value = mock_client
 
         processor = MediaProcessor()
         with pytest.raises(VideoProcessingError, match="failed"):
             await processor.wait_for_processing("files/123", timeout_seconds=5)
 
     @patch("src.services.media_processor.settings")
-    @patch("src.services.media_processor.genai")
-    def test_get_media_processor_factory(self, mock_genai, mock_settings):
+    @patch("src.services.media_processor.get_genai_client")
+    def test_get_media_processor_factory(self, mock_get_client, mock_settings):
         from src.services.media_processor import get_media_processor
         mock_settings.GEMINI_API_KEY = "test-key"
         processor = get_media_processor()
@@ -127,7 +127,7 @@ class TestRedirectSsrf:
         mock_client.__aexit__ = AsyncMock(return_value=False)
         return mock_client
 
-    @patch("src.utils.download.httpx.AsyncClient")
+    @patch("src.utils.http_client.get_http_client")
     async def test_redirect_to_internal_ip_blocked(self, mock_httpx_cls):
         redirect = _make_stream_response(302, {"location": "http://169.254.169.254/latest/"})
         mock_httpx_cls.return_value = await self._client_returning([redirect])
@@ -135,7 +135,7 @@ class TestRedirectSsrf:
         with pytest.raises(Exception, match="Failed to download"):
             await download_image_smart("https://replicate.delivery/legit/img.png")
 
-    @patch("src.utils.download.httpx.AsyncClient")
+    @patch("src.utils.http_client.get_http_client")
     async def test_valid_redirect_followed(self, mock_httpx_cls):
         redirect = _make_stream_response(
             302, {"location": "https://storage.googleapis.com/bucket/final.png"}
@@ -147,7 +147,7 @@ class TestRedirectSsrf:
         assert content == b"\x89PNG"
         assert mime == "image/png"
 
-    @patch("src.utils.download.httpx.AsyncClient")
+    @patch("src.utils.http_client.get_http_client")
     async def test_oversized_body_rejected_mid_stream(self, mock_httpx_cls):
         # No content-length header, so the cap must be enforced while
         # iterating chunks rather than upfront.
@@ -0,0 +1,56 @@
+"""Tests for the page checkpoint and merge stages of scripts/extract_prezzario.py."""
+import json
+
+from scripts.extract_prezzario import PageCheckpoint, merge_pages
+
+
+def _article(codice: str, descrizione: str = "Demolizione") -> dict:
+    return {"codice": codice, "descrizione": descrizione, "unita_misura": "mq",
+            "prezzo_euro": 12.5, "categoria": "Demolizioni e Rimozioni"}
+
+
+def _line(pdf: str, page: int, articles: list[dict]) -> str:
+    return json.dumps({"pdf": pdf, "page": page, "articoli": articles}) + "\n"
+
+
+class TestPageCheckpoint:
+    def test_truncated_last_line_is_skipped(self, tmp_path):
+        path = tmp_path / "pages.jsonl"
+        path.write_text(_line("abc", 0, [_article("A 1.")]) + _line("abc", 1, [_article("A 2.")])[:25])
+        checkpoint = PageCheckpoint(path, "abc")
+        assert list(checkpoint.pages) == [0]  # page 1 is extracted again
+
+    def test_pages_of_another_pdf_are_dropped(self, tmp_path):
+        path = tmp_path / "pages.jsonl"
+        path.write_text(_line("old", 0, [_article("A 1.")]) + _line("abc", 1, [_article("A 2.")]))
+        checkpoint = PageCheckpoint(path, "abc")
+        assert list(checkpoint.pages) == [1]
+
+    def test_first_add_rewrites_a_file_with_foreign_pages(self, tmp_path):
+        path = tmp_path / "pages.jsonl"
+        path.write_text(_line("old", 0, [_article("A 1.")]) + _line("abc", 1, [_article("A 2.")]))
+        checkpoint = PageCheckpoint(path, "abc")
+        checkpoint.add(2, [_article("A 3.")])
+        checkpoint.add(3, [_article("A 4.")])  # later adds append
+
+        entries = [json.loads(line) for line in path.read_text().splitlines()]
+        assert [(e["pdf"], e["page"]) for e in entries] == [("abc", 1), ("abc", 2), ("abc", 3)]
+        assert list(PageCheckpoint(path, "abc").pages) == [1, 2, 3]
+
+    def test_add_appends_without_rewriting(self, tmp_path):
+        path = tmp_path / "pages.jsonl"
+        path.write_text(_line("abc", 0, [_article("A 1.")]))
+        PageCheckpoint(path, "abc").add(1, [_article("A 2.")])
+        assert path.read_text().startswith(_line("abc", 0, [_article("A 1.")]))
+        assert list(PageCheckpoint(path, "abc").pages) == [0, 1]
+
+
+def test_merge_collapses_normalized_codes_keeping_the_first_occurrence():
+    pages = {
+        2: [_article("A 3.2.14.a", "seconda lettura")],
+        1: [_article("A 3.02.14.a.", "prima lettura"), _article("A 14.01.15.c.")],
+        3: [_article(" . ")],  # no usable code
+    }
+    merged = merge_pages(pages)
+    assert [a.codice for a in merged] == ["A 3.02.14.a.", "A 14.01.15.c."]
+    assert merged[0].descrizione == "prima lettura"  # page order, not dict order
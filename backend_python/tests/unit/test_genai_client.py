@@ -0,0 +1,64 @@
+"""Tests for the shared google-genai client registry (src/utils/genai_client.py)."""
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from src.utils.genai_client import GenAIClientRegistry
+
+
+@pytest.fixture
+def registry():
+    with patch("src.utils.genai_client.genai.Client", side_effect=lambda **_: MagicMock()) as client_cls:
+        reg = GenAIClientRegistry()
+        reg.client_cls = client_cls
+        yield reg
+
+
+class TestGenAIClientRegistry:
+    def test_client_built_once_per_key(self, registry):
+        first = registry.get()
+        assert registry.get() is first
+        assert registry.client_cls.call_count == 1
+
+    def test_api_version_and_backend_get_separate_clients(self, registry):
+        default = registry.get()
+        beta = registry.get(api_version="v1beta")
+        vertex = registry.get(backend="vertex")
+        assert len({id(default), id(beta), id(vertex)}) == 3
+        assert registry.client_cls.call_args_list[1].kwargs["http_options"].api_version == "v1beta"
+        assert registry.client_cls.call_args_list[2].kwargs["vertexai"] is True
+
+    async def test_aclose_closes_and_forgets_clients(self, registry):
+        client = registry.get()
+        client.aio.aclose = AsyncMock()
+        await registry.aclose()
+        client.aio.aclose.assert_awaited_once()
+        client.close.assert_called_once()
+        assert registry.get() is not client
+
+
+class TestCallTracking:
+    async def test_latency_and_in_flight_per_model(self, registry):
+        gate = asyncio.Event()
+
+        async def call():
+            with registry.track("flash"):
+                await gate.wait()
+
+        tasks = [asyncio.create_task(call()) for _ in range(2)]
+        await asyncio.sleep(0)
+        assert registry.stats()["models"]["flash"]["in_flight"] == 2
+        gate.set()
+        await asyncio.gather(*tasks)
+
+        stats = registry.stats()["models"]["flash"]
+        assert stats["in_flight"] == 0
+        assert stats["calls"] == 2
+        assert stats["errors"] == 0
+
+    def test_errors_counted_and_reraised(self, registry):
+        with pytest.raises(RuntimeError), registry.track("pro"):
+            raise RuntimeError("quota")
+        stats = registry.stats()["models"]["pro"]
+        assert stats["errors"] == 1
+        assert stats["in_flight"] == 0
@@ -0,0 +1,80 @@
+"""
+Tests for GeminiContextCache (src/utils/genai_context_cache.py) against a
+fake `client.aio.caches` API.
+"""
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+
+from google.genai import errors as genai_errors
+from src.utils.genai_context_cache import GeminiContextCache, is_cache_rejection
+
+
+def _client(fail: bool = False) -> MagicMock:
+    client = MagicMock()
+    created = iter(range(100))
+
+    async def create(model, config):
+        await asyncio.sleep(0)
+        if fail:
+            raise RuntimeError("cached content too small")
+        return SimpleNamespace(name=f"cachedContents/{next(created)}")
+
+    client.aio.caches.create = AsyncMock(side_effect=create)
+    client.aio.caches.delete = AsyncMock()
+    return client
+
+
+async def test_one_cache_per_version_shared_by_concurrent_lookups():
+    client = _client()
+    cache = GeminiContextCache(client, ttl_seconds=3600)
+
+    names = await asyncio.gather(*(cache.lookup("gemini-test", "v1", "prefix") for _ in range(5)))
+
+    assert set(names) == {"cachedContents/0"}
+    client.aio.caches.create.assert_awaited_once()
+    config = client.aio.caches.create.await_args.kwargs["config"]
+    assert config.ttl == "3600s" and config.contents[0].parts[0].text == "prefix"
+
+
+async def test_new_version_replaces_the_old_cache_without_deleting_it():
+    client = _client()
+    cache = GeminiContextCache(client, ttl_seconds=3600)
+    await cache.lookup("gemini-test", "v1", "old prefix")
+
+    assert await cache.lookup("gemini-test", "v2", "new prefix") == "cachedContents/1"
+    client.aio.caches.delete.assert_not_awaited()  # in-flight calls may still use it; TTL expires it
+    assert ("gemini-test", "v1") not in cache._entries
+
+
+def test_only_not_found_and_cache_invalid_argument_count_as_cache_rejections():
+    assert is_cache_rejection(genai_errors.ClientError(404, {"error": {"status": "NOT_FOUND"}}))
+    assert is_cache_rejection(genai_errors.ClientError(400, {"error": {
+        "status": "INVALID_ARGUMENT", "message": "Cached content cachedContents/7 has expired."}}))
+    assert not is_cache_rejection(genai_errors.ClientError(400, {"error": {
+        "status": "INVALID_ARGUMENT", "message": "Unable to process input image."}}))
+    assert not is_cache_rejection(genai_errors.ClientError(429, {"error": {"status": "RESOURCE_EXHAUSTED"}}))
+    assert not is_cache_rejection(genai_errors.ServerError(503, {"error": {"status": "UNAVAILABLE"}}))
+    assert not is_cache_rejection(TimeoutError())
+
+
+async def test_expiring_and_invalidated_entries_are_recreated():
+    client = _client()
+    cache = GeminiContextCache(client, ttl_seconds=60)  # inside the refresh margin: never reused
+    await cache.lookup("gemini-test", "v1", "prefix")
+    assert await cache.lookup("gemini-test", "v1", "prefix") == "cachedContents/1"
+
+    cache.ttl_seconds = 3600
+    await cache.lookup("gemini-test", "v1", "prefix")
+    await cache.invalidate("gemini-test", "v1")
+    assert await cache.lookup("gemini-test", "v1", "prefix") == "cachedContents/3"
+    client.aio.caches.delete.assert_not_awaited()  # forgotten only; other calls may still reference it
+
+
+async def test_creation_failure_falls_back_inline_without_retrying_every_call():
+    client = _client(fail=True)
+    cache = GeminiContextCache(client, ttl_seconds=3600)
+
+    assert await cache.lookup("gemini-test", "v1", "prefix") is None
+    assert await cache.lookup("gemini-test", "v1", "prefix") is None
+    client.aio.caches.create.assert_awaited_once()
@@ -0,0 +1,116 @@
+"""Tests for the shared pooled media HTTP client (src/utils/http_client.py)."""
+import asyncio
+from unittest.mock import patch
+
+import httpx
+import pytest
+from src.utils import http_client
+from src.utils.http_client import (
+    FetchedMedia,
+    MediaFetchError,
+    close_http_clients,
+    fetch_media_bytes,
+    get_http_client,
+)
+
+
+def _mock_client(handler) -> httpx.AsyncClient:
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler), follow_redirects=False)
+
+
+class TestRegistry:
+    async def test_client_is_shared(self):
+        assert get_http_client() is get_http_client()
+        await close_http_clients()
+
+    async def test_close_then_get_rebuilds(self):
+        first = get_http_client()
+        await close_http_clients()
+        assert first.is_closed
+        second = get_http_client()
+        assert second is not first and not second.is_closed
+        await close_http_clients()
+
+
+class TestFetchMediaBytes:
+    async def test_fetch_returns_bytes_and_type(self):
+        def handler(request: httpx.Request) -> httpx.Response:
+            assert request.url.scheme == "https"
+            return httpx.Response(200, content=b"\x89PNG", headers={"content-type": "image/png"})
+
+        with patch.object(http_client, "get_http_client", return_value=_mock_client(handler)):
+            fetched = await fetch_media_bytes("https://storage.googleapis.com/b/photo.png")
+        assert fetched == FetchedMedia(
+            data=b"\x89PNG", content_type="image/png", url="https://storage.googleapis.com/b/photo.png"
+        )
+
+    async def test_rejects_non_allowlisted_host(self):
+        with pytest.raises(ValueError, match="allowlist"):
+            await fetch_media_bytes("https://evil.example.com/x.png")
+
+    async def test_redirect_to_metadata_host_blocked(self):
+        def handler(request: httpx.Request) -> httpx.Response:
+            return httpx.Response(302, headers={"location": "http://169.254.169.254/latest/"})
+
+        with patch.object(http_client, "get_http_client", return_value=_mock_client(handler)), \
+             pytest.raises(ValueError):
+            await fetch_media_bytes("https://replicate.delivery/x/img.png")
+
+    async def test_redirect_chain_followed_and_final_url_reported(self):
+        def handler(request: httpx.Request) -> httpx.Response:
+            if request.url.host == "replicate.delivery":
+                return httpx.Response(302, headers={"location": "https://storage.googleapis.com/b/final.png"})
+            return httpx.Response(200, content=b"ok")
+
+        with patch.object(http_client, "get_http_client", return_value=_mock_client(handler)):
+            fetched = await fetch_media_bytes("https://replicate.delivery/x/img.png")
+        assert fetched.data == b"ok"
+        assert fetched.url == "https://storage.googleapis.com/b/final.png"
+
+    async def test_declared_length_over_cap(self):
+        def handler(request: httpx.Request) -> httpx.Response:
+            return httpx.Response(200, content=b"x" * 64)
+
+        with patch.object(http_client, "get_http_client", return_value=_mock_client(handler)), \
+             pytest.raises(MediaFetchError, match="content-length"):
+            await fetch_media_bytes("https://storage.googleapis.com/b/big.png", max_bytes=16)
+
+    async def test_streamed_body_over_cap(self):
+        async def body():
+            for _ in range(4):
+                yield b"x" * 8
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            return httpx.Response(200, content=body())  # chunked, no content-length
+
+        with patch.object(http_client, "get_http_client", return_value=_mock_client(handler)), \
+             pytest.raises(MediaFetchError, match="size cap"):
+            await fetch_media_bytes("https://storage.googleapis.com/b/big.png", max_bytes=16)
+
+    async def test_http_error_raises(self):
+        def handler(request: httpx.Request) -> httpx.Response:
+            return httpx.Response(404)
+
+        with patch.object(http_client, "get_http_client", return_value=_mock_client(handler)), \
+             pytest.raises(httpx.HTTPStatusError):
+            await fetch_media_bytes("https://storage.googleapis.com/b/missing.png")
+
+    async def test_per_host_concurrency_is_capped(self):
+        in_flight = 0
+        peak = 0
+
+        async def handler(request: httpx.Request) -> httpx.Response:
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            return httpx.Response(200, content=b"ok")
+
+        with patch.object(http_client, "get_http_client", return_value=_mock_client(handler)), \
+             patch.object(http_client.settings, "HTTP_CLIENT_MAX_PER_HOST", 2):
+            http_client._registry._host_slots.clear()
+            await asyncio.gather(*(
+                fetch_media_bytes(f"https://storage.googleapis.com/b/{i}.png") for i in range(6)
+            ))
+        assert peak == 2
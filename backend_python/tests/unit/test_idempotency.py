@@ -0,0 +1,212 @@
+"""Tests for IdempotencyMiddleware and its storage backends."""
+import asyncio
+import time
+from unittest.mock import patch
+
+import pytest
+from src.middleware.idempotency import IdempotencyMiddleware
+from src.middleware.idempotency_store import (
+    CachedResponse,
+    FirestoreIdempotencyStore,
+    InMemoryIdempotencyStore,
+    SQLiteIdempotencyStore,
+)
+from tests.unit.firestore_fake import FakeFirestore
+
+
+def _resp(body: bytes = b'{"ok":true}', created_at: float | None = None) -> CachedResponse:
+    r = CachedResponse(status=200, headers=[[b"content-type", b"application/json"]], body=body)
+    if created_at is not None:
+        r.created_at = created_at
+    return r
+
+
+def _firestore_store(db: FakeFirestore) -> FirestoreIdempotencyStore:
+    s = FirestoreIdempotencyStore()
+    s._db = lambda: db
+    return s
+
+
+@pytest.fixture(params=["memory", "sqlite", "firestore"])
+def store(request, tmp_path):
+    if request.param == "memory":
+        yield InMemoryIdempotencyStore(max_size=3)
+        return
+    if request.param == "firestore":
+        yield _firestore_store(FakeFirestore())
+        return
+    s = SQLiteIdempotencyStore(path=str(tmp_path / "idem.sqlite3"))
+    yield s
+    s.close()
+
+
+class TestStoreContract:
+    async def test_reserve_put_get(self, store):
+        assert await store.reserve("k") is True
+        assert await store.reserve("k") is False  # in-flight duplicate
+        await store.put("k", _resp())
+        cached = await store.get("k")
+        assert cached is not None
+        assert cached.body == b'{"ok":true}'
+        assert cached.headers == [[b"content-type", b"application/json"]]
+
+    async def test_release_frees_key(self, store):
+        assert await store.reserve("k") is True
+        await store.release("k")
+        assert await store.get("k") is None
+        assert await store.reserve("k") is True
+
+    async def test_expired_entry_not_replayed(self, store):
+        await store.reserve("k")
+        await store.put("k", _resp(created_at=time.time() - store.ttl_seconds - 1))
+        assert await store.get("k") is None
+
+    async def test_stale_in_flight_marker_is_reclaimable(self, store):
+        assert await store.reserve("k") is True
+        with patch("src.middleware.idempotency_store.time.monotonic", return_value=time.monotonic() + 3600), \
+             patch("src.middleware.idempotency_store.time.time", return_value=time.time() + 3600):
+            assert await store.reserve("k") is True
+
+
+class TestInMemoryLru:
+    async def test_capacity_evicts_least_recently_used(self):
+        store = InMemoryIdempotencyStore(max_size=2)
+        for k in ("a", "b"):
+            await store.put(k, _resp())
+        await store.get("a")  # refresh a
+        await store.put("c", _resp())
+        assert await store.get("b") is None
+        assert await store.get("a") is not None
+        assert len(store) == 2
+
+    async def test_expired_lru_head_dropped_on_insert(self):
+        store = InMemoryIdempotencyStore(ttl_seconds=10)
+        await store.put("old", _resp(created_at=time.time() - 60))
+        await store.put("new", _resp())
+        assert len(store) == 1
+
+
+class TestSQLiteShared:
+    async def test_two_handles_share_state(self, tmp_path):
+        path = str(tmp_path / "shared.sqlite3")
+        a, b = SQLiteIdempotencyStore(path=path), SQLiteIdempotencyStore(path=path)
+        try:
+            assert await a.reserve("k") is True
+            assert await b.reserve("k") is False
+            await a.put("k", _resp(b"first"))
+            assert (await b.get("k")).body == b"first"
+        finally:
+            a.close()
+            b.close()
+
+
+class TestFirestoreShared:
+    async def test_only_one_instance_takes_over_a_stale_marker(self):
+        db = FakeFirestore(rtt=0.001)
+        a, b = _firestore_store(db), _firestore_store(db)
+        assert await a.reserve("k") is True
+        with patch("src.middleware.idempotency_store.time.time", return_value=time.time() + 3600):
+            won = await asyncio.gather(a.reserve("k"), b.reserve("k"))
+        assert sorted(won) == [False, True]
+
+    async def test_takeover_of_an_expired_response_drops_its_body(self):
+        db = FakeFirestore()
+        s = _firestore_store(db)
+        await s.reserve("k")
+        await s.put("k", _resp(created_at=time.time() - s.ttl_seconds - 1))
+        assert await s.reserve("k") is True
+        (doc,) = db.children("_idempotency_keys").values()
+        assert doc["state"] == "pending" and "body" not in doc
+
+
+# ── Middleware ────────────────────────────────────────────────────────────────
+
+def _scope(path: str = "/api/submit-lead", key: str | None = "abc") -> dict:
+    headers = [(b"authorization", b"Bearer t1")]
+    if key is not None:
+        headers.append((b"idempotency-key", key.encode()))
+    return {"type": "http", "method": "POST", "path": path, "headers": headers}
+
+
+class _App:
+    def __init__(self, status: int = 200):
+        self.calls = 0
+        self.status = status
+
+    async def __call__(self, scope, receive, send):
+        self.calls += 1
+        await send({"type": "http.response.start", "status": self.status, "headers": []})
+        await send({"type": "http.response.body", "body": f"call-{self.calls}".encode()})
+
+
+async def _run(mw, scope):
+    sent = []
+
+    async def send(msg):
+        sent.append(msg)
+
+    await mw(scope, None, send)
+    return sent
+
+
+class TestMiddleware:
+    async def test_duplicate_is_replayed(self):
+        app = _App()
+        mw = IdempotencyMiddleware(app, store=InMemoryIdempotencyStore())
+        await _run(mw, _scope())
+        replay = await _run(mw, _scope())
+        assert app.calls == 1
+        assert replay[-1]["body"] == b"call-1"
+        assert [b"x-idempotency-replayed", b"true"] in replay[0]["headers"]
+
+    async def test_non_2xx_is_not_cached(self):
+        app = _App(status=500)
+        mw = IdempotencyMiddleware(app, store=InMemoryIdempotencyStore())
+        await _run(mw, _scope())
+        await _run(mw, _scope())
+        assert app.calls == 2
+
+    async def test_concurrent_duplicate_gets_409(self):
+        gate = asyncio.Event()
+
+        async def slow_app(scope, receive, send):
+            await gate.wait()
+            await send({"type": "http.response.start", "status": 200, "headers": []})
+            await send({"type": "http.response.body", "body": b"done"})
+
+        mw = IdempotencyMiddleware(slow_app, store=InMemoryIdempotencyStore())
+        first = asyncio.create_task(_run(mw, _scope()))
+        await asyncio.sleep(0)
+        second = await _run(mw, _scope())
+        gate.set()
+        await first
+        assert second[0]["status"] == 409
+
+    @pytest.mark.parametrize("path", [
+        "/api/quote/proj-1/start",
+        "/api/quote/batch",
+        "/api/quote/batch/b_1/submit",
+    ])
+    async def test_submission_routes_are_covered(self, path):
+        app = _App()
+        mw = IdempotencyMiddleware(app, store=InMemoryIdempotencyStore())
+        await _run(mw, _scope(path))
+        await _run(mw, _scope(path))
+        assert app.calls == 1
+
+    async def test_unlisted_path_passes_through(self):
+        app = _App()
+        mw = IdempotencyMiddleware(app, store=InMemoryIdempotencyStore())
+        await _run(mw, _scope("/api/quote/proj-1/approve"))
+        await _run(mw, _scope("/api/quote/proj-1/approve"))
+        assert app.calls == 2
+
+    async def test_shared_sqlite_store_replays_across_middlewares(self, tmp_path):
+        path = str(tmp_path / "shared.sqlite3")
+        app = _App()
+        mw_a = IdempotencyMiddleware(app, store=SQLiteIdempotencyStore(path=path))
+        mw_b = IdempotencyMiddleware(app, store=SQLiteIdempotencyStore(path=path))
+        await _run(mw_a, _scope())
+        replay = await _run(mw_b, _scope())
+        assert app.calls == 1
+        assert replay[-1]["body"] == b"call-1"
@@ -13,19 +13,22 @@ Verifies:
   - analyze_project_for_quote() handles Gemini response_schema output correctly
     when mocked, and raises InsightEngineError on empty/failed responses.
   - completeness_score < 0.7 flow returns missing_info questions.
+  - system_prompt() is memoized per (price book, assemblies) and, with a
+    ContextCache, analyses send only the conversation and reference the cache.
 """
 from __future__ import annotations
 
 from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
+from google.genai.errors import ClientError
 from src.services.insight_engine import (
     InsightAnalysis,
     InsightEngine,
     InsightEngineError,
     SKUItemSuggestion,
 )
-from src.services.pricing_service import PricingService
+from src.services.pricing_service import PriceBookSnapshot, PricingService
 
 # ─── Fixtures ─────────────────────────────────────────────────────────────────
 
@@ -219,16 +222,13 @@ class TestAnalyzeProjectForQuote:
             missing_info=[],
         )
 
-        mock_resp = MagicMock()
-        mock_resp.content = b"\xff\xd8\xff\xe0"  # jpeg magic bytes
-        mock_resp.raise_for_status = MagicMock()
-        mock_http = MagicMock()
-        mock_http.get = AsyncMock(return_value=mock_resp)
-        mock_cm = MagicMock()
-        mock_cm.__aenter__ = AsyncMock(return_value=mock_http)
-        mock_cm.__aexit__ = AsyncMock(return_value=False)
-
-        with patch("httpx.AsyncClient", return_value=mock_cm), \
+        from src.utils.media_cache import CachedMedia
+
+        mock_fetch = AsyncMock(
+            return_value=CachedMedia(data=b"\xff\xd8\xff\xe0", mime_type="image/jpeg", digest="d")
+        )
+
+        with patch.object(ie_mod, "fetch_media_cached", mock_fetch), \
              patch.object(ie_mod.settings, "FIREBASE_STORAGE_BUCKET", bucket), \
              patch.object(
                  engine.client.aio.models, "generate_content", new_callable=AsyncMock
@@ -241,7 +241,7 @@ class TestAnalyzeProjectForQuote:
 
         assert isinstance(result, InsightAnalysis)
         # The legit URL was fetched (not over-blocked by the SSRF guard).
-        mock_http.get.assert_awaited_once()
+        mock_fetch.assert_awaited_once()
 
     @pytest.mark.asyncio
     async def test_empty_chat_history_does_not_crash(self, engine: InsightEngine) -> None:
@@ -262,3 +262,95 @@ class TestAnalyzeProjectForQuote:
 
         assert isinstance(result, InsightAnalysis)
         assert result.suggestions == []
+
+
+# ─── system_prompt memo + context cache ──────────────────────────────────────
+
+class FakeContextCache:
+    """Local ContextCache: hands out one name per (model, version), records calls."""
+
+    def __init__(self) -> None:
+        self.lookups: list[tuple[str, str]] = []
+        self.invalidated: list[tuple[str, str]] = []
+        self.prefixes: dict[str, str] = {}
+
+    async def lookup(self, model: str, version: str, prefix: str) -> str | None:
+        self.lookups.append((model, version))
+        self.prefixes[version] = prefix
+        return f"cachedContents/{version}"
+
+    async def invalidate(self, model: str, version: str) -> None:
+        self.invalidated.append((model, version))
+
+
+def _ok_response() -> MagicMock:
+    resp = MagicMock()
+    resp.text = InsightAnalysis(summary="ok").model_dump_json()
+    return resp
+
+
+class TestSystemPromptMemo:
+    def test_prompt_is_assembled_once_per_price_book(self, engine: InsightEngine) -> None:
+        with patch.object(engine, "_build_system_prompt", wraps=engine._build_system_prompt) as build:
+            first = engine.system_prompt()
+            assert engine.system_prompt() == first
+            assert build.call_count == 1
+
+            items = [dict(PricingService.load_price_book()[0], unit_price=999.0)]
+            with patch.object(PricingService, "_snapshot", PriceBookSnapshot.build(items, "test")):
+                prompt, version = engine.system_prompt()
+
+        assert build.call_count == 2
+        assert version != first[1] and "€999.00" in prompt
+
+
+class TestContextCache:
+    @pytest.mark.asyncio
+    async def test_cached_prefix_is_referenced_not_resent(self) -> None:
+        cache = FakeContextCache()
+        engine = InsightEngine(model_name="gemini-test", context_cache=cache)
+        system_prompt, version = engine.system_prompt()
+
+        with patch.object(engine.client.aio.models, "generate_content", new_callable=AsyncMock) as generate:
+            generate.return_value = _ok_response()
+            await engine.analyze_project_for_quote(chat_history=[{"role": "user", "content": "bagno 6mq"}])
+
+        assert cache.lookups == [("gemini-test", version)] and cache.prefixes[version] == system_prompt
+        kwargs = generate.await_args.kwargs
+        assert kwargs["config"].cached_content == f"cachedContents/{version}"
+        texts = [p.text for p in kwargs["contents"][0].parts]
+        assert texts == ["## Conversazione\n**USER**: bagno 6mq"]
+
+    @pytest.mark.asyncio
+    async def test_rejected_cache_is_invalidated_and_the_prefix_sent_inline(self) -> None:
+        cache = FakeContextCache()
+        engine = InsightEngine(model_name="gemini-test", context_cache=cache)
+        system_prompt, version = engine.system_prompt()
+
+        with patch.object(engine.client.aio.models, "generate_content", new_callable=AsyncMock) as generate:
+            generate.side_effect = [ClientError(404, {"error": {"status": "NOT_FOUND"}}), _ok_response()]
+            result = await engine.analyze_project_for_quote(chat_history=[{"role": "user", "content": "x"}])
+
+        assert result.summary == "ok"
+        assert cache.invalidated == [("gemini-test", version)]
+        retry = generate.await_args_list[1].kwargs
+        assert retry["config"].cached_content is None
+        assert retry["contents"][0].parts[0].text == system_prompt
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("error", [
+        ClientError(429, {"error": {"status": "RESOURCE_EXHAUSTED"}}),
+        ClientError(400, {"error": {"status": "INVALID_ARGUMENT", "message": "Unable to process input image."}}),
+        TimeoutError("deadline exceeded"),
+    ])
+    async def test_other_failures_keep_the_cache_and_do_not_retry(self, error) -> None:
+        cache = FakeContextCache()
+        engine = InsightEngine(model_name="gemini-test", context_cache=cache)
+
+        with patch.object(engine.client.aio.models, "generate_content", new_callable=AsyncMock) as generate:
+            generate.side_effect = [error, _ok_response()]
+            with pytest.raises(InsightEngineError):
+                await engine.analyze_project_for_quote(chat_history=[{"role": "user", "content": "x"}])
+
+        assert cache.invalidated == []
+        assert generate.await_count == 1
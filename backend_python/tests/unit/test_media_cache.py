@@ -0,0 +1,165 @@
+"""Tests for the content-addressed media byte cache (src/utils/media_cache.py)."""
+import asyncio
+
+from src.utils.media_cache import MediaCache, media_key
+
+
+def _loader(data: bytes, mime: str | None = "image/jpeg", calls: list | None = None):
+    async def load():
+        if calls is not None:
+            calls.append(1)
+        return data, mime
+    return load
+
+
+class TestMediaKey:
+    def test_credentials_are_part_of_key(self):
+        a = "https://storage.googleapis.com/b/uploads/s1/p.jpg?X-Goog-Signature=aaa&X-Goog-Expires=1"
+        b = "https://storage.googleapis.com/b/uploads/s1/p.jpg?X-Goog-Signature=bbb&X-Goog-Expires=1"
+        assert media_key(a) != media_key(b)
+        assert media_key(a).startswith("gs://b/uploads/s1/p.jpg@")
+        assert "aaa" not in media_key(a)
+
+    def test_firebase_client_url_normalized(self):
+        url = "https://firebasestorage.googleapis.com/v0/b/b/o/uploads%2Fp.jpg?alt=media&token=t"
+        same = "https://storage.googleapis.com/b/uploads/p.jpg?token=t"
+        assert media_key(url) == media_key(same)
+        assert media_key(url).startswith("gs://b/uploads/p.jpg@")
+
+    def test_generation_is_part_of_key(self):
+        url = "https://storage.googleapis.com/b/p.jpg?generation=42"
+        assert media_key(url) == "gs://b/p.jpg#42"
+
+    def test_other_hosts_keyed_by_url(self):
+        assert media_key("https://replicate.delivery/x/y.png#frag") == "https://replicate.delivery/x/y.png"
+
+
+class TestMediaCache:
+    async def test_hit_skips_loader(self):
+        cache = MediaCache(max_bytes=1024)
+        calls: list = []
+        first = await cache.get_or_load("https://storage.googleapis.com/b/p.jpg?sig=1", _loader(b"img", calls=calls))
+        second = await cache.get_or_load("https://storage.googleapis.com/b/p.jpg?sig=1", _loader(b"other", calls=calls))
+        assert len(calls) == 1
+        assert second.data == first.data == b"img"
+        assert second.mime_type == "image/jpeg"
+        assert bytes(second.view()) == b"img"
+        assert cache.stats()["hits"] == 1
+
+    async def test_identical_content_stored_once(self):
+        cache = MediaCache(max_bytes=1024)
+        a = await cache.get_or_load("https://replicate.delivery/a.png", _loader(b"same"))
+        b = await cache.get_or_load("https://replicate.delivery/b.png", _loader(b"same"))
+        assert a.digest == b.digest
+        assert cache.stats()["blobs"] == 1
+        assert cache.stats()["memory_bytes"] == 4
+
+    async def test_concurrent_misses_share_one_fetch(self):
+        cache = MediaCache(max_bytes=1024)
+        calls: list = []
+        gate = asyncio.Event()
+
+        async def slow():
+            calls.append(1)
+            await gate.wait()
+            return b"img", "image/png"
+
+        tasks = [asyncio.create_task(cache.get_or_load("https://replicate.delivery/a.png", slow)) for _ in range(5)]
+        await asyncio.sleep(0)
+        gate.set()
+        results = await asyncio.gather(*tasks)
+        assert len(calls) == 1
+        assert {r.data for r in results} == {b"img"}
+        assert cache.stats()["shared_waits"] == 4
+
+    async def test_failure_propagates_to_waiters_and_is_not_cached(self):
+        cache = MediaCache(max_bytes=1024)
+        gate = asyncio.Event()
+
+        async def failing():
+            await gate.wait()
+            raise RuntimeError("boom")
+
+        tasks = [asyncio.create_task(cache.get_or_load("https://replicate.delivery/a.png", failing)) for _ in range(2)]
+        await asyncio.sleep(0)
+        gate.set()
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+        assert all(isinstance(r, RuntimeError) for r in results)
+        ok = await cache.get_or_load("https://replicate.delivery/a.png", _loader(b"img"))
+        assert ok.data == b"img"
+
+    async def test_other_token_misses_but_shares_the_blob(self):
+        cache = MediaCache(max_bytes=1024)
+        calls: list = []
+        url = "https://firebasestorage.googleapis.com/v0/b/b/o/p.jpg?alt=media&token="
+        await cache.get_or_load(url + "good", _loader(b"img", calls=calls))
+        await cache.get_or_load(url + "revoked", _loader(b"img", calls=calls))
+        assert len(calls) == 2  # storage re-checks the second token
+        assert cache.stats()["blobs"] == 1
+
+    async def test_admin_scope_is_not_served_to_unprivileged_callers(self):
+        cache = MediaCache(max_bytes=1024)
+        calls: list = []
+        url = "https://firebasestorage.googleapis.com/v0/b/b/o/p.jpg?alt=media"
+        await cache.get_or_load(url, _loader(b"img", calls=calls), scope="admin")
+        await cache.get_or_load(url, _loader(b"img", calls=calls))
+        assert len(calls) == 2  # the Admin SDK fetch did not satisfy a plain one
+        await cache.get_or_load(url, _loader(b"img", calls=calls), scope="admin")
+        assert len(calls) == 2
+
+    async def test_cancelling_the_leader_does_not_fail_waiters(self):
+        cache = MediaCache(max_bytes=1024)
+        gate = asyncio.Event()
+
+        async def slow():
+            await gate.wait()
+            return b"img", "image/png"
+
+        leader = asyncio.create_task(cache.get_or_load("https://replicate.delivery/a.png", slow))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(cache.get_or_load("https://replicate.delivery/a.png", slow))
+        await asyncio.sleep(0)
+        leader.cancel()
+        await asyncio.sleep(0)
+        gate.set()
+        assert (await waiter).data == b"img"
+        assert leader.cancelled()
+
+    async def test_byte_budget_evicts_lru(self):
+        cache = MediaCache(max_bytes=10)
+        await cache.get_or_load("https://replicate.delivery/a", _loader(b"aaaa"))
+        await cache.get_or_load("https://replicate.delivery/b", _loader(b"bbbb"))
+        await cache.get_or_load("https://replicate.delivery/a", _loader(b"xxxx"))  # refresh a
+        await cache.get_or_load("https://replicate.delivery/c", _loader(b"cccc"))
+        calls: list = []
+        await cache.get_or_load("https://replicate.delivery/b", _loader(b"bbbb", calls=calls))
+        assert calls == [1]
+        assert cache.stats()["memory_bytes"] <= 10
+
+    async def test_oversized_object_served_but_not_cached(self):
+        cache = MediaCache(max_bytes=2)
+        media = await cache.get_or_load("https://replicate.delivery/a", _loader(b"toolarge"))
+        assert media.data == b"toolarge"
+        assert cache.stats()["entries"] == 0
+
+    async def test_evicted_blob_served_from_spill_dir(self, tmp_path):
+        cache = MediaCache(max_bytes=4, spill_dir=str(tmp_path), spill_max_bytes=100)
+        await cache.get_or_load("https://replicate.delivery/a", _loader(b"aaaa"))
+        await cache.get_or_load("https://replicate.delivery/b", _loader(b"bbbb"))  # spills a
+        assert len(list(tmp_path.iterdir())) == 1
+        calls: list = []
+        media = await cache.get_or_load("https://replicate.delivery/a", _loader(b"zzzz", calls=calls))
+        assert media.data == b"aaaa"
+        assert calls == []
+        assert cache.stats()["disk_hits"] == 1
+
+    async def test_ttl_expiry_refetches(self):
+        cache = MediaCache(max_bytes=1024, ttl_seconds=0.0)
+        await cache.get_or_load("https://replicate.delivery/a", _loader(b"v1"))
+        media = await cache.get_or_load("https://replicate.delivery/a", _loader(b"v2"))
+        assert media.data == b"v2"
+
+    async def test_missing_mime_defaults_to_octet_stream(self):
+        cache = MediaCache(max_bytes=1024)
+        media = await cache.get_or_load("https://replicate.delivery/a", _loader(b"x", mime=None))
+        assert media.mime_type == "application/octet-stream"
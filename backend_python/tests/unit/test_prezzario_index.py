@@ -0,0 +1,51 @@
+"""Tests for the in-process prezzario code index (src/services/prezzario_index.py)."""
+import json
+
+from src.services.prezzario_index import PrezzarioIndex, normalize_code
+
+_ARTICLES = [
+    {"codice": "A 3.02.14.a.", "prezzo_euro": 12.5},
+    {"codice": "A 3.02.14.b.", "prezzo_euro": 16.0},
+    {"codice": "A 3.02.140.a.", "prezzo_euro": 20.0},
+    {"codice": "A 3.02.2.a.", "prezzo_euro": 3.0},
+    {"codice": "A 14.01.15.c.", "prezzo_euro": 6.1},
+]
+
+
+class TestNormalizeCode:
+    def test_case_spacing_trailing_dot_and_leading_zeros(self):
+        assert normalize_code("A 3.02.14.a.") == "a.3.2.14.a"
+        assert normalize_code("a3.2.14.A") == "a.3.2.14.a"
+        assert normalize_code("  A 3 . 02 . 14 . a  ") == "a.3.2.14.a"
+
+    def test_empty_code(self):
+        assert normalize_code(" . ") == ""
+
+
+class TestPrezzarioIndex:
+    def test_exact_lookup(self):
+        index = PrezzarioIndex(_ARTICLES)
+        assert index.lookup("a 3.2.14.b")["prezzo_euro"] == 16.0
+        assert index.lookup("A 3.02.14.z.") is None
+
+    def test_prefix_matches_whole_segments_in_code_order(self):
+        index = PrezzarioIndex(_ARTICLES)
+        codes = [a["codice"] for a in index.by_prefix("A 3.02.14")]
+        assert codes == ["A 3.02.14.a.", "A 3.02.14.b."]  # not A 3.02.140.*
+        chapter = [a["codice"] for a in index.by_prefix("A 3.02")]
+        assert chapter == ["A 3.02.2.a.", "A 3.02.14.a.", "A 3.02.14.b.", "A 3.02.140.a."]
+
+    def test_fuzzy_finds_codes_one_edit_away(self):
+        index = PrezzarioIndex(_ARTICLES)
+        assert [(a["codice"], d) for a, d in index.fuzzy("A 14.01.16.c.")] == [("A 14.01.15.c.", 1)]
+        assert index.fuzzy("A 14.01.26.d.") == []  # two edits
+
+    def test_fuzzy_exact_match_has_distance_zero(self):
+        index = PrezzarioIndex(_ARTICLES)
+        best, distance = index.fuzzy("A 3.02.14.a")[0]
+        assert best["codice"] == "A 3.02.14.a." and distance == 0
+
+    def test_load_accepts_extractor_output(self, tmp_path):
+        path = tmp_path / "prezzario.json"
+        path.write_text(json.dumps(_ARTICLES), encoding="utf-8")
+        assert len(PrezzarioIndex.load(path)) == len(_ARTICLES)
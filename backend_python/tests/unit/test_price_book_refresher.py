@@ -0,0 +1,96 @@
+"""
+Tests for live price-book reload (src/services/price_book_refresher.py)
+against the in-memory Firestore fake.
+"""
+import asyncio
+from datetime import UTC, datetime, timedelta
+from unittest.mock import patch
+
+import pytest
+from src.services.price_book_refresher import PriceBookRefresher
+from src.services.pricing_service import PriceBookSnapshot, PricingService
+from tests.unit.firestore_fake import FakeFirestore
+
+_PATH = "app_config/price_book"
+_T0 = datetime(2026, 1, 1, tzinfo=UTC)
+
+
+def _items(price: float) -> list[dict]:
+    return [{"sku": "DEM-001", "description": "Demolizione", "unit": "mq", "unit_price": price,
+             "category": "Demolizioni", "tags": ["demolizione"]}]
+
+
+@pytest.fixture(autouse=True)
+def _bundled_snapshot():
+    with patch.object(PricingService, "_snapshot", PriceBookSnapshot.load()):
+        yield
+
+
+async def test_swaps_in_a_newer_price_book():
+    db = FakeFirestore()
+    db.docs[_PATH] = {"items": _items(30.0), "updated_at": _T0}
+    refresher = PriceBookRefresher(db, interval=60)
+
+    assert await refresher.refresh_once()
+    assert PricingService.get_item_by_sku("DEM-001")["unit_price"] == 30.0
+    assert PricingService.get_item_by_sku("TIN-001") is None  # the Firestore book replaces the bundled one
+    first = PricingService.snapshot().version
+
+    db.rpcs.clear()
+    assert not await refresher.refresh_once()
+    assert db.round_trips == 1  # unchanged updated_at: one projected read, no full fetch
+
+    db.docs[_PATH] = {"items": _items(32.0), "updated_at": _T0 + timedelta(minutes=1)}
+    assert await refresher.refresh_once()
+    assert PricingService.get_item_by_sku("DEM-001")["unit_price"] == 32.0
+    assert PricingService.snapshot().version != first
+
+
+@pytest.mark.parametrize("broken", [
+    {"unit_price": None},  # readers multiply it
+    {"unit_price": True},
+    {"description": None},  # quotes and the insight prompt index it
+    {"unit": 3},
+    {"tags": "demolizione"},
+    {"range_max": "40"},
+])
+async def test_keeps_the_current_book_when_the_document_is_malformed(broken):
+    db = FakeFirestore()
+    db.docs[_PATH] = {"items": [{**_items(30.0)[0], **broken}], "updated_at": _T0}
+    before = PricingService.snapshot()
+    assert not await PriceBookRefresher(db, interval=60).refresh_once()
+    assert PricingService.snapshot() is before
+
+
+async def test_an_item_missing_a_required_field_is_malformed():
+    db = FakeFirestore()
+    item = _items(30.0)[0]
+    del item["unit"]
+    db.docs[_PATH] = {"items": [item], "updated_at": _T0}
+    assert not await PriceBookRefresher(db, interval=60).refresh_once()
+
+
+async def test_falls_back_to_the_bundled_json_when_the_document_is_removed():
+    db = FakeFirestore()
+    db.docs[_PATH] = {"items": _items(30.0), "updated_at": _T0}
+    refresher = PriceBookRefresher(db, interval=60)
+    await refresher.refresh_once()
+
+    del db.docs[_PATH]
+    assert await refresher.refresh_once()
+    assert PricingService.get_item_by_sku("DEM-001")["unit_price"] == 25.0
+    assert not PricingService.snapshot().version.startswith("firestore+")
+
+
+async def test_run_survives_firestore_errors():
+    class _Down(FakeFirestore):
+        async def _rpc(self, kind):
+            raise ConnectionError("unavailable")
+
+    refresher = PriceBookRefresher(_Down(), interval=0.01)
+    before = PricingService.snapshot()
+    task = refresher.start()
+    await asyncio.sleep(0.05)  # several failed polls
+    assert not task.done()
+    await refresher.stop()
+    assert PricingService.snapshot() is before
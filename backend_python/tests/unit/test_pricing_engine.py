@@ -7,9 +7,11 @@ Rule #20: When creating a Service, create tests/unit/test_{service}.py
 Verifies: SKU loading, per-item calculation, financial aggregation, and
 full quote construction from an AI-provided SKU list.
 """
+from unittest.mock import patch
+
 import pytest
 from src.schemas.quote import QuoteItem
-from src.services.pricing_service import PricingService
+from src.services.pricing_service import PriceBookSnapshot, PricingService
 
 # ─── Price Book Loading ───────────────────────────────────────────────────────
 
@@ -26,6 +28,49 @@ class TestLoadPriceBook:
             assert entry.get("sku") is not None, f"Entry missing 'sku': {entry}"
 
 
+# ─── Indexed Snapshot ─────────────────────────────────────────────────────────
+
+_ITEMS = [
+    {"sku": "A-1", "unit_price": 10.0, "range_min": 8.0, "range_max": 14.0, "category": "Pavimenti",
+     "tags": ["Gres", "posa"]},
+    {"sku": "A-2", "unit_price": 30.0, "category": "Pavimenti", "tags": ["parquet", "posa"]},
+    {"sku": "B-1", "unit_price": 5.0, "category": "Tinteggiature"},
+    {"sku": "A-1", "unit_price": 99.0},
+]
+
+
+class TestPriceBookSnapshot:
+    def test_indexes(self):
+        snap = PriceBookSnapshot.build(_ITEMS, "v1")
+        assert snap.by_sku["A-1"]["unit_price"] == 10.0  # first duplicate wins, as the old scan did
+        assert snap.ranges["A-1"] == (8.0, 14.0)
+        assert snap.ranges["A-2"] == (30.0, 30.0)  # no range: the unit price
+
+    def test_zero_range_bound_is_kept(self):
+        snap = PriceBookSnapshot.build([{"sku": "S-1", "unit_price": 40.0, "range_min": 0.0, "range_max": 60.0}])
+        assert snap.ranges["S-1"] == (0.0, 60.0)
+
+    def test_is_read_only(self):
+        snap = PriceBookSnapshot.build(_ITEMS, "v1")
+        with pytest.raises(TypeError):
+            snap.by_sku["X"] = {}
+        with pytest.raises(AttributeError):
+            snap.version = "v2"
+
+    def test_loaded_once_and_shared(self):
+        snap = PricingService.snapshot()
+        assert PricingService.snapshot() is snap
+        assert PricingService.load_price_book() is snap.items
+        assert "+" in snap.version  # file "version" + content digest
+        assert len(snap.by_sku) == len({i["sku"] for i in snap.items})
+
+    def test_quote_reads_the_shared_snapshot(self):
+        with patch.object(PricingService, "_snapshot", PriceBookSnapshot.build(
+            [{"sku": "A-1", "unit_price": 10.0, "description": "d", "unit": "mq"}], "test")):
+            quote = PricingService.create_quote_from_skus("p", "u", [{"sku": "A-1", "qty": 3}])
+        assert quote.items[0].total == 30.0
+
+
 # ─── SKU Lookup ───────────────────────────────────────────────────────────────
 
 class TestGetItemBySku:
@@ -408,3 +408,32 @@ class TestProjectsFailClosed:
         # The project doc must survive so the purge can be retried
         mock_doc_ref.delete.assert_not_awaited()
 
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("purge_fails", [False, True])
+    async def test_delete_project_purges_the_adk_session_log(self, purge_fails):
+        """GIVEN a project whose chat lives in the ADK session event log
+        WHEN delete_project is called
+        THEN the log is purged for that session, and a purge failure fails the
+        whole delete with the project document left in place for a retry.
+        """
+        from src.db import projects as projects_db
+        from src.db.projects.constants import PROJECTS_COLLECTION
+        from tests.unit.firestore_fake import FakeFirestore
+
+        db = FakeFirestore()
+        db.docs[f"{PROJECTS_COLLECTION}/project-abc"] = {"userId": "user-123"}
+        bucket = MagicMock()
+        bucket.list_blobs.return_value = []
+        purge = AsyncMock(side_effect=RuntimeError("firestore down") if purge_fails else None)
+
+        with (
+            patch('src.db.projects.deletion.get_async_firestore_client', return_value=db),
+            patch('src.db.projects.deletion.get_storage_client', return_value=bucket),
+            patch('src.adk.session.purge_sessions', purge),
+        ):
+            result = await projects_db.delete_project("project-abc", "user-123")
+
+        purge.assert_awaited_once_with(session_id="project-abc")
+        assert result is not purge_fails
+        assert (db.data(f"{PROJECTS_COLLECTION}/project-abc") is not None) is purge_fails
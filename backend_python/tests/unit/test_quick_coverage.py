@@ -79,7 +79,7 @@ class TestInsightEngine:
 
     def _make_engine(self):
         """Build InsightEngine with mocked genai client."""
-        with patch("src.services.insight_engine.genai.Client") as MockClient, \
+        with patch("src.services.insight_engine.get_genai_client") as MockClient, \
              patch("src.core.config.settings") as mock_settings:
             mock_settings.CHAT_MODEL_VERSION = "gemini-2.0-flash"
             mock_settings.api_key = "fake-key"
@@ -93,7 +93,7 @@ class TestInsightEngine:
             return engine
 
     def test_init_sets_model_name_from_settings(self):
-        with patch("src.services.insight_engine.genai.Client"), \
+        with patch("src.services.insight_engine.get_genai_client"), \
              patch("src.services.insight_engine.settings") as mock_settings:
             mock_settings.CHAT_MODEL_VERSION = "gemini-test"
             mock_settings.api_key = "key"
@@ -102,7 +102,7 @@ class TestInsightEngine:
             assert engine.model_name == "gemini-test"
 
     def test_init_with_explicit_model_name(self):
-        with patch("src.services.insight_engine.genai.Client"), \
+        with patch("src.services.insight_engine.get_genai_client"), \
              patch("src.services.insight_engine.settings") as mock_settings:
             mock_settings.api_key = "key"
             from src.services.insight_engine import InsightEngine
@@ -186,7 +186,7 @@ class TestInsightEngine:
         assert result.summary == "ok"
 
     def test_get_insight_engine_singleton(self):
-        with patch("src.services.insight_engine.genai.Client"), \
+        with patch("src.services.insight_engine.get_genai_client"), \
              patch("src.core.config.settings") as mock_settings:
             mock_settings.CHAT_MODEL_VERSION = "model"
             mock_settings.api_key = "key"
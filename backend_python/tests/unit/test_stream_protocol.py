@@ -5,10 +5,11 @@ Focus: the `start` lifecycle frame must be able to carry a stable `messageId`
 so the client adopts the backend-assigned id (eliminating the post-turn id
 swap that caused message re-mount flicker).
 """
+import asyncio
 import json
 
 import pytest
-from src.utils.stream_protocol import stream_text, to_ui_message_stream
+from src.utils.stream_protocol import TEXT_PART_ID, _sse, _sse_chunk, stream_text, to_ui_message_stream
 
 
 async def _empty_source():
@@ -62,3 +63,117 @@ async def test_text_turn_still_brackets_and_finishes_with_message_id():
     assert types[0] == "start"
     assert "text-start" in types and "text-delta" in types and "text-end" in types
     assert types[-1] == "finish"
+
+
+async def _token_source(tokens, delay: float = 0.0, tail=()):
+    for tok in tokens:
+        if delay:
+            await asyncio.sleep(delay)
+        async for chunk in stream_text(tok):
+            yield chunk
+    for chunk in tail:
+        yield chunk
+
+
+def _text(chunks) -> str:
+    return "".join(c["delta"] for c in chunks if c["type"] == "text-delta")
+
+
+@pytest.mark.asyncio
+async def test_coalescing_merges_burst_and_keeps_text():
+    tokens = [f"tok{i} " for i in range(200)]
+    frames = [f async for f in to_ui_message_stream(_token_source(tokens), coalesce_window_ms=50)]
+    chunks = _parse_frames(frames)
+    deltas = [c for c in chunks if c["type"] == "text-delta"]
+
+    assert _text(chunks) == "".join(tokens)
+    # The first token leaves immediately; the rest of the burst shares a few frames.
+    assert deltas[0]["delta"] == "tok0 "
+    assert len(deltas) < 10
+    assert [c["type"] for c in chunks][-2:] == ["text-end", "finish"]
+
+
+@pytest.mark.asyncio
+async def test_coalescing_respects_char_budget():
+    tokens = ["x" * 100] * 50
+    frames = [f async for f in to_ui_message_stream(
+        _token_source(tokens), coalesce_window_ms=1000, coalesce_max_chars=300,
+    )]
+    deltas = [c["delta"] for c in _parse_frames(frames) if c["type"] == "text-delta"]
+    assert "".join(deltas) == "x" * 5000
+    assert max(len(d) for d in deltas) <= 300
+
+
+@pytest.mark.asyncio
+async def test_coalescing_flushes_on_window_while_source_idle():
+    async def source():
+        async for c in stream_text("a"):
+            yield c
+        async for c in stream_text("b"):
+            yield c
+        await asyncio.sleep(0.2)
+        async for c in stream_text("c"):
+            yield c
+
+    gen = to_ui_message_stream(source(), coalesce_window_ms=20)
+    seen = []
+    loop = asyncio.get_running_loop()
+    t0 = loop.time()
+    async for frame in gen:
+        seen.append((loop.time() - t0, frame))
+    b_at = next(t for t, f in seen if '"delta":"b"' in f)
+    assert b_at < 0.15  # flushed by the timer, not held until "c" arrives
+
+
+@pytest.mark.asyncio
+async def test_coalescing_preserves_order_around_data_chunks():
+    status = {"type": "data-status", "data": {"type": "status", "message": "x"}, "transient": True}
+    frames = [f async for f in to_ui_message_stream(
+        _token_source(["a", "b"], tail=[status, {"type": "text-delta", "id": "0", "delta": "c"}]),
+        coalesce_window_ms=1000,
+    )]
+    types = [c["type"] for c in _parse_frames(frames)]
+    assert types == [
+        "start", "text-start", "text-delta", "text-delta", "text-end",
+        "data-status", "text-start", "text-delta", "text-end", "finish",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_coalescing_flushes_buffer_before_error_frame():
+    async def source():
+        async for c in _token_source(["a", "b", "c"]):
+            yield c
+        raise RuntimeError("boom")
+
+    frames = [f async for f in to_ui_message_stream(source(), coalesce_window_ms=1000)]
+    chunks = _parse_frames(frames)
+    assert _text(chunks) == "abc"
+    assert [c["type"] for c in chunks][-3:] == ["text-end", "error", "finish"]
+
+
+@pytest.mark.asyncio
+async def test_coalescing_closes_source_on_disconnect():
+    closed = asyncio.Event()
+
+    async def source():
+        try:
+            while True:
+                async for c in stream_text("tok"):
+                    yield c
+                await asyncio.sleep(0.001)
+        finally:
+            closed.set()
+
+    gen = to_ui_message_stream(source(), coalesce_window_ms=5)
+    async for frame in gen:
+        if "text-delta" in frame:
+            break
+    await gen.aclose()
+    assert closed.is_set()
+
+
+def test_fast_text_delta_frame_matches_generic_serializer():
+    chunk = {"type": "text-delta", "id": TEXT_PART_ID, "delta": 'Però "già" \\ fatto\n'}
+    assert _sse_chunk(chunk) == _sse(chunk)
+    assert json.loads(_sse_chunk(chunk)[len("data: "):]) == chunk
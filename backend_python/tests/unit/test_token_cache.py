@@ -0,0 +1,176 @@
+"""Tests for src/auth/token_cache.py and its use in verify_token."""
+import asyncio
+import time
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+import pytest
+from src.auth.token_cache import VerifiedTokenCache
+
+
+def _claims(uid: str = "u1", ttl: float = 3600, iat: float | None = None) -> dict:
+    now = time.time()
+    return {"uid": uid, "exp": now + ttl, "iat": iat if iat is not None else now, "aud": "proj"}
+
+
+class TestVerifiedTokenCache:
+    def test_miss_then_hit(self):
+        cache = VerifiedTokenCache()
+        assert cache.get("tok") is None
+        cache.put("tok", _claims())
+        assert cache.get("tok")["uid"] == "u1"
+        stats = cache.stats()
+        assert (stats["hits"], stats["misses"], stats["size"]) == (1, 1, 1)
+
+    def test_raw_token_is_not_stored(self):
+        cache = VerifiedTokenCache()
+        cache.put("secret.jwt.value", _claims())
+        assert "secret.jwt.value" not in cache._entries
+
+    def test_entry_expires_at_token_exp(self):
+        cache = VerifiedTokenCache()
+        cache.put("tok", _claims(ttl=10))
+        with patch("src.auth.token_cache.time.time", return_value=time.time() + 11):
+            assert cache.get("tok") is None
+        assert cache.stats()["size"] == 0
+
+    def test_already_expired_token_not_cached(self):
+        cache = VerifiedTokenCache()
+        cache.put("tok", _claims(ttl=-1))
+        assert cache.stats()["size"] == 0
+
+    def test_lru_bound(self):
+        cache = VerifiedTokenCache(max_entries=2)
+        cache.put("a", _claims("a"))
+        cache.put("b", _claims("b"))
+        cache.get("a")  # a becomes most recent
+        cache.put("c", _claims("c"))
+        assert cache.get("b") is None
+        assert cache.get("a") is not None
+        assert cache.stats()["evictions"] == 1
+
+    def test_invalidate_uid(self):
+        cache = VerifiedTokenCache()
+        cache.put("t1", _claims("u1"))
+        cache.put("t2", _claims("u1"))
+        cache.put("t3", _claims("u2"))
+        assert cache.invalidate_uid("u1") == 2
+        assert cache.get("t3") is not None
+
+
+class TestRevocationRecheck:
+    async def _hit_and_drain(self, cache: VerifiedTokenCache, token: str):
+        result = cache.get(token)
+        await asyncio.gather(*cache._rechecks.values())
+        return result
+
+    async def test_fresh_entry_does_not_recheck(self):
+        cache = VerifiedTokenCache(recheck_seconds=300)
+        cache.put("tok", _claims())
+        with patch("src.auth.token_cache._fetch_user") as fetch:
+            await self._hit_and_drain(cache, "tok")
+        fetch.assert_not_called()
+
+    async def test_revoked_user_is_evicted(self):
+        cache = VerifiedTokenCache(recheck_seconds=0)
+        iat = time.time() - 60
+        cache.put("tok", _claims(iat=iat))
+        user = SimpleNamespace(disabled=False, tokens_valid_after_timestamp=int((iat + 30) * 1000))
+        with patch("src.auth.token_cache._fetch_user", return_value=user):
+            # The hit that triggers the recheck is still served (background check)...
+            assert await self._hit_and_drain(cache, "tok") is not None
+        # ...but the next one falls back to full verification.
+        assert cache.get("tok") is None
+        assert cache.stats()["revocations"] == 1
+
+    async def test_disabled_user_is_evicted(self):
+        cache = VerifiedTokenCache(recheck_seconds=0)
+        cache.put("tok", _claims())
+        user = SimpleNamespace(disabled=True, tokens_valid_after_timestamp=None)
+        with patch("src.auth.token_cache._fetch_user", return_value=user):
+            await self._hit_and_drain(cache, "tok")
+        assert cache.get("tok") is None
+
+    async def test_valid_user_refreshes_checked_at(self):
+        cache = VerifiedTokenCache(recheck_seconds=0)
+        cache.put("tok", _claims(iat=time.time()))
+        user = SimpleNamespace(disabled=False, tokens_valid_after_timestamp=int((time.time() - 3600) * 1000))
+        with patch("src.auth.token_cache._fetch_user", return_value=user):
+            await self._hit_and_drain(cache, "tok")
+        assert cache.stats()["size"] == 1
+        assert cache.stats()["revocations"] == 0
+
+    async def test_recheck_failure_fails_closed(self):
+        cache = VerifiedTokenCache(recheck_seconds=0)
+        cache.put("tok", _claims())
+        with patch("src.auth.token_cache._fetch_user", side_effect=RuntimeError("firebase down")):
+            await self._hit_and_drain(cache, "tok")
+        assert cache.stats()["size"] == 0
+
+
+class TestVerifyTokenUsesCache:
+    @pytest.fixture
+    def request_with_token(self):
+        req = MagicMock()
+        req.headers = {"Authorization": "Bearer tok-abc"}
+        req.client = None
+        return req
+
+    async def test_second_request_skips_firebase(self, request_with_token):
+        from src.auth import jwt_handler
+        from src.core.config import settings
+
+        cache = VerifiedTokenCache()
+        claims = _claims("user-1")
+        claims["aud"] = settings.GOOGLE_CLOUD_PROJECT or settings.FIREBASE_PROJECT_ID or "proj"
+        claims["firebase"] = {"sign_in_provider": "anonymous"}
+        with patch.object(jwt_handler, "get_token_cache", return_value=cache), \
+             patch.object(jwt_handler, "init_firebase"), \
+             patch.object(jwt_handler.auth, "verify_id_token", return_value=claims) as verify:
+            first = await jwt_handler.verify_token(request_with_token)
+            second = await jwt_handler.verify_token(request_with_token)
+
+        assert verify.call_count == 1
+        assert first.uid == second.uid == "user-1"
+        assert cache.stats()["hits"] == 1
+
+    async def test_rejected_token_is_not_cached(self, request_with_token):
+        from src.auth import jwt_handler
+        from src.core.exceptions import AuthError
+
+        cache = VerifiedTokenCache()
+        with patch.object(jwt_handler, "get_token_cache", return_value=cache), \
+             patch.object(jwt_handler, "init_firebase"), \
+             patch.object(jwt_handler.auth, "verify_id_token",
+                          side_effect=jwt_handler.auth.RevokedIdTokenError("revoked")):
+            with pytest.raises(AuthError):
+                await jwt_handler.verify_token(request_with_token)
+        assert cache.stats()["size"] == 0
+
+    async def test_token_without_uid_is_rejected(self, request_with_token):
+        from src.auth import jwt_handler
+        from src.core.config import settings
+        from src.core.exceptions import AuthError
+
+        claims = _claims("user-1")
+        claims["aud"] = settings.GOOGLE_CLOUD_PROJECT or settings.FIREBASE_PROJECT_ID or "proj"
+        del claims["uid"]
+        with patch.object(jwt_handler, "get_token_cache", return_value=None), \
+             patch.object(jwt_handler, "init_firebase"), \
+             patch.object(jwt_handler.auth, "verify_id_token", return_value=claims):
+            with pytest.raises(AuthError) as exc_info:
+                await jwt_handler.verify_token(request_with_token)
+        assert exc_info.value.detail == {"reason": "missing_uid"}
+
+
+async def test_ready_exposes_token_cache_counters():
+    from httpx import ASGITransport, AsyncClient
+    from main import app
+
+    cache = VerifiedTokenCache()
+    cache.get("unknown-token")
+    with patch("src.auth.token_cache.get_token_cache", return_value=cache), \
+         patch("src.db.firebase_client.get_firestore_client"):
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+            resp = await client.get("/ready")
+    assert resp.json()["token_cache"]["misses"] == 1
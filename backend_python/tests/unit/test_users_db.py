@@ -0,0 +1,48 @@
+"""
+Unit Tests - GDPR erasure (src/db/users.py delete_user_data).
+"""
+from unittest.mock import AsyncMock, call, patch
+
+import pytest
+from tests.unit.firestore_fake import FakeFirestore
+
+
+def _seed(db: FakeFirestore) -> None:
+    db.docs["sessions/chat-1"] = {"userId": "u1"}
+    db.docs["sessions/chat-1/messages/m1"] = {"content": "via Roma 1"}
+    db.docs["sessions/chat-other"] = {"userId": "u2"}
+    db.docs["users/u1"] = {"email": "u1@example.com"}
+
+
+async def test_delete_user_data_purges_adk_sessions_by_user_and_by_chat():
+    db = FakeFirestore()
+    _seed(db)
+    purge = AsyncMock(side_effect=[2, 1])
+
+    with (
+        patch("src.db.users.get_async_firestore_client", return_value=db),
+        patch("src.db.users.purge_sessions", purge),
+        patch("firebase_admin.auth.delete_user"),
+    ):
+        from src.db.users import delete_user_data
+        summary = await delete_user_data("u1")
+
+    # By chat too: a guest chat claimed by u1 was logged under the guest uid.
+    assert purge.await_args_list == [call(user_id="u1"), call(session_id="chat-1")]
+    assert summary["adk_sessions"] == 3
+    assert set(db.docs) == {"sessions/chat-other"}
+
+
+async def test_delete_user_data_fails_closed_when_the_adk_purge_fails():
+    db = FakeFirestore()
+    _seed(db)
+
+    with (
+        patch("src.db.users.get_async_firestore_client", return_value=db),
+        patch("src.db.users.purge_sessions", AsyncMock(side_effect=RuntimeError("firestore down"))),
+        pytest.raises(RuntimeError),
+    ):
+        from src.db.users import delete_user_data
+        await delete_user_data("u1")
+
+    assert db.data("users/u1") is not None  # erasure not reported, profile left for the retry
@@ -0,0 +1,119 @@
+"""Tests for the pre-model image normalization stage (src/vision/preprocess.py)."""
+import io
+from unittest.mock import patch
+
+import pytest
+from PIL import Image
+from src.vision import preprocess
+from src.vision.preprocess import normalize_image, prepare_image
+
+_GPS_IFD = 0x8825
+_MAKE = 0x010F
+
+
+def _image_bytes(
+    size=(4000, 3000), fmt="JPEG", mode="RGB", orientation: int | None = None, gps: bool = False,
+) -> bytes:
+    img = Image.radial_gradient("L").resize(size).convert(mode)
+    out = io.BytesIO()
+    kwargs = {}
+    if orientation is not None or gps:
+        exif = Image.Exif()
+        if orientation is not None:
+            exif[0x0112] = orientation
+        if gps:
+            exif[_MAKE] = "PhoneMaker"
+            exif[_GPS_IFD] = {1: "N", 2: (41.0, 54.0, 0.0)}
+        kwargs["exif"] = exif
+    img.save(out, format=fmt, **kwargs)
+    return out.getvalue()
+
+
+@pytest.fixture(autouse=True)
+def _clear_cache():
+    preprocess.clear_preprocess_cache()
+    yield
+    preprocess.clear_preprocess_cache()
+
+
+class TestNormalizeImage:
+    def test_downscales_to_long_edge(self):
+        src = _image_bytes()
+        out = normalize_image(src, long_edge=1024)
+        assert out.transformed
+        assert max(out.width, out.height) == 1024
+        assert len(out.data) < len(src)
+        assert Image.open(io.BytesIO(out.data)).size == (1024, 768)
+
+    def test_exif_orientation_applied_and_stripped(self):
+        src = _image_bytes(size=(400, 200), orientation=6)  # rotate 90° CW on display
+        out = normalize_image(src, long_edge=1024)
+        assert (out.width, out.height) == (200, 400)
+        assert 0x0112 not in Image.open(io.BytesIO(out.data)).getexif()
+
+    def test_small_jpeg_passes_through(self):
+        src = _image_bytes(size=(640, 480))
+        out = normalize_image(src, "image/jpeg", long_edge=1024)
+        assert not out.transformed
+        assert out.data is src
+
+    @pytest.mark.parametrize("fmt", ["JPEG", "WEBP"])
+    def test_small_photo_keeps_pixels_but_loses_exif(self, fmt):
+        src = _image_bytes(size=(640, 480), fmt=fmt, orientation=1, gps=True)
+        assert _GPS_IFD in Image.open(io.BytesIO(src)).getexif()
+        out = normalize_image(src, "image/jpeg", long_edge=1024)
+        assert not out.transformed and out.source_bytes == len(src)
+        stripped = Image.open(io.BytesIO(out.data))
+        assert not stripped.getexif()
+        assert stripped.tobytes() == Image.open(io.BytesIO(src)).tobytes()
+
+    def test_small_png_is_always_reencoded(self):
+        src = _image_bytes(size=(8, 8), fmt="PNG", gps=True)
+        out = normalize_image(src, "image/png", long_edge=1024)
+        assert out.transformed  # no lossless metadata strip for PNG: never forwarded as-is
+        assert not Image.open(io.BytesIO(out.data)).getexif()
+
+    def test_undecodable_bytes_pass_through(self):
+        out = normalize_image(b"not an image", "image/heic", long_edge=1024)
+        assert not out.transformed
+        assert out.data == b"not an image"
+        assert out.mime_type == "image/heic"
+
+    def test_rgba_png_flattened_to_jpeg(self):
+        src = _image_bytes(size=(3000, 2000), fmt="PNG", mode="RGBA")
+        out = normalize_image(src, "image/png", long_edge=1024)
+        assert out.mime_type == "image/jpeg"
+        assert Image.open(io.BytesIO(out.data)).mode == "RGB"
+
+    def test_webp_output(self):
+        out = normalize_image(_image_bytes(), long_edge=512, encode_format="webp")
+        assert out.mime_type == "image/webp"
+        assert Image.open(io.BytesIO(out.data)).format == "WEBP"
+
+
+class TestPrepareImage:
+    async def test_uses_long_edge_per_use_case(self):
+        src = _image_bytes()
+        triage = await prepare_image(src, use="triage")
+        cad = await prepare_image(src, use="cad")
+        assert max(triage.width, triage.height) == 1024
+        assert max(cad.width, cad.height) == 2048
+
+    async def test_result_cached_by_source_hash(self):
+        src = _image_bytes()
+        first = await prepare_image(src, use="triage")
+        with patch.object(preprocess, "normalize_image") as mock_normalize:
+            second = await prepare_image(bytes(src), use="triage")
+        mock_normalize.assert_not_called()
+        assert second is first
+
+    async def test_non_image_mime_untouched(self):
+        out = await prepare_image(b"\x00\x00video", "video/mp4")
+        assert out.data == b"\x00\x00video"
+        assert out.mime_type == "video/mp4"
+
+    async def test_disabled_flag_passes_through(self):
+        src = _image_bytes()
+        with patch.object(preprocess.settings, "VISION_PREPROCESS_ENABLED", False):
+            out = await prepare_image(src)
+        assert out.data is src
@@ -0,0 +1,123 @@
+"""Tests for the vision result cache (src/vision/result_cache.py)."""
+import json
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from src.vision import result_cache
+from src.vision.result_cache import SqliteResultStore, VisionResultCache, vision_cache_key
+from src.vision.triage import analyze_image_triage
+
+_TRIAGE_JSON = json.dumps({"roomType": "bagno", "currentStyle": "classico", "keyFeatures": ["vasca"]})
+
+
+def _triage_client(text: str = _TRIAGE_JSON) -> MagicMock:
+    client = MagicMock()
+    client.aio.models.generate_content = AsyncMock(return_value=MagicMock(text=text))
+    return client
+
+
+class TestVisionCacheKey:
+    def test_key_changes_with_every_component(self):
+        base = vision_cache_key(b"img", "triage", "prompt", "flash")
+        assert vision_cache_key(b"img", "triage", "prompt", "flash") == base
+        assert vision_cache_key(b"img2", "triage", "prompt", "flash") != base
+        assert vision_cache_key(b"img", "measure_room", "prompt", "flash") != base
+        assert vision_cache_key(b"img", "triage", "prompt v2", "flash") != base
+        assert vision_cache_key(b"img", "triage", "prompt", "pro") != base
+
+    def test_key_follows_the_preprocessing_settings(self):
+        base = vision_cache_key(b"img", "triage", "prompt", "flash", use="triage")
+        assert vision_cache_key(b"img", "triage", "prompt", "flash") != base
+        with patch.object(result_cache.settings, "VISION_ENCODE_QUALITY", 60):
+            assert vision_cache_key(b"img", "triage", "prompt", "flash", use="triage") != base
+
+
+class TestVisionResultCache:
+    async def test_memory_hit_returns_a_copy(self):
+        cache = VisionResultCache(max_entries=4, ttl_seconds=60)
+        await cache.put("k", {"features": ["a"]})
+        first = await cache.get("k")
+        first["features"].append("mutated")
+        assert await cache.get("k") == {"features": ["a"]}
+        assert cache.stats()["hits"] == 2
+
+    async def test_lru_evicts_oldest(self):
+        cache = VisionResultCache(max_entries=2, ttl_seconds=60)
+        for key in ("a", "b", "c"):
+            await cache.put(key, {"k": key})
+        assert await cache.get("a") is None
+        assert await cache.get("c") == {"k": "c"}
+
+    async def test_expired_entry_is_a_miss(self):
+        cache = VisionResultCache(max_entries=4, ttl_seconds=60)
+        with patch.object(result_cache.time, "time", return_value=1000.0):
+            await cache.put("k", {"v": 1})
+        with patch.object(result_cache.time, "time", return_value=1061.0):
+            assert await cache.get("k") is None
+
+    async def test_disabled_cache_stores_nothing(self):
+        cache = VisionResultCache(max_entries=4, ttl_seconds=60, enabled=False)
+        await cache.put("k", {"v": 1})
+        assert await cache.get("k") is None
+
+    async def test_sqlite_tier_survives_a_new_memory_tier(self, tmp_path):
+        path = str(tmp_path / "vision.sqlite3")
+        await VisionResultCache(4, 60, store=SqliteResultStore(path)).put("k", {"v": 1})
+        fresh = VisionResultCache(4, 60, store=SqliteResultStore(path))
+        assert await fresh.get("k") == {"v": 1}
+        assert fresh.stats()["store_hits"] == 1
+
+    async def test_sqlite_purges_expired_rows_periodically(self, tmp_path):
+        store = SqliteResultStore(str(tmp_path / "vision.sqlite3"))
+        with patch.object(result_cache.time, "time", return_value=1000.0):
+            await store.put("old", {"v": 1}, expires_at=1001.0)
+        with patch.object(result_cache.time, "time", return_value=1010.0):
+            await store.put("new", {"v": 2}, expires_at=2000.0)  # within the purge interval
+        count = "SELECT COUNT(*) FROM vision_results"
+        assert store._conn.execute(count).fetchone()[0] == 2
+        with patch.object(result_cache.time, "time", return_value=1000.0 + result_cache._PURGE_INTERVAL_SECONDS):
+            await store.put("newer", {"v": 3}, expires_at=2000.0)
+        assert store._conn.execute(count).fetchone()[0] == 2
+        assert await store.get("old") is None
+
+    async def test_broken_store_degrades_to_miss(self):
+        store = MagicMock()
+        store.get = AsyncMock(side_effect=RuntimeError("firestore down"))
+        store.put = AsyncMock(side_effect=RuntimeError("firestore down"))
+        cache = VisionResultCache(4, 60, store=store)
+        await cache.put("k", {"v": 1})
+        assert await cache.get("k") == {"v": 1}  # memory tier still serves it
+        assert await cache.get("other") is None
+        assert cache.stats()["store_errors"] == 2
+
+
+class TestTriageCaching:
+    @pytest.fixture(autouse=True)
+    def _no_preprocess(self):
+        with patch("src.vision.triage.prepare_image", new=AsyncMock(return_value=MagicMock(mime_type="image/jpeg", data=b"x"))):
+            yield
+
+    async def test_second_call_on_same_photo_skips_gemini(self):
+        client = _triage_client()
+        with patch("src.vision.triage.get_genai_client", return_value=client):
+            first = await analyze_image_triage(b"photo")
+            second = await analyze_image_triage(b"photo")
+        assert first == second
+        assert first["roomType"] == "bagno"
+        assert client.aio.models.generate_content.await_count == 1
+
+    async def test_bypass_flag_forces_fresh_call(self):
+        client = _triage_client()
+        with patch("src.vision.triage.get_genai_client", return_value=client):
+            await analyze_image_triage(b"photo")
+            await analyze_image_triage(b"photo", use_cache=False)
+        assert client.aio.models.generate_content.await_count == 2
+
+    async def test_fallback_result_is_not_cached(self):
+        client = _triage_client(text="")
+        with patch("src.vision.triage.get_genai_client", return_value=client):
+            failed = await analyze_image_triage(b"photo")
+            client.aio.models.generate_content.return_value = MagicMock(text=_TRIAGE_JSON)
+            recovered = await analyze_image_triage(b"photo")
+        assert failed["success"] is False
+        assert recovered["success"] is True